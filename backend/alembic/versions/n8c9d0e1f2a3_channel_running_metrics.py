@@ -0,0 +1,59 @@
+"""channels: running aggregates для инкрементальных метрик (resolved / ROI sum / ROI count)
+
+Revision ID: n8c9d0e1f2a3
+Revises: m7b8c9d0e1f2
+Create Date: 2026-10-16
+
+accuracy и average_roi каналов больше не пересчитываются полным проходом по signals:
+счётчики обновляются при каждом flush (app/services/metrics_calculator.py),
+recalculate_all_channels — сверка одним GROUP BY.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "n8c9d0e1f2a3"
+down_revision: Union[str, None] = "m7b8c9d0e1f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_HIT = "('TP1_HIT', 'TP2_HIT', 'TP3_HIT', 'ENTRY_HIT')"
+_RESOLVED = "('TP1_HIT', 'TP2_HIT', 'TP3_HIT', 'ENTRY_HIT', 'SL_HIT', 'EXPIRED', 'CANCELLED')"
+
+
+def upgrade() -> None:
+    op.add_column("channels", sa.Column("resolved_signals", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("channels", sa.Column("roi_sum", sa.Float(), nullable=False, server_default="0"))
+    op.add_column("channels", sa.Column("roi_count", sa.Integer(), nullable=False, server_default="0"))
+
+    # Начальное заполнение из истории; дальше счётчики ведёт приложение
+    op.execute(
+        f"""
+        UPDATE channels SET
+            signals_count = (SELECT COUNT(*) FROM signals s WHERE s.channel_id = channels.id),
+            resolved_signals = (
+                SELECT COUNT(*) FROM signals s
+                WHERE s.channel_id = channels.id AND CAST(s.status AS VARCHAR) IN {_RESOLVED}
+            ),
+            successful_signals = (
+                SELECT COUNT(*) FROM signals s
+                WHERE s.channel_id = channels.id AND CAST(s.status AS VARCHAR) IN {_HIT}
+            ),
+            roi_sum = COALESCE((
+                SELECT SUM(s.profit_loss_percentage) FROM signals s
+                WHERE s.channel_id = channels.id
+            ), 0),
+            roi_count = (
+                SELECT COUNT(s.profit_loss_percentage) FROM signals s
+                WHERE s.channel_id = channels.id
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("channels", "roi_count")
+    op.drop_column("channels", "roi_sum")
+    op.drop_column("channels", "resolved_signals")
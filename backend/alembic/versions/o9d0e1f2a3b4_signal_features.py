@@ -0,0 +1,48 @@
+"""signal_features — point-in-time признаки сигналов для обучения и инференса
+
+Revision ID: o9d0e1f2a3b4
+Revises: n8c9d0e1f2a3
+Create Date: 2026-10-16
+
+Заполняется инкрементально (app/services/feature_store.py): ML sweep перед предсказанием,
+periodic_ml_train перед обучением. train_from_db.py читает таблицу потоково, без LIMIT.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "o9d0e1f2a3b4"
+down_revision: Union[str, None] = "n8c9d0e1f2a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "signal_features",
+        sa.Column("signal_id", sa.Integer(), nullable=False),
+        sa.Column("as_of", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("feature_version", sa.Integer(), nullable=False),
+        sa.Column("confidence_score", sa.Float(), nullable=True),
+        sa.Column("risk_reward_ratio", sa.Float(), nullable=True),
+        sa.Column("price_deviation", sa.Float(), nullable=True),
+        sa.Column("direction", sa.Float(), nullable=False),
+        sa.Column("rsi", sa.Float(), nullable=True),
+        sa.Column("macd", sa.Float(), nullable=True),
+        sa.Column("channel_accuracy", sa.Float(), nullable=True),
+        sa.Column("channel_signal_count", sa.Integer(), nullable=False),
+        sa.Column("has_indicators", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("computed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["signal_id"], ["signals.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("signal_id"),
+    )
+    op.create_index("ix_signal_features_as_of", "signal_features", ["as_of"], unique=False)
+    op.create_index("ix_signal_features_version", "signal_features", ["feature_version"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_signal_features_version", table_name="signal_features")
+    op.drop_index("ix_signal_features_as_of", table_name="signal_features")
+    op.drop_table("signal_features")
@@ -0,0 +1,28 @@
+"""keyset pagination: (created_at, id) индексы для dashboard-лент сигналов и каналов
+
+Revision ID: p0e1f2a3b4c5
+Revises: o9d0e1f2a3b4
+Create Date: 2026-10-16
+
+Страницы читаются по курсору WHERE (created_at, id) < (:c, :i) ORDER BY created_at DESC, id DESC
+вместо OFFSET; лента канала использует существующий ix_signals_channel_created.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "p0e1f2a3b4c5"
+down_revision: Union[str, None] = "o9d0e1f2a3b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_signals_created_id", "signals", ["created_at", "id"], unique=False)
+    op.create_index("ix_channels_created_id", "channels", ["created_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_channels_created_id", table_name="channels")
+    op.drop_index("ix_signals_created_id", table_name="signals")
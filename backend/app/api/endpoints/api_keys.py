@@ -8,7 +8,7 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from app.core.database import get_db
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.core.auth import require_feature
 try:
     from app.services.api_key_service import api_key_service
@@ -31,7 +31,7 @@ class UpdateAPIKeyRequest(BaseModel):
 @router.post("/api-keys")
 async def create_api_key(
     request: CreateAPIKeyRequest,
-    current_user: User = Depends(require_feature("api_access")),
+    current_user: Principal = Depends(require_feature("api_access")),
     db: Session = Depends(get_db)
 ):
     """
@@ -62,7 +62,7 @@ async def create_api_key(
 
 @router.get("/api-keys")
 async def list_api_keys(
-    current_user: User = Depends(require_feature("api_access")),
+    current_user: Principal = Depends(require_feature("api_access")),
     db: Session = Depends(get_db)
 ):
     """
@@ -88,7 +88,7 @@ async def list_api_keys(
 async def update_api_key(
     key_id: int,
     request: UpdateAPIKeyRequest,
-    current_user: User = Depends(require_feature("api_access")),
+    current_user: Principal = Depends(require_feature("api_access")),
     db: Session = Depends(get_db)
 ):
     """
@@ -120,7 +120,7 @@ async def update_api_key(
 @router.delete("/api-keys/{key_id}")
 async def revoke_api_key(
     key_id: int,
-    current_user: User = Depends(require_feature("api_access")),
+    current_user: Principal = Depends(require_feature("api_access")),
     db: Session = Depends(get_db)
 ):
     """
@@ -143,7 +143,7 @@ async def revoke_api_key(
 
 @router.get("/api-keys/usage")
 async def get_api_usage_stats(
-    current_user: User = Depends(require_feature("api_access")),
+    current_user: Principal = Depends(require_feature("api_access")),
     db: Session = Depends(get_db)
 ):
     """
@@ -166,7 +166,7 @@ async def get_api_usage_stats(
 
 @router.get("/api-keys/permissions")
 async def get_available_permissions(
-    current_user: User = Depends(require_feature("api_access"))
+    current_user: Principal = Depends(require_feature("api_access"))
 ):
     """
     Get list of available API permissions for Pro users
@@ -265,25 +265,48 @@ def delete_channel(
 def get_channel_signals(
     channel_id: int,
     db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    skip: int = Query(0, ge=0, description="Deprecated: OFFSET, используйте cursor"),
+    limit: int = Query(100, ge=1, le=500),
     current_user: models.User = Depends(auth.get_current_active_user),
 ):
     """
     Retrieve signals from a specific channel (authenticated-only).
     Сигналы — премиум-функционал; Free может видеть только антирейтинг
     каналов (`GET /api/v1/channels/`) и их базовую статистику.
+
+    Keyset-пагинация: следующая страница — ?cursor=<next_cursor>; total считается
+    только для первой страницы (на следующих — null).
     """
-    from app.services.signal_service import SignalService
-    from app.schemas.signal import SignalFilterParams
+    from app.services.keyset_pagination import InvalidCursor, keyset_page
+
+    cache_key = None
+    try:
+        from app.core.redis_cache import cache_get, key_channel_signals
+        cache_key = key_channel_signals(channel_id, cursor or (f"o{skip}" if skip else ""), limit)
+        cached = cache_get(cache_key)
+        if cached is not None:
+            return cached
+    except Exception:
+        pass
 
     channel = db.query(models.Channel).filter(models.Channel.id == channel_id).first()
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
 
-    signal_service = SignalService(db)
-    filters = SignalFilterParams(channel_id=channel_id)
-    signals, total = signal_service.get_signals(skip=skip, limit=limit, filters=filters)
+    query = db.query(models.Signal).filter(models.Signal.channel_id == channel_id)
+    next_cursor = None
+    if skip and not cursor:
+        signals = (
+            query.order_by(models.Signal.created_at.desc(), models.Signal.id.desc())
+            .offset(skip).limit(limit).all()
+        )
+    else:
+        try:
+            signals, next_cursor = keyset_page(query, models.Signal, cursor, limit)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    total = query.count() if not cursor else None
 
     items = []
     for s in signals:
@@ -300,7 +323,15 @@ def get_channel_signals(
             "profit_loss_percentage": float(s.profit_loss_percentage) if s.profit_loss_percentage else None,
             "created_at": s.created_at.isoformat() if s.created_at else None,
         })
-    return {"items": items, "total": total, "skip": skip, "limit": limit}
+    result = {"items": items, "total": total, "skip": skip, "limit": limit, "next_cursor": next_cursor}
+
+    if cache_key is not None:
+        try:
+            from app.core.redis_cache import cache_set, CACHE_TTL_VERSIONED
+            cache_set(cache_key, result, CACHE_TTL_VERSIONED)
+        except Exception:
+            pass
+    return result
 
 
 @router.get("/{channel_id}/statistics")
@@ -331,5 +362,5 @@ def get_channel_statistics(
         "successful_signals": successful,
         "accuracy": round(accuracy, 1),
         "average_roi": round(stats.average_roi, 2),
-        "max_drawdown": 0,
+        "max_drawdown": stats.max_drawdown,
     } 
\ No newline at end of file
@@ -12,6 +12,7 @@ from app.core.auth import get_current_user, get_optional_current_user, require_p
 from app.models.channel import Channel
 from app.models.signal import Signal
 from app.models.user import User
+from app.services.principal_cache import Principal
 from app.services.telegram_scraper import collect_signals_from_channel
 from app.services.collection_pipeline import (
     persist_parsed_signals_for_channel,
@@ -82,7 +83,7 @@ async def collect_channel_signals(
 @router.post("/collect-all")
 async def collect_all_channels(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
     """Collect signals from all active channels."""
     settings = get_settings()
@@ -138,7 +139,7 @@ async def collect_all_channels(
 @router.post("/recalculate-metrics")
 async def recalculate_metrics(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
     """Recalculate accuracy and ROI for all channels."""
     results = recalculate_all_channels(db)
@@ -170,7 +171,7 @@ async def validate_signal(
 @router.post("/check-signals")
 async def check_signals(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
     """Check pending signals against current market prices. Updates TP/SL hit status."""
     result = await check_pending_signals(db)
@@ -182,7 +183,7 @@ async def check_signals(
 async def deep_collect(
     request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
     """Deep historical collection: scrape ALL posts, validate against CoinGecko prices."""
     result = await deep_collect_and_validate(db)
@@ -192,7 +193,7 @@ async def deep_collect(
 @router.post("/collect-reddit")
 async def collect_reddit(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
     """Collect signals from Reddit crypto subreddits."""
     total_saved = 0
@@ -233,7 +234,7 @@ async def collect_reddit(
 @router.post("/ocr-parse")
 async def ocr_parse_signal(
     image_url: str,
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
     """Extract trading signal from image URL via OCR (premium-only).
 
@@ -257,7 +258,7 @@ async def ocr_parse_signal(
 @router.post("/validate-history")
 async def validate_historical(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
     """Validate all signals against historical CoinGecko prices. Updates accuracy."""
     result = await validate_all_signals(db)
@@ -278,7 +279,7 @@ async def telethon_collect(
     channel_username: str,
     days: int = 90,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
     """Collect deep history from a channel via Telethon (requires auth).
 
@@ -309,7 +310,7 @@ async def telethon_collect(
 async def telethon_collect_all(
     days: int = 90,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
     """Telethon deep collect для всех активных Telegram-каналов из БД (как /collect-all по охвату)."""
     if not telethon_ready():
@@ -1,118 +1,136 @@
 import logging
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 
-from app.core.auth import get_current_active_user
+from app.core.auth import get_current_principal
 from app.core.database import get_db
 from app.models.channel import Channel
 from app.models.signal import Signal
-from app.models.user import User
+from app.services.keyset_pagination import InvalidCursor, keyset_page
+from app.services.principal_cache import Principal
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Курсор следующей страницы; тело ответа остаётся списком (совместимость)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _signal_dict(signal: Signal) -> dict:
+    return {
+        "id": signal.id,
+        "asset": signal.asset,
+        "symbol": signal.symbol,
+        "direction": signal.direction,
+        "entry_price": float(signal.entry_price) if signal.entry_price else None,
+        "tp1_price": float(signal.tp1_price) if signal.tp1_price else None,
+        "tp2_price": float(signal.tp2_price) if signal.tp2_price else None,
+        "tp3_price": float(signal.tp3_price) if signal.tp3_price else None,
+        "stop_loss": float(signal.stop_loss) if signal.stop_loss else None,
+        "original_text": signal.original_text,
+        "status": signal.status,
+        "confidence_score": float(signal.confidence_score) if signal.confidence_score else None,
+        "created_at": signal.created_at.isoformat() if signal.created_at else None,
+        "updated_at": signal.updated_at.isoformat() if signal.updated_at else None,
+        "channel_id": signal.channel_id,
+        "channel_name": f"Channel {signal.channel_id}" if signal.channel_id else "Unknown"
+    }
+
+
+def _channel_dict(channel: Channel) -> dict:
+    return {
+        "id": channel.id,
+        "name": channel.name,
+        "username": channel.username,
+        "description": channel.description,
+        "platform": channel.platform,
+        "is_active": channel.is_active,
+        "is_verified": channel.is_verified,
+        "subscribers_count": channel.subscribers_count,
+        "category": channel.category,
+        "priority": channel.priority,
+        "expected_accuracy": channel.expected_accuracy,
+        "status": channel.status,
+        "created_at": channel.created_at.isoformat() if channel.created_at else None,
+        "updated_at": channel.updated_at.isoformat() if channel.updated_at else None
+    }
+
+
+def _page(db: Session, model, to_dict, cursor: Optional[str], skip: int, limit: int) -> dict:
+    query = db.query(model)
+    if skip and not cursor:
+        # устаревший OFFSET-режим: только для старых клиентов
+        rows = query.order_by(model.created_at.desc(), model.id.desc()).offset(skip).limit(limit).all()
+        return {"items": [to_dict(r) for r in rows], "next_cursor": None}
+    try:
+        rows, next_cursor = keyset_page(query, model, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": [to_dict(r) for r in rows], "next_cursor": next_cursor}
+
+
+def _cached_page(name: str, key_fn, build) -> dict:
+    """Страница из Redis по версионированному ключу; промах — build() и запись на CACHE_TTL_VERSIONED."""
+    key = None
+    try:
+        from app.core.redis_cache import cache_get
+        key = key_fn()
+        cached = cache_get(key)
+        if cached is not None:
+            return cached
+    except Exception:
+        logger.warning("dashboard.%s: cache lookup failed; falling back to DB", name, exc_info=True)
+    page = build()
+    if key is not None:
+        try:
+            from app.core.redis_cache import cache_set, CACHE_TTL_VERSIONED
+            cache_set(key, page, CACHE_TTL_VERSIONED)
+        except Exception:
+            logger.warning("dashboard.%s: cache write failed", name, exc_info=True)
+    return page
+
+
 @router.get("/signals", response_model=List[dict])
 def get_signals_dashboard(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor предыдущей страницы"),
+    skip: int = Query(0, ge=0, description="Deprecated: OFFSET, используйте cursor"),
     limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    """Get signals without JOIN - simple version for dashboard."""
-    try:
-        from app.core.redis_cache import cache_get, cache_set, key_dashboard_signals, CACHE_TTL_ANALYTICS
-        cached = cache_get(key_dashboard_signals(skip, limit))
-        if cached is not None:
-            return cached
-    except Exception:
-        logger.warning("dashboard.signals: cache lookup failed; falling back to DB", exc_info=True)
-    query = db.query(Signal)
-    
-    # Get total count
-    total = query.count()
-    
-    # Apply pagination
-    signals = query.order_by(Signal.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Convert to simple dict format
-    result = []
-    for signal in signals:
-        signal_dict = {
-            "id": signal.id,
-            "asset": signal.asset,
-            "symbol": signal.symbol,
-            "direction": signal.direction,
-            "entry_price": float(signal.entry_price) if signal.entry_price else None,
-            "tp1_price": float(signal.tp1_price) if signal.tp1_price else None,
-            "tp2_price": float(signal.tp2_price) if signal.tp2_price else None,
-            "tp3_price": float(signal.tp3_price) if signal.tp3_price else None,
-            "stop_loss": float(signal.stop_loss) if signal.stop_loss else None,
-            "original_text": signal.original_text,
-            "status": signal.status,
-            "confidence_score": float(signal.confidence_score) if signal.confidence_score else None,
-            "created_at": signal.created_at.isoformat() if signal.created_at else None,
-            "updated_at": signal.updated_at.isoformat() if signal.updated_at else None,
-            "channel_id": signal.channel_id,
-            "channel_name": f"Channel {signal.channel_id}" if signal.channel_id else "Unknown"
-        }
-        result.append(signal_dict)
+    """Get signals without JOIN - simple version for dashboard (keyset by created_at, id)."""
+    from app.core.redis_cache import key_dashboard_signals
+
+    page = _cached_page(
+        "signals",
+        lambda: key_dashboard_signals(cursor or (f"o{skip}" if skip else ""), limit),
+        lambda: _page(db, Signal, _signal_dict, cursor, skip, limit),
+    )
+    if page["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    return page["items"]
 
-    try:
-        from app.core.redis_cache import cache_set, key_dashboard_signals, CACHE_TTL_ANALYTICS
-        cache_set(key_dashboard_signals(skip, limit), result, CACHE_TTL_ANALYTICS)
-    except Exception:
-        logger.warning("dashboard.signals: cache write failed", exc_info=True)
-    return result
 
 @router.get("/channels", response_model=List[dict])
 def get_channels_dashboard(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor предыдущей страницы"),
+    skip: int = Query(0, ge=0, description="Deprecated: OFFSET, используйте cursor"),
     limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
 ):
-    """Get channels without complex JOIN - simple version for dashboard."""
-    try:
-        from app.core.redis_cache import cache_get, cache_set, key_dashboard_channels, CACHE_TTL_ANALYTICS
-        cached = cache_get(key_dashboard_channels(skip, limit))
-        if cached is not None:
-            return cached
-    except Exception:
-        logger.warning("dashboard.channels: cache lookup failed; falling back to DB", exc_info=True)
-    query = db.query(Channel)
-    
-    # Get total count
-    total = query.count()
-    
-    # Apply pagination
-    channels = query.order_by(Channel.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Convert to simple dict format
-    result = []
-    for channel in channels:
-        channel_dict = {
-            "id": channel.id,
-            "name": channel.name,
-            "username": channel.username,
-            "description": channel.description,
-            "platform": channel.platform,
-            "is_active": channel.is_active,
-            "is_verified": channel.is_verified,
-            "subscribers_count": channel.subscribers_count,
-            "category": channel.category,
-            "priority": channel.priority,
-            "expected_accuracy": channel.expected_accuracy,
-            "status": channel.status,
-            "created_at": channel.created_at.isoformat() if channel.created_at else None,
-            "updated_at": channel.updated_at.isoformat() if channel.updated_at else None
-        }
-        result.append(channel_dict)
+    """Get channels without complex JOIN - simple version for dashboard (keyset by created_at, id)."""
+    from app.core.redis_cache import key_dashboard_channels
 
-    try:
-        from app.core.redis_cache import cache_set, key_dashboard_channels, CACHE_TTL_ANALYTICS
-        cache_set(key_dashboard_channels(skip, limit), result, CACHE_TTL_ANALYTICS)
-    except Exception:
-        logger.warning("dashboard.channels: cache write failed", exc_info=True)
-    return result
+    page = _cached_page(
+        "channels",
+        lambda: key_dashboard_channels(cursor or (f"o{skip}" if skip else ""), limit),
+        lambda: _page(db, Channel, _channel_dict, cursor, skip, limit),
+    )
+    if page["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    return page["items"]
@@ -14,7 +14,7 @@ from sqlalchemy.orm import Session
 from app.core.auth import require_admin
 from app.core.database import get_db
 from app.models.execution_model import ExecutionModel
-from app.models.user import User
+from app.services.principal_cache import Principal
 
 router = APIRouter()
 
@@ -39,7 +39,7 @@ class ExecutionModelRead(BaseModel):
 @router.get("/", response_model=List[ExecutionModelRead])
 def list_execution_models(
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
     active_only: bool = Query(True, description="Только is_active=true"),
 ):
     q = db.query(ExecutionModel)
@@ -52,7 +52,7 @@ def list_execution_models(
 def get_execution_model_by_key(
     model_key: str,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     row = (
         db.query(ExecutionModel)
@@ -68,7 +68,7 @@ def get_execution_model_by_key(
 def get_execution_model(
     execution_model_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     row = db.query(ExecutionModel).filter(ExecutionModel.id == execution_model_id).first()
     if not row:
@@ -27,7 +27,8 @@ async def _ensure_export_access(user: User) -> None:
 
 @router.get("/export/signals")
 async def export_signals(
-    format: str = Query("csv", description="Export format: csv, excel, json"),
+    format: str = Query("csv", description="Export format: csv, excel, json, ndjson"),
+    gzip: bool = Query(False, description="Compress csv/json/ndjson on the fly (.gz)"),
     date_from: Optional[datetime] = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: Optional[datetime] = Query(None, description="End date (YYYY-MM-DD)"),
     channel_ids: Optional[List[str]] = Query(None, description="Specific channel IDs"),
@@ -53,7 +54,8 @@ async def export_signals(
             format=format,
             date_from=date_from,
             date_to=date_to,
-            channel_ids=channel_ids
+            channel_ids=channel_ids,
+            gzip=gzip
         )
     except Exception as e:
         raise HTTPException(
@@ -146,6 +148,7 @@ async def get_supported_formats(
         "description": {
             "csv": "Comma-separated values format",
             "excel": "Microsoft Excel format with multiple sheets",
-            "json": "JavaScript Object Notation format"
+            "json": "JavaScript Object Notation format",
+            "ndjson": "Newline-delimited JSON, one record per line (signals are streamed)"
         }
     }
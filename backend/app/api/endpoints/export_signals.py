@@ -1,53 +1,48 @@
 """
-Export signals as CSV.
+Export signals as CSV / NDJSON, streamed from a server-side cursor.
 """
-import csv
-import io
-from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.auth import get_current_user, require_premium
+from app.models.channel import Channel
 from app.models.signal import Signal
-from app.models.user import User
+from app.services.principal_cache import Principal
+from app.services.export_stream import stream_signals
 
 router = APIRouter()
 
+EXPORT_COLUMNS = (
+    ("ID", Signal.id),
+    ("Asset", Signal.asset),
+    ("Direction", Signal.direction),
+    ("Entry Price", Signal.entry_price),
+    ("Take Profit", Signal.tp1_price),
+    ("Stop Loss", Signal.stop_loss),
+    ("Status", Signal.status),
+    ("PnL %", Signal.profit_loss_percentage),
+    ("Channel", Channel.name),
+    ("Confidence", Signal.confidence_score),
+    ("Created At", Signal.created_at),
+)
+
 
 @router.get("/export/signals.csv")
 async def export_signals_csv(
+    gzip: bool = Query(False, description="Отдать signals_export.csv.gz"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
-    """Export all signals as CSV file."""
-    signals = db.query(Signal).options(joinedload(Signal.channel)).order_by(Signal.created_at.desc()).limit(1000).all()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        "ID", "Asset", "Direction", "Entry Price", "Take Profit", "Stop Loss",
-        "Status", "PnL %", "Channel", "Confidence", "Created At",
-    ])
+    """Export all signals as CSV file (full history, streamed)."""
+    return stream_signals(db, "signals_export", format="csv", gzip=gzip, columns=EXPORT_COLUMNS)
 
-    for s in signals:
-        writer.writerow([
-            s.id,
-            s.asset,
-            s.direction,
-            float(s.entry_price) if s.entry_price else "",
-            float(s.tp1_price) if s.tp1_price else "",
-            float(s.stop_loss) if s.stop_loss else "",
-            s.status,
-            float(s.profit_loss_percentage) if s.profit_loss_percentage else "",
-            s.channel.name if s.channel else "",
-            float(s.confidence_score) if s.confidence_score else "",
-            s.created_at.isoformat() if s.created_at else "",
-        ])
 
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=signals_export.csv"},
-    )
+@router.get("/export/signals.ndjson")
+async def export_signals_ndjson(
+    gzip: bool = Query(False, description="Отдать signals_export.ndjson.gz"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_premium),
+):
+    """Export all signals as newline-delimited JSON (one object per line, streamed)."""
+    return stream_signals(db, "signals_export", format="ndjson", gzip=gzip, columns=EXPORT_COLUMNS)
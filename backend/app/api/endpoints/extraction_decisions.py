@@ -13,7 +13,7 @@ from sqlalchemy.orm import Session
 from app.core.auth import require_admin
 from app.core.database import get_db
 from app.models.extraction_decision import ExtractionDecision
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.services.extraction_service import ALLOWED_DECISION_TYPES, override_decision
 
 router = APIRouter()
@@ -43,7 +43,7 @@ class DecisionOverrideBody(BaseModel):
 def list_decisions_for_raw_event(
     raw_event_id: int = Query(..., ge=1),
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     return (
         db.query(ExtractionDecision)
@@ -57,7 +57,7 @@ def list_decisions_for_raw_event(
 def post_override_decision(
     body: DecisionOverrideBody,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     dt = body.decision_type.strip().lower()
     if dt not in ALLOWED_DECISION_TYPES:
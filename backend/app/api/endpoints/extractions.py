@@ -14,7 +14,7 @@ from app.core.auth import require_admin
 from app.core.config import get_settings
 from app.core.database import get_db
 from app.models.extraction import Extraction
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.services import extraction_service
 
 router = APIRouter()
@@ -38,7 +38,7 @@ class ExtractionRead(BaseModel):
 def run_extraction_for_raw_event(
     raw_event_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
     message_version_id: Optional[int] = Query(
         None,
         description="Иначе берётся последняя версия по version_no",
@@ -75,7 +75,7 @@ def run_extraction_for_raw_event(
 def list_extractions_for_raw_event(
     raw_event_id: int = Query(..., ge=1),
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     return (
         db.query(Extraction)
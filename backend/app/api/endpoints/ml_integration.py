@@ -12,9 +12,11 @@ from datetime import datetime
 import httpx
 
 from ...core.database import get_db
-from ...services.ml_gateway import ml_http_request, MLCircuitOpenError
+from ...services.ml_gateway import ml_http_request, ml_predict_signal, MLCircuitOpenError, MLServiceError
+from ...services.feature_store import get_features
+from ...services.ml_prediction_sweep import request_batch_predictions, signal_to_ml_request
 from ...models.signal import Signal
-from ...models.user import User
+from ...services.principal_cache import Principal
 from ...core.auth import get_current_user, require_feature
 from ...core.config import get_settings
 
@@ -59,7 +61,7 @@ class BatchMLPredictionResponse(BaseModel):
 async def predict_signal(
     request: MLPredictionRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_feature("ml_predictions"))
+    current_user: Principal = Depends(require_feature("ml_predictions"))
 ):
     """
     Get ML prediction for a specific signal
@@ -71,44 +73,26 @@ async def predict_signal(
             raise HTTPException(status_code=404, detail="Signal not found")
         
         # Prepare data for ML service
-        ml_request_data = {
-            "asset": signal.asset,
-            "direction": signal.direction,
-            "entry_price": float(signal.entry_price),
-            "target_price": float(signal.target_price) if signal.target_price else None,
-            "stop_loss": float(signal.stop_loss) if signal.stop_loss else None,
-            "channel_id": signal.channel_id,
-            "channel_accuracy": signal.channel.accuracy if signal.channel else 0.5,
-            "confidence": float(signal.confidence) if signal.confidence else 0.5
-        }
+        ml_request_data = signal_to_ml_request(signal, get_features(db, [signal.id]).get(signal.id))
         
-        # Call ML service (A6: optional version header for A/B)
+        # Call ML service (A6: optional version header for A/B); identical in-flight requests are coalesced
         settings = get_settings()
-        base_url = settings.ML_SERVICE_URL
-        headers = {}
-        if getattr(settings, "ML_MODEL_VERSION", None):
-            headers["X-ML-Model-Version"] = settings.ML_MODEL_VERSION
         try:
-            response = await ml_http_request(
-                "post",
-                f"{base_url}/api/v1/predictions/signal",
+            ml_prediction = await ml_predict_signal(
+                ml_request_data,
+                model_version=getattr(settings, "ML_MODEL_VERSION", None),
                 timeout=30.0,
-                json=ml_request_data,
-                headers=headers or None,
             )
         except MLCircuitOpenError:
             raise HTTPException(
                 status_code=503,
                 detail="ML service temporarily unavailable (circuit open)",
             ) from None
-
-        if response.status_code != 200:
+        except MLServiceError as e:
             raise HTTPException(
                 status_code=500,
-                detail=f"ML service error: {response.status_code}",
-            )
-
-        ml_prediction = response.json()
+                detail=f"ML service error: {e.status_code}",
+            ) from None
 
         return MLPredictionResponse(
             signal_id=request.signal_id,
@@ -138,7 +122,7 @@ async def predict_signal(
 async def predict_batch_signals(
     request: BatchMLPredictionRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_feature("ml_predictions"))
+    current_user: Principal = Depends(require_feature("ml_predictions"))
 ):
     """
     Get ML predictions for multiple signals
@@ -150,53 +134,18 @@ async def predict_batch_signals(
         if not signals:
             raise HTTPException(status_code=404, detail="No signals found")
         
-        # Prepare batch data for ML service
-        ml_signals = []
-        for signal in signals:
-            ml_request_data = {
-                "asset": signal.asset,
-                "direction": signal.direction,
-                "entry_price": float(signal.entry_price),
-                "target_price": float(signal.target_price) if signal.target_price else None,
-                "stop_loss": float(signal.stop_loss) if signal.stop_loss else None,
-                "channel_id": signal.channel_id,
-                "channel_accuracy": signal.channel.accuracy if signal.channel else 0.5,
-                "confidence": float(signal.confidence) if signal.confidence else 0.5
-            }
-            ml_signals.append(ml_request_data)
-        
-        batch_request_data = {"signals": ml_signals}
-        
-        settings = get_settings()
-        base_url = settings.ML_SERVICE_URL
-        headers = {}
-        if getattr(settings, "ML_MODEL_VERSION", None):
-            headers["X-ML-Model-Version"] = settings.ML_MODEL_VERSION
+        # One round trip for the whole batch (ML service scores one feature matrix)
         try:
-            response = await ml_http_request(
-                "post",
-                f"{base_url}/api/v1/predictions/batch",
-                timeout=60.0,
-                json=batch_request_data,
-                headers=headers or None,
-            )
+            ml_predictions = await request_batch_predictions(signals, get_features(db, [s.id for s in signals]))
         except MLCircuitOpenError:
             raise HTTPException(
                 status_code=503,
                 detail="ML service temporarily unavailable (circuit open)",
             ) from None
 
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=500,
-                detail=f"ML service error: {response.status_code}",
-            )
-
-        ml_batch_result = response.json()
-
         predictions = []
-        for i, ml_prediction in enumerate(ml_batch_result["predictions"]):
-            signal_id = signals[i].id
+        for signal, ml_prediction in zip(signals, ml_predictions):
+            signal_id = signal.id
             predictions.append(
                 MLPredictionResponse(
                     signal_id=signal_id,
@@ -232,7 +181,7 @@ async def predict_batch_signals(
 @router.post("/predict")
 async def direct_ml_predict(
     request: DirectMLPredictionRequest,
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """
     Direct ML prediction without requiring signal in database
@@ -317,7 +266,7 @@ async def ml_service_health():
 
 @router.get("/model/info")
 async def get_ml_model_info(
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """
     Get ML model information
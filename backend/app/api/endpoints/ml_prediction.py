@@ -12,7 +12,7 @@ from app.core.auth import require_feature
 from app.services.signal_prediction_service import signal_prediction_service
 from app.models.signal import Signal
 from app.models.channel import Channel
-from app.models.user import User
+from app.services.principal_cache import Principal
 
 router = APIRouter()
 
@@ -20,7 +20,7 @@ router = APIRouter()
 @router.post("/train", response_model=Dict[str, Any])
 async def train_model(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """
     Обучает ML-модель на исторических данных сигналов
@@ -49,7 +49,7 @@ async def train_model(
 
 @router.get("/model-status", response_model=Dict[str, Any])
 async def get_model_status(
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """
     Возвращает статус ML-модели
@@ -71,7 +71,7 @@ async def get_model_status(
 async def predict_signal_success(
     signal_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """
     Предсказывает успешность конкретного сигнала
@@ -121,7 +121,7 @@ async def predict_signal_success(
 async def batch_predict_signals(
     signal_ids: List[int],
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """
     Предсказывает успешность для списка сигналов
@@ -170,7 +170,7 @@ async def batch_predict_signals(
 
 @router.get("/feature-importance", response_model=Dict[str, Any])
 async def get_feature_importance(
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """
     Возвращает важность признаков модели
@@ -221,7 +221,7 @@ async def get_feature_importance(
 @router.post("/save-model", response_model=Dict[str, Any])
 async def save_model(
     filepath: str = "models/signal_prediction_model.pkl",
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """
     Сохраняет обученную модель в файл
@@ -259,7 +259,7 @@ async def save_model(
 @router.post("/load-model", response_model=Dict[str, Any])
 async def load_model(
     filepath: str = "models/signal_prediction_model.pkl",
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """
     Загружает модель из файла
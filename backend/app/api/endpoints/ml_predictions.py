@@ -4,7 +4,7 @@ from typing import List
 
 from ...core.database import get_db
 from ...core.auth import require_feature
-from ...models.user import User
+from ...services.principal_cache import Principal
 from ...services.signal_prediction_service import SignalPredictionService
 from ...schemas.ml_schemas import PredictionRequest, PredictionResponse, BatchPredictionRequest, BatchPredictionResponse, ModelStatusResponse, TrainResponse
 
@@ -13,7 +13,7 @@ router = APIRouter()
 @router.post("/train", response_model=TrainResponse)
 def train_model(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """Запускает обучение ML-модели на всех доступных данных SignalResult."""
     service = SignalPredictionService(db)
@@ -26,7 +26,7 @@ def train_model(
 @router.get("/model-status", response_model=ModelStatusResponse)
 def get_model_status(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """Возвращает статус текущей ML-модели."""
     service = SignalPredictionService(db)
@@ -37,7 +37,7 @@ def get_model_status(
 def predict_signal_success(
     request: PredictionRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """Предсказывает вероятность успеха для одного сигнала."""
     service = SignalPredictionService(db)
@@ -53,7 +53,7 @@ def predict_signal_success(
 def batch_predict_signal_success(
     request: BatchPredictionRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_feature("ml_predictions")),
+    current_user: Principal = Depends(require_feature("ml_predictions")),
 ):
     """Предсказывает вероятность успеха для списка сигналов."""
     service = SignalPredictionService(db)
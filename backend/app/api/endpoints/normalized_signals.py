@@ -15,7 +15,7 @@ from app.core.config import get_settings
 from app.core.database import get_db
 from app.models.normalized_signal import NormalizedSignal
 from app.models.signal import Signal
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.services.normalized_signal_service import materialize_from_extraction
 from app.services.outcome_service import ensure_pending_outcomes_for_normalized
 from app.services.trading_lifecycle_service import apply_lifecycle_transition
@@ -58,7 +58,7 @@ def patch_trading_lifecycle(
     normalized_signal_id: int,
     body: LifecyclePatchBody,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """Переход trading_lifecycle_status по графу (см. trading_lifecycle_service)."""
     ns, err = apply_lifecycle_transition(
@@ -80,7 +80,7 @@ def patch_legacy_signal_link(
     normalized_signal_id: int,
     body: LegacyLinkBody,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     ns = db.query(NormalizedSignal).filter(NormalizedSignal.id == normalized_signal_id).first()
     if not ns:
@@ -101,7 +101,7 @@ def patch_legacy_signal_link(
 def post_materialize_from_extraction(
     extraction_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     if not get_settings().EXTRACTION_PIPELINE_ENABLED:
         raise HTTPException(status_code=503, detail="EXTRACTION_PIPELINE_ENABLED=false")
@@ -128,7 +128,7 @@ def post_materialize_from_extraction(
 def list_normalized_signals_for_raw_event(
     raw_event_id: int = Query(..., ge=1),
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     return (
         db.query(NormalizedSignal)
@@ -16,6 +16,7 @@ from app.core.config import get_settings
 from app.services.payment_service import PaymentService
 from app import schemas
 from app.models.user import User, UserRole
+from app.services.principal_cache import Principal
 
 # Import specific schemas
 from app.schemas.payment import (
@@ -497,7 +498,7 @@ async def get_invoice(
 async def get_premium_payment_history(
     skip: int = Query(0, ge=0, description="Number of payments to skip"),
     limit: int = Query(50, ge=1, le=100, description="Number of payments to return"),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
     db: Session = Depends(get_db)
 ):
     """Get premium user's payment history with detailed information."""
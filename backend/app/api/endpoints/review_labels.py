@@ -22,7 +22,7 @@ from app.models.raw_ingestion import MessageVersion, RawEvent
 from app.models.review_label import ReviewLabel
 from app.models.signal_outcome import SignalOutcome
 from app.models.signal_relation import SignalRelation
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.services.outcome_service import ensure_pending_outcomes_for_raw_event
 
 router = APIRouter()
@@ -190,7 +190,7 @@ def _preview_text(text: Optional[str]) -> Optional[str]:
 @router.get("/queue", response_model=ReviewQueueResponse)
 def review_queue(
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
     unlabeled_only: bool = Query(True, description="Только raw_events без review_labels"),
@@ -261,7 +261,7 @@ def review_queue(
 def get_raw_event_detail(
     raw_event_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     ev = db.query(RawEvent).filter(RawEvent.id == raw_event_id).first()
     if not ev:
@@ -417,7 +417,7 @@ def get_raw_event_detail(
 def create_review_label(
     body: ReviewLabelCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin),
 ):
     raw_row = db.query(RawEvent).filter(RawEvent.id == body.raw_event_id).first()
     if not raw_row:
@@ -443,7 +443,7 @@ def create_review_label(
 def list_review_labels(
     raw_event_id: int = Query(..., ge=1),
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     return (
         db.query(ReviewLabel)
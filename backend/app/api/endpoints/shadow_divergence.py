@@ -13,7 +13,7 @@ from app.core.metrics import (
     SHADOW_LEGACY_DIVERGENCE_REPORTS,
     SHADOW_LEGACY_DIVERGENCE_SCORE,
 )
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.services.shadow_divergence import build_ab_report, build_divergence_report
 
 router = APIRouter()
@@ -22,7 +22,7 @@ router = APIRouter()
 @router.get("/divergence-report")
 def get_divergence_report(
     limit: int = Query(100, ge=1, le=500),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
     """
@@ -44,7 +44,7 @@ def get_divergence_report(
 def get_ab_report(
     limit: int = Query(100, ge=1, le=500),
     min_sample_size: int = Query(100, ge=1, le=10000),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
     """
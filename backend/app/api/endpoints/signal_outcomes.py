@@ -18,7 +18,7 @@ from app.core.config import get_settings
 from app.core.database import get_db
 from app.models.raw_ingestion import RawEvent
 from app.models.signal_outcome import SignalOutcome
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.services.outcome_service import (
     apply_stub_recalculate,
     ensure_pending_outcomes_for_normalized,
@@ -27,6 +27,7 @@ from app.services.outcome_service import (
 )
 from app.services.outcome_recalc_service import (
     process_pending_signal_outcomes,
+    process_pending_signal_outcomes_batch,
     recalculate_signal_outcome_from_candles,
 )
 
@@ -125,7 +126,7 @@ def _to_read(row: SignalOutcome) -> SignalOutcomeRead:
 def list_signal_outcomes(
     normalized_signal_id: int = Query(..., ge=1),
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     rows = (
         db.query(SignalOutcome)
@@ -144,7 +145,7 @@ def list_signal_outcomes(
 def post_ensure_outcome_slots(
     normalized_signal_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """Создать недостающие строки PENDING для всех активных execution_models."""
     created, err = ensure_pending_outcomes_for_normalized(db, normalized_signal_id=normalized_signal_id)
@@ -163,7 +164,7 @@ def post_ensure_outcome_slots(
 def post_ensure_outcome_slots_for_raw_event(
     raw_event_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """Создать недостающие PENDING для всех normalized_signals данного raw_event."""
     ev = db.query(RawEvent).filter(RawEvent.id == raw_event_id).first()
@@ -189,7 +190,7 @@ def patch_signal_outcome(
     signal_outcome_id: int,
     body: SignalOutcomePatchBody,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """Ручное обновление полей outcome (разметка / правки до worker)."""
     payload = body.model_dump(exclude_unset=True)
@@ -213,12 +214,21 @@ def patch_signal_outcome(
 def post_process_pending_outcome_recalc(
     limit: int = Query(50, ge=1, le=500),
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """Пакетный пересчёт PENDING outcomes по свечам (см. Celery task)."""
     settings = get_settings()
     if not settings.OUTCOME_RECALC_ENABLED:
         raise HTTPException(status_code=503, detail="OUTCOME_RECALC_ENABLED=false")
+    if settings.OUTCOME_RECALC_VECTORIZED:
+        stats = process_pending_signal_outcomes_batch(
+            db,
+            limit=limit,
+            lookahead_days=settings.OUTCOME_RECALC_LOOKAHEAD_DAYS,
+            timeframe=settings.OUTCOME_RECALC_TIMEFRAME,
+            batch_size=settings.OUTCOME_RECALC_VECTORIZED_BATCH_SIZE,
+        )
+        return ProcessPendingOutcomesResponse(**stats)
     stats = process_pending_signal_outcomes(
         db,
         limit=limit,
@@ -233,7 +243,7 @@ def post_recalculate_outcome_from_candles(
     signal_outcome_id: int,
     force: bool = Query(False, description="Пересчитать даже если статус COMPLETE"),
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """Расчёт по свечам: market_candles или CoinGecko OHLC (флаг OUTCOME_RECALC_ENABLED)."""
     settings = get_settings()
@@ -264,7 +274,7 @@ def post_recalculate_outcome_from_candles(
 def post_stub_recalculate_outcome(
     signal_outcome_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     """Заглушка пересчёта: DATA_INCOMPLETE + error_detail (свечи/market worker не подключены)."""
     row, err = apply_stub_recalculate(db, signal_outcome_id=signal_outcome_id)
@@ -287,7 +297,7 @@ def post_stub_recalculate_outcome(
 def get_signal_outcome(
     signal_outcome_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     row = (
         db.query(SignalOutcome)
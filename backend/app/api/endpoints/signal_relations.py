@@ -12,7 +12,7 @@ from sqlalchemy.orm import Session
 from app.core.auth import require_admin
 from app.core.database import get_db
 from app.models.signal_relation import SignalRelation
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.services.signal_relation_service import ALLOWED_RELATION_TYPES, create_signal_relation
 
 router = APIRouter()
@@ -43,7 +43,7 @@ class SignalRelationCreate(BaseModel):
 def post_signal_relation(
     body: SignalRelationCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
 ):
     rt = body.relation_type.strip().lower()
     if rt not in ALLOWED_RELATION_TYPES:
@@ -78,7 +78,7 @@ def post_signal_relation(
 @router.get("/", response_model=List[SignalRelationRead])
 def list_signal_relations(
     db: Session = Depends(get_db),
-    _: User = Depends(require_admin),
+    _: Principal = Depends(require_admin),
     from_normalized_signal_id: Optional[int] = Query(None, ge=1),
     to_normalized_signal_id: Optional[int] = Query(None, ge=1),
 ):
@@ -7,10 +7,10 @@ from datetime import datetime, timedelta
 
 from app.core.config import get_settings
 from app.core.database import get_db
-from app.core.auth import get_current_active_user, require_admin, get_current_user, require_premium
+from app.core.auth import get_current_principal, require_admin, get_current_user, require_premium
 from app.services.signal_service import SignalService
 from app.services.telegram_signal_service import TelegramSignalService
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.models.signal import Signal
 from app import schemas
 from app.schemas.signal import SignalResponse, SignalCreate, SignalUpdate, SignalFilterParams, SignalStats
@@ -66,7 +66,7 @@ async def create_signal(
     signal_in: schemas.signal.SignalCreate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin),
 ):
     """Create a new signal manually (admin-only).
 
@@ -91,7 +91,7 @@ def get_signals(
     page: int = Query(1, ge=1, description="Page number (1-based)"),
     size: int = Query(100, ge=1, le=200, description="Page size"),
     filters: schemas.signal.SignalFilterParams = Depends(),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
     """Retrieve a list of signals with pagination and filtering."""
     signal_service = SignalService(db)
@@ -122,7 +122,7 @@ def get_signals_dashboard(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """Get signals without JOIN - simple version for dashboard.
 
@@ -169,7 +169,7 @@ def get_signals_dashboard(
 def get_signal(
     signal_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """Retrieve a specific signal by its ID (authenticated-only)."""
     signal_service = SignalService(db)
@@ -222,7 +222,7 @@ def get_general_stats(db: Session = Depends(get_db)):
 def get_channel_stats(
     channel_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
 ):
     """Get signal statistics for a specific channel (premium-only)."""
     signal_service = SignalService(db)
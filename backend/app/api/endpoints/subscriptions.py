@@ -12,6 +12,7 @@ from app.core.auth import (
 from app.services.subscription_service import SubscriptionService
 from app import schemas
 from app.models.user import User
+from app.services.principal_cache import Principal
 
 # Import specific schemas
 from app.schemas.subscription import (
@@ -312,7 +313,7 @@ async def expire_old_subscriptions(db: Session = Depends(get_db)):
 # Premium user endpoints
 @router.get("/premium/features", dependencies=[Depends(require_premium)])
 async def get_premium_features(
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
     db: Session = Depends(get_db)
 ):
     """Get premium features available to user."""
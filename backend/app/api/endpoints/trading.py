@@ -9,6 +9,7 @@ import logging
 from app.core.database import get_db
 from app.core.auth import get_current_user, require_premium
 from app.models.user import User
+from app.services.principal_cache import Principal
 from app.services.trading_service import TradingService
 from app.schemas.trading import (
     TradingAccountCreate, TradingAccountUpdate, TradingAccountResponse,
@@ -24,7 +25,7 @@ router = APIRouter()
 @router.post("/accounts", response_model=TradingAccountResponse)
 async def create_trading_account(
     account_data: TradingAccountCreate,
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
     db: Session = Depends(get_db)
 ):
     """Create a new trading account"""
@@ -86,7 +87,7 @@ async def get_trading_account(
 async def update_trading_account(
     account_id: int,
     account_data: TradingAccountUpdate,
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
     db: Session = Depends(get_db)
 ):
     """Update a trading account"""
@@ -119,7 +120,7 @@ async def update_trading_account(
 @router.delete("/accounts/{account_id}")
 async def delete_trading_account(
     account_id: int,
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
     db: Session = Depends(get_db)
 ):
     """Delete a trading account"""
@@ -203,7 +204,7 @@ async def get_open_positions(
 @router.post("/orders", response_model=TradingOrderResponse)
 async def place_order(
     order_request: PlaceOrderRequest,
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
     db: Session = Depends(get_db)
 ):
     """Place a trading order"""
@@ -221,7 +222,7 @@ async def place_order(
 @router.post("/positions/close", response_model=TradingOrderResponse)
 async def close_position(
     close_request: ClosePositionRequest,
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
     db: Session = Depends(get_db)
 ):
     """Close a trading position"""
@@ -240,7 +241,7 @@ async def close_position(
 async def execute_signal(
     signal_id: int,
     account_id: int,
-    current_user: User = Depends(require_premium),
+    current_user: Principal = Depends(require_premium),
     db: Session = Depends(get_db)
 ):
     """Execute a trading signal"""
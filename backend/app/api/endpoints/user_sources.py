@@ -15,6 +15,7 @@ from ...core.database import get_db
 from ...core.auth import get_current_active_user, require_admin
 from ...models.channel import Channel
 from ...models.user import User, UserRole
+from ...services.principal_cache import Principal
 from ...models.signal import Signal
 from ...models.performance_metric import PerformanceMetric
 try:
@@ -29,7 +30,7 @@ logger = logging.getLogger(__name__)
 @router.post("/init-db")
 async def init_db(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
+    current_user: Principal = Depends(require_admin),
 ):
     """Инициализация таблиц базы данных"""
     try:
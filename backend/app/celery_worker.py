@@ -159,7 +159,10 @@ def recalculate_canonical_signal_outcomes():
 
         from app.core.config import get_settings
         from app.core.database import SessionLocal
-        from app.services.outcome_recalc_service import process_pending_signal_outcomes
+        from app.services.outcome_recalc_service import (
+            process_pending_signal_outcomes,
+            process_pending_signal_outcomes_batch,
+        )
 
         settings = get_settings()
         if not settings.OUTCOME_RECALC_ENABLED:
@@ -167,12 +170,21 @@ def recalculate_canonical_signal_outcomes():
 
         db = SessionLocal()
         try:
-            stats = process_pending_signal_outcomes(
-                db,
-                limit=settings.OUTCOME_RECALC_BATCH_LIMIT,
-                lookahead_days=settings.OUTCOME_RECALC_LOOKAHEAD_DAYS,
-                timeframe=settings.OUTCOME_RECALC_TIMEFRAME,
-            )
+            if settings.OUTCOME_RECALC_VECTORIZED:
+                stats = process_pending_signal_outcomes_batch(
+                    db,
+                    limit=settings.OUTCOME_RECALC_VECTORIZED_LIMIT,
+                    lookahead_days=settings.OUTCOME_RECALC_LOOKAHEAD_DAYS,
+                    timeframe=settings.OUTCOME_RECALC_TIMEFRAME,
+                    batch_size=settings.OUTCOME_RECALC_VECTORIZED_BATCH_SIZE,
+                )
+            else:
+                stats = process_pending_signal_outcomes(
+                    db,
+                    limit=settings.OUTCOME_RECALC_BATCH_LIMIT,
+                    lookahead_days=settings.OUTCOME_RECALC_LOOKAHEAD_DAYS,
+                    timeframe=settings.OUTCOME_RECALC_TIMEFRAME,
+                )
             logger.info(
                 "Canonical outcome recalc: processed=%s ok=%s failed=%s",
                 stats.get("processed"),
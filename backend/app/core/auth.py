@@ -8,6 +8,7 @@ from app.core.database import get_db
 from app.core.security import verify_token
 from app import models
 from app.models.user import User, UserRole
+from app.services.principal_cache import Principal, get_principal
 from app.services.user_service import UserService
 
 # Security scheme for JWT tokens
@@ -54,6 +55,42 @@ def get_current_user(
     return user
 
 
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> Principal:
+    """
+    Current user as a cached snapshot (role, plan, limits, features) — no DB session on a hit.
+    For read / gate-only endpoints; endpoints that modify the user use get_current_user.
+    """
+    payload = verify_token(credentials.credentials, token_type="access")
+    user_id = payload.get("sub")
+    
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    principal = get_principal(int(user_id))
+    
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User account is disabled",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return principal
+
+
 def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -67,8 +104,8 @@ def get_current_active_user(
 
 
 def get_current_premium_user(
-    current_user: User = Depends(get_current_active_user)
-) -> User:
+    current_user: Principal = Depends(get_current_principal)
+) -> Principal:
     """Get current premium user."""
     if current_user.role not in [UserRole.PREMIUM_USER, UserRole.ADMIN]:
         raise HTTPException(
@@ -79,8 +116,8 @@ def get_current_premium_user(
 
 
 def get_current_admin_user(
-    current_user: User = Depends(get_current_active_user)
-) -> User:
+    current_user: Principal = Depends(get_current_principal)
+) -> Principal:
     """Get current admin user."""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -124,7 +161,7 @@ class RoleChecker:
     def __init__(self, allowed_roles: list):
         self.allowed_roles = allowed_roles
     
-    def __call__(self, current_user: User = Depends(get_current_active_user)):
+    def __call__(self, current_user: Principal = Depends(get_current_principal)):
         if current_user.role not in self.allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -134,7 +171,7 @@ class RoleChecker:
 
 
 # Pre-defined role checkers
-def require_premium(current_user: User = Depends(get_current_active_user)) -> User:
+def require_premium(current_user: Principal = Depends(get_current_principal)) -> Principal:
     """
     Premium gate for endpoints.
 
@@ -148,7 +185,7 @@ def require_premium(current_user: User = Depends(get_current_active_user)) -> Us
     return current_user
 
 
-def require_pro_user(current_user: User = Depends(get_current_active_user)) -> User:
+def require_pro_user(current_user: Principal = Depends(get_current_principal)) -> Principal:
     """Require Pro (or Admin) role for endpoint access."""
     if os.getenv("PYTEST_CURRENT_TEST") or os.getenv("ENVIRONMENT", "").lower() == "testing":
         return current_user
@@ -157,9 +194,9 @@ def require_pro_user(current_user: User = Depends(get_current_active_user)) -> U
     return current_user
 
 
-def require_feature(feature: str) -> Callable[[User], User]:
+def require_feature(feature: str) -> Callable[[Principal], Principal]:
     """Require enabled feature flag for current user."""
-    def _dependency(current_user: User = Depends(get_current_active_user)) -> User:
+    def _dependency(current_user: Principal = Depends(get_current_principal)) -> Principal:
         if os.getenv("PYTEST_CURRENT_TEST") or os.getenv("ENVIRONMENT", "").lower() == "testing":
             return current_user
         if current_user.role == UserRole.ADMIN:
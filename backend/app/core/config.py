@@ -89,6 +89,11 @@ class Settings(BaseSettings):
     )
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # TTL снимка аутентифицированного пользователя (principal): процесс + Redis; 0 — без кэша
+    AUTH_PRINCIPAL_TTL_SEC: float = 5.0
+    # SubscriptionLimitMiddleware: 429 по дневному лимиту API Free-плана и downgrade
+    # просроченной подписки; выключено — middleware не подключается (как было: no-op)
+    SUBSCRIPTION_LIMITS_ENFORCED: bool = False
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = [
@@ -135,6 +140,8 @@ class Settings(BaseSettings):
     # Celery beat: периодический Telethon collect-all (нужны session + worker с telethon)
     CELERY_TELETHON_COLLECT_ENABLED: bool = False
     TELETHON_COLLECT_DAYS_BACK: int = 7
+    # Параллельное чтение каналов через одно Telethon-подключение (1 — последовательно)
+    TELETHON_COLLECT_CONCURRENCY: int = 1
     # Запись в extractions + admin run (legacy_text экстрактор); без флага POST /admin/extractions/... → 503
     EXTRACTION_PIPELINE_ENABLED: bool = False
     # После materialize → normalized_signal автоматически создавать PENDING signal_outcomes для активных execution_models
@@ -146,6 +153,14 @@ class Settings(BaseSettings):
     OUTCOME_RECALC_LOOKAHEAD_DAYS: int = 14
     OUTCOME_RECALC_TIMEFRAME: str = "1h"
     OUTCOME_RECALC_BATCH_LIMIT: int = 50
+    # Векторизованный пересчёт (группы по символу, bulk UPDATE на пачку) — для дренажа backlog
+    OUTCOME_RECALC_VECTORIZED: bool = False
+    OUTCOME_RECALC_VECTORIZED_LIMIT: int = 50000
+    OUTCOME_RECALC_VECTORIZED_BATCH_SIZE: int = 1000
+    # Локальное колоночное хранилище свечей (mmap), досинхронизация из market_candles при чтении
+    CANDLE_STORE_ENABLED: bool = False
+    CANDLE_STORE_DIR: str = "./data/candle_store"
+    CANDLE_STORE_SYNC_INTERVAL_SEC: int = 60
     # market_on_publish: опорная цена на свече сигнала — close | open | hl2 | ohlc4
     OUTCOME_MOP_REFERENCE: str = "close"
     # На одной свече при одновременном касании SL и TP: True = сначала SL (консервативно)
@@ -163,9 +178,37 @@ class Settings(BaseSettings):
     TELEGRAM_POSTS_BASE_LIMIT: int = 20
     TELEGRAM_POSTS_PRIORITY_STEP: int = 5
     TELEGRAM_POSTS_MAX_LIMIT: int = 80
+    # Сколько каналов t.me/s качать/парсить одновременно (1 — последовательно); запись в БД всё равно по одному.
+    # Лимит запросов на хост — TELEGRAM_HTTP_RATE_PER_SEC / TELEGRAM_HTTP_BURST, OCR — OCR_TELEGRAM_CONCURRENCY (env)
+    TELEGRAM_COLLECT_CONCURRENCY: int = 1
     # Подробный лог воронки парсинга (posts → parsed → saved / skip)
     COLLECT_LOG_PARSE_FUNNEL: bool = True
-    
+    # Дедуп по первым 500 символам для строк без content_fingerprint; выключить после
+    # scripts/backfill_content_fingerprints.py
+    DEDUP_LEGACY_PREFIX_CHECK: bool = True
+    # Процессный кэш fingerprint (LRU + Bloom по каналу): «точно нет» — без запроса в БД
+    DEDUP_FINGERPRINT_CACHE: bool = False
+    DEDUP_FINGERPRINT_CACHE_LRU_SIZE: int = 2000
+    DEDUP_FINGERPRINT_CACHE_REFRESH_SEC: int = 60
+    # Пул процессов для парсинга пачек текстов (бэкфиллы, переэкстракция): 0 — inline, -1 — по числу ядер.
+    # Пачки меньше PARSE_EXECUTOR_MIN_BATCH всегда парсятся inline
+    PARSE_EXECUTOR_WORKERS: int = 0
+    PARSE_EXECUTOR_CHUNK_SIZE: int = 200
+    PARSE_EXECUTOR_MIN_BATCH: int = 256
+    # Поток цен (app/services/price_feed.py): WebSocket бирж → таблица последних цен + Redis pub/sub.
+    # SCHEDULER_MODE=asyncio — ингестор в API-процессе; celery — отдельный `python -m app.services.price_feed`
+    PRICE_FEED_ENABLED: bool = False
+    PRICE_FEED_EXCHANGES: str = "binance,bybit"
+    # Bybit подписывается по символам; Binance !miniTicker@arr отдаёт все пары одним потоком
+    PRICE_FEED_SYMBOLS: str = "BTCUSDT,ETHUSDT,BNBUSDT,SOLUSDT,XRPUSDT,ADAUSDT,DOGEUSDT,AVAXUSDT,DOTUSDT,LINKUSDT"
+    # Старше — цена из таблицы не используется, потребители идут в REST-снимок
+    PRICE_FEED_MAX_AGE_SEC: float = 15.0
+    # Интервал REST-опроса биржи, пока её WebSocket недоступен
+    PRICE_FEED_REST_POLL_SEC: float = 5.0
+    # NDJSON-запись тиков вместо бирж (тесты / локальная отладка); скорость 0 — без пауз
+    PRICE_FEED_REPLAY_FILE: str = ""
+    PRICE_FEED_REPLAY_SPEED: float = 0.0
+
     # ML Service (A6: опциональная версия модели для A/B — передаётся в заголовке в ML service)
     ML_SERVICE_URL: str = "http://localhost:8001"
     ML_MODEL_VERSION: Optional[str] = None
@@ -173,6 +216,13 @@ class Settings(BaseSettings):
     ML_HTTP_RETRIES: int = 2
     ML_CIRCUIT_FAILURE_THRESHOLD: int = 5
     ML_CIRCUIT_OPEN_SECONDS: int = 60
+    # Пул HTTP-клиента backend → ml-service (HTTP/2 — если установлен h2 и URL по TLS)
+    ML_HTTP_MAX_CONNECTIONS: int = 100
+    ML_HTTP_MAX_KEEPALIVE: int = 20
+    ML_HTTP2: bool = True
+    # Микро-пачки: одиночные предсказания за окно (мс) уходят одним /batch; 0 — выключено
+    ML_PREDICT_BATCH_WINDOW_MS: float = 0.0
+    ML_PREDICT_BATCH_MAX: int = 32
     # Readiness: по умолчанию достаточно БД; для K8s можно потребовать Redis/ML
     READINESS_REQUIRE_REDIS: bool = False
     READINESS_REQUIRE_ML: bool = False
@@ -1,4 +1,9 @@
-from contextlib import contextmanager
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Optional, TypeVar
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -9,6 +14,12 @@ from .config import get_settings
 # Ensure all SQLAlchemy models are imported/registered with Base.metadata
 # before any Base.metadata.create_all() calls (especially in tests).
 import app.models  # noqa: F401
+# Хуки сессии, ведущие running-метрики каналов (signals_count / accuracy / average_roi)
+import app.services.metrics_calculator  # noqa: F401,E402
+# Хуки сессии: после commit с записью Signal/Channel — новая версия кэша страниц
+import app.services.cache_versions  # noqa: F401,E402
+# Хуки сессии: после commit с изменением User/Subscription — сброс снимков principal
+import app.services.principal_cache  # noqa: F401,E402
 
 # Получаем настройки
 settings = get_settings()
@@ -38,4 +49,105 @@ def session_scope():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- Async-слой для фоновых циклов на event loop API (scheduler, auto-collect) ---
+# Запросы идут через asyncpg / aiosqlite и не блокируют loop; хуки Session
+# (metrics_calculator, cache_versions) срабатывают и для AsyncSession — она
+# оборачивает ту же синхронную Session.
+
+T = TypeVar("T")
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+_async_engine = None
+_async_sessionmaker = None
+
+
+def async_database_url(url: str) -> str:
+    """postgresql:// → postgresql+asyncpg://, sqlite:/// → sqlite+aiosqlite:///; уже async — как есть."""
+    scheme, sep, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+def get_async_engine():
+    """AsyncEngine рядом с engine (создаётся при первом обращении)."""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(async_database_url(settings.database_url), pool_pre_ping=True)
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+@asynccontextmanager
+async def async_session_scope():
+    """AsyncSession для фоновых корутин; закрывается всегда, commit — на вызывающем."""
+    get_async_engine()
+    session = _async_sessionmaker()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _async_sessionmaker = None
+
+
+# Синхронный код, оставшийся в фоновых циклах (ML-фичи, discovery, digest), —
+# в ограниченном пуле: не больше DB_SYNC_WORKERS соединений из пула engine и
+# потоков, конкурирующих с обработчиками запросов.
+_db_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _sync_workers() -> int:
+    try:
+        return max(1, int(os.getenv("DB_SYNC_WORKERS", "2")))
+    except ValueError:
+        return 2
+
+
+def _get_db_executor() -> ThreadPoolExecutor:
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(max_workers=_sync_workers(), thread_name_prefix="db-sync")
+    return _db_executor
+
+
+async def run_sync_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """fn(*args, **kwargs) в пуле db-sync; fn сам открывает сессию (session_scope)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_db_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_with_session(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """fn(db, *args, **kwargs) с новой синхронной сессией в пуле db-sync; rollback при ошибке."""
+
+    def _call() -> T:
+        with session_scope() as db:
+            try:
+                return fn(db, *args, **kwargs)
+            except Exception:
+                db.rollback()
+                raise
+
+    return await run_sync_db(_call)
+
+
+def shutdown_db_executor() -> None:
+    global _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=False, cancel_futures=True)
+        _db_executor = None
@@ -46,6 +46,11 @@ SIGNALS_SKIPPED = Counter(
     "Signals skipped by reason",
     ["reason"],  # no_entry_price, duplicate
 )
+DEDUP_FINGERPRINT_CACHE = Counter(
+    "dedup_fingerprint_cache_total",
+    "Fingerprint cache lookups in signal dedup",
+    ["result"],  # lru_hit, bloom_negative, sql_confirmed, tail_confirmed, bloom_false_positive
+)
 SIGNALS_VALIDATED = Counter(
     "signals_validated_total",
     "Signals processed by historical validator",
@@ -2,56 +2,74 @@ from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import run_sync_db, run_with_session
+from app.core.security import verify_token
 from app.models.user import User, SubscriptionPlan, SubscriptionStatus
-from app.services.user_service import UserService
-from app.services.subscription_service import SubscriptionService
-from app.core.auth import get_current_user
+from app.services.principal_cache import Principal, get_principal, principal_cache
 import contextlib
+from typing import Optional
+
+
+def _downgrade_to_free(db: Session, user_id: int) -> None:
+    db_user = db.query(User).filter(User.id == user_id).first()
+    if db_user is None:
+        return
+    db_user.subscription_plan = SubscriptionPlan.FREE
+    db_user.subscription_status = SubscriptionStatus.EXPIRED
+    db_user.channels_limit = 3
+    db_user.api_calls_limit = 100
+    db.commit()  # хук principal_cache сбрасывает снимок пользователя
+
+
+async def _request_principal(request: Request) -> Optional[Principal]:
+    """Снимок пользователя по Bearer-токену: из L1 без потоков, иначе кэш/БД в пуле db-sync."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    user_id = verify_token(token, token_type="access").get("sub")
+    if user_id is None:
+        return None
+    return principal_cache.peek(int(user_id)) or await run_sync_db(get_principal, int(user_id))
+
 
 class SubscriptionLimitMiddleware(BaseHTTPMiddleware):
     """
     Middleware для проверки лимитов и статуса подписки пользователя.
     - Если подписка истекла — downgrade на free-план.
     - Если лимиты превышены — graceful degradation (ограничение доступа).
+    Пользователь и подписка — из кэша principal: на горячем пути запросов в БД нет.
+    Подключается только при SUBSCRIPTION_LIMITS_ENFORCED (по умолчанию выключено).
     """
     async def dispatch(self, request: Request, call_next):
         # Применять только к защищённым API (например, /api/v1/)
         if not request.url.path.startswith("/api/v1/"):
             return await call_next(request)
-        
+
         # Пропускать публичные эндпоинты
         if any(request.url.path.startswith(p) for p in [
             "/api/v1/auth", "/api/v1/health", "/api/v1/docs", "/api/v1/openapi.json"
         ]):
             return await call_next(request)
-        
+
         # Получаем пользователя (если есть токен)
         user = None
         with contextlib.suppress(Exception):
-            user = await get_current_user(request)
+            user = await _request_principal(request)
         if not user:
             return await call_next(request)
-        
-        # Проверяем статус подписки
-        db: Session = next(get_db())
-        user_service = UserService(db)
-        subscription_service = SubscriptionService(db)
-        db_user = user_service.get_user_by_id(user.id)
-        subscription = subscription_service.get_user_subscription(user.id)
-        
-        # Если подписка истекла — downgrade на free-план
-        if subscription and subscription.status not in [SubscriptionStatus.ACTIVE, SubscriptionStatus.TRIALING]:
-            db_user.subscription_plan = SubscriptionPlan.FREE
-            db_user.subscription_status = SubscriptionStatus.EXPIRED
-            db_user.channels_limit = 3
-            db_user.api_calls_limit = 100
-            db.commit()
-            db.refresh(db_user)
-        
+
+        # Если подписка истекла — downgrade на free-план (один раз, а не на каждый запрос)
+        if (
+            user.current_subscription_status
+            and user.current_subscription_status not in (SubscriptionStatus.ACTIVE.value, SubscriptionStatus.TRIALING.value)
+            and user.subscription_status != SubscriptionStatus.EXPIRED
+        ):
+            await run_with_session(_downgrade_to_free, user.id)
+            user = await run_sync_db(get_principal, user.id) or user
+
         # Проверяем лимиты (каналы, API)
-        if db_user.subscription_plan == SubscriptionPlan.FREE:
-            if db_user.api_calls_used_today >= db_user.api_calls_limit:
+        if user.subscription_plan == SubscriptionPlan.FREE:
+            if user.api_calls_limit is not None and user.api_calls_used_today >= user.api_calls_limit:
                 return JSONResponse(
                     status_code=429,
                     content={
@@ -62,4 +80,4 @@ class SubscriptionLimitMiddleware(BaseHTTPMiddleware):
             # Можно добавить проверку лимита каналов и других фич
         # Для premium/pro — можно добавить свои лимиты
         # ...
-        return await call_next(request) 
\ No newline at end of file
+        return await call_next(request)
@@ -1,6 +1,11 @@
 """
 Redis cache layer for prices, channels, analytics.
 TTL-based caching with fallback when Redis unavailable.
+
+Versioned namespaces (signals, channels): ключ страницы содержит текущую версию
+пространства, запись в таблицу (app/services/cache_versions.py) делает INCR версии —
+все страницы пространства сразу становятся недостижимыми. TTL таких ключей —
+только уборка памяти, свежесть им не определяется.
 """
 import os
 import json
@@ -15,6 +20,17 @@ _REDIS_DISABLED = False
 CACHE_TTL_PRICE = 300      # 5 min
 CACHE_TTL_CHANNELS = 60     # 1 min
 CACHE_TTL_ANALYTICS = 120   # 2 min
+CACHE_TTL_VERSIONED = 3600  # 1 h: инвалидация по версии, не по TTL
+
+NS_SIGNALS = "signals"
+NS_CHANNELS = "channels"
+# статистика сигналов: своя версия у каждого канала + общая (bulk-записи без channel_id)
+NS_SIGNAL_STATS = "signal_stats"
+NS_PRINCIPALS = "principals"
+
+
+def ns_channel_stats(channel_id: int) -> str:
+    return f"{NS_SIGNAL_STATS}:{channel_id}"
 
 
 def _get_redis():
@@ -36,6 +52,11 @@ def _get_redis():
         return None
 
 
+def redis_client():
+    """Общий sync-клиент (decode_responses=True) или None, если Redis недоступен."""
+    return _get_redis()
+
+
 def cache_get(key: str) -> Optional[Any]:
     """Get value from Redis cache. Returns None if miss or Redis down."""
     r = _get_redis()
@@ -75,18 +96,63 @@ def cache_delete(key: str) -> bool:
         return False
 
 
+def _version_key(namespace: str) -> str:
+    return f"cachever:{namespace}"
+
+
+def cache_version(namespace: str) -> int:
+    """Текущая версия пространства ключей (0, если ещё не было записей или Redis недоступен)."""
+    r = _get_redis()
+    if not r:
+        return 0
+    try:
+        return int(r.get(_version_key(namespace)) or 0)
+    except Exception as e:
+        logger.debug(f"Cache version read failed for {namespace}: {e}")
+        return 0
+
+
+def bump_cache_version(*namespaces: str) -> bool:
+    """INCR версий: все закэшированные страницы этих пространств перестают совпадать по ключу."""
+    r = _get_redis()
+    if not r or not namespaces:
+        return False
+    try:
+        pipe = r.pipeline()
+        for ns in namespaces:
+            pipe.incr(_version_key(ns))
+        pipe.execute()
+        return True
+    except Exception as e:
+        logger.debug(f"Cache version bump failed for {namespaces}: {e}")
+        return False
+
+
 # Key builders
 def key_price(symbol: str) -> str:
     return f"price:{symbol.upper()}"
 
 
 def key_channels_list(sort: str, skip: int, limit: int) -> str:
-    return f"channels:list:{sort}:{skip}:{limit}"
+    return f"channels:list:v{cache_version(NS_CHANNELS)}:{sort}:{skip}:{limit}"
+
+
+def key_dashboard_signals(cursor: str, limit: int) -> str:
+    return f"dashboard:signals:v{cache_version(NS_SIGNALS)}:{cursor or '-'}:{limit}"
+
+
+def key_dashboard_channels(cursor: str, limit: int) -> str:
+    return f"dashboard:channels:v{cache_version(NS_CHANNELS)}:{cursor or '-'}:{limit}"
+
+
+def key_channel_signals(channel_id: int, cursor: str, limit: int) -> str:
+    return f"channel:{channel_id}:signals:v{cache_version(NS_SIGNALS)}:{cursor or '-'}:{limit}"
 
 
-def key_dashboard_signals(skip: int, limit: int) -> str:
-    return f"dashboard:signals:{skip}:{limit}"
+def key_principal(user_id: int) -> str:
+    return f"principal:v{cache_version(NS_PRINCIPALS)}:{user_id}"
 
 
-def key_dashboard_channels(skip: int, limit: int) -> str:
-    return f"dashboard:channels:{skip}:{limit}"
+def key_signal_stats(channel_id: int, date_from: Optional[Any] = None, date_to: Optional[Any] = None) -> str:
+    ver = f"{cache_version(NS_SIGNAL_STATS)}.{cache_version(ns_channel_stats(channel_id))}"
+    return f"signal_stats:{channel_id}:v{ver}:{date_from or '-'}:{date_to or '-'}"
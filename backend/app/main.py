@@ -286,6 +286,22 @@ async def lifespan(app: FastAPI):
         else:
             logger.warning("Database engine not available - running in limited mode")
 
+        # Прогрев кэша fingerprint для дедупа (DEDUP_FINGERPRINT_CACHE) — в фоне, не блокируя старт
+        def _warm_dedup_cache():
+            from app.core.database import SessionLocal
+            from app.services.dedup import warm_fingerprint_cache
+
+            db = SessionLocal()
+            try:
+                warm_fingerprint_cache(db)
+            except Exception as e:
+                logger.warning("Dedup fingerprint cache warm-up failed: %s", e)
+            finally:
+                db.close()
+
+        if engine and get_settings().DEDUP_FINGERPRINT_CACHE:
+            _background_tasks.append(asyncio.create_task(asyncio.to_thread(_warm_dedup_cache)))
+
         mode = _scheduler_mode()
 
         # Запускаем in-process планировщики только в asyncio mode.
@@ -308,20 +324,20 @@ async def lifespan(app: FastAPI):
             async def _auto_collect():
                 await asyncio.sleep(3)
                 try:
-                    from app.core.database import SessionLocal
+                    from app.core.database import async_session_scope
                     from app.core.config import get_settings
-                    from app.services.collection_pipeline import run_full_collection_async
-                    from app.services.metrics_calculator import recalculate_all_channels
+                    from app.services.collection_pipeline import run_full_collection_on_async_session
+                    from app.services.metrics_calculator import recalculate_all_channels_async
 
-                    db = SessionLocal()
-                    try:
+                    # AsyncSession: стартовый сбор не блокирует первые запросы к API
+                    async with async_session_scope() as session:
                         st = get_settings()
-                        result = await run_full_collection_async(db, st)
+                        result = await run_full_collection_on_async_session(session, st)
                         tg = result.get("telegram") or {}
                         rd = result.get("reddit") or {}
                         total = (tg.get("saved") or 0) + (rd.get("saved") or 0)
-                        db.commit()
-                        recalculate_all_channels(db)
+                        await session.commit()
+                        await recalculate_all_channels_async(session)
                         logger.info(
                             "Startup collection: saved=%s tg_posts=%s tg_channels=%s reddit_saved=%s",
                             total,
@@ -329,8 +345,6 @@ async def lifespan(app: FastAPI):
                             tg.get("channels"),
                             rd.get("saved"),
                         )
-                    finally:
-                        db.close()
                 except Exception as e:
                     logger.warning("Startup collection failed: %s", e)
             t1 = asyncio.create_task(_auto_collect())
@@ -363,6 +377,15 @@ async def lifespan(app: FastAPI):
                 )
             except Exception as sched_err:
                 logger.warning("Scheduler not started", error=str(sched_err))
+
+            # Поток цен: ингестор (держатель lease в Redis) или подписка на его тики
+            if get_settings().PRICE_FEED_ENABLED:
+                from app.services.price_feed import run_price_feed
+                from app.tasks.scheduler import periodic_price_triggers
+
+                _background_tasks.append(asyncio.create_task(run_price_feed()))
+                _background_tasks.append(asyncio.create_task(periodic_price_triggers()))
+                logger.info("Price feed and price triggers started")
         else:
             logger.info("In-process schedulers disabled (SCHEDULER_MODE=celery); relying on Celery beat/worker")
 
@@ -390,12 +413,34 @@ async def lifespan(app: FastAPI):
                 logger.info("Trading scheduler stopped")
         except Exception as e:
             logger.error("Error stopping trading scheduler", error=str(e))
+        # Пулы соединений с биржами: loop торгового рантайма и loop API
+        try:
+            from app.services.exchange_service import close_shared_session
+            from app.services.trading_runtime import trading_runtime
+
+            trading_runtime.stop()
+            await close_shared_session()
+        except Exception as e:
+            logger.error("Error closing exchange sessions", error=str(e))
+        try:
+            from app.services.ml_gateway import close_ml_client
+
+            await close_ml_client()
+        except Exception as e:
+            logger.error("Error closing ML client", error=str(e))
         # Close DB engine
         try:
             if engine:
                 engine.dispose()
         except Exception:
             pass
+        try:
+            from app.core.database import dispose_async_engine, shutdown_db_executor
+
+            await dispose_async_engine()
+            shutdown_db_executor()
+        except Exception:
+            pass
         logger.info("Application shutdown completed")
 
 # Создание FastAPI приложения
@@ -486,8 +531,8 @@ if getattr(settings, "ENVIRONMENT", "development") == "production":
     except Exception as e:
         logger.warning("TrustedHostMiddleware skip: %s", e)
 
-# Добавляем middleware для ограничения подписок (если доступен)
-if SubscriptionLimitMiddleware:
+# Добавляем middleware для ограничения подписок (если доступен и включён)
+if SubscriptionLimitMiddleware and getattr(settings, "SUBSCRIPTION_LIMITS_ENFORCED", False):
     app.add_middleware(SubscriptionLimitMiddleware)
 
 # Добавляем rate limiting middleware
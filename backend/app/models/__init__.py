@@ -51,6 +51,7 @@ from .normalized_signal import NormalizedSignal
 from .signal_relation import SignalRelation
 from .execution_model import ExecutionModel
 from .signal_outcome import SignalOutcome
+from .signal_feature import SignalFeature
 
 # Экспортируем все модели для удобного импорта
 __all__ = [
@@ -112,4 +113,5 @@ __all__ = [
     "SignalRelation",
     "ExecutionModel",
     "SignalOutcome",
+    "SignalFeature",
 ]
\ No newline at end of file
@@ -27,6 +27,10 @@ class Channel(BaseModel):
     successful_signals = Column(Integer, default=0, nullable=False)
     accuracy = Column(Float, nullable=True)
     average_roi = Column(Float, nullable=True)
+    # Running aggregates (metrics_calculator): accuracy / average_roi derive from them
+    resolved_signals = Column(Integer, default=0, nullable=False, server_default="0")
+    roi_sum = Column(Float, default=0.0, nullable=False, server_default="0")
+    roi_count = Column(Integer, default=0, nullable=False, server_default="0")
     category = Column(String(100), nullable=True)
     priority = Column(Integer, default=1, nullable=False)
     expected_accuracy = Column(String(50), nullable=True)
@@ -0,0 +1,37 @@
+"""SignalFeature — признаки сигнала на момент сигнала (point-in-time) для обучения и инференса."""
+from __future__ import annotations
+
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer
+
+from app.models.base import Base
+
+
+class SignalFeature(Base):
+    """
+    Одна строка на сигнал. Индикаторы — последняя точка technical_indicators не позже as_of,
+    статистика канала — только по сигналам, созданным/закрытым до as_of (без утечки исходов).
+    Заполняется инкрементально app/services/feature_store.py.
+    """
+
+    __tablename__ = "signal_features"
+    __table_args__ = (
+        Index("ix_signal_features_as_of", "as_of"),
+        Index("ix_signal_features_version", "feature_version"),
+    )
+
+    signal_id = Column(Integer, ForeignKey("signals.id", ondelete="CASCADE"), primary_key=True)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    feature_version = Column(Integer, nullable=False)
+
+    # Порядок = FEATURE_NAMES ml-service (trained_predictor)
+    confidence_score = Column(Float, nullable=True)
+    risk_reward_ratio = Column(Float, nullable=True)
+    price_deviation = Column(Float, nullable=True)
+    direction = Column(Float, nullable=False)  # 1 = LONG, 0 = SHORT
+    rsi = Column(Float, nullable=True)
+    macd = Column(Float, nullable=True)
+    channel_accuracy = Column(Float, nullable=True)  # % на момент as_of
+    channel_signal_count = Column(Integer, nullable=False)
+
+    has_indicators = Column(Boolean, nullable=False, default=False)
+    computed_at = Column(DateTime(timezone=True), nullable=False)
@@ -179,6 +179,17 @@ class SignalStats(BaseModel):
     best_signal_roi: float = 0.0
     worst_signal_roi: float = 0.0
     average_duration_hours: float = 0.0
+    failed_signals: int = 0
+    pending_signals: int = 0
+    accuracy_percentage: float = 0.0
+    total_profit_loss: float = 0.0
+    tp1_hits: int = 0
+    tp2_hits: int = 0
+    tp3_hits: int = 0
+    sl_hits: int = 0
+    expired_signals: int = 0
+    max_drawdown: float = 0.0
+    sharpe_ratio: float = 0.0
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,102 @@
+"""
+Инвалидация кэша страниц по событию записи, а не по TTL.
+
+Хуки сессии отмечают, какие пространства ключей задела транзакция
+(insert / update / delete Signal или Channel — через unit of work или bulk ORM-запрос),
+и после commit делают INCR их версий (app.core.redis_cache.bump_cache_version).
+Так persist_parsed_signals_for_channel, обновления статусов в signal_checker,
+правки каналов из API и любые другие записи сбрасывают закэшированные страницы
+dashboard / /channels/{id}/signals / списка каналов сразу после фиксации.
+Статистика сигналов (SignalService.get_signal_stats) версионируется по каналу:
+запись сигнала канала A не сбрасывает кэш статистики канала B.
+
+Сигналы двигают и версию каналов: счётчики и accuracy канала обновляются вместе
+с сигналом (metrics_calculator).
+"""
+import asyncio
+import logging
+from typing import Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.redis_cache import (
+    NS_CHANNELS,
+    NS_SIGNAL_STATS,
+    NS_SIGNALS,
+    bump_cache_version,
+    ns_channel_stats,
+)
+from app.models.channel import Channel
+from app.models.signal import Signal
+
+logger = logging.getLogger(__name__)
+
+_DIRTY_KEY = "cache_versions_dirty"
+
+
+def _namespaces_for(entity) -> Set[str]:
+    if isinstance(entity, Signal):
+        namespaces = {NS_SIGNALS, NS_CHANNELS}
+        # статистика — по каналу; при переносе сигнала сбрасываются оба канала
+        channel_ids = {entity.channel_id}
+        channel_ids.update(inspect(entity).attrs.channel_id.history.deleted or ())
+        namespaces.update(ns_channel_stats(cid) for cid in channel_ids if cid is not None)
+        return namespaces
+    if entity is Signal:
+        # bulk-запрос: затронутые каналы неизвестны
+        return {NS_SIGNALS, NS_CHANNELS, NS_SIGNAL_STATS}
+    if entity is Channel or isinstance(entity, Channel):
+        return {NS_CHANNELS}
+    return set()
+
+
+def _mark(session: Session, namespaces: Set[str]) -> None:
+    if namespaces:
+        session.info.setdefault(_DIRTY_KEY, set()).update(namespaces)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_written(session: Session, flush_context) -> None:
+    namespaces: Set[str] = set()
+    for obj in session.new:
+        namespaces |= _namespaces_for(obj)
+    for obj in session.deleted:
+        namespaces |= _namespaces_for(obj)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            namespaces |= _namespaces_for(obj)
+    _mark(session, namespaces)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk(orm_execute_state) -> None:
+    # update(Signal).where(...) / delete(...) мимо unit of work
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            _mark(orm_execute_state.session, _namespaces_for(mapper.class_))
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_versions(session: Session) -> None:
+    """
+    INCR версий после commit. Commit из AsyncSession идёт на потоке event loop —
+    там pipeline уходит в default executor, чтобы не держать loop на RTT до Redis;
+    старая страница может отдаться ещё один раз, пока INCR не дошёл.
+    Sync-сессии (threadpool, Celery) делают INCR сразу.
+    """
+    namespaces = session.info.pop(_DIRTY_KEY, None)
+    if not namespaces:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        bump_cache_version(*sorted(namespaces))
+        return
+    loop.run_in_executor(None, bump_cache_version, *sorted(namespaces))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
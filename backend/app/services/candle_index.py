@@ -0,0 +1,210 @@
+"""
+Индекс серии свечей: бинарный поиск по ts + sparse table для range max(high) / min(low).
+
+Строится один раз на серию за O(n log n); дальше «экстремум high/low на [i, j]» — O(1),
+«первый бар с high >= L / low <= L начиная с i» — O(log n) (спуск по степеням двойки).
+Значения — float64; вызывающий берёт точные Decimal из свечи по найденному индексу.
+"""
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+def _sparse_table(values: np.ndarray, prefer_max: bool) -> np.ndarray:
+    """table[k, i] = индекс экстремума на [i, i + 2^k) (при равенстве — самый левый)."""
+    n = int(values.shape[0])
+    levels = max(1, n.bit_length())
+    table = np.zeros((levels, n), dtype=np.int64)
+    table[0] = np.arange(n)
+    for k in range(1, levels):
+        half = 1 << (k - 1)
+        span = n - (1 << k) + 1
+        if span <= 0:
+            table = table[:k]
+            break
+        a = table[k - 1, :span]
+        b = table[k - 1, half : half + span]
+        better = values[b] > values[a] if prefer_max else values[b] < values[a]
+        table[k, :span] = np.where(better, b, a)
+    return table
+
+
+class CandleIndex:
+    """
+    Индекс над колонками ts (int64 µs UTC), high, low (float64).
+
+    offset/length — окно поверх общего индекса (view для срезов серии без перестроения);
+    все методы принимают и возвращают индексы относительно окна.
+    """
+
+    __slots__ = ("ts", "high", "low", "_max_t", "_min_t", "offset", "length")
+
+    def __init__(self, ts: np.ndarray, high: np.ndarray, low: np.ndarray) -> None:
+        self.ts = ts
+        self.high = high
+        self.low = low
+        self._max_t = _sparse_table(high, prefer_max=True)
+        self._min_t = _sparse_table(low, prefer_max=False)
+        self.offset = 0
+        self.length = int(ts.shape[0])
+
+    @classmethod
+    def from_candles(cls, candles: Sequence) -> "CandleIndex":
+        from app.services.outcome_candle_engine import to_epoch_us
+
+        n = len(candles)
+        return cls(
+            np.fromiter((to_epoch_us(c.ts_open) for c in candles), dtype=np.int64, count=n),
+            np.fromiter((float(c.high) for c in candles), dtype=np.float64, count=n),
+            np.fromiter((float(c.low) for c in candles), dtype=np.float64, count=n),
+        )
+
+    def window(self, offset: int, length: int) -> "CandleIndex":
+        view = object.__new__(CandleIndex)
+        view.ts, view.high, view.low = self.ts, self.high, self.low
+        view._max_t, view._min_t = self._max_t, self._min_t
+        view.offset = self.offset + offset
+        view.length = length
+        return view
+
+    def __len__(self) -> int:
+        return self.length
+
+    # --- время ---
+
+    def locate(self, at_us: int, delta_us: int) -> int:
+        """Свеча, содержащая at (ts <= at < ts + delta), иначе первая после; -1 если нет."""
+        lo = self.offset
+        hi = lo + self.length
+        i = int(np.searchsorted(self.ts[lo:hi], at_us - delta_us, side="right"))
+        return i if i < self.length else -1
+
+    def bounds(self, from_us: int, to_us: int) -> Tuple[int, int]:
+        """[lo, hi) баров с from <= ts <= to."""
+        w = self.ts[self.offset : self.offset + self.length]
+        lo = int(np.searchsorted(w, from_us, side="left"))
+        hi = int(np.searchsorted(w, to_us, side="right"))
+        return lo, max(lo, hi)
+
+    # --- экстремумы на [i, j] включительно ---
+
+    def _query(self, table: np.ndarray, values: np.ndarray, i: int, j: int, prefer_max: bool) -> int:
+        a_i = self.offset + int(i)
+        b_i = self.offset + int(j)
+        k = (b_i - a_i + 1).bit_length() - 1
+        a = int(table[k, a_i])
+        b = int(table[k, b_i - (1 << k) + 1])
+        if prefer_max:
+            pick = b if values[b] > values[a] else a
+        else:
+            pick = b if values[b] < values[a] else a
+        return pick - self.offset
+
+    def argmax_high(self, i: int, j: int) -> int:
+        return self._query(self._max_t, self.high, i, j, True)
+
+    def argmin_low(self, i: int, j: int) -> int:
+        return self._query(self._min_t, self.low, i, j, False)
+
+    def max_high(self, i: int, j: int) -> float:
+        return float(self.high[self.offset + self.argmax_high(i, j)])
+
+    def min_low(self, i: int, j: int) -> float:
+        return float(self.low[self.offset + self.argmin_low(i, j)])
+
+    def argmax_high_many(self, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Векторная версия argmax_high для массивов границ (i <= j)."""
+        return self._query_many(self._max_t, self.high, i, j, True)
+
+    def argmin_low_many(self, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        return self._query_many(self._min_t, self.low, i, j, False)
+
+    def _query_many(self, table, values, i, j, prefer_max: bool) -> np.ndarray:
+        a_i = self.offset + np.asarray(i, dtype=np.int64)
+        b_i = self.offset + np.asarray(j, dtype=np.int64)
+        k = np.frexp((b_i - a_i + 1).astype(np.float64))[1].astype(np.int64) - 1
+        a = table[k, a_i]
+        b = table[k, b_i - (1 << k) + 1]
+        better = values[b] > values[a] if prefer_max else values[b] < values[a]
+        return np.where(better, b, a) - self.offset
+
+    # --- первый бар, пересекающий уровень ---
+
+    def _first(self, table, values, level: float, start: int, end: int, prefer_max: bool) -> int:
+        p = self.offset + max(0, int(start))
+        stop = self.offset + min(int(end), self.length)
+        for k in range(table.shape[0] - 1, -1, -1):
+            step = 1 << k
+            if p + step > stop:
+                continue
+            v = values[table[k, p]]
+            if (v < level) if prefer_max else (v > level):
+                p += step
+        return p - self.offset if p < stop else -1
+
+    def first_high_ge(self, level: float, start: int, end: Optional[int] = None) -> int:
+        """Первый бар в [start, end) с high >= level, -1 если нет."""
+        return self._first(self._max_t, self.high, level, start, self.length if end is None else end, True)
+
+    def first_low_le(self, level: float, start: int, end: Optional[int] = None) -> int:
+        """Первый бар в [start, end) с low <= level, -1 если нет."""
+        return self._first(self._min_t, self.low, level, start, self.length if end is None else end, False)
+
+
+class LinearScan:
+    """
+    Тот же интерфейс поиска поверх списка свечей — линейным проходом, без построения таблиц.
+
+    Для разового списка (один сигнал) sparse table за O(n log n) дороже самого прохода O(n);
+    индекс окупается только на серии, которую читают многие сигналы (CandleSeries, batch-движок).
+    """
+
+    __slots__ = ("candles",)
+
+    def __init__(self, candles: Sequence) -> None:
+        self.candles = candles
+
+    def __len__(self) -> int:
+        return len(self.candles)
+
+    def argmax_high(self, i: int, j: int) -> int:
+        best = i
+        for k in range(i + 1, j + 1):
+            if self.candles[k].high > self.candles[best].high:
+                best = k
+        return best
+
+    def argmin_low(self, i: int, j: int) -> int:
+        best = i
+        for k in range(i + 1, j + 1):
+            if self.candles[k].low < self.candles[best].low:
+                best = k
+        return best
+
+    def first_high_ge(self, level: float, start: int, end: Optional[int] = None) -> int:
+        stop = len(self.candles) if end is None else min(end, len(self.candles))
+        for k in range(max(0, start), stop):
+            if float(self.candles[k].high) >= level:
+                return k
+        return -1
+
+    def first_low_le(self, level: float, start: int, end: Optional[int] = None) -> int:
+        stop = len(self.candles) if end is None else min(end, len(self.candles))
+        for k in range(max(0, start), stop):
+            if float(self.candles[k].low) <= level:
+                return k
+        return -1
+
+
+CandleSearch = Union[CandleIndex, LinearScan]
+
+
+def index_for(candles: Sequence) -> CandleSearch:
+    """Поиск по окну: у CandleSeries — предвычисленный индекс (view), для списка — линейный проход."""
+    from app.services.candle_store import CandleSeries
+
+    if isinstance(candles, CandleSeries):
+        return candles.index()
+    return LinearScan(candles)
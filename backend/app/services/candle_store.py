@@ -0,0 +1,395 @@
+"""
+Колоночное локальное хранилище свечей: per (symbol, timeframe) append-only файлы + mmap.
+
+Раскладка: <CANDLE_STORE_DIR>/<timeframe>/<SYMBOL>/{ts.i8, open.f8, high.f8, low.f8, close.f8, volume.f8}.
+ts — int64 микросекунды UTC (как outcome_batch_engine.to_epoch_us), цены — float64.
+Источник истины — market_candles: sync_from_db дописывает новые строки и перечитывает последние
+_SYNC_OVERLAP_BARS баров (загрузчик обновляет незакрытый бар); если в БД до этого окна строк
+не столько, сколько локально (догрузили дыру), серия перестраивается целиком.
+Читатели получают read-only np.memmap; срез по времени — бинарный поиск, без копирования.
+Изменение уже записанных строк — новые файлы через os.replace: открытые mmap читателей
+остаются на старых файлах (целый снимок, без SIGBUS), series() переотображает по смене inode.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Sequence
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+from sqlalchemy import text
+
+from app.services.candle_index import CandleIndex
+from app.services.outcome_candle_engine import OhlcCandle, to_epoch_us
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover — Windows dev
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("ts", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+)
+_VALUE_COLUMNS = _COLUMNS[1:]
+_ITEMSIZE = 8
+_SYNC_FETCH_ROWS = 10_000
+_SYNC_OVERLAP_BARS = 3
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _from_epoch_us(us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=us)
+
+
+def _row_ts(v: Any) -> datetime:
+    # SQLite через text() отдаёт DateTime строкой
+    if isinstance(v, str):
+        v = datetime.fromisoformat(v)
+    return v
+
+
+class CandleSeries(Sequence):
+    """Окно свечей (view поверх mmap-колонок). Элементы — OhlcCandle, создаются лениво."""
+
+    __slots__ = ("ts", "open", "high", "low", "close", "volume", "_root", "_off", "_index")
+
+    def __init__(self, ts, open, high, low, close, volume, *, _root=None, _off: int = 0) -> None:  # noqa: A002
+        self.ts = ts
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self._root = _root
+        self._off = _off
+        self._index: Optional[CandleIndex] = None
+
+    @classmethod
+    def empty(cls) -> "CandleSeries":
+        z = np.empty(0, dtype=np.float64)
+        return cls(np.empty(0, dtype=np.int64), z, z, z, z, z)
+
+    def __len__(self) -> int:
+        return int(self.ts.shape[0])
+
+    def __getitem__(self, i: Union[int, slice]):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("CandleSeries supports contiguous slices only")
+            stop = max(start, stop)
+            return CandleSeries(
+                self.ts[start:stop],
+                self.open[start:stop],
+                self.high[start:stop],
+                self.low[start:stop],
+                self.close[start:stop],
+                self.volume[start:stop],
+                _root=self._root or self,
+                _off=self._off + start,
+            )
+        return OhlcCandle(
+            ts_open=_from_epoch_us(int(self.ts[i])),
+            open=Decimal(repr(float(self.open[i]))),
+            high=Decimal(repr(float(self.high[i]))),
+            low=Decimal(repr(float(self.low[i]))),
+            close=Decimal(repr(float(self.close[i]))),
+        )
+
+    def index(self) -> CandleIndex:
+        """CandleIndex окна: строится один раз на всю серию, срезы получают view со сдвигом."""
+        root = self._root or self
+        if root._index is None:
+            root._index = CandleIndex(root.ts, root.high, root.low)
+        return root._index.window(self._off, len(self))
+
+    def __iter__(self) -> Iterator[OhlcCandle]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def timestamps(self) -> list[datetime]:
+        return [_from_epoch_us(int(t)) for t in self.ts]
+
+    def bounds(self, from_ts: datetime, to_ts: datetime) -> Tuple[int, int]:
+        """[lo, hi) для from_ts <= ts <= to_ts, O(log n)."""
+        lo = int(np.searchsorted(self.ts, to_epoch_us(from_ts), side="left"))
+        hi = int(np.searchsorted(self.ts, to_epoch_us(to_ts), side="right"))
+        return lo, max(lo, hi)
+
+    def range(self, from_ts: datetime, to_ts: datetime) -> "CandleSeries":
+        lo, hi = self.bounds(from_ts, to_ts)
+        return self[lo:hi]
+
+
+class CandleStore:
+    """Каталог колоночных файлов; один экземпляр на процесс (get_candle_store)."""
+
+    def __init__(self, root: Union[str, Path]) -> None:
+        self.root = Path(root)
+        self._maps: dict[Tuple[str, str], Tuple[Tuple[int, int], CandleSeries]] = {}
+        self._mu = threading.Lock()
+
+    def _dir(self, symbol: str, timeframe: str) -> Path:
+        return self.root / timeframe / symbol.upper()
+
+    def _version(self, d: Path) -> Tuple[int, int]:
+        """(число строк, inode ts.i8): меняется и при дописывании, и при перезаписи файлов."""
+        try:
+            st = (d / "ts.i8").stat()
+        except FileNotFoundError:
+            return 0, 0
+        return st.st_size // _ITEMSIZE, st.st_ino
+
+    def _count(self, d: Path) -> int:
+        return self._version(d)[0]
+
+    def series(self, symbol: str, timeframe: str) -> CandleSeries:
+        """Вся серия read-only через mmap; переотображается, если файлы изменены другим процессом."""
+        key = (symbol.upper(), timeframe)
+        d = self._dir(*key)
+        version = self._version(d)
+        n = version[0]
+        with self._mu:
+            cached = self._maps.get(key)
+            if cached and cached[0] == version:
+                return cached[1]
+            if n == 0:
+                s = CandleSeries.empty()
+            else:
+                s = CandleSeries(
+                    *(np.memmap(d / f"{name}.{dt[1:]}", dtype=dt, mode="r", shape=(n,)) for name, dt in _COLUMNS)
+                )
+            self._maps[key] = (version, s)
+            return s
+
+    def last_ts_us(self, symbol: str, timeframe: str) -> Optional[int]:
+        s = self.series(symbol, timeframe)
+        return int(s.ts[-1]) if len(s) else None
+
+    @contextmanager
+    def _locked(self, d: Path):
+        d.mkdir(parents=True, exist_ok=True)
+        with open(d / ".lock", "a+b") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def _truncate_torn(self, d: Path, n: int) -> None:
+        # хвосты колонок значений после сбоя между записью значений и ts
+        for name, dt in _VALUE_COLUMNS:
+            p = d / f"{name}.{dt[1:]}"
+            if p.exists() and p.stat().st_size != n * _ITEMSIZE:
+                os.truncate(p, n * _ITEMSIZE)
+
+    def _write_appended(self, d: Path, cols: dict[str, np.ndarray]) -> None:
+        # сначала значения, затем ts: длина ts.i8 — число зафиксированных строк
+        for name, dt in _VALUE_COLUMNS + _COLUMNS[:1]:
+            with open(d / f"{name}.{dt[1:]}", "ab") as fh:
+                fh.write(cols[name].tobytes())
+                fh.flush()
+
+    def _rewrite(self, d: Path, keep: int, n: int, cols: dict[str, np.ndarray]) -> None:
+        """Колонки = первые keep строк + cols; каждый файл собирается рядом и подменяется os.replace."""
+        grows = keep + len(cols["ts"]) >= n
+        # при росте ts последним, при усечении первым: длина ts никогда не больше длины значений
+        order = _VALUE_COLUMNS + _COLUMNS[:1] if grows else _COLUMNS[:1] + _VALUE_COLUMNS
+        for name, dt in order:
+            path = d / f"{name}.{dt[1:]}"
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "wb") as out:
+                if keep:
+                    with open(path, "rb") as fh:
+                        out.write(fh.read(keep * _ITEMSIZE))
+                out.write(cols[name].tobytes())
+                out.flush()
+            os.replace(tmp, path)
+
+    @staticmethod
+    def _columns(rows: Iterable[Tuple[datetime, Any, Any, Any, Any, Any]], after: Optional[int]) -> dict[str, np.ndarray]:
+        """Строки → колонки, только строго возрастающие ts новее after."""
+        cols: dict[str, list] = {name: [] for name, _ in _COLUMNS}
+        last = after
+        for r in rows:
+            t = to_epoch_us(_row_ts(r[0]))
+            if last is not None and t <= last:
+                continue
+            last = t
+            cols["ts"].append(t)
+            for k, (name, _) in enumerate(_VALUE_COLUMNS, start=1):
+                cols[name].append(float(r[k]))
+        return {name: np.asarray(cols[name], dtype=dt) for name, dt in _COLUMNS}
+
+    def append(
+        self,
+        symbol: str,
+        timeframe: str,
+        rows: Iterable[Tuple[datetime, Any, Any, Any, Any, Any]],
+    ) -> int:
+        """
+        Дописать (ts, open, high, low, close, volume) строго новее последнего ts.
+
+        Сначала пишутся колонки значений, затем ts: длина ts.i8 — число зафиксированных строк,
+        хвосты после сбоя отрезаются при следующей записи.
+        """
+        d = self._dir(symbol, timeframe)
+        with self._locked(d):
+            n = self._count(d)
+            self._truncate_torn(d, n)
+            cols = self._columns(rows, self.last_ts_us(symbol, timeframe) if n else None)
+            added = len(cols["ts"])
+            if added:
+                self._write_appended(d, cols)
+        return added
+
+    def replace_tail(
+        self,
+        symbol: str,
+        timeframe: str,
+        keep: int,
+        rows: Iterable[Tuple[datetime, Any, Any, Any, Any, Any]],
+    ) -> int:
+        """
+        Серия = первые keep строк + rows (rows — все строки источника начиная с позиции keep).
+
+        Совпадающее начало хвоста не трогается: только новые строки — дописывание, как append;
+        изменённые или пропавшие — перезапись файлов. Возвращает число новых или изменённых строк.
+        """
+        d = self._dir(symbol, timeframe)
+        cols = self._columns(rows, None)
+        with self._locked(d):
+            n = self._count(d)
+            if keep > n:
+                return 0  # серию только что перестроил другой процесс — следующий sync сверит заново
+            self._truncate_torn(d, n)
+            old = self.series(symbol, timeframe)[keep:n]
+            m = min(len(old), len(cols["ts"]))
+            same = np.ones(m, dtype=bool)
+            for name, _ in _COLUMNS:
+                same &= np.asarray(getattr(old, name)[:m]) == cols[name][:m]
+            common = m if same.all() else int(np.argmin(same))
+            if common == len(old):
+                tail = {name: arr[common:] for name, arr in cols.items()}
+                if len(tail["ts"]):
+                    self._write_appended(d, tail)
+            else:
+                self._rewrite(d, keep, n, cols)
+        return len(cols["ts"]) - common
+
+    def sync_from_db(self, db, symbol: str, timeframe: str, overlap: int = _SYNC_OVERLAP_BARS) -> int:
+        """
+        Синхронизировать с market_candles (Session или Connection): новые строки и последние
+        overlap баров; при догруженной в БД истории — полная перестройка. Возвращает число
+        новых или изменённых строк.
+        """
+        s = self.series(symbol, timeframe)
+        params = {"symbol": symbol.upper(), "tf": timeframe}
+        keep = max(0, len(s) - max(1, overlap))
+        since = _from_epoch_us(int(s.ts[keep])) if len(s) else _EPOCH
+        if keep:
+            before = db.execute(
+                text(
+                    """
+                    SELECT COUNT(*) FROM market_candles
+                    WHERE symbol = :symbol AND timeframe = :tf AND timestamp < :since
+                    """
+                ),
+                {**params, "since": since},
+            ).scalar()
+            if before != keep:
+                logger.info(
+                    "candle store %s %s: %s rows before overlap in DB vs %s local, rebuilding",
+                    symbol, timeframe, before, keep,
+                )
+                keep, since = 0, _EPOCH
+        result = db.execute(
+            text(
+                """
+                SELECT timestamp, open, high, low, close, volume
+                FROM market_candles
+                WHERE symbol = :symbol
+                  AND timeframe = :tf
+                  AND timestamp >= :since
+                ORDER BY timestamp ASC
+                """
+            ),
+            {**params, "since": since},
+        )
+        if not len(s):
+            # пустое хранилище: первичная загрузка потоком, без всей истории в памяти
+            added = 0
+            while True:
+                chunk = result.fetchmany(_SYNC_FETCH_ROWS)
+                if not chunk:
+                    break
+                added += self.append(symbol, timeframe, chunk)
+            return added
+        return self.replace_tail(symbol, timeframe, keep, result.fetchall())
+
+
+_store: Optional[CandleStore] = None
+_store_mu = threading.Lock()
+_last_sync: dict[Tuple[str, str], float] = {}
+
+
+def get_candle_store() -> Optional[CandleStore]:
+    """Процессный CandleStore при CANDLE_STORE_ENABLED, иначе None."""
+    global _store
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    if not settings.CANDLE_STORE_ENABLED:
+        return None
+    with _store_mu:
+        if _store is None or _store.root != Path(settings.CANDLE_STORE_DIR):
+            _store = CandleStore(settings.CANDLE_STORE_DIR)
+        return _store
+
+
+def read_window(
+    db,
+    *,
+    symbol: str,
+    timeframe: str,
+    from_ts: datetime,
+    to_ts: datetime,
+) -> Optional[CandleSeries]:
+    """
+    Окно свечей из локального хранилища (zero-copy) с ленивой досинхронизацией из market_candles.
+
+    None — хранилище выключено или синхронизация не удалась: вызывающий идёт в SQL как раньше.
+    """
+    store = get_candle_store()
+    if store is None:
+        return None
+    from app.core.config import get_settings
+
+    key = (symbol.upper(), timeframe)
+    now = time.monotonic()
+    if now - _last_sync.get(key, float("-inf")) >= get_settings().CANDLE_STORE_SYNC_INTERVAL_SEC:
+        try:
+            store.sync_from_db(db, symbol, timeframe)
+            _last_sync[key] = now
+        except Exception as e:
+            logger.debug("candle store sync skipped for %s %s: %s", symbol, timeframe, e)
+            return None
+    return store.series(symbol, timeframe).range(from_ts, to_ts)
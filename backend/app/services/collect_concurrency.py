@@ -0,0 +1,167 @@
+"""
+Ограниченный параллелизм для сбора: fan-out по каналам, общий httpx-клиент, лимит на хост.
+
+- fan_out: N каналов качаются/парсятся одновременно, запись в БД — строго по одному
+  (через очередь, в вызывающей корутине: Session не потокобезопасна и не делится между задачами).
+- telegram_http_client: общий keep-alive пул на цикл вместо нового клиента на каждый канал.
+- host_limiter: token bucket на хост (t.me и CDN картинок), чтобы параллельный сбор не упирался в бан;
+  действует только внутри параллельного fan_out — последовательный сбор (concurrency=1) не ждёт.
+- ocr_semaphore: ограничение одновременных OCR (CPU/память EasyOCR).
+
+Примитивы asyncio привязаны к event loop: Celery-задачи зовут asyncio.run на каждый запуск,
+поэтому семафоры и бакеты хранятся per-loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import inspect
+import logging
+import os
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, TypeVar, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_per_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+# True в задачах параллельного fan_out (контекст наследуется при create_task)
+_parallel_fetch: contextvars.ContextVar[bool] = contextvars.ContextVar("collect_parallel_fetch", default=False)
+
+
+def _loop_state() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    state = _per_loop.get(loop)
+    if state is None:
+        state = _per_loop[loop] = {}
+    return state
+
+
+class TokenBucket:
+    """Token bucket: rate токенов/сек, ёмкость burst. acquire ждёт, пока не появится токен."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = max(0.001, float(rate))
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _host_rate() -> float:
+    return float(os.getenv("TELEGRAM_HTTP_RATE_PER_SEC", "2"))
+
+
+def _host_burst() -> int:
+    return int(os.getenv("TELEGRAM_HTTP_BURST", "4"))
+
+
+async def host_limiter(host: Optional[str]) -> None:
+    """
+    Дождаться токена для хоста. No-op вне параллельного fan_out (последовательный сбор идёт
+    как раньше, без добавочных задержек) и при TELEGRAM_HTTP_RATE_PER_SEC<=0.
+    """
+    if not host or not _parallel_fetch.get():
+        return
+    rate = _host_rate()
+    if rate <= 0:
+        return
+    buckets = _loop_state().setdefault("buckets", {})
+    bucket = buckets.get(host)
+    if bucket is None:
+        bucket = buckets[host] = TokenBucket(rate, _host_burst())
+    await bucket.acquire()
+
+
+def ocr_semaphore() -> asyncio.Semaphore:
+    """Семафор OCR-стадии сбора (OCR_TELEGRAM_CONCURRENCY, по умолчанию 2)."""
+    state = _loop_state()
+    sem = state.get("ocr_sem")
+    if sem is None:
+        sem = state["ocr_sem"] = asyncio.Semaphore(max(1, int(os.getenv("OCR_TELEGRAM_CONCURRENCY", "2"))))
+    return sem
+
+
+def telegram_http_client(concurrency: int) -> httpx.AsyncClient:
+    """Keep-alive клиент на цикл сбора: один пул соединений к t.me на все каналы."""
+    return httpx.AsyncClient(
+        timeout=15.0,
+        follow_redirects=True,
+        limits=httpx.Limits(max_keepalive_connections=concurrency, max_connections=concurrency * 2),
+    )
+
+
+async def _maybe_await(result: Any) -> None:
+    if inspect.isawaitable(result):
+        await result
+
+
+async def fan_out(
+    items: Iterable[T],
+    fetch: Callable[[T], Awaitable[Optional[R]]],
+    persist: Callable[[T, R], Union[None, Awaitable[None]]],
+    *,
+    concurrency: int,
+) -> int:
+    """
+    fetch(item) — до concurrency одновременно; persist(item, result) — по одному, по мере готовности.
+
+    fetch возвращает None — элемент пропускается (ошибки fetch логирует сам).
+    Ошибка persist останавливает цикл и отменяет оставшиеся fetch. Возвращает число persist.
+    persist может быть корутиной (AsyncSession) — тогда она ожидается, порядок тот же.
+    """
+    items = list(items)
+    done = 0
+    if concurrency <= 1:
+        for item in items:
+            res = await fetch(item)
+            if res is not None:
+                await _maybe_await(persist(item, res))
+                done += 1
+        return done
+
+    sem = asyncio.Semaphore(concurrency)
+    queue: "asyncio.Queue[tuple]" = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def _produce(item: T) -> None:
+        async with sem:
+            try:
+                res = await fetch(item)
+            except Exception as e:
+                logger.warning("fan_out fetch failed: %s", e)
+                res = None
+        await queue.put((item, res))
+
+    token = _parallel_fetch.set(True)
+    try:
+        tasks = [asyncio.create_task(_produce(item)) for item in items]
+    finally:
+        _parallel_fetch.reset(token)
+    try:
+        for _ in range(len(tasks)):
+            item, res = await queue.get()
+            if res is not None:
+                await _maybe_await(persist(item, res))
+                done += 1
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return done
@@ -6,18 +6,22 @@ from __future__ import annotations
 
 import asyncio
 import hashlib
+import inspect
 import logging
 import os
 from decimal import Decimal
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Union
 
 from sqlalchemy.orm import Session
 
 from app.models.channel import Channel
 from app.models.signal import Signal, TelegramSignal
-from app.services.dedup import content_fingerprint, signal_exists
+from app.services.collect_concurrency import fan_out, telegram_http_client
+from app.services.dedup import content_fingerprint, existing_raw_telegram_texts, find_duplicate_signals
 
 if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
     from app.services.telegram_scraper import ChannelPost, ParsedSignal
 
 logger = logging.getLogger(__name__)
@@ -142,6 +146,13 @@ def persist_shadow_telegram_posts_if_enabled(
     }
 
 
+def _telethon_username(channel: Channel) -> Optional[str]:
+    username = channel.username
+    if not username and channel.url:
+        username = channel.url.rstrip("/").split("/")[-1]
+    return username or None
+
+
 async def telethon_collect_channel_core(
     db: Session,
     channel: Channel,
@@ -152,13 +163,22 @@ async def telethon_collect_channel_core(
     """
     from app.services.telethon_collector import collect_channel_history
 
-    username = channel.username
-    if not username and channel.url:
-        username = channel.url.rstrip("/").split("/")[-1]
+    username = _telethon_username(channel)
     if not username:
         return {"error": "Channel has no username or URL", "channel_name": channel.name}
 
     signals, telethon_shadow_posts = await collect_channel_history(username, days_back=days)
+    return telethon_persist_channel(db, channel, username, signals, telethon_shadow_posts)
+
+
+def telethon_persist_channel(
+    db: Session,
+    channel: Channel,
+    username: str,
+    signals: List["ParsedSignal"],
+    telethon_shadow_posts: List["ChannelPost"],
+) -> Dict[str, Any]:
+    """Запись результата Telethon одного канала: shadow raw + legacy Signal. Без commit."""
     shadow_stats = persist_shadow_telegram_posts_if_enabled(
         db,
         channel,
@@ -193,7 +213,7 @@ async def telethon_collect_channel_core(
         )
         saved += 1
 
-    channel.signals_count = db.query(Signal).filter(Signal.channel_id == channel.id).count()
+    db.flush()  # signals_count ведут хуки metrics_calculator: после flush в channel уже новое значение
     return {
         "channel": username,
         "channel_label": channel.name,
@@ -205,32 +225,71 @@ async def telethon_collect_channel_core(
 
 
 async def run_telethon_collect_all_channels(db: Session, days: int) -> Dict[str, Any]:
-    """Все активные Telegram-каналы через Telethon. Без commit."""
+    """
+    Все активные Telegram-каналы через Telethon. Без commit.
+
+    При TELETHON_COLLECT_CONCURRENCY > 1 история каналов читается параллельно через одно
+    подключение (shared_client), запись в БД — последовательно через fan_out.
+    """
+    from app.core.config import get_settings
+    from app.services.telethon_collector import collect_channel_history, shared_client
+
     channels = (
         db.query(Channel)
         .filter(Channel.is_active == True, Channel.platform == "telegram")
         .all()
     )
     results: List[Dict[str, Any]] = []
+    targets = []
     for channel in channels:
+        username = _telethon_username(channel)
+        if not username:
+            results.append({"channel_name": channel.name, "error": "Channel has no username or URL"})
+            continue
+        targets.append((channel, channel.name, username))
+
+    concurrency = max(1, int(get_settings().TELETHON_COLLECT_CONCURRENCY or 1))
+
+    def _persist(target, fetched) -> None:
+        channel, name, username = target
+        if isinstance(fetched, Exception):
+            results.append({"channel_name": name, "error": str(fetched)})
+            return
         try:
-            body = await telethon_collect_channel_core(db, channel, days)
-            if body.get("error"):
-                results.append({"channel_name": channel.name, "error": body["error"]})
-                continue
-            results.append(
-                {
-                    "channel_name": body["channel_label"],
-                    "username": body["channel"],
-                    "signals_found": body["signals_found"],
-                    "new_saved": body["new_saved"],
-                    "total_signals": body["total"],
-                    "shadow_raw": body["shadow_raw"],
-                }
-            )
+            body = telethon_persist_channel(db, channel, username, *fetched)
         except Exception as e:
-            logger.error("run_telethon_collect_all_channels %s: %s", channel.name, e)
-            results.append({"channel_name": channel.name, "error": str(e)})
+            logger.error("run_telethon_collect_all_channels %s: %s", name, e)
+            results.append({"channel_name": name, "error": str(e)})
+            return
+        results.append(
+            {
+                "channel_name": body["channel_label"],
+                "username": body["channel"],
+                "signals_found": body["signals_found"],
+                "new_saved": body["new_saved"],
+                "total_signals": body["total"],
+                "shadow_raw": body["shadow_raw"],
+            }
+        )
+
+    async def _run(client) -> None:
+        async def _fetch(target):
+            _channel, name, username = target
+            try:
+                if client is not None:
+                    return await collect_channel_history(username, days_back=days, client=client)
+                return await collect_channel_history(username, days_back=days)
+            except Exception as e:
+                logger.error("run_telethon_collect_all_channels %s: %s", name, e)
+                return e
+
+        await fan_out(targets, _fetch, _persist, concurrency=concurrency if client is not None else 1)
+
+    if concurrency > 1 and targets:
+        async with shared_client() as client:
+            await _run(client)
+    else:
+        await _run(None)
     return {"channels_processed": len(results), "results": results}
 
 
@@ -363,6 +422,16 @@ def persist_parsed_signals_for_channel(
         os.getenv("STORE_RAW_TELEGRAM_SIGNALS", "true").lower() in ("1", "true", "yes")
     )
 
+    # Дедуп всей пачки заранее: один IN-запрос на signals и один на telegram_signals
+    with_entry = [sig for sig in signals if sig.entry_price]
+    duplicate_flags = iter(find_duplicate_signals(db, channel.id, [sig.original_text for sig in with_entry]))
+    source = getattr(channel, "username", None) or getattr(channel, "name", "telegram")
+    raw_seen = (
+        existing_raw_telegram_texts(db, source, (sig.original_text for sig in signals if not sig.entry_price))
+        if store_raw and len(with_entry) < len(signals)
+        else set()
+    )
+
     for sig in signals:
         if not sig.entry_price:
             if not store_raw:
@@ -371,15 +440,11 @@ def persist_parsed_signals_for_channel(
 
             # RAW telegram signal: keep asset+direction+text+media evidence, even without entry/TP/SL.
             # Dedup by (source + original_text) to avoid unbounded growth.
-            source = getattr(channel, "username", None) or getattr(channel, "name", "telegram")
-            exists = (
-                db.query(TelegramSignal)
-                .filter(TelegramSignal.source == source, TelegramSignal.original_text == sig.original_text)
-                .first()
-            )
-            if exists:
+            if sig.original_text in raw_seen:
                 raw_skipped_duplicate += 1
                 continue
+            if sig.original_text is not None:
+                raw_seen.add(sig.original_text)
 
             fp = content_fingerprint(sig.original_text)
             meta: Dict[str, Any] = {
@@ -405,7 +470,7 @@ def persist_parsed_signals_for_channel(
             continue
         parsed_with_entry += 1
 
-        if signal_exists(db, channel.id, sig.original_text):
+        if next(duplicate_flags):
             skipped_duplicate += 1
             continue
 
@@ -446,9 +511,6 @@ def persist_parsed_signals_for_channel(
             logger.warning("flush before custom_alerts hook: %s", e)
         _fire_custom_alerts_for_new_signals(new_signals_batch, db)
 
-    if saved > 0:
-        channel.signals_count = (channel.signals_count or 0) + saved
-
     if record_metrics and _METRICS:
         if posts_fetched:
             SIGNALS_POSTS_FETCHED.inc(posts_fetched)
@@ -495,48 +557,124 @@ def aggregate_stats(total: Dict[str, int], part: Dict[str, int]) -> None:
         total[k] = total.get(k, 0) + part.get(k, 0)
 
 
-async def run_telegram_collection_cycle(db: Session, settings: Any) -> Dict[str, Any]:
-    """Один цикл сбора по всем активным Telegram-каналам (без commit/recalculate)."""
-    from app.services.telegram_scraper import collect_signals_from_channel
-
-    channels = (
+def _active_telegram_channels(db: Session, settings: Any) -> List[Channel]:
+    if not settings.COLLECT_TELEGRAM:
+        return []
+    return (
         db.query(Channel)
         .filter(Channel.is_active == True, Channel.platform == "telegram")
         .all()
-        if settings.COLLECT_TELEGRAM
-        else []
     )
 
+
+def _persist_telegram_result(db: Session, channel: Channel, uname: str, result: Any) -> Dict[str, int]:
+    persist_shadow_telegram_posts_if_enabled(db, channel, result.posts, web_username=uname)
+    return persist_parsed_signals_for_channel(
+        db,
+        channel,
+        result.signals,
+        posts_fetched=result.posts_fetched,
+        record_metrics=True,
+    )
+
+
+async def _telegram_cycle(
+    channels: List[Channel],
+    settings: Any,
+    persist: Callable[[Channel, str, Any], Union[Dict[str, int], Awaitable[Dict[str, int]]]],
+) -> Dict[str, Any]:
+    from app.services.telegram_scraper import collect_signals_from_channel
+
     total: Dict[str, int] = {}
     raw_posts = 0
 
-    for channel in channels:
-        uname = channel.username or (channel.url or "").rstrip("/").split("/")[-1]
-        if not uname:
-            continue
-        lim = telegram_fetch_limit(channel, settings)
+    def _username(channel: Channel) -> str:
+        return channel.username or (channel.url or "").rstrip("/").split("/")[-1]
+
+    concurrency = int(getattr(settings, "TELEGRAM_COLLECT_CONCURRENCY", 1) or 1)
+    client = telegram_http_client(concurrency) if concurrency > 1 else None
+    # Атрибуты ORM читаем до fan-out: задачи fetch не трогают Session
+    targets = [(ch, _username(ch), telegram_fetch_limit(ch, settings)) for ch in channels]
+
+    async def _fetch(target):
+        _ch, uname, lim = target
         try:
-            result = await collect_signals_from_channel(uname, limit=lim)
+            return await collect_signals_from_channel(uname, limit=lim, client=client)
         except Exception as e:
             logger.warning("Telegram collect @%s: %s", uname, e)
-            continue
+            return None
 
+    async def _persist(target, result) -> None:
+        nonlocal raw_posts
+        channel, uname, _lim = target
         raw_posts += result.posts_fetched
-        persist_shadow_telegram_posts_if_enabled(db, channel, result.posts, web_username=uname)
-        st = persist_parsed_signals_for_channel(
-            db,
-            channel,
-            result.signals,
-            posts_fetched=result.posts_fetched,
-            record_metrics=True,
-        )
+        st = persist(channel, uname, result)
+        if inspect.isawaitable(st):
+            st = await st
         aggregate_stats(total, st)
 
+    try:
+        await fan_out([t for t in targets if t[1]], _fetch, _persist, concurrency=concurrency)
+    finally:
+        if client is not None:
+            await client.aclose()
+
     total["posts_fetched"] = raw_posts
     total["channels"] = len(channels)
     return total
 
 
+async def run_telegram_collection_cycle(db: Session, settings: Any) -> Dict[str, Any]:
+    """Один цикл сбора по всем активным Telegram-каналам (без commit/recalculate)."""
+    return await _telegram_cycle(
+        _active_telegram_channels(db, settings),
+        settings,
+        lambda channel, uname, result: _persist_telegram_result(db, channel, uname, result),
+    )
+
+
+async def run_telegram_collection_cycle_async(session: "AsyncSession", settings: Any) -> Dict[str, Any]:
+    """
+    То же на AsyncSession (фоновые циклы на event loop API): запись идёт через async-драйвер
+    (run_sync исполняет общий код сохранения на соединении сессии), loop не блокируется.
+    """
+    channels = await session.run_sync(_active_telegram_channels, settings)
+
+    async def _persist(channel: Channel, uname: str, result: Any) -> Dict[str, int]:
+        return await session.run_sync(_persist_telegram_result, channel, uname, result)
+
+    return await _telegram_cycle(channels, settings, _persist)
+
+
+def _persist_reddit_result(db: Session, sub: str, res: Any) -> Dict[str, int]:
+    channel = db.query(Channel).filter(Channel.username == f"r_{sub}").first()
+    if not channel:
+        channel = Channel(
+            username=f"r_{sub}",
+            name=f"r/{sub}",
+            url=f"https://reddit.com/r/{sub}",
+            platform="reddit",
+            description=f"Reddit r/{sub}",
+            category="community",
+            is_active=True,
+            status="active",
+            signals_count=0,
+        )
+        db.add(channel)
+        db.flush()
+
+    persist_shadow_reddit_posts_if_enabled(
+        db, channel, res.reddit_posts, subreddit=sub, scrape_mode="rss"
+    )
+    return persist_parsed_signals_for_channel(
+        db,
+        channel,
+        res.signals,
+        posts_fetched=res.posts_fetched,
+        record_metrics=True,
+    )
+
+
 async def run_reddit_collection_cycle(db: Session, settings: Any) -> Dict[str, Any]:
     """Один цикл Reddit (как в scheduler): каналы r_<sub>, дедуп через pipeline."""
     from app.services.reddit_scraper import collect_reddit_signals, CRYPTO_SUBREDDITS
@@ -545,33 +683,7 @@ async def run_reddit_collection_cycle(db: Session, settings: Any) -> Dict[str, A
     for sub in CRYPTO_SUBREDDITS:
         try:
             res = await collect_reddit_signals(sub, limit=25)
-            channel = db.query(Channel).filter(Channel.username == f"r_{sub}").first()
-            if not channel:
-                channel = Channel(
-                    username=f"r_{sub}",
-                    name=f"r/{sub}",
-                    url=f"https://reddit.com/r/{sub}",
-                    platform="reddit",
-                    description=f"Reddit r/{sub}",
-                    category="community",
-                    is_active=True,
-                    status="active",
-                    signals_count=0,
-                )
-                db.add(channel)
-                db.flush()
-
-            persist_shadow_reddit_posts_if_enabled(
-                db, channel, res.reddit_posts, subreddit=sub, scrape_mode="rss"
-            )
-            st = persist_parsed_signals_for_channel(
-                db,
-                channel,
-                res.signals,
-                posts_fetched=res.posts_fetched,
-                record_metrics=True,
-            )
-            aggregate_stats(total, st)
+            aggregate_stats(total, _persist_reddit_result(db, sub, res))
         except Exception as e:
             # Keep the rest of subreddits processing even if one item fails.
             # Without rollback SQLAlchemy session stays in aborted transaction state
@@ -586,6 +698,26 @@ async def run_reddit_collection_cycle(db: Session, settings: Any) -> Dict[str, A
     return total
 
 
+async def run_reddit_collection_cycle_async(session: "AsyncSession", settings: Any) -> Dict[str, Any]:
+    """run_reddit_collection_cycle на AsyncSession."""
+    from app.services.reddit_scraper import collect_reddit_signals, CRYPTO_SUBREDDITS
+
+    total: Dict[str, int] = {}
+    for sub in CRYPTO_SUBREDDITS:
+        try:
+            res = await collect_reddit_signals(sub, limit=25)
+            aggregate_stats(total, await session.run_sync(_persist_reddit_result, sub, res))
+        except Exception as e:
+            try:
+                await session.rollback()
+            except Exception:
+                pass
+            logger.warning("Reddit r/%s: %s", sub, e)
+
+    total["subreddits"] = len(CRYPTO_SUBREDDITS)
+    return total
+
+
 async def run_full_collection_async(db: Session, settings: Any) -> Dict[str, Any]:
     """Telegram + опционально Reddit в одной сессии (перед commit вызывающий делает commit)."""
     out: Dict[str, Any] = {"telegram": {}, "reddit": {}}
@@ -593,3 +725,12 @@ async def run_full_collection_async(db: Session, settings: Any) -> Dict[str, Any
     if getattr(settings, "COLLECT_REDDIT_IN_RUN_COLLECTION", True):
         out["reddit"] = await run_reddit_collection_cycle(db, settings)
     return out
+
+
+async def run_full_collection_on_async_session(session: "AsyncSession", settings: Any) -> Dict[str, Any]:
+    """run_full_collection_async на AsyncSession (startup auto-collect)."""
+    out: Dict[str, Any] = {"telegram": {}, "reddit": {}}
+    out["telegram"] = await run_telegram_collection_cycle_async(session, settings)
+    if getattr(settings, "COLLECT_REDDIT_IN_RUN_COLLECTION", True):
+        out["reddit"] = await run_reddit_collection_cycle_async(session, settings)
+    return out
@@ -1,11 +1,26 @@
 """Signal deduplication: content fingerprint (SHA-256) + legacy left(500)."""
 import hashlib
+import logging
+import math
 import re
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Set
 
+from sqlalchemy import and_, func, or_, update
 from sqlalchemy.orm import Session
 
-from app.models.signal import Signal
+from app.models.signal import Signal, TelegramSignal
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+LEGACY_PREFIX_LEN = 500
+logger = logging.getLogger(__name__)
+
+# Ограничение на размер IN (...) — параметры драйвера; обычная пачка сбора укладывается в один запрос
+_IN_CHUNK = 1000
 
 
 def normalize_text_for_dedup(text: Optional[str]) -> str:
@@ -23,35 +38,418 @@ def content_fingerprint(text: Optional[str]) -> str:
     return hashlib.sha256(n.encode("utf-8")).hexdigest()
 
 
+class _BloomFilter:
+    """Bloom-фильтр по hex SHA-256: позиции — double hashing из первых 32 hex-символов."""
+
+    __slots__ = ("bits", "m", "k", "count", "capacity")
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self.capacity = max(256, int(capacity))
+        self.m = int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)) + 1
+        self.k = max(1, round(self.m / self.capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fp: str) -> Iterable[int]:
+        h1 = int(fp[:16], 16)
+        h2 = int(fp[16:32], 16) | 1
+        return ((h1 + i * h2) % self.m for i in range(self.k))
+
+    def add(self, fp: str) -> None:
+        for p in self._positions(fp):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, fp: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(fp))
+
+
+def _cache_metric(result: str, n: int = 1) -> None:
+    if n <= 0:
+        return
+    try:
+        from app.core.metrics import DEDUP_FINGERPRINT_CACHE
+
+        DEDUP_FINGERPRINT_CACHE.labels(result=result).inc(n)
+    except Exception:
+        pass
+
+
+class FingerprintCache:
+    """
+    Кэш fingerprint сигналов по каналам: Bloom-фильтр по всем строкам + LRU недавно подтверждённых.
+
+    lookup: True — в LRU (подтверждён БД ранее), False — Bloom «точно нет» среди строк, которые
+    кэш видел, None — возможно есть, подтвердить SQL. Прогрев — из signals.content_fingerprint;
+    затем дочитываются строки с id выше watermark не чаще refresh_sec (записи других процессов).
+    Между refresh «нет» не окончательно: строки других процессов новее tail_from вызывающий
+    сверяет узким запросом по хвосту id. tail_from — watermark предыдущего refresh, так что
+    хвост покрывает и транзакции, закоммиченные уже после того, как refresh прошёл их id.
+    Каналы с legacy-строками без fingerprint кэш не обслуживает, пока включён префиксный дедуп.
+    """
+
+    def __init__(self, lru_size: int = 2000, refresh_sec: float = 60.0, error_rate: float = 0.01) -> None:
+        self.lru_size = lru_size
+        self.refresh_sec = refresh_sec
+        self.error_rate = error_rate
+        self._mu = threading.Lock()
+        self._blooms: Dict[int, _BloomFilter] = {}
+        self._recent: Dict[int, "OrderedDict[str, None]"] = {}
+        self._legacy_channels: Set[int] = set()
+        self._watermark = 0
+        self._tail_from = 0
+        self._refreshed_at = float("-inf")
+        self.warmed = False
+
+    @property
+    def tail_from(self) -> int:
+        """Строки с id больше этого Bloom может не знать — «нет» по ним подтверждает SQL."""
+        with self._mu:
+            return self._tail_from
+
+    def warm(self, db: Session) -> int:
+        """Полная (пере)сборка Bloom-фильтров из signals.content_fingerprint."""
+        max_id = db.query(func.max(Signal.id)).scalar() or 0
+        counts = dict(
+            db.query(Signal.channel_id, func.count(Signal.id))
+            .filter(Signal.content_fingerprint.isnot(None), Signal.id <= max_id)
+            .group_by(Signal.channel_id)
+            .all()
+        )
+        legacy = {
+            cid
+            for (cid,) in db.query(Signal.channel_id)
+            .filter(Signal.content_fingerprint.is_(None), Signal.id <= max_id)
+            .distinct()
+            .all()
+        }
+        # запас ×2 под рост до следующей пересборки
+        blooms = {cid: _BloomFilter(2 * n, self.error_rate) for cid, n in counts.items()}
+        rows = (
+            db.query(Signal.channel_id, Signal.content_fingerprint)
+            .filter(Signal.content_fingerprint.isnot(None), Signal.id <= max_id)
+            .yield_per(10_000)
+        )
+        total = 0
+        for cid, fp in rows:
+            blooms[cid].add(fp)
+            total += 1
+        with self._mu:
+            self._blooms = blooms
+            self._legacy_channels = legacy
+            self._tail_from = min(self._watermark, max_id) if self.warmed else max_id
+            self._watermark = max_id
+            self._refreshed_at = time.monotonic()
+            self.warmed = True
+        logger.info("dedup fingerprint cache warmed: %s fingerprints, %s channels", total, len(blooms))
+        return total
+
+    def refresh(self, db: Session, *, force: bool = False) -> None:
+        """Дочитать строки новее watermark; пересобрать, если фильтр переполнен."""
+        if not self.warmed:
+            self.warm(db)
+            return
+        if not force and time.monotonic() - self._refreshed_at < self.refresh_sec:
+            return
+        rows = (
+            db.query(Signal.id, Signal.channel_id, Signal.content_fingerprint)
+            .filter(Signal.id > self._watermark)
+            .order_by(Signal.id)
+            .all()
+        )
+        overflow = False
+        with self._mu:
+            self._tail_from = self._watermark
+            for sid, cid, fp in rows:
+                if fp is None:
+                    self._legacy_channels.add(cid)
+                else:
+                    overflow |= self._add_locked(cid, fp)
+                self._watermark = max(self._watermark, sid)
+            self._refreshed_at = time.monotonic()
+        if overflow:
+            self.warm(db)
+
+    def _add_locked(self, channel_id: int, fp: str) -> bool:
+        bloom = self._blooms.get(channel_id)
+        if bloom is None:
+            bloom = self._blooms[channel_id] = _BloomFilter(256, self.error_rate)
+        bloom.add(fp)
+        return bloom.count > bloom.capacity
+
+    def serves(self, channel_id: int, legacy_check: bool) -> bool:
+        return self.warmed and not (legacy_check and channel_id in self._legacy_channels)
+
+    def lookup(self, channel_id: int, fps: Iterable[str]) -> Dict[str, Optional[bool]]:
+        out: Dict[str, Optional[bool]] = {}
+        with self._mu:
+            bloom = self._blooms.get(channel_id)
+            recent = self._recent.get(channel_id)
+            for fp in fps:
+                if recent is not None and fp in recent:
+                    recent.move_to_end(fp)
+                    out[fp] = True
+                elif bloom is None or fp not in bloom:
+                    out[fp] = False
+                else:
+                    out[fp] = None
+        vals = list(out.values())
+        _cache_metric("lru_hit", vals.count(True))
+        _cache_metric("bloom_negative", vals.count(False))
+        return out
+
+    def remember(self, channel_id: int, *, confirmed: Iterable[str] = (), added: Iterable[str] = ()) -> None:
+        """confirmed — найдены в БД (в LRU и Bloom); added — будут записаны (только в Bloom)."""
+        with self._mu:
+            recent = self._recent.setdefault(channel_id, OrderedDict())
+            for fp in confirmed:
+                self._add_locked(channel_id, fp)
+                recent[fp] = None
+                recent.move_to_end(fp)
+            while len(recent) > self.lru_size:
+                recent.popitem(last=False)
+            for fp in added:
+                self._add_locked(channel_id, fp)
+
+    def clear(self) -> None:
+        with self._mu:
+            self._blooms.clear()
+            self._recent.clear()
+            self._legacy_channels.clear()
+            self._watermark = 0
+            self._tail_from = 0
+            self._refreshed_at = float("-inf")
+            self.warmed = False
+
+
+_fp_cache: Optional[FingerprintCache] = None
+_fp_cache_mu = threading.Lock()
+
+
+def get_fingerprint_cache() -> Optional[FingerprintCache]:
+    """Процессный FingerprintCache при DEDUP_FINGERPRINT_CACHE, иначе None."""
+    global _fp_cache
+    try:
+        from app.core.config import get_settings
+
+        settings = get_settings()
+    except Exception:
+        return None
+    if not settings.DEDUP_FINGERPRINT_CACHE:
+        return None
+    with _fp_cache_mu:
+        if _fp_cache is None:
+            _fp_cache = FingerprintCache(
+                lru_size=settings.DEDUP_FINGERPRINT_CACHE_LRU_SIZE,
+                refresh_sec=settings.DEDUP_FINGERPRINT_CACHE_REFRESH_SEC,
+            )
+        return _fp_cache
+
+
+def warm_fingerprint_cache(db: Session) -> int:
+    """Прогрев при старте процесса; 0 если кэш выключен."""
+    cache = get_fingerprint_cache()
+    return cache.warm(db) if cache is not None else 0
+
+
+def _serving_cache(db: Session, channel_id: int) -> Optional[FingerprintCache]:
+    cache = get_fingerprint_cache()
+    if cache is None:
+        return None
+    try:
+        cache.refresh(db)
+    except Exception as e:
+        logger.warning("dedup fingerprint cache refresh failed: %s", e)
+        return None
+    return cache if cache.serves(channel_id, _legacy_prefix_check_enabled()) else None
+
+
 def signal_exists(db: Session, channel_id: int, text: Optional[str]) -> bool:
     """
     Проверка дубликата: сначала по content_fingerprint, затем legacy по первым 500 символам
     для строк без заполненного fingerprint (старые записи).
     """
     fp = content_fingerprint(text)
+    cache = _serving_cache(db, channel_id)
+    if cache is not None:
+        cached = cache.lookup(channel_id, [fp])[fp]
+        if cached is True:
+            return True
+        if cached is False:
+            # Bloom не знает строк новее tail_from (другие процессы после refresh)
+            if (
+                db.query(Signal.id)
+                .filter(
+                    Signal.channel_id == channel_id,
+                    Signal.id > cache.tail_from,
+                    Signal.content_fingerprint == fp,
+                )
+                .first()
+            ):
+                cache.remember(channel_id, confirmed=[fp])
+                _cache_metric("tail_confirmed")
+                return True
+            return False
     if (
         db.query(Signal)
         .filter(Signal.channel_id == channel_id, Signal.content_fingerprint == fp)
         .first()
     ):
+        if cache is not None:
+            cache.remember(channel_id, confirmed=[fp])
+            _cache_metric("sql_confirmed")
         return True
+    if cache is not None:
+        _cache_metric("bloom_false_positive")
+        return False
 
-    prefix = (text or "")[:500]
-    if not prefix:
+    prefix = (text or "")[:LEGACY_PREFIX_LEN]
+    if not prefix or not _legacy_prefix_check_enabled():
         return False
 
+    # Сравнение префикса на стороне БД — без выгрузки всех legacy-строк канала
     legacy = (
-        db.query(Signal)
+        db.query(Signal.id)
         .filter(
             Signal.channel_id == channel_id,
             Signal.content_fingerprint.is_(None),
+            func.substr(Signal.original_text, 1, LEGACY_PREFIX_LEN) == prefix,
         )
-        .all()
+        .first()
     )
-    for row in legacy:
-        if (row.original_text or "")[:500] == prefix:
-            return True
-    return False
+    return bool(legacy)
+
+
+def _legacy_prefix_check_enabled() -> bool:
+    try:
+        from app.core.config import get_settings
+
+        return bool(get_settings().DEDUP_LEGACY_PREFIX_CHECK)
+    except Exception:
+        return True
+
+
+def _chunks(items: Sequence, size: int = _IN_CHUNK) -> Iterable[Sequence]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def find_duplicate_signals(db: Session, channel_id: int, texts: Sequence[Optional[str]]) -> List[bool]:
+    """
+    Пакетный signal_exists: флаг дубликата для каждого текста пачки.
+
+    Один запрос к signals на пачку: fingerprint IN (...) либо (legacy, без fingerprint)
+    left(original_text, 500) IN (...). Повтор внутри самой пачки — тоже дубликат
+    (первое вхождение сохраняется).
+    """
+    fps = [content_fingerprint(t) for t in texts]
+    prefixes = [(t or "")[:LEGACY_PREFIX_LEN] for t in texts]
+    uniq_fps = sorted(set(fps))
+    uniq_prefixes = sorted({p for p in prefixes if p}) if _legacy_prefix_check_enabled() else []
+
+    known_fps: Set[str] = set()
+    tail_fps: List[str] = []
+    tail_from = 0
+    cache = _serving_cache(db, channel_id) if fps else None
+    if cache is not None:
+        # канал без legacy-строк: «возможно есть» по Bloom — в SQL по индексу канала;
+        # «точно нет» — только по хвосту id > tail_from, которого Bloom ещё не видел
+        cached = cache.lookup(channel_id, uniq_fps)
+        known_fps = {fp for fp, v in cached.items() if v}
+        uniq_fps = [fp for fp, v in cached.items() if v is None]
+        tail_fps = [fp for fp, v in cached.items() if v is False]
+        tail_from = cache.tail_from
+        uniq_prefixes = []
+    from_cache = set(known_fps)
+
+    prefix_col = func.substr(Signal.original_text, 1, LEGACY_PREFIX_LEN)
+    known_prefixes: Set[str] = set()
+    n = max(len(uniq_fps), len(uniq_prefixes), len(tail_fps))
+    for i in range(0, n, _IN_CHUNK):
+        fp_part = uniq_fps[i : i + _IN_CHUNK]
+        px_part = uniq_prefixes[i : i + _IN_CHUNK]
+        tail_part = tail_fps[i : i + _IN_CHUNK]
+        conds = []
+        if fp_part:
+            conds.append(Signal.content_fingerprint.in_(fp_part))
+        if tail_part:
+            conds.append(and_(Signal.id > tail_from, Signal.content_fingerprint.in_(tail_part)))
+        if px_part:
+            conds.append(and_(Signal.content_fingerprint.is_(None), prefix_col.in_(px_part)))
+        rows = (
+            db.query(Signal.content_fingerprint, prefix_col)
+            .filter(Signal.channel_id == channel_id, or_(*conds))
+            .distinct()
+            .all()
+        )
+        for fp, px in rows:
+            if fp is not None:
+                known_fps.add(fp)
+            elif px:
+                known_prefixes.add(px)
+
+    confirmed = known_fps - from_cache
+    if cache is not None:
+        maybe_confirmed = len(confirmed.intersection(uniq_fps))
+        _cache_metric("sql_confirmed", maybe_confirmed)
+        _cache_metric("tail_confirmed", len(confirmed) - maybe_confirmed)
+        _cache_metric("bloom_false_positive", len(uniq_fps) - maybe_confirmed)
+
+    out: List[bool] = []
+    for fp, px in zip(fps, prefixes):
+        out.append(fp in known_fps or (bool(px) and px in known_prefixes))
+        known_fps.add(fp)
+    if cache is not None:
+        cache.remember(
+            channel_id,
+            confirmed=confirmed,
+            added={fp for fp, dup in zip(fps, out) if not dup},
+        )
+    return out
+
+
+def existing_raw_telegram_texts(db: Session, source: str, texts: Iterable[Optional[str]]) -> Set[str]:
+    """original_text из пачки, уже сохранённые как RAW TelegramSignal этого source (IN-запрос)."""
+    uniq = sorted({t for t in texts if t is not None})
+    found: Set[str] = set()
+    for part in _chunks(uniq):
+        rows = (
+            db.query(TelegramSignal.original_text)
+            .filter(TelegramSignal.source == source, TelegramSignal.original_text.in_(part))
+            .all()
+        )
+        found.update(r[0] for r in rows)
+    return found
+
+
+def backfill_content_fingerprints(db: Session, *, batch_size: int = 1000, limit: Optional[int] = None) -> int:
+    """
+    Заполнить content_fingerprint у legacy-сигналов (keyset по id, bulk UPDATE, commit на пачку).
+
+    После прогона legacy-ветка дедупа по left(500) пуста — её можно выключить
+    (DEDUP_LEGACY_PREFIX_CHECK=false).
+    """
+    updated = 0
+    last_id = 0
+    while limit is None or updated < limit:
+        size = batch_size if limit is None else min(batch_size, limit - updated)
+        rows = (
+            db.query(Signal.id, Signal.original_text)
+            .filter(Signal.content_fingerprint.is_(None), Signal.id > last_id)
+            .order_by(Signal.id)
+            .limit(size)
+            .all()
+        )
+        if not rows:
+            break
+        db.execute(
+            update(Signal),
+            [{"id": sid, "content_fingerprint": content_fingerprint(txt)} for sid, txt in rows],
+        )
+        db.commit()
+        updated += len(rows)
+        last_id = rows[-1][0]
+    return updated
 
 
 def cleanup_duplicates(db: Session) -> int:
@@ -109,3 +507,8 @@ def cleanup_duplicates(db: Session) -> int:
 
     db.commit()
     return deleted
+
+
+async def cleanup_duplicates_async(session: "AsyncSession") -> int:
+    """cleanup_duplicates на AsyncSession (фоновые циклы на event loop API): те же запросы и commit через async-драйвер."""
+    return await session.run_sync(cleanup_duplicates)
@@ -234,7 +234,6 @@ async def deep_collect_and_validate(db, channel_usernames: List[str] = None) ->
                 except Exception as e:
                     logger.debug(f"Validation error: {e}")
 
-        ch.signals_count = db.query(Signal).filter(Signal.channel_id == ch.id).count()
         total_signals += saved
 
         if validated_signals:
@@ -242,9 +241,7 @@ async def deep_collect_and_validate(db, channel_usernames: List[str] = None) ->
             ch_sl = sum(1 for v in validated_signals if v["outcome"] == "SL_HIT")
             ch_resolved = ch_tp + ch_sl
             ch_acc = (ch_tp / ch_resolved * 100) if ch_resolved > 0 else None
-            ch.accuracy = ch_acc
             avg_pnl = sum(v["pnl"] for v in validated_signals if v["pnl"]) / len(validated_signals) if validated_signals else None
-            ch.average_roi = round(avg_pnl, 2) if avg_pnl else None
 
             channel_results.append({
                 "channel": ch.name, "username": uname,
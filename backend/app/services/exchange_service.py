@@ -7,13 +7,15 @@ EXCHANGE_LIVE_TRADING_ENABLED=true and EXCHANGE_PAPER_MODE=false.
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import hmac
 import json
 import logging
 import time
+import weakref
 from decimal import Decimal
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional
 from urllib.parse import urlencode
 
 import aiohttp
@@ -24,6 +26,34 @@ from app.models.trading import ExchangeType
 
 logger = logging.getLogger(__name__)
 
+# Одна keep-alive aiohttp-сессия на event loop: все экземпляры ExchangeService (в т.ч. по
+# одному на запрос API) делят пул соединений, у каждой биржи — свой пул хоста (limit_per_host)
+_POOL_LIMIT = 100
+_POOL_LIMIT_PER_HOST = 20
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+
+def _shared_session(timeout_seconds: int) -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = _sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=_POOL_LIMIT,
+                limit_per_host=_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=30,
+            ),
+            timeout=aiohttp.ClientTimeout(total=timeout_seconds),
+        )
+    return session
+
+
+async def close_shared_session() -> None:
+    """Закрыть пул текущего event loop (shutdown API / trading runtime)."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
 
 class ExchangeService:
     """Service for interacting with cryptocurrency exchanges."""
@@ -103,25 +133,20 @@ class ExchangeService:
         headers: Optional[Dict[str, str]] = None,
     ) -> Dict[str, Any]:
         timeout = aiohttp.ClientTimeout(total=self._timeout())
-        owns_session = self.session is None
-        session = self.session or aiohttp.ClientSession(timeout=timeout)
-        try:
-            async with session.request(
-                method,
-                url,
-                params=params,
-                json=json_body,
-                headers=headers,
-                timeout=timeout,
-            ) as response:
-                text = await response.text()
-                payload = json.loads(text) if text else {}
-                if response.status >= 400:
-                    raise RuntimeError(f"Exchange HTTP {response.status}: {payload}")
-                return payload
-        finally:
-            if owns_session:
-                await session.close()
+        session = self.session or _shared_session(self._timeout())
+        async with session.request(
+            method,
+            url,
+            params=params,
+            json=json_body,
+            headers=headers,
+            timeout=timeout,
+        ) as response:
+            text = await response.text()
+            payload = json.loads(text) if text else {}
+            if response.status >= 400:
+                raise RuntimeError(f"Exchange HTTP {response.status}: {payload}")
+            return payload
 
     def _request_json_sync(
         self,
@@ -382,11 +407,43 @@ class ExchangeService:
             logger.exception("Error getting price from %s", exchange)
             return None
 
+    async def get_current_prices(self, exchange: ExchangeType, symbols: Iterable[str]) -> Dict[str, Decimal]:
+        """Prices for many symbols with one ticker call (instead of get_current_price per position)."""
+        wanted = sorted({s for s in symbols if s})
+        if not wanted:
+            return {}
+        try:
+            if self._is_paper_mode():
+                logger.warning("[PAPER] %s prices for %s symbols", exchange, len(wanted))
+                return {s: self._paper_price(s) for s in wanted}
+            if exchange == ExchangeType.BYBIT:
+                payload = await self._request_json(
+                    "GET",
+                    f"{self._bybit_base_url()}/v5/market/tickers",
+                    params={"category": "linear"},
+                )
+                self._raise_for_bybit(payload)
+                last = {row.get("symbol"): row.get("lastPrice") for row in payload.get("result", {}).get("list", [])}
+            elif exchange == ExchangeType.BINANCE:
+                payload = await self._request_json("GET", f"{self._binance_base_url()}/api/v3/ticker/price")
+                last = {row.get("symbol"): row.get("price") for row in payload}
+            else:
+                logger.warning("Unsupported exchange for price: %s", exchange)
+                return {}
+            return {s: Decimal(str(last[s])) for s in wanted if last.get(s)}
+        except Exception:
+            logger.exception("Error getting prices from %s", exchange)
+            return {}
+
+    @staticmethod
+    def _paper_price(symbol: str) -> Decimal:
+        return Decimal(str(50000 if "BTC" in symbol else 3000 if "ETH" in symbol else 100))
+
     async def _get_bybit_price(self, symbol: str) -> Optional[Decimal]:
         if self._is_paper_mode():
-            base_price = 50000 if "BTC" in symbol else 3000 if "ETH" in symbol else 100
+            base_price = self._paper_price(symbol)
             logger.warning("[PAPER] Bybit price for %s: %s", symbol, base_price)
-            return Decimal(str(base_price))
+            return base_price
 
         payload = await self._request_json(
             "GET",
@@ -401,9 +458,9 @@ class ExchangeService:
 
     async def _get_binance_price(self, symbol: str) -> Optional[Decimal]:
         if self._is_paper_mode():
-            base_price = 50000 if "BTC" in symbol else 3000 if "ETH" in symbol else 100
+            base_price = self._paper_price(symbol)
             logger.warning("[PAPER] Binance price for %s: %s", symbol, base_price)
-            return Decimal(str(base_price))
+            return base_price
 
         payload = await self._request_json(
             "GET",
@@ -2,9 +2,10 @@
 Data Export Service - Excel/CSV export for Premium users
 Part of Task 2.3.1: Premium функции
 """
+import asyncio
 import logging
 import io
-import csv
+import tempfile
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import pandas as pd
@@ -16,9 +17,19 @@ from ..models.user import User, SubscriptionPlan
 from ..models.channel import Channel
 from ..models.signal import Signal
 from ..middleware.rbac_middleware import check_subscription_limit
+from .export_stream import (
+    SIGNAL_EXPORT_COLUMNS,
+    export_value,
+    iter_rows,
+    signals_export_query,
+    stream_signals,
+    streaming_export,
+)
 
 logger = logging.getLogger(__name__)
 
+_EXCEL_SPOOL_BYTES = 8 * 1024 * 1024
+
 class DataExportService:
     """
     Service for exporting user data in various formats
@@ -26,7 +37,7 @@ class DataExportService:
     """
     
     def __init__(self):
-        self.supported_formats = ['csv', 'excel', 'json']
+        self.supported_formats = ['csv', 'excel', 'json', 'ndjson']
     
     async def export_user_data(
         self,
@@ -36,7 +47,8 @@ class DataExportService:
         format: str = 'csv',
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
-        channel_ids: Optional[List[str]] = None
+        channel_ids: Optional[List[str]] = None,
+        gzip: bool = False
     ) -> StreamingResponse:
         """
         Export user data in specified format
@@ -45,10 +57,11 @@ class DataExportService:
             user: User requesting export
             db: Database session
             export_type: Type of data to export ('signals', 'channels', 'analytics')
-            format: Export format ('csv', 'excel', 'json')
+            format: Export format ('csv', 'excel', 'json', 'ndjson')
             date_from: Start date filter
             date_to: End date filter
             channel_ids: Specific channel IDs to export
+            gzip: Compress the file on the fly (csv / json / ndjson)
         
         Returns:
             StreamingResponse: File download response
@@ -62,11 +75,19 @@ class DataExportService:
                 detail=f"Unsupported format. Supported formats: {', '.join(self.supported_formats)}"
             )
         
-        # Get data based on export type
+        # Signals: без лимита строк, потоком с server-side cursor (export_stream)
         if export_type == 'signals':
-            data = await self._get_signals_data(user, db, date_from, date_to, channel_ids)
             filename = f"crypto_signals_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        elif export_type == 'channels':
+            filters = dict(owner_id=user.id, date_from=date_from, date_to=date_to, channel_ids=channel_ids)
+            if format == 'excel':
+                # openpyxl собирает книгу синхронно — уводим сборку с event loop
+                return await asyncio.to_thread(
+                    self._generate_signals_excel_response, db, filename, filters
+                )
+            return stream_signals(db, filename, format=format, gzip=gzip, **filters)
+
+        # Get data based on export type
+        if export_type == 'channels':
             data = await self._get_channels_data(user, db)
             filename = f"crypto_channels_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         elif export_type == 'analytics':
@@ -79,62 +100,25 @@ class DataExportService:
             )
         
         # Generate file based on format
-        if format == 'csv':
-            return self._generate_csv_response(data, filename)
-        elif format == 'excel':
+        if format in ('csv', 'ndjson'):
+            if not data:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="No data available for export"
+                )
+            headers = list(data[0].keys())
+            return streaming_export(
+                (tuple(export_value(row.get(h)) for h in headers) for row in data),
+                headers,
+                filename,
+                format=format,
+                gzip=gzip,
+            )
+        if format == 'excel':
             return self._generate_excel_response(data, filename, export_type)
         elif format == 'json':
             return self._generate_json_response(data, filename)
     
-    async def _get_signals_data(
-        self,
-        user: User,
-        db: Session,
-        date_from: Optional[datetime] = None,
-        date_to: Optional[datetime] = None,
-        channel_ids: Optional[List[str]] = None
-    ) -> List[Dict[str, Any]]:
-        """Get signals data for export"""
-        query = db.query(Signal).join(Channel).filter(Channel.owner_id == user.id)
-        
-        # Apply date filters
-        if date_from:
-            query = query.filter(Signal.created_at >= date_from)
-        if date_to:
-            query = query.filter(Signal.created_at <= date_to)
-        
-        # Apply channel filter
-        if channel_ids:
-            query = query.filter(Channel.id.in_(channel_ids))
-        
-        signals = query.order_by(Signal.created_at.desc()).all()
-        
-        # Convert to export format
-        data = []
-        for signal in signals:
-            data.append({
-                'Signal ID': signal.id,
-                'Channel Name': signal.channel.name if signal.channel else 'Unknown',
-                'Channel Type': signal.channel.type if signal.channel else 'Unknown',
-                'Symbol': signal.symbol,
-                'Signal Type': signal.signal_type,
-                'Entry Price': signal.entry_price,
-                'Target Price': signal.target_price,
-                'Stop Loss': signal.stop_loss,
-                'Confidence': signal.confidence,
-                'Status': signal.status,
-                'Created Date': signal.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'Updated Date': signal.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'Raw Message': signal.raw_message,
-                'Source Channel': signal.source_channel,
-                'Author': signal.author,
-                'ROI %': signal.roi_percentage if hasattr(signal, 'roi_percentage') else None,
-                'Duration (hours)': self._calculate_signal_duration(signal),
-                'Performance': self._get_signal_performance(signal)
-            })
-        
-        return data
-    
     async def _get_channels_data(self, user: User, db: Session) -> List[Dict[str, Any]]:
         """Get channels data for export"""
         channels = db.query(Channel).filter(Channel.owner_id == user.id).all()
@@ -222,34 +206,83 @@ class DataExportService:
         
         return data
     
-    def _generate_csv_response(self, data: List[Dict[str, Any]], filename: str) -> StreamingResponse:
-        """Generate CSV file response"""
-        if not data:
+    def _generate_signals_excel_response(
+        self, db: Session, filename: str, filters: Dict[str, Any]
+    ) -> StreamingResponse:
+        """
+        Signals в xlsx без загрузки всей выборки: openpyxl write_only пишет строки курсора
+        во временные файлы, Summary считается на лету. xlsx — zip, поэтому отдаётся после сборки
+        (из SpooledTemporaryFile), но память не растёт с числом строк.
+        """
+        from openpyxl import Workbook
+
+        headers = [h for h, _ in SIGNAL_EXPORT_COLUMNS]
+        idx = {h: i for i, h in enumerate(headers)}
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Signals')
+        ws.append(headers)
+
+        total = longs = shorts = conf_n = 0
+        conf_sum = 0.0
+        symbols, channels = set(), set()
+        for row in iter_rows(db, signals_export_query(**filters)):
+            ws.append(list(row))
+            total += 1
+            direction = row[idx['Direction']]
+            longs += direction == 'LONG'
+            shorts += direction == 'SHORT'
+            if row[idx['Confidence']] != '':
+                conf_sum += row[idx['Confidence']]
+                conf_n += 1
+            symbols.add(row[idx['Symbol']])
+            channels.add(row[idx['Channel Name']])
+
+        if total == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No data available for export"
             )
-        
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=data[0].keys())
-        writer.writeheader()
-        writer.writerows(data)
-        
-        response = StreamingResponse(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            media_type='text/csv',
-            headers={"Content-Disposition": f"attachment; filename={filename}.csv"}
+
+        summary = wb.create_sheet('Summary')
+        summary.append(['Metric', 'Value'])
+        for metric, value in (
+            ('Total Signals', total),
+            ('Long Signals', longs),
+            ('Short Signals', shorts),
+            ('Average Confidence', round(conf_sum / conf_n, 3) if conf_n else 0),
+            ('Unique Symbols', len(symbols - {''})),
+            ('Unique Channels', len(channels - {''})),
+            ('Export Date', datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+        ):
+            summary.append([metric, value])
+
+        output = tempfile.SpooledTemporaryFile(max_size=_EXCEL_SPOOL_BYTES)
+        wb.save(output)
+        output.seek(0)
+
+        def _chunks():
+            try:
+                while True:
+                    chunk = output.read(64 * 1024)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                output.close()
+
+        return StreamingResponse(
+            _chunks(),
+            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            headers={"Content-Disposition": f"attachment; filename={filename}.xlsx"}
         )
-        
-        return response
-    
+
     def _generate_excel_response(
         self, 
         data: List[Dict[str, Any]], 
         filename: str, 
         export_type: str
     ) -> StreamingResponse:
-        """Generate Excel file response with multiple sheets if needed"""
+        """Generate Excel file response (channels / analytics)"""
         if not data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -265,12 +298,6 @@ class DataExportService:
             # Write main data sheet
             sheet_name = export_type.capitalize()
             df.to_excel(writer, sheet_name=sheet_name, index=False)
-            
-            # Add summary sheet for signals export
-            if export_type == 'signals' and len(data) > 0:
-                summary_data = self._generate_summary_stats(data)
-                summary_df = pd.DataFrame(summary_data)
-                summary_df.to_excel(writer, sheet_name='Summary', index=False)
         
         output.seek(0)
         
@@ -305,29 +332,6 @@ class DataExportService:
         
         return response
     
-    def _calculate_signal_duration(self, signal: Signal) -> Optional[float]:
-        """Calculate signal duration in hours"""
-        if signal.status == 'completed' and signal.updated_at:
-            duration = signal.updated_at - signal.created_at
-            return round(duration.total_seconds() / 3600, 2)
-        return None
-    
-    def _get_signal_performance(self, signal: Signal) -> str:
-        """Get signal performance status"""
-        if signal.status == 'completed':
-            if hasattr(signal, 'roi_percentage') and signal.roi_percentage:
-                if signal.roi_percentage > 0:
-                    return 'Profitable'
-                elif signal.roi_percentage < 0:
-                    return 'Loss'
-                else:
-                    return 'Break Even'
-        elif signal.status == 'active':
-            return 'Active'
-        elif signal.status == 'cancelled':
-            return 'Cancelled'
-        return 'Unknown'
-    
     def _get_last_signal_date(self, channel: Channel, db: Session) -> Optional[str]:
         """Get the date of the last signal from channel"""
         last_signal = db.query(Signal).filter(
@@ -376,37 +380,6 @@ class DataExportService:
         avg_per_day = len(signals) / days if days > 0 else 0
         
         return f"{round(avg_per_day, 1)} signals/day"
-    
-    def _generate_summary_stats(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Generate summary statistics for export"""
-        if not data:
-            return []
-        
-        total_signals = len(data)
-        buy_signals = len([d for d in data if d.get('Signal Type') == 'buy'])
-        sell_signals = len([d for d in data if d.get('Signal Type') == 'sell'])
-        
-        # Calculate average confidence
-        confidences = [d.get('Confidence', 0) for d in data if d.get('Confidence')]
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-        
-        # Get unique symbols
-        symbols = set(d.get('Symbol', '') for d in data if d.get('Symbol'))
-        
-        # Get unique channels
-        channels = set(d.get('Channel Name', '') for d in data if d.get('Channel Name'))
-        
-        summary = [
-            {'Metric': 'Total Signals', 'Value': total_signals},
-            {'Metric': 'Buy Signals', 'Value': buy_signals},
-            {'Metric': 'Sell Signals', 'Value': sell_signals},
-            {'Metric': 'Average Confidence', 'Value': round(avg_confidence, 3)},
-            {'Metric': 'Unique Symbols', 'Value': len(symbols)},
-            {'Metric': 'Unique Channels', 'Value': len(channels)},
-            {'Metric': 'Export Date', 'Value': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        ]
-        
-        return summary
 
 
 # Global export service instance
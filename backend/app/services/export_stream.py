@@ -0,0 +1,213 @@
+"""
+Потоковый экспорт сигналов: server-side cursor → CSV / NDJSON / JSON чанками, опционально gzip.
+
+Запрос выбирает только нужные столбцы (без ORM-объектов и joinedload), строки читаются
+курсором по EXPORT_CHUNK_ROWS (yield_per; на PostgreSQL — именованный курсор),
+каждый чанк сразу уходит клиенту. Память не зависит от объёма истории, заголовок
+отправляется до первого запроса к БД — клиент получает первый байт сразу.
+
+Генераторы синхронные: StreamingResponse гоняет их в threadpool, event loop не блокируется.
+Сессия своя (на том же engine, что и у запроса): dependency get_db закрывается раньше,
+чем дочитается ответ.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.channel import Channel
+from app.models.signal import Signal
+
+EXPORT_CHUNK_ROWS = 1000
+
+# (заголовок, столбец); порядок = порядок в файле
+SIGNAL_EXPORT_COLUMNS: Tuple[Tuple[str, Any], ...] = (
+    ("Signal ID", Signal.id),
+    ("Channel Name", Channel.name),
+    ("Channel Platform", Channel.platform),
+    ("Asset", Signal.asset),
+    ("Symbol", Signal.symbol),
+    ("Direction", Signal.direction),
+    ("Entry Price", Signal.entry_price),
+    ("TP1", Signal.tp1_price),
+    ("TP2", Signal.tp2_price),
+    ("TP3", Signal.tp3_price),
+    ("Stop Loss", Signal.stop_loss),
+    ("Confidence", Signal.confidence_score),
+    ("Status", Signal.status),
+    ("PnL %", Signal.profit_loss_percentage),
+    ("Exit Price", Signal.final_exit_price),
+    ("Exit Date", Signal.final_exit_timestamp),
+    ("Created Date", Signal.created_at),
+    ("Raw Message", Signal.original_text),
+)
+
+
+def export_value(value: Any) -> Any:
+    """Значение ячейки: enum → value, Decimal → float, datetime → ISO, None → ''."""
+    if value is None:
+        return ""
+    if hasattr(value, "value"):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def signals_export_query(
+    columns: Sequence[Tuple[str, Any]] = SIGNAL_EXPORT_COLUMNS,
+    owner_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    channel_ids: Optional[Sequence[Any]] = None,
+):
+    stmt = select(*[c for _, c in columns]).select_from(Signal).outerjoin(
+        Channel, Channel.id == Signal.channel_id
+    )
+    if owner_id is not None:
+        stmt = stmt.where(Channel.owner_id == owner_id)
+    if date_from:
+        stmt = stmt.where(Signal.created_at >= date_from)
+    if date_to:
+        stmt = stmt.where(Signal.created_at <= date_to)
+    if channel_ids:
+        stmt = stmt.where(Signal.channel_id.in_([int(c) for c in channel_ids]))
+    return stmt.order_by(Signal.created_at.desc(), Signal.id.desc())
+
+
+def iter_rows(db: Session, stmt, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[Tuple[Any, ...]]:
+    """Строки stmt курсором (yield_per); отдельная сессия на engine запроса, закрывается в конце."""
+    session = Session(bind=db.get_bind())
+    try:
+        result = session.execute(stmt.execution_options(yield_per=chunk_rows))
+        for row in result:
+            yield tuple(export_value(v) for v in row)
+    finally:
+        session.close()
+
+
+def iter_csv(headers: Sequence[str], rows: Iterable[Sequence[Any]], chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(headers)
+    yield buf.getvalue().encode("utf-8")
+    buf.seek(0)
+    buf.truncate()
+    n = 0
+    for row in rows:
+        writer.writerow(row)
+        n += 1
+        if n >= chunk_rows:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+            n = 0
+    if n:
+        yield buf.getvalue().encode("utf-8")
+
+
+def _json_lines(headers: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), default=str, ensure_ascii=False)
+
+
+def iter_ndjson(headers: Sequence[str], rows: Iterable[Sequence[Any]], chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    parts: List[str] = []
+    for line in _json_lines(headers, rows):
+        parts.append(line)
+        if len(parts) >= chunk_rows:
+            yield ("\n".join(parts) + "\n").encode("utf-8")
+            parts = []
+    if parts:
+        yield ("\n".join(parts) + "\n").encode("utf-8")
+
+
+def iter_json_array(headers: Sequence[str], rows: Iterable[Sequence[Any]], chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """JSON-массив объектов, собираемый по кускам (для совместимости с format=json)."""
+    yield b"["
+    first = True
+    parts: List[str] = []
+    for line in _json_lines(headers, rows):
+        parts.append(line)
+        if len(parts) >= chunk_rows:
+            yield (("" if first else ",") + ",".join(parts)).encode("utf-8")
+            first = False
+            parts = []
+    if parts:
+        yield (("" if first else ",") + ",".join(parts)).encode("utf-8")
+    yield b"]"
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """gzip на лету: каждый входной чанк сжимается и отдаётся, как только компрессор что-то выдал."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 — gzip-заголовок
+    first = True
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if first:
+            # заголовок файла — сразу, не дожидаясь заполнения буфера компрессора
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+            first = False
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+_WRITERS: dict = {
+    "csv": (iter_csv, "text/csv", "csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson", "ndjson"),
+    "json": (iter_json_array, "application/json", "json"),
+}
+
+STREAM_FORMATS = tuple(_WRITERS)
+
+
+def streaming_export(
+    rows: Iterable[Sequence[Any]],
+    headers: Sequence[str],
+    filename: str,
+    format: str = "csv",
+    gzip: bool = False,
+) -> StreamingResponse:
+    """StreamingResponse для rows в format (csv / ndjson / json); gzip — файл .gz."""
+    writer, media_type, ext = _WRITERS[format]
+    chunks: Iterable[bytes] = writer(headers, rows)
+    name = f"{filename}.{ext}"
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        media_type = "application/gzip"
+        name += ".gz"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={name}"},
+    )
+
+
+def stream_signals(
+    db: Session,
+    filename: str,
+    format: str = "csv",
+    gzip: bool = False,
+    columns: Sequence[Tuple[str, Any]] = SIGNAL_EXPORT_COLUMNS,
+    **filters: Any,
+) -> StreamingResponse:
+    """Сигналы (фильтры — signals_export_query) потоком в format."""
+    return streaming_export(
+        iter_rows(db, signals_export_query(columns, **filters)),
+        [h for h, _ in columns],
+        filename,
+        format=format,
+        gzip=gzip,
+    )
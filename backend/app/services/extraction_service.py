@@ -6,7 +6,7 @@
 """
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
@@ -105,8 +105,10 @@ def classify_and_fields(text: Optional[str]) -> Tuple[str, Optional[float], Dict
     """
     if not (text or "").strip():
         return "NOISE", None, {}
+    return _classify_parsed(parse_signal_from_text(text))
 
-    sig = parse_signal_from_text(text)
+
+def _classify_parsed(sig: Optional[ParsedSignal]) -> Tuple[str, Optional[float], Dict[str, Any]]:
     if sig is None:
         return "UNRESOLVED", None, {}
 
@@ -117,6 +119,24 @@ def classify_and_fields(text: Optional[str]) -> Tuple[str, Optional[float], Dict
     return "AMBIGUOUS", float(sig.confidence), fields
 
 
+def classify_and_fields_many(
+    texts: Sequence[Optional[str]],
+) -> List[Tuple[str, Optional[float], Dict[str, Any]]]:
+    """
+    classify_and_fields для пачки (массовая переэкстракция): парсинг через пул процессов
+    (parse_executor, PARSE_EXECUTOR_WORKERS), порядок результатов = порядок texts.
+    """
+    from app.services.parse_executor import parse_texts
+
+    texts = list(texts)
+    todo = [i for i, t in enumerate(texts) if (t or "").strip()]
+    parsed = parse_texts([texts[i] for i in todo])
+    out: List[Tuple[str, Optional[float], Dict[str, Any]]] = [("NOISE", None, {}) for _ in texts]
+    for i, sig in zip(todo, parsed):
+        out[i] = _classify_parsed(sig)
+    return out
+
+
 def get_or_create_extraction_for_message_version(
     db: Session,
     *,
@@ -181,6 +201,51 @@ def get_or_create_extraction_for_message_version(
     return row
 
 
+def extract_message_versions(db: Session, message_version_ids: Sequence[int]) -> int:
+    """
+    Пачечный вариант get_or_create_extraction_for_message_version (переэкстракция истории):
+    уже извлечённые текущим экстрактором версии пропускаются, остальные парсятся одним
+    classify_and_fields_many. Возвращает число созданных Extraction; commit — на вызывающем.
+    """
+    if not get_settings().EXTRACTION_PIPELINE_ENABLED or not message_version_ids:
+        return 0
+
+    done = {
+        mv_id
+        for (mv_id,) in db.query(Extraction.message_version_id).filter(
+            Extraction.message_version_id.in_(list(message_version_ids)),
+            Extraction.extractor_name == EXTRACTOR_NAME,
+            Extraction.extractor_version == EXTRACTOR_VERSION,
+        )
+    }
+    mvs = (
+        db.query(MessageVersion)
+        .filter(MessageVersion.id.in_([i for i in message_version_ids if i not in done]))
+        .order_by(MessageVersion.id)
+        .all()
+    )
+    if not mvs:
+        return 0
+
+    rows = []
+    for mv, (status, conf, fields) in zip(mvs, classify_and_fields_many([mv.text_snapshot for mv in mvs])):
+        row = Extraction(
+            raw_event_id=mv.raw_event_id,
+            message_version_id=mv.id,
+            extractor_name=EXTRACTOR_NAME,
+            extractor_version=EXTRACTOR_VERSION,
+            classification_status=status,
+            confidence=conf,
+            extracted_fields=fields,
+        )
+        db.add(row)
+        rows.append(row)
+    db.flush()
+    for row in rows:
+        ensure_decision_for_extraction(db, row)
+    return len(rows)
+
+
 def override_decision(
     db: Session,
     *,
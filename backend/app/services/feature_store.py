@@ -0,0 +1,351 @@
+"""
+Point-in-time feature store: signal_features, одна строка на сигнал.
+
+Признаки считаются один раз на момент сигнала (as_of = message_timestamp или created_at)
+и читаются и обучением (ml-service/train_from_db.py), и онлайн-предсказанием
+(ml_prediction_sweep) — одни и те же значения, без второй реализации в ML-сервисе.
+
+- индикаторы: последняя точка technical_indicators (ML_INDICATOR_TIMEFRAME) не позже as_of
+  и не старше ML_FEATURE_INDICATOR_MAX_AGE_HOURS; поиск — bisect по точкам символа,
+  загруженным одним запросом на символ для всей пачки;
+- статистика канала: accuracy и число сигналов только по сигналам канала до as_of
+  (текущий channels.accuracy содержит исходы, которых на момент сигнала ещё не было);
+- materialize_features досчитывает пачкой недостающие строки, строки старой FEATURE_VERSION
+  и строки без индикаторов (индикаторы могли догрузиться позже).
+"""
+from __future__ import annotations
+
+import logging
+import os
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, Float, delete, insert, inspect, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.models.signal import Signal
+from app.models.signal_feature import SignalFeature
+from app.services.metrics_calculator import HIT_STATUSES, RESOLVED_STATUSES
+
+logger = logging.getLogger(__name__)
+
+FEATURE_VERSION = 1
+FEATURE_BATCH = 1000
+
+# Порядок столбцов матрицы признаков ml-service (models/trained_predictor.FEATURE_NAMES)
+FEATURE_NAMES = (
+    "confidence_score",
+    "risk_reward_ratio",
+    "price_deviation",
+    "direction",
+    "rsi",
+    "macd",
+    "channel_accuracy",
+    "channel_signal_count",
+)
+
+# Строки без индикаторов пересчитываются не чаще, чем раз в столько
+_MISSING_INDICATOR_RETRY = timedelta(hours=1)
+
+
+def _indicator_timeframe() -> str:
+    return os.getenv("ML_INDICATOR_TIMEFRAME", "1d")
+
+
+def _indicator_max_age() -> timedelta:
+    try:
+        return timedelta(hours=float(os.getenv("ML_FEATURE_INDICATOR_MAX_AGE_HOURS", "72")))
+    except ValueError:
+        return timedelta(hours=72)
+
+
+def _naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    """SQLite отдаёт naive, PostgreSQL — aware; сравниваем в naive UTC."""
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _status(value: Any) -> str:
+    return str(getattr(value, "value", value) or "")
+
+
+def indicator_symbol(signal: Signal) -> str:
+    """Ключ technical_indicators: 'BTC/USDT' → 'BTC', 'BTCUSDT' → 'BTCUSDT' (как в train_from_db)."""
+    raw = (signal.symbol or "").strip() or (signal.asset or "")
+    return raw.split("/")[0].strip().upper()
+
+
+def signal_as_of(signal: Signal) -> Optional[datetime]:
+    return _naive_utc(signal.message_timestamp or signal.created_at)
+
+
+def _resolved_at(row) -> Optional[datetime]:
+    return _naive_utc(
+        row.final_exit_timestamp
+        or row.tp1_hit_at
+        or row.sl_hit_at
+        or row.entry_hit_at
+        or row.cancelled_at
+        or row.expires_at
+        or row.updated_at
+    )
+
+
+def signal_price_features(signal: Signal) -> Dict[str, Optional[float]]:
+    """Признаки из самого сигнала: R/R, относительный спред TP/SL, направление, confidence 0-1."""
+    entry = _float(signal.entry_price) or 0.0
+    tp = _float(signal.tp1_price) or 0.0
+    sl = _float(signal.stop_loss) or 0.0
+
+    rr = _float(signal.risk_reward_ratio) or 0.0
+    if rr <= 0 and entry > 0 and tp and sl:
+        rr = abs(tp - entry) / max(abs(entry - sl), 0.001)
+
+    # прокси волатильности, пока нет ATR на момент сигнала
+    if entry > 0 and tp and sl:
+        price_dev = min(abs(tp - entry) / entry, abs(entry - sl) / entry, 0.5)
+    else:
+        price_dev = None
+
+    direction = _status(signal.direction).upper()
+    confidence = _float(signal.confidence_score)
+    return {
+        "confidence_score": confidence / 100 if confidence is not None and confidence > 1 else confidence,
+        "risk_reward_ratio": rr if rr > 0 else None,
+        "price_deviation": price_dev,
+        "direction": 1.0 if direction in ("LONG", "BUY") else 0.0,
+    }
+
+
+class _IndicatorIndex:
+    """Точки индикаторов по символу, отсортированные по времени; as-of поиск bisect."""
+
+    def __init__(self) -> None:
+        self._ts: Dict[str, List[datetime]] = {}
+        self._values: Dict[str, List[Tuple[Optional[float], Optional[float]]]] = {}
+
+    def add(self, symbol: str, rows: Iterable[Any]) -> None:
+        ts, values = [], []
+        for r in rows:
+            ts.append(_naive_utc(r.timestamp))
+            values.append((_float(r.rsi_14), _float(r.macd_line)))
+        self._ts[symbol] = ts
+        self._values[symbol] = values
+
+    def as_of(self, symbol: str, when: datetime, max_age: timedelta) -> Tuple[Optional[float], Optional[float]]:
+        ts = self._ts.get(symbol)
+        if not ts:
+            return None, None
+        i = bisect_right(ts, when) - 1
+        if i < 0 or when - ts[i] > max_age:
+            return None, None
+        return self._values[symbol][i]
+
+
+def _load_indicators(db: Session, signals: Sequence[Signal]) -> _IndicatorIndex:
+    index = _IndicatorIndex()
+    if not inspect(db.get_bind()).has_table("technical_indicators"):
+        return index
+    windows: Dict[str, List[datetime]] = defaultdict(list)
+    for s in signals:
+        when = signal_as_of(s)
+        if when is not None:
+            windows[indicator_symbol(s)].append(when)
+    max_age = _indicator_max_age()
+    # типизированные колонки: без них SQLite отдаёт timestamp строкой
+    q = text(
+        "SELECT timestamp, rsi_14, macd_line FROM technical_indicators "
+        "WHERE symbol = :symbol AND timeframe = :tf AND timestamp >= :start AND timestamp <= :end "
+        "ORDER BY timestamp"
+    ).columns(timestamp=DateTime, rsi_14=Float, macd_line=Float)
+    for symbol, times in windows.items():
+        rows = db.execute(
+            q,
+            {"symbol": symbol, "tf": _indicator_timeframe(), "start": min(times) - max_age, "end": max(times)},
+        ).fetchall()
+        index.add(symbol, rows)
+    return index
+
+
+class _ChannelHistory:
+    """Для канала: отсортированные моменты сигналов и закрытий (с признаком попадания)."""
+
+    def __init__(self) -> None:
+        self.created: Dict[int, List[datetime]] = defaultdict(list)
+        self.resolved: Dict[int, List[datetime]] = defaultdict(list)
+        self.hits: Dict[int, List[int]] = {}  # префиксные суммы попаданий по resolved
+
+    def stats_as_of(self, channel_id: int, when: datetime) -> Tuple[Optional[float], int]:
+        count = bisect_left(self.created.get(channel_id, []), when)
+        resolved = bisect_left(self.resolved.get(channel_id, []), when)
+        if not resolved:
+            return None, count
+        hits = self.hits[channel_id][resolved - 1]
+        return round(hits / resolved * 100, 1), count
+
+
+def _load_channel_history(db: Session, channel_ids: Iterable[int], until: datetime) -> _ChannelHistory:
+    history = _ChannelHistory()
+    ids = sorted({c for c in channel_ids if c is not None})
+    if not ids:
+        return history
+    rows = db.execute(
+        select(
+            Signal.channel_id,
+            Signal.status,
+            Signal.message_timestamp,
+            Signal.created_at,
+            Signal.final_exit_timestamp,
+            Signal.tp1_hit_at,
+            Signal.sl_hit_at,
+            Signal.entry_hit_at,
+            Signal.cancelled_at,
+            Signal.expires_at,
+            Signal.updated_at,
+        ).where(Signal.channel_id.in_(ids))
+    ).all()
+    resolved: Dict[int, List[Tuple[datetime, int]]] = defaultdict(list)
+    for r in rows:
+        created = _naive_utc(r.message_timestamp or r.created_at)
+        if created is not None and created <= until:
+            history.created[r.channel_id].append(created)
+        status = _status(r.status)
+        if status in RESOLVED_STATUSES:
+            at = _resolved_at(r)
+            if at is not None and at <= until:
+                resolved[r.channel_id].append((at, 1 if status in HIT_STATUSES else 0))
+    for times in history.created.values():
+        times.sort()
+    for channel_id, items in resolved.items():
+        items.sort(key=lambda x: x[0])
+        history.resolved[channel_id] = [t for t, _ in items]
+        prefix, acc = [], 0
+        for _, hit in items:
+            acc += hit
+            prefix.append(acc)
+        history.hits[channel_id] = prefix
+    return history
+
+
+def compute_features(db: Session, signals: Sequence[Signal]) -> List[Dict[str, Any]]:
+    """Строки signal_features для пачки сигналов (без записи)."""
+    signals = [s for s in signals if signal_as_of(s) is not None]
+    if not signals:
+        return []
+    indicators = _load_indicators(db, signals)
+    history = _load_channel_history(db, (s.channel_id for s in signals), max(signal_as_of(s) for s in signals))
+    max_age = _indicator_max_age()
+    now = datetime.now(timezone.utc)
+
+    rows = []
+    for s in signals:
+        when = signal_as_of(s)
+        rsi, macd = indicators.as_of(indicator_symbol(s), when, max_age)
+        accuracy, count = history.stats_as_of(s.channel_id, when)
+        rows.append({
+            "signal_id": s.id,
+            "as_of": when.replace(tzinfo=timezone.utc),
+            "feature_version": FEATURE_VERSION,
+            **signal_price_features(s),
+            "rsi": rsi,
+            "macd": macd,
+            "channel_accuracy": accuracy,
+            "channel_signal_count": count,
+            "has_indicators": rsi is not None and macd is not None,
+            "computed_at": now,
+        })
+    return rows
+
+
+def _write(db: Session, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    ids = [r["signal_id"] for r in rows]
+    db.execute(delete(SignalFeature).where(SignalFeature.signal_id.in_(ids)))
+    db.execute(insert(SignalFeature), rows)
+
+
+def _stale_signals(db: Session, limit: int) -> List[Signal]:
+    """Без строки признаков или со старой FEATURE_VERSION, затем — без индикаторов (давно не пересчитывались)."""
+    base = db.query(Signal).outerjoin(SignalFeature, SignalFeature.signal_id == Signal.id)
+    signals = (
+        base.filter(or_(SignalFeature.signal_id.is_(None), SignalFeature.feature_version < FEATURE_VERSION))
+        .order_by(Signal.id)
+        .limit(limit)
+        .all()
+    )
+    if len(signals) < limit:
+        retry_before = datetime.now(timezone.utc) - _MISSING_INDICATOR_RETRY
+        signals += (
+            base.filter(
+                SignalFeature.has_indicators.is_(False),
+                SignalFeature.feature_version == FEATURE_VERSION,
+                SignalFeature.computed_at < retry_before,
+                SignalFeature.as_of >= datetime.now(timezone.utc) - _indicator_max_age() - timedelta(days=1),
+            )
+            .order_by(Signal.id)
+            .limit(limit - len(signals))
+            .all()
+        )
+    return signals
+
+
+def materialize_features(
+    db: Session,
+    signal_ids: Optional[Sequence[int]] = None,
+    limit: int = FEATURE_BATCH,
+) -> int:
+    """
+    Досчитать признаки пачкой: для signal_ids (всегда пересчёт) или до limit устаревших строк.
+    Возвращает число записанных строк; commit — здесь.
+    """
+    if signal_ids is not None:
+        signals = db.query(Signal).filter(Signal.id.in_(list(signal_ids))).all() if signal_ids else []
+    else:
+        signals = _stale_signals(db, limit)
+    rows = compute_features(db, signals)
+    _write(db, rows)
+    db.commit()
+    if rows:
+        logger.info("Feature store: %s signal feature rows materialized", len(rows))
+    return len(rows)
+
+
+def materialize_all(db: Session, batch: int = FEATURE_BATCH, max_batches: int = 1000) -> int:
+    """Догнать таблицу целиком пачками по batch (перед обучением)."""
+    total = 0
+    for _ in range(max_batches):
+        n = materialize_features(db, limit=batch)
+        total += n
+        if n < batch:
+            break
+    return total
+
+
+def feature_dict(row: SignalFeature) -> Dict[str, Optional[float]]:
+    return {name: getattr(row, name) for name in FEATURE_NAMES}
+
+
+def get_features(db: Session, signal_ids: Sequence[int]) -> Dict[int, Dict[str, Optional[float]]]:
+    """Признаки по signal_id; отсутствующие/устаревшие строки досчитываются одной пачкой."""
+    if not signal_ids:
+        return {}
+    rows = {
+        r.signal_id: r
+        for r in db.query(SignalFeature).filter(SignalFeature.signal_id.in_(list(signal_ids))).all()
+    }
+    missing = [i for i in signal_ids if i not in rows or rows[i].feature_version < FEATURE_VERSION]
+    if missing:
+        materialize_features(db, signal_ids=missing)
+        for r in db.query(SignalFeature).filter(SignalFeature.signal_id.in_(missing)).all():
+            rows[r.signal_id] = r
+    return {i: feature_dict(r) for i, r in rows.items()}
@@ -118,7 +118,7 @@ def _asset_to_symbol(asset: str) -> Optional[str]:
 
 def get_price_range_after_from_db(db, asset: str, after_date: datetime, days: int = 14, timeframe: str = "1h") -> Optional[dict]:
     """
-    Prefer DB candles (market_candles) if available.
+    Prefer DB candles (market_candles) if available; reads the local candle store when enabled.
     Returns dict with high/low/close and data_points.
     """
     symbol = _asset_to_symbol(asset)
@@ -126,6 +126,22 @@ def get_price_range_after_from_db(db, asset: str, after_date: datetime, days: in
         return None
     to_date = after_date + timedelta(days=days)
 
+    from app.services.candle_store import read_window
+
+    series = read_window(db, symbol=symbol, timeframe=timeframe, from_ts=after_date, to_ts=to_date)
+    if series is not None:
+        if not len(series):
+            return None
+        ix = series.index()
+        last = len(series) - 1
+        return {
+            "high": ix.max_high(0, last),
+            "low": ix.min_low(0, last),
+            "close": float(series.close[-1]),
+            "data_points": len(series),
+            "source": f"store.market_candles.{timeframe}",
+        }
+
     try:
         q = text(
             """
@@ -322,12 +338,9 @@ async def validate_all_signals(db) -> dict:
             "pnl": r.pnl_pct, "high": r.high_after, "low": r.low_after,
         })
 
+    # Channel metrics are updated incrementally on flush (metrics_calculator)
     db.commit()
 
-    # Recalculate channel metrics
-    from app.services.metrics_calculator import recalculate_all_channels
-    recalculate_all_channels(db)
-
     accuracy = (tp_count / total_validated * 100) if total_validated > 0 else 0
 
     return {
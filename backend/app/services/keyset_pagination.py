@@ -0,0 +1,54 @@
+"""
+Keyset-пагинация по (created_at, id) DESC.
+
+Курсор — непрозрачная строка (base64 JSON [created_at ISO, id]) последней строки страницы.
+Следующая страница — WHERE created_at < c OR (created_at = c AND id < i): цена не растёт
+с глубиной, в отличие от OFFSET, и вставка новых строк не сдвигает уже отданные страницы.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: int) -> str:
+    payload = json.dumps([created_at.isoformat() if created_at else None, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created) if created else None), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_page(query: Query, model: Any, cursor: Optional[str], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Страница query (ORM-модель model с created_at и id) после cursor.
+    Возвращает (строки, курсор следующей страницы или None, если это последняя).
+    """
+    created_col, id_col = model.created_at, model.id
+    if cursor:
+        created, row_id = decode_cursor(cursor)
+        if created is None:
+            query = query.filter(created_col.is_(None), id_col < row_id)
+        else:
+            query = query.filter(
+                or_(created_col < created, and_(created_col == created, id_col < row_id))
+            )
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
@@ -0,0 +1,136 @@
+"""
+Пакетная загрузка свечей и индикаторов: COPY во временную таблицу + один INSERT … SELECT … ON CONFLICT.
+
+Вместо INSERT на строку (и commit на строку у индикаторов) строки пишутся CSV-потоком
+через COPY (psycopg2 copy_expert) в temp-таблицу, затем сливаются в целевую одним
+запросом: на 200k строк — одна транзакция и два оператора. На других драйверах
+(sqlite в тестах) — executemany того же INSERT … ON CONFLICT.
+
+Ключ слияния везде (symbol, timeframe, timestamp); существующие строки обновляются
+(последняя свеча, загруженная незакрытой, и её индикаторы перезаписываются при следующем запуске).
+Транзакцией управляет вызывающий (conn.commit()).
+"""
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+MERGE_KEY = ("symbol", "timeframe", "timestamp")
+COPY_CHUNK_ROWS = 50_000
+
+CANDLE_COLUMNS = ("symbol", "timeframe", "timestamp", "open", "high", "low", "close", "volume", "source")
+INDICATOR_COLUMNS = (
+    "symbol", "timeframe", "timestamp", "rsi_14", "macd_line", "macd_signal", "macd_histogram",
+    "bb_upper", "bb_middle", "bb_lower", "atr_14", "stoch_k", "stoch_d",
+)
+
+
+def _chunks(rows: Iterable[Sequence[Any]], size: int) -> Iterator[List[Sequence[Any]]]:
+    chunk: List[Sequence[Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv_buffer(rows: Sequence[Sequence[Any]]) -> io.StringIO:
+    """CSV для COPY: None → пустое поле без кавычек (NULL в FORMAT csv)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    for row in rows:
+        writer.writerow(["" if v is None else (v.isoformat() if isinstance(v, datetime) else v) for v in row])
+    buf.seek(0)
+    return buf
+
+
+def _merge_sql(table: str, columns: Sequence[str], source_sql: str, update: bool) -> str:
+    conflict = ", ".join(MERGE_KEY)
+    if not update:
+        action = "DO NOTHING"
+    else:
+        assignments = [f"{c} = EXCLUDED.{c}" for c in columns if c not in MERGE_KEY]
+        assignments.append("updated_at = CURRENT_TIMESTAMP")
+        action = "DO UPDATE SET " + ", ".join(assignments)
+    return f"INSERT INTO {table} ({', '.join(columns)}) {source_sql} ON CONFLICT ({conflict}) {action}"
+
+
+def _copy_merge(conn: Connection, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]], update: bool) -> int:
+    stage = f"_stage_{table}_{uuid.uuid4().hex[:8]}"
+    cols = ", ".join(columns)
+    key = ", ".join(MERGE_KEY)
+    conn.execute(text(f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {cols} FROM {table} WITH NO DATA"))
+    cursor = conn.connection.cursor()
+    staged = 0
+    try:
+        for chunk in _chunks(rows, COPY_CHUNK_ROWS):
+            cursor.copy_expert(f"COPY {stage} ({cols}) FROM STDIN WITH (FORMAT csv)", _csv_buffer(chunk))
+            staged += len(chunk)
+    finally:
+        cursor.close()
+    merged = 0
+    if staged:
+        # повторы ключа внутри пачки (перекрытие страниц биржи) ON CONFLICT не переварит
+        source_sql = f"SELECT DISTINCT ON ({key}) {cols} FROM {stage} ORDER BY {key}"
+        merged = conn.execute(text(_merge_sql(table, columns, source_sql, update))).rowcount
+    conn.execute(text(f"DROP TABLE {stage}"))
+    return merged
+
+
+def _executemany_merge(conn: Connection, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]], update: bool) -> int:
+    values = ", ".join(f":{c}" for c in columns)
+    stmt = text(_merge_sql(table, columns, f"VALUES ({values})", update))
+    merged = 0
+    for chunk in _chunks(rows, COPY_CHUNK_ROWS):
+        conn.execute(stmt, [dict(zip(columns, row)) for row in chunk])
+        merged += len(chunk)
+    return merged
+
+
+def bulk_merge(
+    conn: Connection,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    *,
+    update: bool = True,
+) -> int:
+    """Слить rows (кортежи в порядке columns) в table по (symbol, timeframe, timestamp). Без commit."""
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        return _copy_merge(conn, table, columns, rows, update)
+    return _executemany_merge(conn, table, columns, rows, update)
+
+
+def last_timestamp(conn: Connection, table: str, symbol: str, timeframe: str) -> Optional[datetime]:
+    return conn.execute(
+        text(f"SELECT MAX(timestamp) FROM {table} WHERE symbol = :symbol AND timeframe = :tf"),
+        {"symbol": symbol, "tf": timeframe},
+    ).scalar()
+
+
+def load_candles(
+    conn: Connection,
+    symbol: str,
+    timeframe: str,
+    klines: Iterable[Tuple[Any, ...]],
+    source: str = "binance",
+) -> int:
+    """klines — (timestamp, open, high, low, close, volume); без commit."""
+    rows = ((symbol, timeframe, *k[:6], source) for k in klines)
+    return bulk_merge(conn, "market_candles", CANDLE_COLUMNS, rows)
+
+
+def load_indicators(conn: Connection, rows: Iterable[Sequence[Any]]) -> int:
+    """rows — кортежи в порядке INDICATOR_COLUMNS; без commit."""
+    return bulk_merge(conn, "technical_indicators", INDICATOR_COLUMNS, rows)
@@ -1,10 +1,25 @@
 """
 Calculate channel accuracy and ROI from signal history.
+
+Каналы хранят running aggregates (signals_count, resolved_signals, successful_signals,
+roi_sum, roi_count). Их ведут хуки сессии: вставка / удаление сигнала или смена его
+статуса / PnL — один UPDATE channels на затронутый канал, без чтения сигналов канала;
+accuracy и average_roi выводятся из счётчиков в том же UPDATE.
+
+recalculate_channel_metrics / recalculate_all_channels — сверка: один GROUP BY по signals,
+расхождения (bulk UPDATE / raw SQL мимо ORM) исправляются и логируются.
 """
 import logging
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Numeric, case, cast, event, func, inspect
 from sqlalchemy.orm import Session
 from app.models.channel import Channel
-from app.models.signal import Signal
+from app.models.signal import Signal, SignalStatus
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
@@ -12,56 +27,209 @@ HIT_STATUSES = {"TP1_HIT", "TP2_HIT", "TP3_HIT", "ENTRY_HIT"}
 MISS_STATUSES = {"SL_HIT", "EXPIRED", "CANCELLED"}
 RESOLVED_STATUSES = HIT_STATUSES | MISS_STATUSES
 
+# Порядок полей в дельтах и агрегатах
+_COUNTERS = ("signals_count", "resolved_signals", "successful_signals", "roi_sum", "roi_count")
+_DERIVED = ("accuracy", "average_roi")
+_TRACKED = ("status", "profit_loss_percentage", "channel_id")
 
-def recalculate_channel_metrics(db: Session, channel_id: int) -> dict:
-    """Recalculate accuracy and ROI for a channel from its signals."""
-    channel = db.query(Channel).filter(Channel.id == channel_id).first()
-    if not channel:
-        return {"error": "Channel not found"}
+_PENDING_KEY = "channel_metric_deltas"
+_TOUCHED_KEY = "channel_metric_touched"
 
-    signals = db.query(Signal).filter(Signal.channel_id == channel_id).all()
-    total = len(signals)
-    resolved = [s for s in signals if s.status in RESOLVED_STATUSES]
-    hits = [s for s in signals if s.status in HIT_STATUSES]
-
-    channel.signals_count = total
-
-    if resolved:
-        channel.accuracy = round(len(hits) / len(resolved) * 100, 1)
-        channel.successful_signals = len(hits)
-    elif total > 0:
-        channel.accuracy = None
-        channel.successful_signals = 0
-    else:
-        channel.accuracy = None
-        channel.successful_signals = 0
-
-    # average_roi = средний ROI в процентах (используем profit_loss_percentage)
-    total_roi_pct = 0.0
-    roi_count = 0
-    for s in signals:
-        if s.profit_loss_percentage is not None:
-            total_roi_pct += float(s.profit_loss_percentage)
-            roi_count += 1
-    channel.average_roi = round(total_roi_pct / roi_count, 2) if roi_count > 0 else None
+Delta = Tuple[int, int, int, float, int]
+
+
+def _contribution(status, pnl) -> Delta:
+    """Вклад одного сигнала в счётчики канала (порядок — _COUNTERS)."""
+    status = getattr(status, "value", status)
+    return (
+        1,
+        1 if status in RESOLVED_STATUSES else 0,
+        1 if status in HIT_STATUSES else 0,
+        float(pnl) if pnl is not None else 0.0,
+        1 if pnl is not None else 0,
+    )
+
+
+def _accumulate(deltas: Dict[int, list], channel_id: Optional[int], contrib: Delta, sign: int) -> None:
+    if channel_id is None:
+        return
+    acc = deltas[channel_id]
+    for i, v in enumerate(contrib):
+        acc[i] += sign * v
+
+
+def _accuracy(hits: int, resolved: int) -> Optional[float]:
+    return round(hits / resolved * 100, 1) if resolved else None
+
+
+def _average_roi(roi_sum: float, roi_count: int) -> Optional[float]:
+    return round(roi_sum / roi_count, 2) if roi_count else None
+
+
+def _old_new(state, key: str):
+    hist = state.attrs[key].history
+    old = hist.deleted[0] if hist.deleted else (hist.unchanged[0] if hist.unchanged else None)
+    new = hist.added[0] if hist.added else (hist.unchanged[0] if hist.unchanged else None)
+    return old, new, hist.has_changes()
+
+
+def _apply_deltas(session: Session, deltas: Dict[int, list]) -> None:
+    t = Channel.__table__
+    for channel_id, (n, resolved, hits, roi_sum, roi_count) in deltas.items():
+        if not any((n, resolved, hits, roi_sum, roi_count)):
+            continue
+        # SET-выражения видят старые значения строки, поэтому производные считаем от (col + delta)
+        new_resolved = t.c.resolved_signals + resolved
+        new_hits = t.c.successful_signals + hits
+        new_roi_sum = t.c.roi_sum + roi_sum
+        new_roi_count = t.c.roi_count + roi_count
+        values = {
+            "signals_count": t.c.signals_count + n,
+            "resolved_signals": new_resolved,
+            "successful_signals": new_hits,
+            "roi_sum": new_roi_sum,
+            "roi_count": new_roi_count,
+        }
+        # производные — только когда меняются их входы: новый PENDING-сигнал не трогает accuracy
+        if resolved or hits:
+            values["accuracy"] = case(
+                (new_resolved > 0, func.round(cast(new_hits * 100.0 / new_resolved, Numeric), 1)),
+                else_=None,
+            )
+        if roi_sum or roi_count:
+            values["average_roi"] = case(
+                (new_roi_count > 0, func.round(cast(new_roi_sum / new_roi_count, Numeric), 2)),
+                else_=None,
+            )
+        session.connection().execute(t.update().where(t.c.id == channel_id).values(**values))
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_deleted(session: Session, flush_context, instances) -> None:
+    # Удаляемые сигналы читаем до DELETE: после flush строки уже нет, а атрибуты могут быть expired
+    deltas: Dict[int, list] = defaultdict(lambda: [0, 0, 0, 0.0, 0])
+    for obj in session.deleted:
+        if isinstance(obj, Signal):
+            _accumulate(deltas, obj.channel_id, _contribution(obj.status, obj.profit_loss_percentage), -1)
+    session.info[_PENDING_KEY] = deltas
 
-    db.commit()
 
+@event.listens_for(Session, "after_flush")
+def _apply_signal_changes(session: Session, flush_context) -> None:
+    deltas = session.info.pop(_PENDING_KEY, None) or defaultdict(lambda: [0, 0, 0, 0.0, 0])
+    for obj in session.new:
+        if isinstance(obj, Signal):
+            _accumulate(deltas, obj.channel_id, _contribution(obj.status, obj.profit_loss_percentage), 1)
+    for obj in session.dirty:
+        if not isinstance(obj, Signal):
+            continue
+        state = inspect(obj)
+        (old_status, new_status, s_chg), (old_pnl, new_pnl, p_chg), (old_ch, new_ch, c_chg) = (
+            _old_new(state, key) for key in _TRACKED
+        )
+        if not (s_chg or p_chg or c_chg):
+            continue
+        _accumulate(deltas, old_ch, _contribution(old_status, old_pnl), -1)
+        _accumulate(deltas, new_ch, _contribution(new_status, new_pnl), 1)
+    if not deltas:
+        return
+    _apply_deltas(session, deltas)
+    session.info.setdefault(_TOUCHED_KEY, set()).update(deltas)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_touched_channels(session: Session, flush_context) -> None:
+    # Загруженные Channel видят новые счётчики при следующем обращении
+    for channel_id in session.info.pop(_TOUCHED_KEY, ()):
+        ch = session.identity_map.get(session.identity_key(Channel, channel_id))
+        if ch is not None:
+            session.expire(ch, _COUNTERS + _DERIVED)
+
+
+def _load_old_value(target, value, oldvalue, initiator) -> None:
+    pass
+
+
+# active_history: при присваивании expired-атрибута (после commit) старое значение
+# подгружается из БД, иначе вклад "до" в дельту неизвестен
+for _attr in (Signal.status, Signal.profit_loss_percentage, Signal.channel_id):
+    event.listen(_attr, "set", _load_old_value, active_history=True)
+
+
+def _aggregate_signals(db: Session, channel_ids: Optional[Iterable[int]] = None) -> Dict[int, tuple]:
+    """channel_id → (total, resolved, hits, roi_sum, roi_count) одним GROUP BY."""
+    resolved = [SignalStatus(s) for s in RESOLVED_STATUSES]
+    hits = [SignalStatus(s) for s in HIT_STATUSES]
+    q = db.query(
+        Signal.channel_id,
+        func.count(Signal.id),
+        func.sum(case((Signal.status.in_(resolved), 1), else_=0)),
+        func.sum(case((Signal.status.in_(hits), 1), else_=0)),
+        func.sum(Signal.profit_loss_percentage),
+        func.count(Signal.profit_loss_percentage),
+    )
+    if channel_ids is not None:
+        q = q.filter(Signal.channel_id.in_(list(channel_ids)))
     return {
-        "channel": channel.name,
-        "total_signals": total,
-        "resolved": len(resolved),
-        "hits": len(hits),
-        "accuracy": channel.accuracy,
-        "average_roi": channel.average_roi,
+        row[0]: (int(row[1]), int(row[2] or 0), int(row[3] or 0), float(row[4] or 0), int(row[5]))
+        for row in q.group_by(Signal.channel_id).all()
     }
 
 
-def recalculate_all_channels(db: Session) -> list:
-    """Recalculate metrics for all channels."""
-    channels = db.query(Channel).all()
+def _reconcile(db: Session, channels: List[Channel], aggregates: Dict[int, tuple]) -> list:
     results = []
-    for ch in channels:
-        r = recalculate_channel_metrics(db, ch.id)
-        results.append(r)
+    drifted = 0
+    for channel in channels:
+        total, resolved, hits, roi_sum, roi_count = aggregates.get(channel.id, (0, 0, 0, 0.0, 0))
+        stored = (
+            channel.signals_count or 0,
+            channel.resolved_signals or 0,
+            channel.successful_signals or 0,
+            channel.roi_count or 0,
+        )
+        drift = stored != (total, resolved, hits, roi_count) or abs((channel.roi_sum or 0.0) - roi_sum) > 1e-6
+        if drift:
+            drifted += 1
+            logger.warning(
+                "Channel %s metrics drift: stored total/resolved/hits/roi_n=%s, actual=%s",
+                channel.id, stored, (total, resolved, hits, roi_count),
+            )
+        channel.signals_count = total
+        channel.resolved_signals = resolved
+        channel.successful_signals = hits
+        channel.roi_sum = roi_sum
+        channel.roi_count = roi_count
+        channel.accuracy = _accuracy(hits, resolved)
+        channel.average_roi = _average_roi(roi_sum, roi_count)
+        results.append({
+            "channel": channel.name,
+            "total_signals": total,
+            "resolved": resolved,
+            "hits": hits,
+            "accuracy": channel.accuracy,
+            "average_roi": channel.average_roi,
+            "reconciled": drift,
+        })
+    db.commit()
+    if drifted:
+        logger.info(f"Channel metrics reconciliation fixed {drifted}/{len(channels)} channels")
     return results
+
+
+def recalculate_channel_metrics(db: Session, channel_id: int) -> dict:
+    """Reconcile accuracy and ROI for a channel against its signals (SQL aggregate)."""
+    channel = db.query(Channel).filter(Channel.id == channel_id).first()
+    if not channel:
+        return {"error": "Channel not found"}
+    return _reconcile(db, [channel], _aggregate_signals(db, [channel_id]))[0]
+
+
+def recalculate_all_channels(db: Session) -> list:
+    """Reconcile running metrics of all channels with one GROUP BY over signals."""
+    channels = db.query(Channel).all()
+    return _reconcile(db, channels, _aggregate_signals(db))
+
+
+async def recalculate_all_channels_async(session: "AsyncSession") -> list:
+    """recalculate_all_channels на AsyncSession (фоновые циклы на event loop API): тот же GROUP BY и commit через async-драйвер."""
+    return await session.run_sync(recalculate_all_channels)
@@ -1,12 +1,19 @@
 """
 HTTP к ML-сервису: повторы при временных сбоях + circuit breaker (защита от каскада).
+
+Клиент httpx один на event loop и живёт до shutdown (close_ml_client): keep-alive пул,
+HTTP/2 при наличии пакета h2 и TLS. Предсказания по одному сигналу (ml_predict_signal)
+склеиваются: одинаковые запросы в полёте ждут один ответ, а при ML_PREDICT_BATCH_WINDOW_MS > 0
+параллельные одиночные запросы уходят одним POST /batch.
 """
 from __future__ import annotations
 
 import asyncio
+import json
 import logging
 import time
-from typing import Any, Optional
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 
@@ -19,10 +26,25 @@ _failures = 0
 _open_until: float = 0.0
 
 
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+# Одинаковые предсказания в полёте: (loop, url, версия модели, тело) → задача
+_inflight: Dict[Tuple[Any, ...], "asyncio.Task[Dict[str, Any]]"] = {}
+# Копящиеся микро-пачки: (loop, base_url, версия модели) → [(payload, future)]
+_batches: Dict[Tuple[Any, ...], List[Tuple[Dict[str, Any], "asyncio.Future[Dict[str, Any]]"]]] = {}
+
+
 class MLCircuitOpenError(Exception):
     """Circuit открыт после серии ошибок ML-сервиса."""
 
 
+class MLServiceError(Exception):
+    """ML-сервис ответил не 200 (или ответ не сходится с запросом)."""
+
+    def __init__(self, status_code: int, detail: str = "") -> None:
+        super().__init__(f"ML service error: {status_code}" + (f" - {detail}" if detail else ""))
+        self.status_code = status_code
+
+
 async def _should_block() -> bool:
     return time.monotonic() < _open_until
 
@@ -59,6 +81,34 @@ def circuit_status() -> dict[str, Any]:
     }
 
 
+def _get_client() -> httpx.AsyncClient:
+    """Общий клиент текущего loop (создаётся при первом запросе)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        s = get_settings()
+        limits = httpx.Limits(
+            max_connections=max(1, int(getattr(s, "ML_HTTP_MAX_CONNECTIONS", 100))),
+            max_keepalive_connections=max(1, int(getattr(s, "ML_HTTP_MAX_KEEPALIVE", 20))),
+            keepalive_expiry=30.0,
+        )
+        try:
+            client = httpx.AsyncClient(limits=limits, http2=bool(getattr(s, "ML_HTTP2", True)))
+        except ImportError:
+            # http2=True требует пакет h2 — без него тот же пул по HTTP/1.1
+            logger.info("h2 is not installed, ML client uses HTTP/1.1")
+            client = httpx.AsyncClient(limits=limits)
+        _clients[loop] = client
+    return client
+
+
+async def close_ml_client() -> None:
+    """Закрыть клиент текущего loop (shutdown приложения)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
 async def ml_http_request(
     method: str,
     url: str,
@@ -79,9 +129,8 @@ async def ml_http_request(
 
     for attempt in range(retries + 1):
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                fn = getattr(client, method.lower())
-                r = await fn(url, **kwargs)
+            fn = getattr(_get_client(), method.lower())
+            r = await fn(url, timeout=timeout, **kwargs)
             if r.status_code < 500:
                 await _on_success()
                 return r
@@ -102,3 +151,125 @@ async def ml_http_request(
     if last_err:
         raise last_err
     raise RuntimeError("ml_http_request: unexpected end")
+
+
+async def _post_prediction(url: str, body: Any, model_version: Optional[str], timeout: float) -> Any:
+    headers = {"X-ML-Model-Version": model_version} if model_version else None
+    r = await ml_http_request("post", url, timeout=timeout, json=body, headers=headers)
+    if r.status_code != 200:
+        raise MLServiceError(r.status_code, r.text)
+    return r.json()
+
+
+async def _predict_each(
+    base_url: str,
+    model_version: Optional[str],
+    batch: List[Tuple[Dict[str, Any], "asyncio.Future[Dict[str, Any]]"]],
+    timeout: float,
+) -> None:
+    """По сигналу на /predictions/signal: у каждого ожидающего свой результат или своя ошибка."""
+    url = f"{base_url}/api/v1/predictions/signal"
+    outcomes = await asyncio.gather(
+        *(_post_prediction(url, payload, model_version, timeout) for payload, _ in batch),
+        return_exceptions=True,
+    )
+    for (_, fut), outcome in zip(batch, outcomes):
+        if fut.done():
+            continue
+        if isinstance(outcome, BaseException):
+            fut.set_exception(outcome)
+        else:
+            fut.set_result(outcome)
+
+
+async def _flush_batch(
+    base_url: str,
+    model_version: Optional[str],
+    batch: List[Tuple[Dict[str, Any], "asyncio.Future[Dict[str, Any]]"]],
+    timeout: float,
+) -> None:
+    try:
+        if len(batch) == 1:
+            await _predict_each(base_url, model_version, batch, timeout)
+            return
+        try:
+            body = await _post_prediction(
+                f"{base_url}/api/v1/predictions/batch",
+                {"signals": [payload for payload, _ in batch]},
+                model_version,
+                timeout,
+            )
+            results = body["predictions"]
+            if len(results) != len(batch):
+                raise MLServiceError(200, f"{len(results)} predictions for {len(batch)} signals")
+        except MLServiceError as e:
+            # не-200 на /batch (обычно 422 из-за одного кривого payload) не должен валить соседей:
+            # повторяем по одному, ошибку получит только тот, чей запрос её вызвал
+            logger.info("ML batch of %s failed (%s), retrying per signal", len(batch), e.status_code)
+            await _predict_each(base_url, model_version, batch, timeout)
+            return
+    except asyncio.CancelledError:
+        for _, fut in batch:
+            fut.cancel()
+        raise
+    except Exception as e:
+        for _, fut in batch:
+            if not fut.done():
+                fut.set_exception(e)
+        return
+    for (_, fut), result in zip(batch, results):
+        if not fut.done():
+            fut.set_result(result)
+
+
+def _start_flush(key: Tuple[Any, ...], batch: list, timeout: float) -> None:
+    # Таймер окна мог опоздать: пачку уже отправили по размеру и копится следующая
+    if _batches.get(key) is not batch:
+        return
+    del _batches[key]
+    asyncio.ensure_future(_flush_batch(key[1], key[2], batch, timeout))
+
+
+async def _batched_prediction(
+    base_url: str, model_version: Optional[str], payload: Dict[str, Any], timeout: float, window: float
+) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    key = (loop, base_url, model_version)
+    fut: "asyncio.Future[Dict[str, Any]]" = loop.create_future()
+    batch = _batches.setdefault(key, [])
+    batch.append((payload, fut))
+    if len(batch) >= max(1, int(getattr(get_settings(), "ML_PREDICT_BATCH_MAX", 32))):
+        _start_flush(key, batch, timeout)
+    elif len(batch) == 1:
+        loop.call_later(window, _start_flush, key, batch, timeout)
+    return await fut
+
+
+async def ml_predict_signal(
+    payload: Dict[str, Any],
+    *,
+    model_version: Optional[str] = None,
+    timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """
+    Предсказание по одному сигналу (тело — как для POST /predictions/signal).
+    Одинаковый запрос, уже отправленный в ML, не дублируется — ждём его ответ; при
+    ML_PREDICT_BATCH_WINDOW_MS > 0 одиночные запросы за окно собираются в один /batch.
+    Ошибки: MLCircuitOpenError, MLServiceError (не 200), httpx.RequestError.
+    """
+    s = get_settings()
+    base_url = s.ML_SERVICE_URL.rstrip("/")
+    window = max(0.0, float(getattr(s, "ML_PREDICT_BATCH_WINDOW_MS", 0) or 0)) / 1000.0
+    loop = asyncio.get_running_loop()
+    key = (loop, base_url, model_version, json.dumps(payload, sort_keys=True, default=str))
+
+    task = _inflight.get(key)
+    if task is None:
+        if window > 0:
+            coro = _batched_prediction(base_url, model_version, payload, timeout, window)
+        else:
+            coro = _post_prediction(f"{base_url}/api/v1/predictions/signal", payload, model_version, timeout)
+        task = _inflight[key] = asyncio.ensure_future(coro)
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: отмена одного ожидающего (клиент отвалился) не отменяет запрос остальным
+    return await asyncio.shield(task)
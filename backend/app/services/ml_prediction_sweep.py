@@ -0,0 +1,110 @@
+"""
+ML-предсказания для сигналов пачкой: один POST /api/v1/predictions/batch на ML_SWEEP_BATCH сигналов.
+
+ML-сервис строит одну матрицу признаков и считает её одним вызовом модели, рыночные данные
+берёт одним multi-asset запросом, поэтому sweep по сотням PENDING-сигналов — один round trip,
+а не запрос на каждый сигнал.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models.signal import Signal
+from app.services.feature_store import get_features
+from app.services.ml_gateway import ml_http_request
+
+logger = logging.getLogger(__name__)
+
+ML_SWEEP_BATCH = 500
+
+
+def signal_to_ml_request(signal: Signal, features: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Signal → SignalPredictionRequest ML-сервиса.
+    features — строка signal_features: ML-сервис берёт признаки из неё, как при обучении.
+    """
+    accuracy = signal.channel.accuracy if signal.channel and signal.channel.accuracy is not None else None
+    return {
+        "signal_id": signal.id,
+        "features": features,
+        "asset": signal.asset,
+        "direction": getattr(signal.direction, "value", signal.direction),
+        "entry_price": float(signal.entry_price),
+        "target_price": float(signal.tp1_price) if signal.tp1_price else None,
+        "stop_loss": float(signal.stop_loss) if signal.stop_loss else None,
+        "channel_id": signal.channel_id,
+        # channels.accuracy — проценты, ML-сервис ждёт 0-1
+        "channel_accuracy": accuracy / 100 if accuracy is not None else 0.5,
+        "confidence": _confidence_0_1(signal.confidence_score),
+    }
+
+
+def _confidence_0_1(value: Any) -> float:
+    """confidence_score как в feature_store: проценты (> 1) приводятся к 0-1, доли остаются."""
+    if value is None:
+        return 0.5
+    value = float(value)
+    return value / 100 if value > 1 else value
+
+
+def _headers() -> Dict[str, str] | None:
+    settings = get_settings()
+    if getattr(settings, "ML_MODEL_VERSION", None):
+        return {"X-ML-Model-Version": settings.ML_MODEL_VERSION}
+    return None
+
+
+async def request_batch_predictions(
+    signals: List[Signal],
+    features: Optional[Dict[int, Dict[str, Any]]] = None,
+    timeout: float = 60.0,
+) -> List[Dict[str, Any]]:
+    """Предсказания в порядке signals, один HTTP-запрос; ошибки ML-сервиса — исключение."""
+    features = features or {}
+    if not signals:
+        return []
+    base_url = get_settings().ML_SERVICE_URL.rstrip("/")
+    response = await ml_http_request(
+        "post",
+        f"{base_url}/api/v1/predictions/batch",
+        timeout=timeout,
+        json={"signals": [signal_to_ml_request(s, features.get(s.id)) for s in signals]},
+        headers=_headers(),
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"ML service error: {response.status_code}")
+    predictions = response.json()["predictions"]
+    if len(predictions) != len(signals):
+        raise RuntimeError(f"ML service returned {len(predictions)} predictions for {len(signals)} signals")
+    return predictions
+
+
+async def predict_pending_signals(db: Session, limit: int = ML_SWEEP_BATCH) -> dict:
+    """PENDING-сигналы без ML-оценки → одна пачка в ML-сервис → ml_success_probability / ml_prediction."""
+    signals = (
+        db.query(Signal)
+        .filter(
+            Signal.status == "PENDING",
+            Signal.ml_success_probability.is_(None),
+            Signal.entry_price.isnot(None),
+        )
+        .order_by(Signal.id.desc())
+        .limit(limit)
+        .all()
+    )
+    if not signals:
+        return {"predicted_signals": 0}
+
+    # point-in-time признаки из signal_features — те же, на которых обучалась модель
+    features = get_features(db, [s.id for s in signals])
+    predictions = await request_batch_predictions(signals, features)
+    for signal, prediction in zip(signals, predictions):
+        signal.ml_success_probability = prediction["success_probability"]
+        signal.ml_prediction = prediction
+    db.commit()
+    logger.info("ML sweep: %s signals predicted in one batch", len(signals))
+    return {"predicted_signals": len(signals)}
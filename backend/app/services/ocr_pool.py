@@ -0,0 +1,215 @@
+"""
+OCR вне event loop: пул процессов с одним EasyOCR reader на воркер + кэш по хэшу содержимого.
+
+extract_text_from_image — секунды CPU на картинку (EasyOCR по вариантам препроцессинга);
+вызванный прямо из корутины, он останавливает весь коллектор. Здесь:
+- картинка декодируется и хэшируется (sha256 пикселей) в потоке. Хэш точный, не перцептивный:
+  карточки сигналов одного канала совпадают вёрсткой и отличаются только цифрами, pHash
+  их склеивает и отдаёт чужой текст (чужие TP/SL);
+- текст ищется в кэше по хэшу: Redis (общий для процессов, переживает рестарт) и
+  in-process LRU как fallback — репост того же скриншота под новым URL OCR не запускает;
+- промах уходит в ProcessPoolExecutor (OCR_WORKERS, reader создаётся в initializer воркера);
+- очередь ограничена (OCR_QUEUE_MAX задач в работе): при переполнении картинка пропускается
+  без записи в кэш — сбор не ждёт OCR, следующий проход попробует снова.
+
+OCR_WORKERS=0 — OCR в потоке текущего процесса (loop тоже не блокируется).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+_pending = 0
+_pending_lock = threading.Lock()
+
+_local_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_local_cache_lock = threading.Lock()
+
+
+def _workers() -> int:
+    try:
+        return max(0, int(os.getenv("OCR_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+def _queue_max() -> int:
+    try:
+        return max(1, int(os.getenv("OCR_QUEUE_MAX", "16")))
+    except ValueError:
+        return 16
+
+
+def _cache_ttl_seconds() -> int:
+    return int(os.getenv("OCR_CACHE_TTL_SECONDS", "86400"))  # 24h
+
+
+def _cache_max_items() -> int:
+    return int(os.getenv("OCR_CACHE_MAX_ITEMS", "2000"))
+
+
+def image_hash(image_bytes: bytes) -> str:
+    """
+    Точный хэш картинки: sha256 декодированных пикселей (тот же скриншот в другом контейнере
+    или с другими метаданными совпадает). Без numpy/cv2 или для неразборчивых байт — sha256 байт.
+    """
+    try:
+        import numpy as np
+        import cv2
+
+        img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is not None:
+            h = hashlib.sha256(f"{img.shape}".encode())
+            h.update(np.ascontiguousarray(img).data)
+            return "x" + h.hexdigest()
+    except Exception as e:
+        logger.debug("Image decode unavailable, hashing raw bytes: %s", e)
+    return "s" + hashlib.sha256(image_bytes).hexdigest()
+
+
+def _key(image_key: str) -> str:
+    return f"ocr:text:{image_key}"
+
+
+def cache_get(image_key: str) -> Optional[str]:
+    try:
+        from app.core.redis_cache import cache_get as redis_get
+
+        cached = redis_get(_key(image_key))
+        if cached is not None:
+            return str(cached)
+    except ImportError:
+        pass
+    ttl = _cache_ttl_seconds()
+    with _local_cache_lock:
+        ent = _local_cache.get(image_key)
+        if ent is None:
+            return None
+        if ttl > 0 and time.time() - ent[0] > ttl:
+            _local_cache.pop(image_key, None)
+            return None
+        _local_cache.move_to_end(image_key)
+        return ent[1]
+
+
+def cache_set(image_key: str, text: str) -> None:
+    try:
+        from app.core.redis_cache import cache_set as redis_set
+
+        redis_set(_key(image_key), text, _cache_ttl_seconds())
+    except ImportError:
+        pass
+    max_items = _cache_max_items()
+    with _local_cache_lock:
+        _local_cache[image_key] = (time.time(), text)
+        _local_cache.move_to_end(image_key)
+        if max_items > 0:
+            while len(_local_cache) > max_items:
+                _local_cache.popitem(last=False)
+
+
+def clear_local_cache() -> None:
+    with _local_cache_lock:
+        _local_cache.clear()
+
+
+def _init_worker() -> None:
+    """initializer: EasyOCR reader создаётся один раз на воркер, до первой задачи."""
+    from app.services.ocr_signal_parser import _get_reader
+
+    _get_reader()
+
+
+def _ocr_job(image_bytes: bytes, order: Sequence[str]) -> Tuple[str, Optional[str], List[str]]:
+    from app.services.ocr_signal_parser import extract_text_ranked
+
+    return extract_text_ranked(image_bytes, order)
+
+
+def get_ocr_executor() -> Optional[ProcessPoolExecutor]:
+    """Общий пул на процесс; None — OCR в потоке (OCR_WORKERS=0)."""
+    global _pool, _pool_workers
+    n = _workers()
+    if n <= 0:
+        return None
+    with _pool_lock:
+        if _pool is not None and _pool_workers != n:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=n, initializer=_init_worker)
+            _pool_workers = n
+            logger.info("OCR pool: %s worker processes", n)
+        return _pool
+
+
+def shutdown_ocr_executor() -> None:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+def _try_reserve() -> bool:
+    global _pending
+    with _pending_lock:
+        if _pending >= _queue_max():
+            return False
+        _pending += 1
+        return True
+
+
+def _release() -> None:
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def ocr_image_bytes(image_bytes: bytes, channel: Optional[str] = None) -> Optional[str]:
+    """
+    Текст картинки: из кэша по хэшу содержимого или через пул OCR.
+    None — очередь OCR переполнена (результат не кэшируется, можно повторить позже).
+    channel — порядок вариантов препроцессинга по win rate канала (variant_order).
+    """
+    from app.services.ocr_signal_parser import record_variant_result, variant_order
+
+    image_key = await asyncio.to_thread(image_hash, image_bytes)
+    cached = await asyncio.to_thread(cache_get, image_key)
+    if cached is not None:
+        logger.debug("OCR cache hit key=%s len=%s", image_key, len(cached))
+        return cached
+
+    if not _try_reserve():
+        logger.warning("OCR queue full (%s), image key=%s skipped", _queue_max(), image_key)
+        return None
+    try:
+        # статистика вариантов живёт в этом процессе: порядок уходит в воркер, победитель — обратно
+        order = await asyncio.to_thread(variant_order, channel)
+        pool = get_ocr_executor()
+        if pool is None:
+            text, winner, tried = await asyncio.to_thread(_ocr_job, image_bytes, order)
+        else:
+            text, winner, tried = await asyncio.get_running_loop().run_in_executor(
+                pool, _ocr_job, image_bytes, order
+            )
+    finally:
+        _release()
+    await asyncio.to_thread(record_variant_result, channel, winner, tried)
+    text = text or ""
+    await asyncio.to_thread(cache_set, image_key, text)
+    return text
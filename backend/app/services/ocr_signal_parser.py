@@ -1,18 +1,17 @@
 """
 OCR signal parser — extract trading signals from images.
 Uses easyocr for text recognition, then runs signal parser on extracted text.
+Async URL path runs OCR off the event loop (ocr_pool: process pool + content-hash cache).
 """
 import logging
 import io
 import httpx
 import os
-import time
 import asyncio
 import ipaddress
 import socket
-from collections import OrderedDict
-from dataclasses import dataclass
-from typing import Optional, Dict, List, Any
+import threading
+from typing import Optional, Dict, List, Any, Sequence, Tuple
 from urllib.parse import urlparse
 from app.services.telegram_scraper import ParsedSignal, parse_signal_from_text
 
@@ -59,24 +58,24 @@ def _debug_preprocess() -> bool:
     return os.getenv("OCR_DEBUG_PREPROCESS", "").lower() in ("1", "true", "yes")
 
 
-def _make_image_variants(image_bytes: bytes) -> List[Any]:
+def _named_image_variants(image_bytes: bytes) -> List[Tuple[str, Any]]:
     """
-    Return a list of images acceptable by easyocr (numpy arrays).
-    Includes original + preprocessed variants.
+    Return (name, image) pairs acceptable by easyocr (numpy arrays).
+    Includes original + preprocessed variants, in generation order.
     """
     try:
         import numpy as np
         import cv2
     except Exception as e:
         logger.debug("OCR preprocess deps not available: %s", e)
-        return [image_bytes]
+        return [("original", image_bytes)]
 
     arr = np.frombuffer(image_bytes, dtype=np.uint8)
     img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
     if img is None:
-        return [image_bytes]
+        return [("original", image_bytes)]
 
-    variants: List[Any] = [img]
+    variants: List[Tuple[str, Any]] = [("original", img)]
     if not _preprocess_enabled():
         return variants
 
@@ -93,13 +92,13 @@ def _make_image_variants(image_bytes: bytes) -> List[Any]:
         gray_clahe = clahe.apply(gray)
     except Exception:
         gray_clahe = gray
-    variants.append(gray_clahe)
+    variants.append(("clahe", gray_clahe))
 
     # Variant 2: Otsu threshold (global), often better for clean UI text
     try:
         _, otsu = cv2.threshold(gray_clahe, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        variants.append(otsu)
-        variants.append(cv2.bitwise_not(otsu))
+        variants.append(("otsu", otsu))
+        variants.append(("otsu_inv", cv2.bitwise_not(otsu)))
     except Exception:
         pass
 
@@ -112,15 +111,15 @@ def _make_image_variants(image_bytes: bytes) -> List[Any]:
         31,
         9,
     )
-    variants.append(thr)
-    variants.append(cv2.bitwise_not(thr))
+    variants.append(("adaptive", thr))
+    variants.append(("adaptive_inv", cv2.bitwise_not(thr)))
 
     # Variant 4: light sharpen (unsharp mask) then threshold
     try:
         blur = cv2.GaussianBlur(gray_clahe, (0, 0), 1.0)
         sharp = cv2.addWeighted(gray_clahe, 1.6, blur, -0.6, 0)
         _, sharp_otsu = cv2.threshold(sharp, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        variants.append(sharp_otsu)
+        variants.append(("sharp_otsu", sharp_otsu))
     except Exception:
         pass
 
@@ -128,6 +127,14 @@ def _make_image_variants(image_bytes: bytes) -> List[Any]:
     return variants[: max(1, _preprocess_max_variants())]
 
 
+def _make_image_variants(image_bytes: bytes) -> List[Any]:
+    """
+    Return a list of images acceptable by easyocr (numpy arrays).
+    Includes original + preprocessed variants.
+    """
+    return [img for _, img in _named_image_variants(image_bytes)]
+
+
 def _score_ocr_text(text: str, avg_conf: float) -> float:
     if not text:
         return 0.0
@@ -137,53 +144,161 @@ def _score_ocr_text(text: str, avg_conf: float) -> float:
     return (avg_conf * 2.0) + (min(len(t), 400) / 100.0) + density
 
 
-def extract_text_from_image(image_bytes: bytes) -> str:
-    """Extract text from image bytes using EasyOCR (with optional preprocessing)."""
+# Порядок по стоимости: original без препроцессинга (и без апскейла) дешевле всех
+_VARIANT_NAMES = ("original", "clahe", "otsu", "otsu_inv", "adaptive", "adaptive_inv", "sharp_otsu")
+_GLOBAL_STATS = "*"
+
+# channel → variant → [wins, runs]; каналы без истории используют общую статистику
+_variant_stats: Dict[str, Dict[str, List[int]]] = {}
+_variant_stats_lock = threading.Lock()
+
+
+def _early_exit_enabled() -> bool:
+    return os.getenv("OCR_EARLY_EXIT", "true").lower() in ("1", "true", "yes")
+
+
+def _early_exit_score() -> float:
+    try:
+        return float(os.getenv("OCR_EARLY_EXIT_SCORE", "3.5"))
+    except ValueError:
+        return 3.5
+
+
+def _variant_min_samples() -> int:
+    return int(os.getenv("OCR_VARIANT_MIN_SAMPLES", "5"))
+
+
+def _variant_stats_key(channel: str) -> str:
+    return f"ocr:variants:{channel}"
+
+
+def _stats_for(channel: str) -> Dict[str, List[int]]:
+    stats = _variant_stats.get(channel)
+    if stats is None:
+        stats = {}
+        try:
+            from app.core.redis_cache import cache_get
+
+            stats = {k: list(v) for k, v in (cache_get(_variant_stats_key(channel)) or {}).items()}
+        except (ImportError, AttributeError, TypeError, ValueError):
+            pass
+        _variant_stats[channel] = stats
+    return stats
+
+
+def variant_order(channel: Optional[str] = None) -> List[str]:
+    """
+    Порядок вариантов препроцессинга: по win rate (сглаживание Лапласа), при равенстве — по стоимости.
+    Статистика канала используется, когда по нему накоплено OCR_VARIANT_MIN_SAMPLES картинок.
+    """
+    with _variant_stats_lock:
+        stats = _stats_for(channel) if channel else {}
+        if sum(w for w, _ in stats.values()) < _variant_min_samples():
+            stats = _stats_for(_GLOBAL_STATS)
+        rates = {n: (stats[n][0] + 1) / (stats[n][1] + 2) if n in stats else 0.5 for n in _VARIANT_NAMES}
+    return sorted(_VARIANT_NAMES, key=lambda n: (-rates[n], _VARIANT_NAMES.index(n)))
+
+
+def record_variant_result(channel: Optional[str], winner: Optional[str], tried: Sequence[str]) -> None:
+    """Учесть результат OCR одной картинки: какие варианты запускались и какой победил."""
+    if not tried:
+        return
+    keys = [_GLOBAL_STATS] + ([channel] if channel else [])
+    with _variant_stats_lock:
+        for key in keys:
+            stats = _stats_for(key)
+            for name in tried:
+                stats.setdefault(name, [0, 0])[1] += 1
+            if winner:
+                stats.setdefault(winner, [0, 0])[0] += 1
+            try:
+                from app.core.redis_cache import cache_set
+
+                cache_set(_variant_stats_key(key), stats, 30 * 86400)
+            except ImportError:
+                pass
+
+
+def _readtext(reader, img) -> Tuple[str, float]:
+    try:
+        results = reader.readtext(img, detail=1, paragraph=True)
+    except TypeError:
+        results = reader.readtext(img, detail=1)
+    texts: List[str] = []
+    confs: List[float] = []
+    for r in results or []:
+        if isinstance(r, (list, tuple)) and len(r) >= 3:
+            txt = str(r[1] or "").strip()
+            if txt:
+                texts.append(txt)
+                try:
+                    confs.append(float(r[2]))
+                except Exception:
+                    pass
+    text = " ".join(texts).strip()
+    avg_conf = (sum(confs) / len(confs)) if confs else 0.0
+    return text, avg_conf
+
+
+def _good_enough(text: str, score: float) -> bool:
+    threshold = _early_exit_score()
+    if threshold > 0 and score >= threshold:
+        return True
+    sig = parse_signal_from_text(text) if text else None
+    return bool(sig and sig.entry_price)
+
+
+def extract_text_ranked(
+    image_bytes: bytes, order: Optional[Sequence[str]] = None
+) -> Tuple[str, Optional[str], List[str]]:
+    """
+    OCR с ранней остановкой: варианты идут в порядке order (variant_order()), перебор
+    прекращается, как только score >= OCR_EARLY_EXIT_SCORE или в тексте уже есть entry price.
+    Возвращает (лучший текст, имя победившего варианта, запущенные варианты).
+    """
     reader = _get_reader()
     if not reader:
-        return ""
+        return "", None, []
 
+    tried: List[str] = []
     try:
+        variants = _named_image_variants(image_bytes)
+        rank = {n: i for i, n in enumerate(order or _VARIANT_NAMES)}
+        variants.sort(key=lambda v: rank.get(v[0], len(rank)))
+        early_exit = _early_exit_enabled()
+
         best_text = ""
         best_score = 0.0
         best_meta = None
-        idx = 0
-        for img in _make_image_variants(image_bytes):
-            idx += 1
-            try:
-                results = reader.readtext(img, detail=1, paragraph=True)
-            except TypeError:
-                results = reader.readtext(img, detail=1)
-            texts: List[str] = []
-            confs: List[float] = []
-            for r in results or []:
-                if isinstance(r, (list, tuple)) and len(r) >= 3:
-                    txt = str(r[1] or "").strip()
-                    if txt:
-                        texts.append(txt)
-                        try:
-                            confs.append(float(r[2]))
-                        except Exception:
-                            pass
-            text = " ".join(texts).strip()
-            avg_conf = (sum(confs) / len(confs)) if confs else 0.0
+        for name, img in variants:
+            tried.append(name)
+            text, avg_conf = _readtext(reader, img)
             score = _score_ocr_text(text, avg_conf)
             if score > best_score:
                 best_score = score
                 best_text = text
-                best_meta = (idx, avg_conf, len(text))
+                best_meta = (name, avg_conf, len(text))
+                if early_exit and _good_enough(text, score):
+                    break
 
         if _debug_preprocess():
-            logger.info("OCR best_variant=%s score=%.3f avg_conf=%.3f len=%s",
+            logger.info("OCR best_variant=%s score=%.3f avg_conf=%.3f len=%s tried=%s/%s",
                         best_meta[0] if best_meta else None,
                         best_score,
                         best_meta[1] if best_meta else 0.0,
-                        best_meta[2] if best_meta else 0)
+                        best_meta[2] if best_meta else 0,
+                        len(tried), len(variants))
         logger.info(f"OCR extracted {len(best_text)} chars from image")
-        return best_text
+        return best_text, (best_meta[0] if best_meta else None), tried
     except Exception as e:
         logger.error(f"OCR error: {e}")
-        return ""
+        return "", None, tried
+
+
+def extract_text_from_image(image_bytes: bytes, order: Optional[Sequence[str]] = None) -> str:
+    """Extract text from image bytes using EasyOCR (with optional preprocessing)."""
+    return extract_text_ranked(image_bytes, order if order is not None else variant_order())[0]
+
 
 def _min_chars() -> int:
     return int(os.getenv("OCR_MIN_CHARS", "25"))
@@ -203,53 +318,12 @@ def _looks_like_useful_text(text: str) -> bool:
     return alnum / max(1, len(t)) >= 0.25
 
 
-@dataclass(frozen=True)
-class _CacheEntry:
-    ts: float
-    text: str
-
-
-_cache_lock = asyncio.Lock()
-_url_text_cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
 _inflight_lock = asyncio.Lock()
 _inflight: Dict[str, asyncio.Future] = {}
 _http_client: Optional[httpx.AsyncClient] = None
 _http_client_lock = asyncio.Lock()
 
 
-def _cache_ttl_seconds() -> int:
-    return int(os.getenv("OCR_CACHE_TTL_SECONDS", "86400"))  # 24h
-
-
-def _cache_max_items() -> int:
-    return int(os.getenv("OCR_CACHE_MAX_ITEMS", "2000"))
-
-
-async def _cache_get(url: str) -> Optional[str]:
-    ttl = _cache_ttl_seconds()
-    now = time.time()
-    async with _cache_lock:
-        ent = _url_text_cache.get(url)
-        if not ent:
-            return None
-        if ttl > 0 and (now - ent.ts) > ttl:
-            _url_text_cache.pop(url, None)
-            return None
-        # LRU refresh
-        _url_text_cache.move_to_end(url)
-        return ent.text
-
-
-async def _cache_set(url: str, text: str) -> None:
-    now = time.time()
-    max_items = _cache_max_items()
-    async with _cache_lock:
-        _url_text_cache[url] = _CacheEntry(ts=now, text=text)
-        _url_text_cache.move_to_end(url)
-        if max_items > 0:
-            while len(_url_text_cache) > max_items:
-                _url_text_cache.popitem(last=False)
-
 async def _get_http_client() -> httpx.AsyncClient:
     global _http_client
     async with _http_client_lock:
@@ -322,28 +396,25 @@ async def _run_singleflight(image_url: str, coro):
         async with _inflight_lock:
             _inflight.pop(image_url, None)
 
-async def extract_text_from_url(image_url: str) -> str:
-    """Download image and extract text."""
+async def extract_text_from_url(image_url: str, channel: Optional[str] = None) -> str:
+    """Download image and extract text (channel — для статистики вариантов OCR)."""
     if not _is_safe_public_image_url(image_url):
         logger.warning("OCR URL blocked by SSRF guard: %s", image_url)
         return ""
 
-    cached = await _cache_get(image_url)
-    if cached is not None:
-        logger.debug("OCR cache hit for url=%s len=%s", image_url, len(cached))
-        return cached
-
     async def _do():
         try:
+            from app.services.collect_concurrency import host_limiter
+            from app.services.ocr_pool import ocr_image_bytes
+
             client = await _get_http_client()
+            await host_limiter(urlparse(image_url).hostname)
             r = await client.get(image_url)
             if r.status_code == 200 and len(r.content) > 1000:
-                text = extract_text_from_image(r.content)
-                await _cache_set(image_url, text or "")
-                return text
+                # OCR в пуле процессов, результат кэшируется по хэшу содержимого картинки (не по URL)
+                return (await ocr_image_bytes(r.content, channel=channel)) or ""
         except Exception as e:
             logger.error(f"Image download error: {e}")
-        await _cache_set(image_url, "")
         return ""
 
     # singleflight avoids repeated downloads/OCR for same URL during a run
@@ -358,9 +429,9 @@ def parse_signal_from_image(image_bytes: bytes) -> Optional[ParsedSignal]:
     return parse_signal_from_text(text)
 
 
-async def parse_signal_from_image_url(image_url: str) -> Optional[ParsedSignal]:
+async def parse_signal_from_image_url(image_url: str, channel: Optional[str] = None) -> Optional[ParsedSignal]:
     """Download image, OCR it, parse signal."""
-    text = await extract_text_from_url(image_url)
+    text = await extract_text_from_url(image_url, channel=channel)
     if not text or not _looks_like_useful_text(text):
         return None
     return parse_signal_from_text(text)
@@ -0,0 +1,357 @@
+"""
+Векторизованный расчёт SignalOutcome по общему окну свечей (фаза 11, batch-режим).
+
+Семантика — ровно как у compute_outcome_from_candles (parity-тесты в
+tests/test_outcome_batch_engine.py): NumPy ищет индексы баров (вход, SL, TP, окно MFE/MAE)
+сразу для всех сигналов группы (asset, timeframe), а итоговые цены и MFE/MAE
+берутся из исходных Decimal-свечей по найденным индексам.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.candle_index import CandleIndex
+from app.services.outcome_candle_engine import (
+    ENGINE_VERSION,
+    POLICY_REF_V0,
+    OhlcCandle,
+    _normalize_ts,
+    _sanitize_sl,
+    compute_outcome_from_candles,
+    mop_reference_price,
+    timeframe_to_delta,
+    to_epoch_us,
+)
+
+_US = timedelta(microseconds=1)
+
+_MODEL_CODES = {"market_on_publish": 0, "first_touch_limit": 1, "midpoint_entry": 2}
+
+# Ограничение на размер булевых матриц (сигналы × бары) одного прохода.
+_MAX_CELLS_PER_CHUNK = 4_000_000
+
+
+@dataclass(frozen=True)
+class OutcomeSpec:
+    """Входные данные одного outcome (то же, что передаётся в compute_outcome_from_candles)."""
+
+    model_key: str
+    direction: str
+    entry_price: Decimal
+    stop_loss: Optional[Decimal]
+    signal_time: datetime
+    midpoint_price: Optional[Decimal] = None
+    take_profit_levels: Sequence[Decimal] = field(default_factory=tuple)
+
+
+@dataclass(frozen=True)
+class CandleArrays:
+    """Общее окно свечей группы: Decimal-свечи + колонки NumPy для поиска индексов."""
+
+    candles: Sequence[OhlcCandle]
+    ts: np.ndarray  # int64, микросекунды UTC
+    high: np.ndarray  # float64
+    low: np.ndarray  # float64
+
+    @classmethod
+    def from_candles(cls, candles: Sequence[OhlcCandle]) -> "CandleArrays":
+        from app.services.candle_store import CandleSeries
+
+        if isinstance(candles, CandleSeries):
+            # Окно из локального хранилища: колонки уже NumPy (mmap) — без копирования.
+            return cls(candles=candles, ts=candles.ts, high=candles.high, low=candles.low)
+        n = len(candles)
+        ts = np.fromiter((to_epoch_us(c.ts_open) for c in candles), dtype=np.int64, count=n)
+        high = np.fromiter((float(c.high) for c in candles), dtype=np.float64, count=n)
+        low = np.fromiter((float(c.low) for c in candles), dtype=np.float64, count=n)
+        return cls(candles=candles, ts=ts, high=high, low=low)
+
+    def __len__(self) -> int:
+        return len(self.candles)
+
+    def window_bounds(self, from_ts: datetime, to_ts: datetime) -> Tuple[int, int]:
+        """[lo, hi) свечей с from_ts <= ts_open <= to_ts (как WHERE в list_candles_from_db)."""
+        lo = int(np.searchsorted(self.ts, to_epoch_us(from_ts), side="left"))
+        hi = int(np.searchsorted(self.ts, to_epoch_us(to_ts), side="right"))
+        return lo, max(lo, hi)
+
+
+def _first_hit(mask: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Первый столбец j в [start, end) с mask[row, j]; -1 если нет."""
+    cols = np.arange(mask.shape[1])
+    m = mask & (cols >= start[:, None]) & (cols < end[:, None])
+    hit = m.any(axis=1)
+    return np.where(hit, m.argmax(axis=1), -1)
+
+
+def _incomplete(code: str, message: str, *, entry_reached: Optional[bool]) -> Tuple[str, dict[str, Any]]:
+    return "DATA_INCOMPLETE", {
+        "entry_reached": entry_reached,
+        "error_detail": {"code": code, "message": message},
+        "policy_ref": POLICY_REF_V0,
+        "market_data_version": ENGINE_VERSION,
+    }
+
+
+def compute_outcomes_batch(
+    arrays: CandleArrays,
+    specs: Sequence[OutcomeSpec],
+    *,
+    timeframe: str,
+    windows: Optional[Sequence[Tuple[int, int]]] = None,
+    mop_reference: str = "close",
+    sl_before_tp_same_bar: bool = True,
+) -> List[Tuple[str, dict[str, Any]]]:
+    """
+    Пакетный аналог compute_outcome_from_candles.
+
+    windows[i] = (lo, hi): срез общего окна, который для сигнала i играет роль списка candles
+    в скалярном движке (по умолчанию всё окно). Результаты — в порядке specs.
+    """
+    n_specs = len(specs)
+    if windows is None:
+        windows = [(0, len(arrays))] * n_specs
+    results: List[Optional[Tuple[str, dict[str, Any]]]] = [None] * n_specs
+
+    vec_idx: List[int] = []
+    for i, s in enumerate(specs):
+        lo, hi = windows[i]
+        if hi <= lo:
+            results[i] = compute_outcome_from_candles(
+                model_key=s.model_key,
+                direction=s.direction,
+                entry_price=s.entry_price,
+                take_profit=None,
+                stop_loss=s.stop_loss,
+                signal_time=s.signal_time,
+                candles=[],
+                timeframe=timeframe,
+            )
+            continue
+        mk = (s.model_key or "").strip()
+        d = (s.direction or "").upper()
+        if mk not in _MODEL_CODES or d not in ("LONG", "SHORT"):
+            # Редкие ветки ошибок — через эталонный движок, чтобы не дублировать их порядок проверок.
+            results[i] = compute_outcome_from_candles(
+                model_key=s.model_key,
+                direction=s.direction,
+                entry_price=s.entry_price,
+                take_profit=None,
+                stop_loss=s.stop_loss,
+                signal_time=s.signal_time,
+                candles=arrays.candles[lo:hi],
+                timeframe=timeframe,
+                midpoint_price=s.midpoint_price,
+                take_profit_levels=s.take_profit_levels,
+                mop_reference=mop_reference,
+                sl_before_tp_same_bar=sl_before_tp_same_bar,
+            )
+            continue
+        vec_idx.append(i)
+
+    vec_idx.sort(key=lambda i: windows[i])
+    chunk: List[int] = []
+    c_lo = c_hi = 0
+    for i in vec_idx:
+        lo, hi = windows[i]
+        n_lo = min(c_lo, lo) if chunk else lo
+        n_hi = max(c_hi, hi) if chunk else hi
+        if chunk and (len(chunk) + 1) * (n_hi - n_lo) > _MAX_CELLS_PER_CHUNK:
+            _compute_chunk(arrays, specs, windows, chunk, results, timeframe, mop_reference, sl_before_tp_same_bar)
+            chunk, n_lo, n_hi = [], lo, hi
+        chunk.append(i)
+        c_lo, c_hi = n_lo, n_hi
+    if chunk:
+        _compute_chunk(arrays, specs, windows, chunk, results, timeframe, mop_reference, sl_before_tp_same_bar)
+
+    return results  # type: ignore[return-value]
+
+
+def _compute_chunk(
+    arrays: CandleArrays,
+    specs: Sequence[OutcomeSpec],
+    windows: Sequence[Tuple[int, int]],
+    chunk: List[int],
+    results: List[Optional[Tuple[str, dict[str, Any]]]],
+    timeframe: str,
+    mop_reference: str,
+    sl_before_tp_same_bar: bool,
+) -> None:
+    delta = timeframe_to_delta(timeframe)
+    delta_us = delta // _US
+    m = len(chunk)
+    base = min(windows[i][0] for i in chunk)
+    top = max(windows[i][1] for i in chunk)
+    ts = arrays.ts[base:top]
+    high = arrays.high[base:top]
+    low = arrays.low[base:top]
+
+    lo = np.fromiter((windows[i][0] - base for i in chunk), dtype=np.int64, count=m)
+    hi = np.fromiter((windows[i][1] - base for i in chunk), dtype=np.int64, count=m)
+    st_us = np.fromiter((to_epoch_us(specs[i].signal_time) for i in chunk), dtype=np.int64, count=m)
+    is_long = np.fromiter(((specs[i].direction or "").upper() == "LONG" for i in chunk), dtype=bool, count=m)
+    model = np.fromiter((_MODEL_CODES[(specs[i].model_key or "").strip()] for i in chunk), dtype=np.int8, count=m)
+
+    # _find_candle_index: первая свеча среза с ts > st - delta (содержит st либо первая после).
+    idx0 = np.maximum(lo, np.searchsorted(ts, st_us - delta_us, side="right"))
+
+    entry_dec: List[Decimal] = []
+    sl_dec: List[Optional[Decimal]] = []
+    tp_dec: List[List[Decimal]] = []
+    for i in chunk:
+        s = specs[i]
+        d = (s.direction or "").upper()
+        if _MODEL_CODES[(s.model_key or "").strip()] == 2 and s.midpoint_price is not None:
+            entry_dec.append(s.midpoint_price)
+        else:
+            entry_dec.append(s.entry_price)
+        sl_dec.append(_sanitize_sl(d, s.entry_price, s.stop_loss))
+        tp_dec.append([Decimal(str(x)) for x in (s.take_profit_levels or ())])
+
+    level = np.array([float(x) for x in entry_dec], dtype=np.float64)
+    sl = np.array([float(x) if x is not None else np.nan for x in sl_dec], dtype=np.float64)
+    n_tp = np.array([len(x) for x in tp_dec], dtype=np.int64)
+    k_max = int(n_tp.max()) if m else 0
+    tp = np.full((m, k_max), np.nan, dtype=np.float64)
+    for r, levels in enumerate(tp_dec):
+        if levels:
+            tp[r, : len(levels)] = [float(x) for x in levels]
+
+    # Вход: MOP — свеча публикации; лимитные модели — первое касание уровня (LONG: low <= L, SHORT: high >= L).
+    is_mop = model == 0
+    touch = np.where(is_long[:, None], low[None, :] <= level[:, None], high[None, :] >= level[:, None])
+    touch_idx = _first_hit(touch, idx0, hi)
+    entry_idx = np.where(is_mop, idx0, touch_idx)
+    exit_start = np.where(is_mop, idx0 + 1, touch_idx)
+
+    scan = (idx0 < hi) & (entry_idx >= 0) & (exit_start < hi)
+    start = np.where(scan, exit_start, hi)
+
+    # SL: первая свеча пробоя начиная с exit_start (NaN-уровень не срабатывает никогда).
+    with np.errstate(invalid="ignore"):
+        sl_mask = np.where(is_long[:, None], low[None, :] <= sl[:, None], high[None, :] >= sl[:, None])
+    sl_bar = _first_hit(sl_mask, start, hi)
+
+    # TP по порядку уровней: уровень k не раньше бара уровня k-1 (несколько уровней на одной свече).
+    tp_bar = np.full((m, k_max), -1, dtype=np.int64)
+    prev = start.copy()
+    for k in range(k_max):
+        with np.errstate(invalid="ignore"):
+            mask_k = np.where(is_long[:, None], high[None, :] >= tp[:, k : k + 1], low[None, :] <= tp[:, k : k + 1])
+        t_k = _first_hit(mask_k, prev, hi)
+        t_k = np.where((k < n_tp) & (prev < hi), t_k, -1)
+        tp_bar[:, k] = t_k
+        prev = np.where(t_k >= 0, t_k, hi)
+
+    rows = np.arange(m)
+    t_last = np.where(n_tp > 0, tp_bar[rows, np.maximum(n_tp - 1, 0)] if k_max else -1, -1)
+    sl_hit = (sl_bar >= 0) & ((t_last < 0) | (t_last >= sl_bar))
+    if sl_before_tp_same_bar:
+        counted = (tp_bar >= 0) & (~sl_hit[:, None] | (tp_bar < sl_bar[:, None]))
+    else:
+        counted = (tp_bar >= 0) & (~sl_hit[:, None] | (tp_bar <= sl_bar[:, None]))
+    tp_count = counted.sum(axis=1) if k_max else np.zeros(m, dtype=np.int64)
+    outcome_i = np.where(sl_hit, sl_bar, np.where((n_tp > 0) & (t_last >= 0), t_last, hi - 1))
+
+    # Окно MFE/MAE: [exit_start, outcome_i] — экстремумы high/low по sparse table, O(1) на сигнал.
+    ix = CandleIndex(ts, high, low)
+    last = max(0, top - base - 1)
+    q_lo = np.where(scan, start, 0).clip(0, last)
+    q_hi = np.maximum(np.where(scan, outcome_i, 0).clip(0, last), q_lo)
+    i_hi = ix.argmax_high_many(q_lo, q_hi) if m and top > base else np.zeros(m, dtype=np.int64)
+    i_lo = ix.argmin_low_many(q_lo, q_hi) if m and top > base else np.zeros(m, dtype=np.int64)
+
+    candles = arrays.candles
+    for r, i in enumerate(chunk):
+        s = specs[i]
+        st = _normalize_ts(s.signal_time)
+        if idx0[r] >= hi[r]:
+            results[i] = _incomplete("signal_after_candles", "Сигнал позже доступных свечей", entry_reached=False)
+            continue
+        mk_code = int(model[r])
+        if entry_idx[r] < 0:
+            if mk_code == 1:
+                results[i] = _incomplete(
+                    "entry_not_touched", "Лимитный вход не касался свечей в окне", entry_reached=False
+                )
+            else:
+                results[i] = _incomplete(
+                    "midpoint_not_touched", "Midpoint не касался свечей в окне", entry_reached=False
+                )
+            continue
+
+        e_abs = base + int(entry_idx[r])
+        if mk_code == 0:
+            entry_fill = mop_reference_price(candles[e_abs], mop_reference)
+        else:
+            entry_fill = entry_dec[r]
+
+        if not scan[r]:
+            t_entry = int((candles[e_abs].ts_open + delta - st).total_seconds())
+            results[i] = (
+                "COMPLETE",
+                {
+                    "outcome_status": "COMPLETE",
+                    "entry_reached": True,
+                    "entry_fill_price": entry_fill,
+                    "tp_hits": [],
+                    "sl_hit": False,
+                    "expiry_hit": True,
+                    "mfe": Decimal(0),
+                    "mae": Decimal(0),
+                    "time_to_entry_sec": max(0, t_entry),
+                    "time_to_outcome_sec": max(0, t_entry),
+                    "policy_ref": POLICY_REF_V0,
+                    "market_data_version": ENGINE_VERSION,
+                },
+            )
+            continue
+
+        n_hit = int(tp_count[r])
+        levels = tp_dec[r]
+        tp_hits = [{"level": k + 1, "price": str(levels[k])} for k in range(n_hit)]
+        hit_sl = bool(sl_hit[r])
+
+        c_hi = candles[base + int(i_hi[r])]
+        c_lo = candles[base + int(i_lo[r])]
+        if is_long[r]:
+            up = c_hi.high - entry_fill
+            down = entry_fill - c_lo.low
+        else:
+            up = entry_fill - c_lo.low
+            down = c_hi.high - entry_fill
+        mfe = up if up > 0 else Decimal(0)
+        mae = down if down > 0 else Decimal(0)
+
+        if levels:
+            expiry_hit = not hit_sl and n_hit < len(levels)
+        else:
+            expiry_hit = not hit_sl and n_hit == 0
+        t_entry = int(
+            (candles[e_abs].ts_open + (delta if mk_code == 0 else timedelta(0)) - st).total_seconds()
+        )
+        out_ts = candles[base + int(outcome_i[r])].ts_open + delta
+        t_out = int((out_ts - st).total_seconds())
+
+        results[i] = (
+            "COMPLETE",
+            {
+                "outcome_status": "COMPLETE",
+                "entry_reached": True,
+                "entry_fill_price": entry_fill,
+                "tp_hits": tp_hits or None,
+                "sl_hit": hit_sl,
+                "expiry_hit": expiry_hit,
+                "mfe": mfe,
+                "mae": mae,
+                "time_to_entry_sec": max(0, t_entry),
+                "time_to_outcome_sec": max(0, t_out),
+                "policy_ref": POLICY_REF_V0,
+                "market_data_version": ENGINE_VERSION,
+            },
+        )
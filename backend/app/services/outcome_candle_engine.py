@@ -2,11 +2,13 @@
 Расчёт canonical SignalOutcome по OHLC-свечам (фаза 11).
 
 Семантика v0: MARKET_OUTCOME_POLICY.md + engine_version в policy_ref.
-Источник свечей: сначала market_candles (если таблица есть), иначе CoinGecko /ohlc.
+Источник свечей: сначала market_candles (через локальный candle_store, если включён),
+иначе CoinGecko /ohlc.
 """
 from __future__ import annotations
 
 import logging
+from bisect import bisect_right
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
@@ -15,6 +17,8 @@ from typing import Any, List, Optional, Sequence, Tuple
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from app.services.candle_index import CandleSearch, index_for
+
 logger = logging.getLogger(__name__)
 
 POLICY_REF_V0 = "MARKET_OUTCOME_POLICY.md#candle_engine_v0.2"
@@ -72,6 +76,14 @@ def _normalize_ts(dt: datetime) -> datetime:
     return dt.astimezone(timezone.utc)
 
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_epoch_us(dt: datetime) -> int:
+    """UTC datetime → int64 микросекунды (точно, без float)."""
+    return (_normalize_ts(dt) - _EPOCH) // timedelta(microseconds=1)
+
+
 def list_candles_from_db(
     db: Session,
     *,
@@ -79,10 +91,17 @@ def list_candles_from_db(
     timeframe: str,
     from_ts: datetime,
     to_ts: datetime,
-) -> Tuple[List[OhlcCandle], Optional[str]]:
+) -> Tuple[Sequence[OhlcCandle], Optional[str]]:
     symbol = _asset_to_db_symbol(asset)
     if not symbol:
         return [], None
+    from app.services.candle_store import read_window
+
+    series = read_window(db, symbol=symbol, timeframe=timeframe, from_ts=from_ts, to_ts=to_ts)
+    if series is not None:
+        if not len(series):
+            return [], None
+        return series, f"store.market_candles.{timeframe}"
     try:
         q = text(
             """
@@ -188,7 +207,7 @@ def load_candles_for_window(
     signal_time: datetime,
     lookahead_days: int,
     timeframe: str,
-) -> Tuple[List[OhlcCandle], Optional[str]]:
+) -> Tuple[Sequence[OhlcCandle], Optional[str]]:
     st = _normalize_ts(signal_time)
     end = st + timedelta(days=max(1, lookahead_days))
     candles, src = list_candles_from_db(db, asset=asset, timeframe=timeframe, from_ts=st, to_ts=end)
@@ -203,13 +222,35 @@ def load_candles_for_window(
 
 
 def _find_candle_index(signal_time: datetime, candles: Sequence[OhlcCandle], delta: timedelta) -> int:
+    """Свеча, содержащая signal_time, иначе первая после неё; candles отсортированы — бинарный поиск."""
     st = _normalize_ts(signal_time)
-    for i, c in enumerate(candles):
-        if c.ts_open <= st < c.ts_open + delta:
-            return i
-    for i, c in enumerate(candles):
-        if c.ts_open >= st:
-            return i
+    i = bisect_right(candles, st - delta, key=lambda c: c.ts_open)
+    return i if i < len(candles) else -1
+
+
+def _first_low_le(ix: CandleSearch, candles: Sequence[OhlcCandle], level: Decimal, start: int, end: Optional[int] = None) -> int:
+    """Первый бар с low <= level: кандидат по float-индексу, подтверждение по Decimal."""
+    lvl = float(level)
+    i = ix.first_low_le(lvl, start, end)
+    while i >= 0 and not candles[i].low <= level:
+        i = ix.first_low_le(lvl, i + 1, end)
+    return i
+
+
+def _first_high_ge(ix: CandleSearch, candles: Sequence[OhlcCandle], level: Decimal, start: int, end: Optional[int] = None) -> int:
+    lvl = float(level)
+    i = ix.first_high_ge(lvl, start, end)
+    while i >= 0 and not candles[i].high >= level:
+        i = ix.first_high_ge(lvl, i + 1, end)
+    return i
+
+
+def _first_entry_touch(ix: CandleSearch, candles: Sequence[OhlcCandle], d: str, level: Decimal, start: int) -> int:
+    """Касание лимитного уровня: LONG — low <= L, SHORT — high >= L."""
+    if d == "LONG":
+        return _first_low_le(ix, candles, level, start)
+    if d == "SHORT":
+        return _first_high_ge(ix, candles, level, start)
     return -1
 
 
@@ -244,32 +285,75 @@ def mop_reference_price(candle: OhlcCandle, mode: str) -> Decimal:
     return candle.close
 
 
-def _mfe_mae_long(entry: Decimal, candles: Sequence[OhlcCandle], start_i: int, end_i: int) -> Tuple[Decimal, Decimal]:
-    mfe = Decimal(0)
-    mae = Decimal(0)
-    for i in range(start_i, min(end_i + 1, len(candles))):
-        c = candles[i]
-        up = c.high - entry
-        down = entry - c.low
-        if up > mfe:
-            mfe = up
-        if down > mae:
-            mae = down
-    return mfe, mae
-
-
-def _mfe_mae_short(entry: Decimal, candles: Sequence[OhlcCandle], start_i: int, end_i: int) -> Tuple[Decimal, Decimal]:
-    mfe = Decimal(0)
-    mae = Decimal(0)
-    for i in range(start_i, min(end_i + 1, len(candles))):
-        c = candles[i]
-        up = entry - c.low
-        down = c.high - entry
-        if up > mfe:
-            mfe = up
-        if down > mae:
-            mae = down
-    return mfe, mae
+def _mfe_mae_long(
+    entry: Decimal,
+    candles: Sequence[OhlcCandle],
+    start_i: int,
+    end_i: int,
+    ix: Optional[CandleSearch] = None,
+) -> Tuple[Decimal, Decimal]:
+    end_i = min(end_i, len(candles) - 1)
+    if start_i > end_i:
+        return Decimal(0), Decimal(0)
+    ix = ix or index_for(candles)
+    up = candles[ix.argmax_high(start_i, end_i)].high - entry
+    down = entry - candles[ix.argmin_low(start_i, end_i)].low
+    return (up if up > 0 else Decimal(0)), (down if down > 0 else Decimal(0))
+
+
+def _mfe_mae_short(
+    entry: Decimal,
+    candles: Sequence[OhlcCandle],
+    start_i: int,
+    end_i: int,
+    ix: Optional[CandleSearch] = None,
+) -> Tuple[Decimal, Decimal]:
+    end_i = min(end_i, len(candles) - 1)
+    if start_i > end_i:
+        return Decimal(0), Decimal(0)
+    ix = ix or index_for(candles)
+    up = entry - candles[ix.argmin_low(start_i, end_i)].low
+    down = candles[ix.argmax_high(start_i, end_i)].high - entry
+    return (up if up > 0 else Decimal(0)), (down if down > 0 else Decimal(0))
+
+
+def _exit_scan(
+    candles: Sequence[OhlcCandle],
+    ix: CandleSearch,
+    exit_start: int,
+    tp_levels: List[Decimal],
+    sl: Optional[Decimal],
+    sl_first: bool,
+    long: bool,
+) -> Tuple[bool, List[dict], int, int]:
+    """
+    sl_hit, tp_hits, outcome_bar_index, tp_idx (сколько уровней закрыто).
+
+    Эквивалент побарного прохода: бар SL и бары TP (по порядку уровней, несколько на одной свече)
+    ищутся по индексу; при SL и TP на одном баре порядок задаёт sl_first.
+    """
+    sl_touch = _first_low_le if long else _first_high_ge
+    tp_touch = _first_high_ge if long else _first_low_le
+    sl_bar = sl_touch(ix, candles, sl, exit_start) if sl is not None else -1
+    tp_end = sl_bar + 1 if sl_bar >= 0 else None
+    hit_bars: List[int] = []
+    prev = exit_start
+    for lvl in tp_levels:
+        t = tp_touch(ix, candles, lvl, prev, tp_end)
+        if t < 0:
+            break
+        hit_bars.append(t)
+        prev = t
+    all_hit = bool(tp_levels) and len(hit_bars) == len(tp_levels)
+    t_last = hit_bars[-1] if all_hit else -1
+    sl_hit = sl_bar >= 0 and (t_last < 0 or t_last >= sl_bar)
+    if sl_hit:
+        hit_bars = [t for t in hit_bars if (t < sl_bar if sl_first else t <= sl_bar)]
+        outcome_i = sl_bar
+    else:
+        outcome_i = t_last if all_hit else len(candles) - 1
+    tp_hits = [{"level": k + 1, "price": str(tp_levels[k])} for k in range(len(hit_bars))]
+    return sl_hit, tp_hits, outcome_i, len(hit_bars)
 
 
 def _exit_scan_long(
@@ -278,39 +362,10 @@ def _exit_scan_long(
     tp_levels: List[Decimal],
     sl: Optional[Decimal],
     sl_first: bool,
+    ix: Optional[CandleSearch] = None,
 ) -> Tuple[bool, List[dict], int, int]:
     """sl_hit, tp_hits, outcome_bar_index, tp_idx (сколько уровней закрыто)."""
-    last_i = len(candles) - 1
-    outcome_i = last_i
-    tp_hits: List[dict] = []
-    tp_idx = 0
-    sl_hit = False
-    for i in range(exit_start, len(candles)):
-        c = candles[i]
-        if sl_first:
-            if sl is not None and c.low <= sl:
-                sl_hit = True
-                outcome_i = i
-                break
-            while tp_idx < len(tp_levels) and c.high >= tp_levels[tp_idx]:
-                tp_hits.append({"level": tp_idx + 1, "price": str(tp_levels[tp_idx])})
-                tp_idx += 1
-            if sl is not None and c.low <= sl:
-                sl_hit = True
-                outcome_i = i
-                break
-        else:
-            while tp_idx < len(tp_levels) and c.high >= tp_levels[tp_idx]:
-                tp_hits.append({"level": tp_idx + 1, "price": str(tp_levels[tp_idx])})
-                tp_idx += 1
-            if sl is not None and c.low <= sl:
-                sl_hit = True
-                outcome_i = i
-                break
-        if tp_levels and tp_idx >= len(tp_levels):
-            outcome_i = i
-            break
-    return sl_hit, tp_hits, outcome_i, tp_idx
+    return _exit_scan(candles, ix or index_for(candles), exit_start, tp_levels, sl, sl_first, True)
 
 
 def _exit_scan_short(
@@ -319,38 +374,9 @@ def _exit_scan_short(
     tp_levels: List[Decimal],
     sl: Optional[Decimal],
     sl_first: bool,
+    ix: Optional[CandleSearch] = None,
 ) -> Tuple[bool, List[dict], int, int]:
-    last_i = len(candles) - 1
-    outcome_i = last_i
-    tp_hits: List[dict] = []
-    tp_idx = 0
-    sl_hit = False
-    for i in range(exit_start, len(candles)):
-        c = candles[i]
-        if sl_first:
-            if sl is not None and c.high >= sl:
-                sl_hit = True
-                outcome_i = i
-                break
-            while tp_idx < len(tp_levels) and c.low <= tp_levels[tp_idx]:
-                tp_hits.append({"level": tp_idx + 1, "price": str(tp_levels[tp_idx])})
-                tp_idx += 1
-            if sl is not None and c.high >= sl:
-                sl_hit = True
-                outcome_i = i
-                break
-        else:
-            while tp_idx < len(tp_levels) and c.low <= tp_levels[tp_idx]:
-                tp_hits.append({"level": tp_idx + 1, "price": str(tp_levels[tp_idx])})
-                tp_idx += 1
-            if sl is not None and c.high >= sl:
-                sl_hit = True
-                outcome_i = i
-                break
-        if tp_levels and tp_idx >= len(tp_levels):
-            outcome_i = i
-            break
-    return sl_hit, tp_hits, outcome_i, tp_idx
+    return _exit_scan(candles, ix or index_for(candles), exit_start, tp_levels, sl, sl_first, False)
 
 
 def compute_outcome_from_candles(
@@ -405,6 +431,7 @@ def compute_outcome_from_candles(
             "market_data_version": ENGINE_VERSION,
         }
 
+    ix = index_for(candles)
     entry_idx: int
     entry_fill: Decimal
     exit_start: int
@@ -416,21 +443,7 @@ def compute_outcome_from_candles(
         entry_reached = True
     elif mk == "first_touch_limit":
         entry_lvl = entry_price
-        entry_idx = -1
-        for i in range(idx0, len(candles)):
-            c = candles[i]
-            if d == "LONG" and c.low <= entry_lvl <= c.high:
-                entry_idx = i
-                break
-            if d == "LONG" and c.low <= entry_lvl:
-                entry_idx = i
-                break
-            if d == "SHORT" and c.low <= entry_lvl <= c.high:
-                entry_idx = i
-                break
-            if d == "SHORT" and c.high >= entry_lvl:
-                entry_idx = i
-                break
+        entry_idx = _first_entry_touch(ix, candles, d, entry_lvl, idx0)
         if entry_idx < 0:
             return "DATA_INCOMPLETE", {
                 "entry_reached": False,
@@ -444,21 +457,7 @@ def compute_outcome_from_candles(
     elif mk == "midpoint_entry":
         mid = midpoint_price if midpoint_price is not None else entry_price
         entry_lvl = mid
-        entry_idx = -1
-        for i in range(idx0, len(candles)):
-            c = candles[i]
-            if d == "LONG" and c.low <= entry_lvl <= c.high:
-                entry_idx = i
-                break
-            if d == "LONG" and c.low <= entry_lvl:
-                entry_idx = i
-                break
-            if d == "SHORT" and c.high >= entry_lvl:
-                entry_idx = i
-                break
-            if d == "SHORT" and c.low <= entry_lvl <= c.high:
-                entry_idx = i
-                break
+        entry_idx = _first_entry_touch(ix, candles, d, entry_lvl, idx0)
         if entry_idx < 0:
             return "DATA_INCOMPLETE", {
                 "entry_reached": False,
@@ -495,14 +494,14 @@ def compute_outcome_from_candles(
 
     if d == "LONG":
         sl_hit, tp_hits, outcome_i, tp_idx = _exit_scan_long(
-            candles, exit_start, tp_levels, sl, sl_before_tp_same_bar
+            candles, exit_start, tp_levels, sl, sl_before_tp_same_bar, ix
         )
-        mfe, mae = _mfe_mae_long(entry_fill, candles, exit_start, outcome_i)
+        mfe, mae = _mfe_mae_long(entry_fill, candles, exit_start, outcome_i, ix)
     elif d == "SHORT":
         sl_hit, tp_hits, outcome_i, tp_idx = _exit_scan_short(
-            candles, exit_start, tp_levels, sl, sl_before_tp_same_bar
+            candles, exit_start, tp_levels, sl, sl_before_tp_same_bar, ix
         )
-        mfe, mae = _mfe_mae_short(entry_fill, candles, exit_start, outcome_i)
+        mfe, mae = _mfe_mae_short(entry_fill, candles, exit_start, outcome_i, ix)
     else:
         return "ERROR", {
             "error_detail": {"code": "unknown_direction", "message": d},
@@ -3,10 +3,12 @@
 """
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from typing import Any, Optional
+from typing import Any, Optional, Sequence
 
+from sqlalchemy import update
 from sqlalchemy.orm import Session, joinedload
 
 from app.core.config import get_settings
@@ -16,10 +18,14 @@ from app.models.normalized_signal import NormalizedSignal
 from app.models.raw_ingestion import RawEvent
 from app.models.signal_outcome import SignalOutcome
 
+from app.services.outcome_batch_engine import CandleArrays, OutcomeSpec, compute_outcomes_batch
 from app.services.outcome_candle_engine import (
     ENGINE_VERSION,
+    OhlcCandle,
+    _asset_to_db_symbol,
     _midpoint_entry,
     compute_outcome_from_candles,
+    list_candles_from_db,
     load_candles_for_window,
 )
 from app.services.outcome_tp_levels import collect_take_profit_levels
@@ -37,6 +43,101 @@ def _signal_time_utc(ns: NormalizedSignal, raw: Optional[RawEvent]) -> datetime:
     return t.astimezone(timezone.utc)
 
 
+def _outcome_spec(
+    ns: NormalizedSignal,
+    em: ExecutionModel,
+    raw: Optional[RawEvent],
+    ex: Optional[Extraction],
+) -> OutcomeSpec:
+    entry = Decimal(str(ns.entry_price))
+    primary_tp = Decimal(str(ns.take_profit)) if ns.take_profit is not None else None
+    return OutcomeSpec(
+        model_key=em.model_key,
+        direction=ns.direction,
+        entry_price=entry,
+        stop_loss=Decimal(str(ns.stop_loss)) if ns.stop_loss is not None else None,
+        signal_time=_signal_time_utc(ns, raw),
+        midpoint_price=_midpoint_entry(ns),
+        take_profit_levels=tuple(
+            collect_take_profit_levels(
+                ex.extracted_fields if ex else None,
+                primary_tp,
+                ns.direction,
+                entry,
+            )
+        ),
+    )
+
+
+def _compute_single(spec: OutcomeSpec, candles: Sequence[OhlcCandle], timeframe: str) -> tuple[str, dict[str, Any]]:
+    settings = get_settings()
+    return compute_outcome_from_candles(
+        model_key=spec.model_key,
+        direction=spec.direction,
+        entry_price=spec.entry_price,
+        take_profit=None,
+        stop_loss=spec.stop_loss,
+        signal_time=spec.signal_time,
+        candles=candles,
+        timeframe=timeframe,
+        midpoint_price=spec.midpoint_price,
+        take_profit_levels=list(spec.take_profit_levels),
+        mop_reference=settings.OUTCOME_MOP_REFERENCE,
+        sl_before_tp_same_bar=settings.OUTCOME_INTRABAR_SL_BEFORE_TP,
+    )
+
+
+def _outcome_row_values(
+    status: str,
+    fields: dict[str, Any],
+    data_src: Optional[str],
+    now: datetime,
+) -> dict[str, Any]:
+    """Значения колонок SignalOutcome по результату движка (общие для поштучного и batch-пути)."""
+    ver_suffix = f"{data_src or 'none'}|{ENGINE_VERSION}"[:64]
+    if status == "COMPLETE":
+        return {
+            "calculated_at": now,
+            "outcome_status": "COMPLETE",
+            "entry_reached": fields.get("entry_reached"),
+            "entry_fill_price": fields.get("entry_fill_price"),
+            "tp_hits": fields.get("tp_hits"),
+            "sl_hit": fields.get("sl_hit"),
+            "expiry_hit": fields.get("expiry_hit"),
+            "mfe": fields.get("mfe"),
+            "mae": fields.get("mae"),
+            "time_to_entry_sec": fields.get("time_to_entry_sec"),
+            "time_to_outcome_sec": fields.get("time_to_outcome_sec"),
+            "policy_ref": fields.get("policy_ref"),
+            "market_data_version": ver_suffix,
+            "error_detail": None,
+        }
+    if status == "DATA_INCOMPLETE":
+        return {
+            "calculated_at": now,
+            "outcome_status": "DATA_INCOMPLETE",
+            "entry_reached": fields.get("entry_reached"),
+            "entry_fill_price": None,
+            "tp_hits": None,
+            "sl_hit": None,
+            "expiry_hit": None,
+            "mfe": None,
+            "mae": None,
+            "time_to_entry_sec": None,
+            "time_to_outcome_sec": None,
+            "policy_ref": fields.get("policy_ref"),
+            "market_data_version": ver_suffix,
+            "error_detail": fields.get("error_detail") or {"code": "data_incomplete"},
+        }
+    return {
+        "calculated_at": now,
+        "outcome_status": "ERROR",
+        "error_detail": fields.get("error_detail") or {"code": "engine_error"},
+        "policy_ref": fields.get("policy_ref"),
+        "market_data_version": ver_suffix,
+    }
+
+
 def recalculate_signal_outcome_from_candles(
     db: Session,
     *,
@@ -71,84 +172,19 @@ def recalculate_signal_outcome_from_candles(
         return None, "missing normalized_signal or execution_model"
 
     raw = db.query(RawEvent).filter(RawEvent.id == ns.raw_event_id).first()
-    sig_time = _signal_time_utc(ns, raw)
+    ex = db.query(Extraction).filter(Extraction.id == ns.extraction_id).first()
+    spec = _outcome_spec(ns, em, raw, ex)
 
     candles, data_src = load_candles_for_window(
         db,
         asset=ns.asset,
-        signal_time=sig_time,
+        signal_time=spec.signal_time,
         lookahead_days=lookahead_days,
         timeframe=timeframe,
     )
-    md_ver = data_src or "none"
-
-    sl = Decimal(str(ns.stop_loss)) if ns.stop_loss is not None else None
-    entry = Decimal(str(ns.entry_price))
-    mid = _midpoint_entry(ns)
-
-    ex = db.query(Extraction).filter(Extraction.id == ns.extraction_id).first()
-    primary_tp = Decimal(str(ns.take_profit)) if ns.take_profit is not None else None
-    tp_levels = collect_take_profit_levels(
-        ex.extracted_fields if ex else None,
-        primary_tp,
-        ns.direction,
-        entry,
-    )
-
-    settings = get_settings()
-    status, fields = compute_outcome_from_candles(
-        model_key=em.model_key,
-        direction=ns.direction,
-        entry_price=entry,
-        take_profit=None,
-        stop_loss=sl,
-        signal_time=sig_time,
-        candles=candles,
-        timeframe=timeframe,
-        midpoint_price=mid,
-        take_profit_levels=tp_levels,
-        mop_reference=settings.OUTCOME_MOP_REFERENCE,
-        sl_before_tp_same_bar=settings.OUTCOME_INTRABAR_SL_BEFORE_TP,
-    )
-
-    ver_suffix = f"{md_ver or 'none'}|{ENGINE_VERSION}"[:64]
-
-    now = datetime.now(timezone.utc)
-    row.calculated_at = now
-
-    if status == "COMPLETE":
-        row.outcome_status = "COMPLETE"
-        row.entry_reached = fields.get("entry_reached")
-        row.entry_fill_price = fields.get("entry_fill_price")
-        row.tp_hits = fields.get("tp_hits")
-        row.sl_hit = fields.get("sl_hit")
-        row.expiry_hit = fields.get("expiry_hit")
-        row.mfe = fields.get("mfe")
-        row.mae = fields.get("mae")
-        row.time_to_entry_sec = fields.get("time_to_entry_sec")
-        row.time_to_outcome_sec = fields.get("time_to_outcome_sec")
-        row.policy_ref = fields.get("policy_ref")
-        row.market_data_version = ver_suffix
-        row.error_detail = None
-    elif status == "DATA_INCOMPLETE":
-        row.outcome_status = "DATA_INCOMPLETE"
-        row.entry_reached = fields.get("entry_reached")
-        row.entry_fill_price = None
-        row.tp_hits = None
-        row.sl_hit = None
-        row.expiry_hit = None
-        row.mfe = None
-        row.mae = None
-        row.time_to_entry_sec = None
-        row.time_to_outcome_sec = None
-        row.policy_ref = fields.get("policy_ref")
-        row.market_data_version = ver_suffix
-        row.error_detail = fields.get("error_detail") or {"code": "data_incomplete"}
-    else:
-        row.outcome_status = "ERROR"
-        row.error_detail = fields.get("error_detail") or {"code": "engine_error"}
-        row.policy_ref = fields.get("policy_ref")
-        row.market_data_version = ver_suffix
+    status, fields = _compute_single(spec, candles, timeframe)
+    for k, v in _outcome_row_values(status, fields, data_src, datetime.now(timezone.utc)).items():
+        setattr(row, k, v)
 
     db.flush()
     return row, None
@@ -194,3 +230,138 @@ def process_pending_signal_outcomes(
             failed += 1
             errors.append(f"id={r.id}: {ex!s}")
     return {"processed": len(rows), "ok": ok, "failed": failed, "errors": errors[:20]}
+
+
+def process_pending_signal_outcomes_batch(
+    db: Session,
+    *,
+    limit: int,
+    lookahead_days: int,
+    timeframe: str,
+    batch_size: int = 1000,
+) -> dict[str, Any]:
+    """
+    Векторизованная обработка PENDING outcomes (дренаж backlog после бэкфилла свечей).
+
+    Outcomes группируются по символу: одно окно market_candles на группу, расчёт через
+    compute_outcomes_batch, запись — один bulk UPDATE и коммит на пачку из batch_size строк.
+    Сигналы без свечей в БД идут поштучно через load_candles_for_window (fallback CoinGecko).
+    """
+    remaining = max(1, int(limit))
+    size = max(1, int(batch_size))
+    processed = ok = failed = 0
+    errors: list[str] = []
+    last_id = 0
+    while remaining > 0:
+        rows = (
+            db.query(SignalOutcome)
+            .options(
+                joinedload(SignalOutcome.execution_model),
+                joinedload(SignalOutcome.normalized_signal),
+            )
+            .filter(SignalOutcome.outcome_status == "PENDING", SignalOutcome.id > last_id)
+            .order_by(SignalOutcome.id.asc())
+            .limit(min(size, remaining))
+            .all()
+        )
+        if not rows:
+            break
+        last_id = int(rows[-1].id)
+        remaining -= len(rows)
+        processed += len(rows)
+        b_ok, b_errors = _process_outcome_batch(db, rows, lookahead_days=lookahead_days, timeframe=timeframe)
+        ok += b_ok
+        failed += len(b_errors)
+        errors.extend(b_errors)
+    return {"processed": processed, "ok": ok, "failed": failed, "errors": errors[:20]}
+
+
+def _process_outcome_batch(
+    db: Session,
+    rows: list[SignalOutcome],
+    *,
+    lookahead_days: int,
+    timeframe: str,
+) -> tuple[int, list[str]]:
+    errors: list[str] = []
+    ns_list = [r.normalized_signal for r in rows if r.normalized_signal is not None]
+    raw_ids = {ns.raw_event_id for ns in ns_list}
+    ex_ids = {ns.extraction_id for ns in ns_list}
+    raws = {e.id: e for e in db.query(RawEvent).filter(RawEvent.id.in_(raw_ids)).all()} if raw_ids else {}
+    exs = {e.id: e for e in db.query(Extraction).filter(Extraction.id.in_(ex_ids)).all()} if ex_ids else {}
+
+    groups: dict[Optional[str], list[tuple[SignalOutcome, OutcomeSpec]]] = defaultdict(list)
+    for r in rows:
+        ns = r.normalized_signal
+        em = r.execution_model
+        if not ns or not em:
+            errors.append(f"id={r.id}: missing normalized_signal or execution_model")
+            continue
+        try:
+            spec = _outcome_spec(ns, em, raws.get(ns.raw_event_id), exs.get(ns.extraction_id))
+        except Exception as ex:
+            errors.append(f"id={r.id}: {ex!s}")
+            continue
+        groups[_asset_to_db_symbol(ns.asset)].append((r, spec))
+
+    settings = get_settings()
+    now = datetime.now(timezone.utc)
+    lookahead = timedelta(days=max(1, lookahead_days))
+    payload: list[dict[str, Any]] = []
+    for symbol, items in groups.items():
+        try:
+            shared: list[OhlcCandle] = []
+            src: Optional[str] = None
+            if symbol:
+                shared, src = list_candles_from_db(
+                    db,
+                    asset=items[0][0].normalized_signal.asset,
+                    timeframe=timeframe,
+                    from_ts=min(s.signal_time for _, s in items),
+                    to_ts=max(s.signal_time for _, s in items) + lookahead,
+                )
+            arrays = CandleArrays.from_candles(shared)
+            windows = [arrays.window_bounds(s.signal_time, s.signal_time + lookahead) for _, s in items]
+            vec = [k for k, (lo, hi) in enumerate(windows) if hi > lo]
+            results = compute_outcomes_batch(
+                arrays,
+                [items[k][1] for k in vec],
+                timeframe=timeframe,
+                windows=[windows[k] for k in vec],
+                mop_reference=settings.OUTCOME_MOP_REFERENCE,
+                sl_before_tp_same_bar=settings.OUTCOME_INTRABAR_SL_BEFORE_TP,
+            )
+            for k, (status, fields) in zip(vec, results):
+                payload.append({"id": items[k][0].id, **_outcome_row_values(status, fields, src, now)})
+        except Exception as ex:
+            errors.extend(f"id={r.id}: {ex!s}" for r, _ in items)
+            continue
+
+        vec_set = set(vec)
+        for k, (r, spec) in enumerate(items):
+            if k in vec_set:
+                continue
+            try:
+                candles, data_src = load_candles_for_window(
+                    db,
+                    asset=r.normalized_signal.asset,
+                    signal_time=spec.signal_time,
+                    lookahead_days=lookahead_days,
+                    timeframe=timeframe,
+                )
+                status, fields = _compute_single(spec, candles, timeframe)
+                payload.append({"id": r.id, **_outcome_row_values(status, fields, data_src, now)})
+            except Exception as ex:
+                errors.append(f"id={r.id}: {ex!s}")
+
+    if not payload:
+        db.rollback()
+        return 0, errors
+    try:
+        db.execute(update(SignalOutcome), payload)
+        db.commit()
+    except Exception as ex:
+        db.rollback()
+        errors.extend(f"id={p['id']}: {ex!s}" for p in payload)
+        return 0, errors
+    return len(payload), errors
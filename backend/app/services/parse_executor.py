@@ -0,0 +1,159 @@
+"""
+Пул процессов для парсинга текстов сигналов (бэкфиллы, массовая переэкстракция).
+
+parse_signal_from_text — чистый CPU (regex), в одном процессе упирается в GIL. Для больших
+пачек (90 дней истории, сотни каналов) тексты режутся на чанки и уходят в ProcessPoolExecutor:
+- воркер при старте один раз импортирует парсер и прогоняет warm-up (компиляция regex, кэши re);
+- через границу процессов ходят только str → plain tuple (поля ParsedSignal по порядку),
+  без pickling dataclass/datetime на каждый текст;
+- мелкие пачки и PARSE_EXECUTOR_WORKERS=0 — inline в текущем процессе, результат тот же.
+
+Пул ленивый и один на процесс; shutdown_parse_executor() — для скриптов / тестов.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import astuple
+from typing import Any, List, Optional, Sequence, Tuple
+
+from app.services.telegram_scraper import ParsedSignal, parse_signal_from_text
+
+logger = logging.getLogger(__name__)
+
+# поля ParsedSignal в порядке объявления (dataclasses.astuple)
+ParsedTuple = Tuple[Any, ...]
+
+_WARMUP_TEXTS = (
+    "#BTC LONG entry $65000 TP1: $70000 TP2: $72000 SL $63000",
+    "ETH/USDT short zone 3200-3250 targets 3100, 3000 stop 3300",
+    "Good morning everyone!",
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _warm_worker() -> None:
+    """initializer воркера: первый проход по шаблонам, чтобы чанки не платили за компиляцию."""
+    for t in _WARMUP_TEXTS:
+        parse_signal_from_text(t)
+
+
+def _parse_one(text: Optional[str]) -> Optional[ParsedTuple]:
+    sig = parse_signal_from_text(text) if text else None
+    return astuple(sig) if sig is not None else None
+
+
+def _parse_chunk(texts: Sequence[Optional[str]]) -> List[Optional[ParsedTuple]]:
+    return [_parse_one(t) for t in texts]
+
+
+def to_parsed_signal(row: Optional[ParsedTuple]) -> Optional[ParsedSignal]:
+    """plain tuple из воркера → ParsedSignal (None остаётся None)."""
+    return ParsedSignal(*row) if row is not None else None
+
+
+def _settings_workers() -> int:
+    from app.core.config import get_settings
+
+    n = int(getattr(get_settings(), "PARSE_EXECUTOR_WORKERS", 0) or 0)
+    if n < 0:
+        n = os.cpu_count() or 1
+    return n
+
+
+def get_parse_executor(workers: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """Общий пул на процесс; None — парсинг inline (workers=0)."""
+    global _pool, _pool_workers
+    n = _settings_workers() if workers is None else workers
+    if n <= 0:
+        return None
+    with _pool_lock:
+        if _pool is not None and _pool_workers != n:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=n, initializer=_warm_worker)
+            _pool_workers = n
+            logger.info("parse executor: %s worker processes", n)
+        return _pool
+
+
+def shutdown_parse_executor() -> None:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+def _chunks(texts: Sequence[Optional[str]], size: int) -> List[Sequence[Optional[str]]]:
+    size = max(1, size)
+    return [texts[i : i + size] for i in range(0, len(texts), size)]
+
+
+def _plan(texts: Sequence[Optional[str]], workers: Optional[int], chunksize: Optional[int]):
+    """(pool, chunks) или (None, None), если пачку дешевле разобрать inline."""
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    min_batch = int(getattr(settings, "PARSE_EXECUTOR_MIN_BATCH", 256))
+    if len(texts) < max(1, min_batch):
+        return None, None
+    pool = get_parse_executor(workers)
+    if pool is None:
+        return None, None
+    size = chunksize or int(getattr(settings, "PARSE_EXECUTOR_CHUNK_SIZE", 200))
+    return pool, _chunks(texts, size)
+
+
+def _submit(pool: ProcessPoolExecutor, chunks) -> List["Future[List[Optional[ParsedTuple]]]"]:
+    return [pool.submit(_parse_chunk, c) for c in chunks]
+
+
+def parse_texts_raw(
+    texts: Sequence[Optional[str]],
+    *,
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+) -> List[Optional[ParsedTuple]]:
+    """Пачка текстов → plain tuples (порядок входа сохраняется; None — не сигнал)."""
+    texts = list(texts)
+    pool, chunks = _plan(texts, workers, chunksize)
+    if pool is None:
+        return _parse_chunk(texts)
+    out: List[Optional[ParsedTuple]] = []
+    for fut in _submit(pool, chunks):
+        out.extend(fut.result())
+    return out
+
+
+def parse_texts(
+    texts: Sequence[Optional[str]],
+    *,
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+) -> List[Optional[ParsedSignal]]:
+    """Как parse_signal_from_text для каждого текста, но пачкой через пул процессов."""
+    return [to_parsed_signal(r) for r in parse_texts_raw(texts, workers=workers, chunksize=chunksize)]
+
+
+async def parse_texts_async(
+    texts: Sequence[Optional[str]],
+    *,
+    workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+) -> List[Optional[ParsedSignal]]:
+    """parse_texts для async-кода: чанки считаются в пуле, event loop не блокируется."""
+    texts = list(texts)
+    pool, chunks = _plan(texts, workers, chunksize)
+    if pool is None:
+        return [to_parsed_signal(r) for r in _parse_chunk(texts)]
+    parts = await asyncio.gather(*(asyncio.wrap_future(f) for f in _submit(pool, chunks)))
+    return [to_parsed_signal(r) for part in parts for r in part]
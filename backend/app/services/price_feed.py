@@ -0,0 +1,577 @@
+"""
+Поток цен с бирж: один ингестор, общая таблица последних цен, раздача через Redis.
+
+Ингестор держит по одному WebSocket на биржу (Binance !miniTicker@arr — все пары одним
+потоком; Bybit tickers.<SYMBOL> по PRICE_FEED_SYMBOLS) и пишет тики в LastPriceTable:
+pair → (price, ts), pair — нормализованный тикер ('BTC'), ts — unix-время тика. Пока сокет
+недоступен, биржа опрашивается REST (один запрос на все пары раз в PRICE_FEED_REST_POLL_SEC),
+между попытками переподключения — экспоненциальная пауза.
+
+Таблица copy-on-write: писатель собирает новый dict и подменяет ссылку, читатели (любой
+поток или event loop) делают dict.get без блокировок.
+
+Между процессами: ингестор копит тики и раз в publish_interval секунд пишет накопленное
+в Redis-хэш prices:last и публикует в канал prices:ticks (в потоке, не на event loop).
+Процессы без ингестора подписываются на канал фоновым потоком (start_redis_subscriber),
+а пока подписка не догнала — читают хэш одним HMGET (last_prices / last_prices_async).
+Ингестор в кластере один: его запускает тот, кто держит lease prices:ingestor.
+
+FileFeed проигрывает NDJSON-запись ({"ts": ..., "symbol": "BTCUSDT", "price": ...}) вместо
+бирж — для тестов и локальной отладки (PRICE_FEED_REPLAY_FILE).
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.services.price_snapshot import normalize_pair
+
+logger = logging.getLogger(__name__)
+
+Tick = Tuple[float, float]  # (price, unix ts)
+Batch = Dict[str, Tick]
+
+TICKS_CHANNEL = "prices:ticks"
+LAST_HASH = "prices:last"
+LEASE_KEY = "prices:ingestor"
+LEASE_TTL = 30
+
+BINANCE_WS_URL = "wss://stream.binance.com:9443/ws/!miniTicker@arr"
+BYBIT_WS_URL = "wss://stream.bybit.com/v5/public/spot"
+BINANCE_REST_URL = "https://api.binance.com/api/v3/ticker/price"
+BYBIT_REST_URL = "https://api.bybit.com/v5/market/tickers"
+_BYBIT_ARGS_PER_SUBSCRIBE = 10
+_BYBIT_PING_SEC = 20
+_MAX_BACKOFF = 60.0
+
+# compare-and-set по владельцу lease: чужой lease не продлеваем и не снимаем
+_RENEW_LUA = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('expire', KEYS[1], ARGV[2]) else return 0 end"
+_RELEASE_LUA = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+
+class LastPriceTable:
+    """pair → (price, ts). Чтение без блокировок; писатели сериализуются между собой."""
+
+    def __init__(self) -> None:
+        self._data: Dict[str, Tick] = {}
+        self._write_lock = threading.Lock()
+        self.updated_at = 0.0
+
+    def update(self, batch: Batch) -> None:
+        """Влить пачку; тик старше уже известного по паре отбрасывается (две биржи, Redis-эхо)."""
+        if not batch:
+            return
+        with self._write_lock:
+            data = dict(self._data)
+            newest = self.updated_at
+            for pair, (price, ts) in batch.items():
+                old = data.get(pair)
+                if price and (old is None or ts >= old[1]):
+                    data[pair] = (float(price), float(ts))
+                    newest = max(newest, float(ts))
+            self._data = data
+            self.updated_at = newest
+
+    def get(self, pair: str, max_age: Optional[float] = None) -> Optional[Tick]:
+        tick = self._data.get(pair)
+        if tick is None or (max_age is not None and time.time() - tick[1] > max_age):
+            return None
+        return tick
+
+    def price(self, pair: str, max_age: Optional[float] = None) -> Optional[float]:
+        tick = self.get(pair, max_age)
+        return tick[0] if tick else None
+
+    def live(self, max_age: float) -> bool:
+        """Есть ли в таблице тик не старше max_age секунд."""
+        return time.time() - self.updated_at <= max_age
+
+    def snapshot(self) -> Dict[str, Tick]:
+        return dict(self._data)
+
+    def clear(self) -> None:
+        with self._write_lock:
+            self._data = {}
+            self.updated_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+price_table = LastPriceTable()
+
+
+@functools.lru_cache(maxsize=1)
+def feed_config() -> Tuple[bool, float]:
+    """(PRICE_FEED_ENABLED, PRICE_FEED_MAX_AGE_SEC); читается один раз на процесс."""
+    try:
+        from app.core.config import get_settings
+
+        s = get_settings()
+        return bool(s.PRICE_FEED_ENABLED), float(s.PRICE_FEED_MAX_AGE_SEC)
+    except Exception:
+        return False, 15.0
+
+
+def _usdt_pair(symbol: Optional[str]) -> Optional[str]:
+    """'BTCUSDT' → 'BTC'; пары не к USDT в таблицу не попадают."""
+    s = (symbol or "").upper()
+    if not s.endswith("USDT") or len(s) <= 4:
+        return None
+    return normalize_pair(s)
+
+
+def _encode(batch: Batch) -> Dict[str, str]:
+    return {pair: json.dumps([price, ts]) for pair, (price, ts) in batch.items()}
+
+
+def _decode(fields: Dict[str, Optional[str]]) -> Batch:
+    out: Batch = {}
+    for pair, raw in fields.items():
+        if not raw:
+            continue
+        try:
+            price, ts = json.loads(raw)
+            out[pair] = (float(price), float(ts))
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+def _redis():
+    try:
+        from app.core.redis_cache import redis_client
+    except ImportError:
+        return None
+    return redis_client()
+
+
+def publish_batch(batch: Batch) -> bool:
+    """Пачку — в хэш prices:last и в канал prices:ticks (один pipeline)."""
+    r = _redis()
+    if not r or not batch:
+        return False
+    encoded = _encode(batch)
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.hset(LAST_HASH, mapping=encoded)
+        pipe.publish(TICKS_CHANNEL, json.dumps(encoded))
+        pipe.execute()
+        return True
+    except Exception as e:
+        logger.debug("Price feed publish failed: %s", e)
+        return False
+
+
+def _from_redis_hash(pairs: Sequence[str]) -> Batch:
+    r = _redis()
+    if not r or not pairs:
+        return {}
+    try:
+        raw = r.hmget(LAST_HASH, list(pairs))
+    except Exception as e:
+        logger.debug("Price feed hash read failed: %s", e)
+        return {}
+    return _decode(dict(zip(pairs, raw)))
+
+
+def _from_table(symbols: Iterable[str], max_age: float) -> Tuple[Dict[str, List[str]], Dict[str, float], List[str]]:
+    """(pair → символы, цены из таблицы процесса, пары без свежей цены)."""
+    by_pair: Dict[str, List[str]] = {}
+    for s in symbols:
+        if s:
+            by_pair.setdefault(normalize_pair(s), []).append(s)
+    prices: Dict[str, float] = {}
+    missing = []
+    for pair in by_pair:
+        p = price_table.price(pair, max_age)
+        if p is None:
+            missing.append(pair)
+        else:
+            prices[pair] = p
+    return by_pair, prices, missing
+
+
+def _merge_fetched(prices: Dict[str, float], fetched: Batch, max_age: float) -> None:
+    price_table.update(fetched)
+    now = time.time()
+    prices.update({pair: price for pair, (price, ts) in fetched.items() if now - ts <= max_age})
+
+
+def last_prices(symbols: Iterable[str], max_age: Optional[float] = None) -> Dict[str, float]:
+    """
+    Свежие цены из потока (ключи — символы как переданы; нет цены — нет ключа).
+    Сначала таблица процесса; при PRICE_FEED_ENABLED недостающее — из хэша prices:last.
+    HMGET блокирующий: из корутин — last_prices_async.
+    """
+    enabled, default_age = feed_config()
+    max_age = default_age if max_age is None else max_age
+    by_pair, prices, missing = _from_table(symbols, max_age)
+    if missing and enabled:
+        if not price_table.live(max_age):
+            start_redis_subscriber()
+        _merge_fetched(prices, _from_redis_hash(missing), max_age)
+    return {s: prices[pair] for pair, syms in by_pair.items() if pair in prices for s in syms}
+
+
+async def last_prices_async(symbols: Iterable[str], max_age: Optional[float] = None) -> Dict[str, float]:
+    """last_prices для event loop: таблица читается на месте, HMGET — в потоке."""
+    enabled, default_age = feed_config()
+    max_age = default_age if max_age is None else max_age
+    by_pair, prices, missing = _from_table(symbols, max_age)
+    if missing and enabled:
+        if not price_table.live(max_age):
+            start_redis_subscriber()
+        _merge_fetched(prices, await asyncio.to_thread(_from_redis_hash, missing), max_age)
+    return {s: prices[pair] for pair, syms in by_pair.items() if pair in prices for s in syms}
+
+
+# --- подписка на тики из других процессов --------------------------------------------
+
+_subscriber: Optional[threading.Thread] = None
+_subscriber_lock = threading.Lock()
+
+
+def _subscribe_forever() -> None:
+    backoff = 1.0
+    while True:
+        try:
+            # тот же клиент (и сервер), куда пишет publish_batch; pubsub берёт своё соединение из пула
+            client = _redis()
+            if client is None:
+                raise ConnectionError("Redis unavailable")
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(TICKS_CHANNEL)
+            backoff = 1.0
+            for message in pubsub.listen():
+                try:
+                    price_table.update(_decode(json.loads(message["data"])))
+                except (KeyError, TypeError, ValueError):
+                    continue
+        except Exception as e:
+            logger.warning("Price feed subscription lost: %s (retry in %.0fs)", e, backoff)
+        time.sleep(backoff)
+        backoff = min(backoff * 2, _MAX_BACKOFF)
+
+
+def start_redis_subscriber() -> None:
+    """Фоновый поток, вливающий prices:ticks в таблицу процесса (идемпотентно)."""
+    global _subscriber
+    if _subscriber is not None and _subscriber.is_alive():
+        return
+    with _subscriber_lock:
+        if _subscriber is not None and _subscriber.is_alive():
+            return
+        try:
+            import redis  # noqa: F401
+        except ImportError:
+            return
+        _subscriber = threading.Thread(target=_subscribe_forever, name="price-feed-sub", daemon=True)
+        _subscriber.start()
+
+
+# --- источники ------------------------------------------------------------------------
+
+
+class FileFeed:
+    """Проигрывание NDJSON-тиков. speed=0 — без пауз, 1.0 — в темпе записи; ts тика — момент проигрывания."""
+
+    name = "file"
+
+    def __init__(self, path: str, speed: float = 0.0) -> None:
+        self.path = path
+        self.speed = speed
+
+    async def batches(self) -> AsyncIterator[Batch]:
+        prev_ts = None
+        with open(self.path, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                ts = float(row.get("ts") or 0)
+                if self.speed and prev_ts is not None and ts > prev_ts:
+                    await asyncio.sleep((ts - prev_ts) / self.speed)
+                prev_ts = ts
+                yield {normalize_pair(row["symbol"]): (float(row["price"]), time.time())}
+
+
+class BinanceStream:
+    """!miniTicker@arr: раз в секунду пачка по всем изменившимся парам."""
+
+    name = "binance"
+
+    async def batches(self) -> AsyncIterator[Batch]:
+        import websockets
+
+        async with websockets.connect(BINANCE_WS_URL, ping_interval=20, max_size=2 ** 23) as ws:
+            async for raw in ws:
+                batch: Batch = {}
+                for item in json.loads(raw):
+                    pair = _usdt_pair(item.get("s"))
+                    if pair and item.get("c"):
+                        batch[pair] = (float(item["c"]), (item.get("E") or time.time() * 1000) / 1000.0)
+                if batch:
+                    yield batch
+
+
+class BybitStream:
+    """Публичный spot-поток tickers.<SYMBOL>; Bybit ждёт прикладной ping каждые 20 с."""
+
+    name = "bybit"
+
+    def __init__(self, symbols: Sequence[str]) -> None:
+        self.symbols = [s.strip().upper() for s in symbols if s.strip()]
+
+    @staticmethod
+    async def _ping(ws) -> None:
+        while True:
+            await asyncio.sleep(_BYBIT_PING_SEC)
+            await ws.send(json.dumps({"op": "ping"}))
+
+    async def batches(self) -> AsyncIterator[Batch]:
+        import websockets
+
+        async with websockets.connect(BYBIT_WS_URL, ping_interval=None) as ws:
+            for i in range(0, len(self.symbols), _BYBIT_ARGS_PER_SUBSCRIBE):
+                args = [f"tickers.{s}" for s in self.symbols[i : i + _BYBIT_ARGS_PER_SUBSCRIBE]]
+                await ws.send(json.dumps({"op": "subscribe", "args": args}))
+            pinger = asyncio.create_task(self._ping(ws))
+            try:
+                async for raw in ws:
+                    msg = json.loads(raw)
+                    data = msg.get("data") or {}
+                    pair = _usdt_pair(data.get("symbol")) if str(msg.get("topic", "")).startswith("tickers.") else None
+                    if pair and data.get("lastPrice"):
+                        yield {pair: (float(data["lastPrice"]), (msg.get("ts") or time.time() * 1000) / 1000.0)}
+            finally:
+                pinger.cancel()
+
+
+async def _poll_binance(client: httpx.AsyncClient) -> Batch:
+    resp = await client.get(BINANCE_REST_URL)
+    resp.raise_for_status()
+    now = time.time()
+    batch: Batch = {}
+    for row in resp.json():
+        pair = _usdt_pair(row.get("symbol"))
+        if pair and row.get("price"):
+            batch[pair] = (float(row["price"]), now)
+    return batch
+
+
+async def _poll_bybit(client: httpx.AsyncClient) -> Batch:
+    resp = await client.get(BYBIT_REST_URL, params={"category": "spot"})
+    resp.raise_for_status()
+    now = time.time()
+    batch: Batch = {}
+    for row in (resp.json().get("result") or {}).get("list") or []:
+        pair = _usdt_pair(row.get("symbol"))
+        if pair and row.get("lastPrice"):
+            batch[pair] = (float(row["lastPrice"]), now)
+    return batch
+
+
+# запасной REST-опрос по имени источника; у FileFeed его нет — запись просто заканчивается
+REST_POLLERS: Dict[str, Callable[[httpx.AsyncClient], Awaitable[Batch]]] = {
+    "binance": _poll_binance,
+    "bybit": _poll_bybit,
+}
+
+
+class PriceFeedIngestor:
+    """
+    Гоняет источники, вливает тики в таблицу и (publish=True) раздаёт их через Redis.
+    Тики копятся в _pending (по паре — последний) и уходят в Redis раз в publish_interval
+    секунд одной пачкой: Bybit шлёт по тику на сообщение, pipeline на каждый — лишний RTT.
+    """
+
+    def __init__(
+        self,
+        sources: Sequence,
+        table: LastPriceTable = price_table,
+        publish: bool = True,
+        rest_poll_sec: float = 5.0,
+        publish_interval: float = 0.5,
+    ) -> None:
+        self.sources = list(sources)
+        self.table = table
+        self.publish = publish
+        self.rest_poll_sec = rest_poll_sec
+        self.publish_interval = publish_interval
+        self.ticks = 0
+        self.rest_polls = 0
+        self._pending: Batch = {}
+
+    def ingest(self, batch: Batch) -> None:
+        self.table.update(batch)
+        self.ticks += len(batch)
+        if self.publish:
+            self._pending.update(batch)
+
+    async def flush(self) -> None:
+        """Накопленное — в Redis; redis-py блокирующий, поэтому в потоке."""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        await asyncio.to_thread(publish_batch, batch)
+
+    async def _publish_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.publish_interval)
+            await self.flush()
+
+    async def _poll_for(self, name: str, client: httpx.AsyncClient, seconds: float) -> None:
+        """REST-опрос биржи, пока не пора снова пробовать сокет (минимум один запрос)."""
+        poll = REST_POLLERS[name]
+        deadline = time.monotonic() + seconds
+        while True:
+            try:
+                self.ingest(await poll(client))
+                self.rest_polls += 1
+            except Exception as e:
+                logger.warning("Price feed %s: REST poll failed: %s", name, e)
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            await asyncio.sleep(min(self.rest_poll_sec, left))
+
+    async def _run_source(self, source, client: httpx.AsyncClient) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                async for batch in source.batches():
+                    self.ingest(batch)
+                    backoff = 1.0
+                if source.name not in REST_POLLERS:
+                    return
+                logger.warning("Price feed %s: stream closed, REST fallback for %.0fs", source.name, backoff)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if source.name not in REST_POLLERS:
+                    logger.error("Price feed %s failed: %s", source.name, e)
+                    return
+                logger.warning("Price feed %s: stream failed (%s), REST fallback for %.0fs", source.name, e, backoff)
+            await self._poll_for(source.name, client, backoff)
+            backoff = min(backoff * 2, _MAX_BACKOFF)
+
+    async def run(self) -> None:
+        """До отмены; если все источники конечны (FileFeed) — до конца записи."""
+        publisher = asyncio.create_task(self._publish_forever()) if self.publish else None
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                await asyncio.gather(*(self._run_source(s, client) for s in self.sources))
+        finally:
+            if publisher is not None:
+                publisher.cancel()
+                try:
+                    await publisher
+                except asyncio.CancelledError:
+                    pass
+                await self.flush()
+
+
+def sources_from_settings(settings) -> List:
+    if settings.PRICE_FEED_REPLAY_FILE:
+        return [FileFeed(settings.PRICE_FEED_REPLAY_FILE, settings.PRICE_FEED_REPLAY_SPEED)]
+    sources: List = []
+    for name in (n.strip().lower() for n in settings.PRICE_FEED_EXCHANGES.split(",")):
+        if name == "binance":
+            sources.append(BinanceStream())
+        elif name == "bybit":
+            sources.append(BybitStream(settings.PRICE_FEED_SYMBOLS.split(",")))
+        elif name:
+            logger.warning("Price feed: unknown exchange %r ignored", name)
+    return sources
+
+
+# --- один ингестор на кластер -----------------------------------------------------------
+
+
+def _acquire_lease(owner: str) -> bool:
+    r = _redis()
+    if not r:
+        return True  # без Redis раздавать некому — ингестор локальный
+    try:
+        return bool(r.set(LEASE_KEY, owner, nx=True, ex=LEASE_TTL)) or r.get(LEASE_KEY) == owner
+    except Exception as e:
+        logger.warning("Price feed lease check failed: %s", e)
+        return False
+
+
+def _renew_lease(owner: str) -> bool:
+    r = _redis()
+    if not r:
+        return True
+    try:
+        return bool(r.eval(_RENEW_LUA, 1, LEASE_KEY, owner, LEASE_TTL))
+    except Exception as e:
+        logger.warning("Price feed lease renew failed: %s", e)
+        return False
+
+
+def _release_lease(owner: str) -> None:
+    r = _redis()
+    if r:
+        try:
+            r.eval(_RELEASE_LUA, 1, LEASE_KEY, owner)
+        except Exception:
+            pass
+
+
+async def _ingest_while_leader(owner: str, settings) -> bool:
+    """Ингестор, пока lease наш. True — источники закончились сами (запись проиграна)."""
+    ingestor = PriceFeedIngestor(sources_from_settings(settings), rest_poll_sec=settings.PRICE_FEED_REST_POLL_SEC)
+    task = asyncio.create_task(ingestor.run())
+    logger.info("Price feed ingestor started: %s", ", ".join(s.name for s in ingestor.sources) or "no sources")
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=LEASE_TTL / 3)
+            if done:
+                return True
+            if not _renew_lease(owner):
+                logger.warning("Price feed lease lost, ingestor stops")
+                return False
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        _release_lease(owner)
+
+
+async def run_price_feed(settings=None) -> None:
+    """
+    Держатель lease гоняет ингестор, остальные процессы только подписаны на prices:ticks
+    и каждые LEASE_TTL/3 секунд пробуют перехватить lease (если ингестор упал).
+    """
+    if settings is None:
+        from app.core.config import get_settings
+
+        settings = get_settings()
+    owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    while True:
+        if _acquire_lease(owner):
+            if await _ingest_while_leader(owner, settings):
+                return
+        else:
+            start_redis_subscriber()
+        await asyncio.sleep(LEASE_TTL / 3)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_price_feed())
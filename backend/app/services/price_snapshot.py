@@ -0,0 +1,216 @@
+"""
+Общий снимок текущих цен: один multi-id запрос вместо запроса на каждый сигнал.
+
+get_prices(symbols) собирает уникальные базовые активы, отдаёт свежие из снимка / Redis,
+а недостающие докачивает пачкой:
+1) CoinGecko /simple/price с ids=a,b,c (до _COINGECKO_BATCH id за запрос);
+2) что CoinGecko не знает или не вернул — один Binance /ticker/price (все пары разом).
+
+Снимок — in-process dict pair → (price, fetched_at) с TTL price_validator.CACHE_TTL; им
+пользуются signal_checker, price_validator.get_current_price / validate_signal_price и
+PriceTrackingService. Докачка под per-loop lock: параллельные вызовы не дублируют HTTP.
+Раньше снимка смотрится таблица потока цен (app/services/price_feed.py): при живом
+ингесторе до HTTP дело не доходит.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import weakref
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+COINGECKO_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+BINANCE_TICKER_URL = "https://api.binance.com/api/v3/ticker/price"
+_COINGECKO_BATCH = 100
+_QUOTES = ("/USDT", "/USD")
+# сколько секунд не перезапрашивать актив, для которого ни один источник не дал цену
+_MISS_TTL = 60.0
+
+# pair → (price, monotonic fetched_at)
+_snapshot: Dict[str, Tuple[float, float]] = {}
+_misses: Dict[str, float] = {}
+_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+def normalize_pair(symbol: str) -> str:
+    """'BTC/USDT', 'btc/usd', 'BTCUSDT', 'BTC' → 'BTC'."""
+    pair = (symbol or "").strip().upper()
+    for q in _QUOTES:
+        pair = pair.replace(q, "")
+    if pair.endswith("USDT") and len(pair) > 4:
+        pair = pair[:-4]
+    return pair
+
+
+def _ttl() -> float:
+    from app.services.price_validator import CACHE_TTL
+
+    return float(CACHE_TTL)
+
+
+def _fetch_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _locks.get(loop)
+    if lock is None:
+        lock = _locks[loop] = asyncio.Lock()
+    return lock
+
+
+def snapshot_get(pair: str) -> Optional[float]:
+    """Цена из снимка, если не старше TTL (pair — нормализованный тикер)."""
+    hit = _snapshot.get(pair)
+    if hit is None or time.monotonic() - hit[1] >= _ttl():
+        return None
+    return hit[0]
+
+
+def snapshot_put(prices: Dict[str, float]) -> None:
+    """Положить цены в снимок (и в Redis); None / нули игнорируются."""
+    now = time.monotonic()
+    for pair, price in prices.items():
+        if price:
+            _snapshot[pair] = (float(price), now)
+    try:
+        from app.core.redis_cache import CACHE_TTL_PRICE, cache_set, key_price
+
+        for pair, price in prices.items():
+            if price:
+                cache_set(key_price(pair), price, CACHE_TTL_PRICE)
+    except ImportError:
+        pass
+
+
+def clear_snapshot() -> None:
+    _snapshot.clear()
+    _misses.clear()
+
+
+def _recent_miss(pair: str, now: float) -> bool:
+    t = _misses.get(pair)
+    return t is not None and now - t < _MISS_TTL
+
+
+def _from_redis(pairs: Iterable[str]) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    try:
+        from app.core.redis_cache import cache_get, key_price
+    except ImportError:
+        return out
+    now = time.monotonic()
+    for pair in pairs:
+        cached = cache_get(key_price(pair))
+        if cached is not None:
+            out[pair] = float(cached)
+            _snapshot[pair] = (out[pair], now)
+    return out
+
+
+async def _fetch_coingecko(client: httpx.AsyncClient, pairs: List[str]) -> Dict[str, float]:
+    from app.services.price_validator import COINGECKO_IDS
+
+    ids = {COINGECKO_IDS[p]: p for p in pairs if p in COINGECKO_IDS}
+    out: Dict[str, float] = {}
+    id_list = list(ids)
+    for i in range(0, len(id_list), _COINGECKO_BATCH):
+        chunk = id_list[i : i + _COINGECKO_BATCH]
+        try:
+            resp = await client.get(COINGECKO_PRICE_URL, params={"ids": ",".join(chunk), "vs_currencies": "usd"})
+            if resp.status_code != 200:
+                logger.warning("CoinGecko batch price: HTTP %s for %s ids", resp.status_code, len(chunk))
+                continue
+            data = resp.json()
+        except Exception as e:
+            logger.warning("CoinGecko batch price fetch failed (%s ids): %s", len(chunk), e)
+            continue
+        for cg_id in chunk:
+            price = (data.get(cg_id) or {}).get("usd")
+            if price:
+                out[ids[cg_id]] = float(price)
+    return out
+
+
+async def _fetch_binance(client: httpx.AsyncClient, pairs: List[str]) -> Dict[str, float]:
+    want = {f"{p}USDT": p for p in pairs}
+    try:
+        resp = await client.get(BINANCE_TICKER_URL)
+        if resp.status_code != 200:
+            logger.warning("Binance ticker/price: HTTP %s", resp.status_code)
+            return {}
+        rows = resp.json()
+    except Exception as e:
+        logger.warning("Binance ticker/price fetch failed: %s", e)
+        return {}
+    out: Dict[str, float] = {}
+    for row in rows:
+        pair = want.get(row.get("symbol"))
+        if pair:
+            try:
+                out[pair] = float(row["price"])
+            except (KeyError, TypeError, ValueError):
+                continue
+    return out
+
+
+async def _fetch_missing(pairs: List[str]) -> Dict[str, float]:
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        got = await _fetch_coingecko(client, pairs)
+        rest = [p for p in pairs if p not in got]
+        if rest:
+            got.update(await _fetch_binance(client, rest))
+    return got
+
+
+async def get_prices(symbols: Iterable[str]) -> Dict[str, Optional[float]]:
+    """
+    Текущие цены для набора символов (ключи — символы как переданы; None — цены нет).
+    Свежие значения берутся из потока цен, снимка / Redis, остальные — одним проходом по HTTP.
+    """
+    from app.services.price_feed import last_prices_async
+
+    by_pair: Dict[str, List[str]] = {}
+    for s in symbols:
+        if s:
+            by_pair.setdefault(normalize_pair(s), []).append(s)
+
+    # тики потока (WebSocket бирж) свежее любого REST-снимка
+    prices: Dict[str, float] = await last_prices_async(by_pair)
+    missing = []
+    for pair in by_pair:
+        if pair in prices:
+            continue
+        p = snapshot_get(pair)
+        if p is not None:
+            prices[pair] = p
+        else:
+            missing.append(pair)
+    if missing:
+        prices.update(_from_redis(missing))
+        missing = [p for p in missing if p not in prices]
+    if missing:
+        async with _fetch_lock():
+            # пока ждали lock, другой вызов мог уже докачать
+            for pair in list(missing):
+                p = snapshot_get(pair)
+                if p is not None:
+                    prices[pair] = p
+                    missing.remove(pair)
+            now = time.monotonic()
+            missing = [p for p in missing if not _recent_miss(p, now)]
+            if missing:
+                fetched = await _fetch_missing(missing)
+                snapshot_put(fetched)
+                prices.update(fetched)
+                for pair in missing:
+                    if pair not in fetched:
+                        _misses[pair] = now
+
+    return {s: prices.get(pair) for pair, syms in by_pair.items() for s in syms}
+
+
+async def get_price(symbol: str) -> Optional[float]:
+    return (await get_prices([symbol])).get(symbol)
@@ -4,6 +4,7 @@ Part of Task 3.1.2: Price tracking система
 """
 import logging
 import asyncio
+import time
 import aiohttp
 from typing import Dict, Any, List, Optional, Set
 from datetime import datetime, timedelta
@@ -13,9 +14,17 @@ from sqlalchemy import and_
 from ..models.signal import Signal, SignalStatus
 from ..database import get_db
 from ..services.signal_validation_service import signal_validation_service
+from ..services.price_snapshot import get_prices, normalize_pair, snapshot_put
+from ..services.price_feed import feed_config, last_prices_async, price_table
 
 logger = logging.getLogger(__name__)
 
+# Пока идут тики потока цен — current_prices обновляются раз в секунду; без потока — REST раз в 30 с.
+# price_history при этом пишется не чаще HISTORY_SAMPLE_SECONDS
+FEED_REFRESH_SECONDS = 1.0
+POLL_REFRESH_SECONDS = 30
+HISTORY_SAMPLE_SECONDS = 30
+
 class PriceTrackingService:
     """
     Service for real-time cryptocurrency price tracking
@@ -106,6 +115,9 @@ class PriceTrackingService:
     
     async def get_current_price(self, symbol: str) -> Optional[float]:
         """Get current price for a symbol"""
+        price = (await last_prices_async([symbol])).get(symbol)
+        if price:
+            return price
         if symbol in self.current_prices:
             return self.current_prices[symbol]
         
@@ -174,13 +186,18 @@ class PriceTrackingService:
         """
         Main price monitoring loop
         """
+        last_poll = 0.0
         while self.tracking_active:
             try:
+                # With a live price feed most updates are table reads; REST only every POLL_REFRESH_SECONDS
+                feed_live = price_table.live(feed_config()[1])
+                poll_due = time.monotonic() - last_poll >= POLL_REFRESH_SECONDS
                 if self.tracked_symbols:
-                    await self._update_all_prices()
+                    await self._update_all_prices(feed_only=feed_live and not poll_due)
+                if poll_due:
+                    last_poll = time.monotonic()
                 
-                # Sleep for 30 seconds between updates
-                await asyncio.sleep(30)
+                await asyncio.sleep(FEED_REFRESH_SECONDS if feed_live else POLL_REFRESH_SECONDS)
                 
             except Exception as e:
                 logger.error(f"Error in price monitoring loop: {e}")
@@ -234,11 +251,14 @@ class PriceTrackingService:
                 logger.error(f"Error in cleanup loop: {e}")
                 await asyncio.sleep(3600)
     
-    async def _update_all_prices(self):
-        """Update prices for all tracked symbols"""
+    async def _update_all_prices(self, feed_only: bool = False):
+        """Update prices for all tracked symbols (feed_only: only from the price feed table)"""
         try:
-            # Get prices from primary exchange
-            prices = await self._get_multiple_prices(list(self.tracked_symbols))
+            if feed_only:
+                prices = await last_prices_async(self.tracked_symbols)
+            else:
+                # Get prices from primary exchange
+                prices = await self._get_multiple_prices(list(self.tracked_symbols))
             
             timestamp = datetime.utcnow()
             
@@ -247,11 +267,13 @@ class PriceTrackingService:
                     old_price = self.current_prices.get(symbol)
                     self.current_prices[symbol] = price
                     
-                    # Store in price history
-                    if symbol not in self.price_history:
-                        self.price_history[symbol] = []
+                    # Store in price history (sampled: feed updates arrive every second)
+                    history = self.price_history.setdefault(symbol, [])
+                    if history and (timestamp - history[-1]['timestamp']).total_seconds() < HISTORY_SAMPLE_SECONDS:
+                        continue
+                    old_price = history[-1]['price'] if history else old_price
                     
-                    self.price_history[symbol].append({
+                    history.append({
                         'price': price,
                         'timestamp': timestamp,
                         'change': ((price - old_price) / old_price * 100) if old_price else 0
@@ -267,6 +289,11 @@ class PriceTrackingService:
     async def _get_current_price(self, symbol: str) -> Optional[float]:
         """Get current price for a single symbol"""
         try:
+            # Shared snapshot first (same prices as signal_checker / price_validator)
+            price = (await get_prices([symbol])).get(symbol)
+            if price:
+                return price
+
             # Try primary exchange first
             price = await self._fetch_price_from_exchange(symbol, self.primary_exchange)
             if price:
@@ -288,16 +315,24 @@ class PriceTrackingService:
     async def _get_multiple_prices(self, symbols: List[str]) -> Dict[str, Optional[float]]:
         """Get prices for multiple symbols efficiently"""
         try:
+            # One batched lookup through the shared snapshot; exchanges only for what it lacks
+            prices = await get_prices(symbols)
+            missing = [symbol for symbol in symbols if not prices.get(symbol)]
+            if not missing:
+                return prices
+
             if self.primary_exchange == 'binance':
-                return await self._fetch_binance_prices(symbols)
+                fetched = await self._fetch_binance_prices(missing)
             elif self.primary_exchange == 'bybit':
-                return await self._fetch_bybit_prices(symbols)
+                fetched = await self._fetch_bybit_prices(missing)
             else:
                 # Fallback to individual requests
-                prices = {}
-                for symbol in symbols:
-                    prices[symbol] = await self._get_current_price(symbol)
-                return prices
+                fetched = {}
+                for symbol in missing:
+                    fetched[symbol] = await self._get_current_price(symbol)
+            snapshot_put({normalize_pair(k): v for k, v in fetched.items() if v})
+            prices.update({k: v for k, v in fetched.items() if v})
+            return prices
                 
         except Exception as e:
             logger.error(f"Error getting multiple prices: {e}")
@@ -1,16 +1,13 @@
 """
 Validate signal prices against real market data from CoinGecko.
-Uses Redis cache when available, in-memory fallback otherwise.
+Prices come from the shared snapshot (price_snapshot): Redis when available, in-process otherwise.
 """
 import logging
-import httpx
-from typing import Optional, Dict
-from datetime import datetime, timedelta
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
-_price_cache: Dict[str, tuple] = {}  # in-memory fallback
-CACHE_TTL = 300  # 5 minutes
+CACHE_TTL = 300  # 5 minutes, TTL снимка цен
 
 
 COINGECKO_IDS = {
@@ -29,54 +26,21 @@ COINGECKO_IDS = {
 
 
 async def get_current_price(symbol: str) -> Optional[float]:
-    """Get current price for a crypto asset from CoinGecko."""
-    pair = symbol.replace("/USDT", "").replace("/USD", "").upper()
-    coingecko_id = COINGECKO_IDS.get(pair)
-    if not coingecko_id:
-        return None
+    """Get current price for a crypto asset (shared snapshot, batched CoinGecko/Binance)."""
+    from app.services.price_snapshot import get_price
 
-    # Redis cache (preferred)
-    try:
-        from app.core.redis_cache import cache_get, cache_set, key_price, CACHE_TTL_PRICE
-        cached = cache_get(key_price(pair))
-        if cached is not None:
-            return float(cached)
-    except ImportError:
-        pass
+    return await get_price(symbol)
 
-    # In-memory fallback
-    now = datetime.utcnow()
-    if pair in _price_cache:
-        cached_price, cached_time = _price_cache[pair]
-        if (now - cached_time).total_seconds() < CACHE_TTL:
-            return cached_price
 
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(
-                f"https://api.coingecko.com/api/v3/simple/price",
-                params={"ids": coingecko_id, "vs_currencies": "usd"}
-            )
-            if resp.status_code == 200:
-                data = resp.json()
-                price = data.get(coingecko_id, {}).get("usd")
-                if price:
-                    _price_cache[pair] = (price, now)
-                    try:
-                        from app.core.redis_cache import cache_set, key_price, CACHE_TTL_PRICE
-                        cache_set(key_price(pair), price, CACHE_TTL_PRICE)
-                    except ImportError:
-                        pass
-                    return price
-    except Exception as e:
-        logger.warning(f"CoinGecko price fetch failed for {pair}: {e}")
+async def validate_signal_price(
+    symbol: str, entry_price: float, current_price: Optional[float] = None
+) -> dict:
+    """Validate if a signal's entry price is reasonable vs current market.
 
-    return None
-
-
-async def validate_signal_price(symbol: str, entry_price: float) -> dict:
-    """Validate if a signal's entry price is reasonable vs current market."""
-    current_price = await get_current_price(symbol)
+    current_price — уже известная цена (например, из price_snapshot.get_prices по пачке).
+    """
+    if current_price is None:
+        current_price = await get_current_price(symbol)
     if current_price is None:
         return {"valid": True, "reason": "no_market_data", "current_price": None}
 
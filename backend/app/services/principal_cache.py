@@ -0,0 +1,278 @@
+"""
+Кэш аутентифицированного пользователя (principal) для зависимостей авторизации.
+
+JWT sub → неизменяемый снимок пользователя: роль, план, статус подписки, лимиты, фичи.
+L1 — словарь процесса, L2 — Redis (общий для воркеров), TTL у обоих — несколько секунд
+(AUTH_PRINCIPAL_TTL_SEC). Горячий путь авторизованного чтения (require_admin / require_premium /
+require_feature / get_current_principal) не ходит в БД, пока снимок жив.
+
+Инвалидация — по событию записи, как в cache_versions: хуки сессии отмечают пользователей,
+у которых изменились поля снимка (смена плана, деактивация, вебхуки Stripe, правка подписки),
+и после commit сбрасывают их снимки в L1 этого процесса и в Redis. Bulk-запросы по User /
+Subscription сбрасывают всё (версия NS_PRINCIPALS). L1 других воркеров доживает свой TTL.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, lazyload
+
+from app.core.config import get_settings
+from app.core.redis_cache import NS_PRINCIPALS, bump_cache_version, cache_delete, cache_get, cache_set, key_principal
+from app.models.subscription import Subscription
+from app.models.user import SubscriptionPlan, SubscriptionStatus, User, UserRole
+
+logger = logging.getLogger(__name__)
+
+_DIRTY_KEY = "principals_dirty"
+_ALL = "*"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Снимок пользователя для проверок доступа; атрибуты — как у User."""
+
+    id: int
+    email: str
+    username: Optional[str]
+    full_name: Optional[str]
+    role: UserRole
+    is_active: bool
+    is_verified: bool
+    subscription_plan: SubscriptionPlan
+    subscription_status: SubscriptionStatus
+    subscription_end_date: Optional[datetime]
+    channels_limit: Optional[int]
+    api_calls_limit: Optional[int]
+    api_calls_used_today: int
+    features: FrozenSet[str]
+    # статус текущей записи Subscription (ACTIVE / TRIALING / PAST_DUE), None — подписки нет
+    current_subscription_status: Optional[str] = None
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+    @property
+    def is_premium(self) -> bool:
+        if self.is_admin:
+            return True
+        return (
+            self.subscription_plan in [SubscriptionPlan.PREMIUM, SubscriptionPlan.PRO]
+            and self.subscription_status == SubscriptionStatus.ACTIVE
+            and (self.subscription_end_date is None or self.subscription_end_date > datetime.utcnow())
+        )
+
+    @property
+    def is_pro(self) -> bool:
+        if self.is_admin:
+            return True
+        return (
+            self.subscription_plan == SubscriptionPlan.PRO
+            and self.subscription_status == SubscriptionStatus.ACTIVE
+            and (self.subscription_end_date is None or self.subscription_end_date > datetime.utcnow())
+        )
+
+    def has_feature(self, feature: str) -> bool:
+        return self.is_admin or feature in self.features
+
+    @classmethod
+    def from_user(cls, user: User, subscription: Optional[Subscription] = None) -> "Principal":
+        status = getattr(subscription, "status", None)
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            full_name=user.full_name,
+            role=user.role or UserRole.FREE_USER,
+            is_active=bool(user.is_active),
+            is_verified=bool(user.is_verified),
+            subscription_plan=user.subscription_plan or SubscriptionPlan.FREE,
+            subscription_status=user.subscription_status or SubscriptionStatus.ACTIVE,
+            subscription_end_date=user.subscription_end_date,
+            channels_limit=user.channels_limit,
+            api_calls_limit=user.api_calls_limit,
+            api_calls_used_today=user.api_calls_used_today or 0,
+            features=frozenset(k for k, on in (user.features_enabled or {}).items() if on),
+            current_subscription_status=getattr(status, "value", status),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        for name in ("role", "subscription_plan", "subscription_status"):
+            data[name] = data[name].value
+        data["subscription_end_date"] = self.subscription_end_date.isoformat() if self.subscription_end_date else None
+        data["features"] = sorted(self.features)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Principal":
+        end = data.get("subscription_end_date")
+        return cls(**{
+            **data,
+            "role": UserRole(data["role"]),
+            "subscription_plan": SubscriptionPlan(data["subscription_plan"]),
+            "subscription_status": SubscriptionStatus(data["subscription_status"]),
+            "subscription_end_date": datetime.fromisoformat(end) if end else None,
+            "features": frozenset(data.get("features") or ()),
+        })
+
+
+# Поля User, изменение которых сбрасывает снимок; счётчик api_calls_used_today (растёт на
+# каждый вызов API) и поля входа не сбрасывают — снимок догоняет их по TTL
+_USER_FIELDS = tuple(
+    f.name for f in fields(Principal)
+    if f.name not in ("id", "features", "current_subscription_status", "api_calls_used_today")
+) + ("features_enabled",)
+
+
+class PrincipalCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local: Dict[int, Tuple[float, Principal]] = {}
+        # растёт на каждой инвалидации: загрузка, начатая до неё, не кладёт старый снимок
+        self._epoch = 0
+
+    @staticmethod
+    def ttl() -> float:
+        return max(0.0, float(getattr(get_settings(), "AUTH_PRINCIPAL_TTL_SEC", 5.0)))
+
+    def peek(self, user_id: int) -> Optional[Principal]:
+        """Только L1, без Redis/БД (для async-кода: не блокирует event loop)."""
+        with self._lock:
+            hit = self._local.get(user_id)
+        return hit[1] if hit is not None and hit[0] > time.monotonic() else None
+
+    def get(self, user_id: int, load: Callable[[int], Optional[Principal]]) -> Optional[Principal]:
+        """Снимок из L1 → Redis → load(user_id) (БД); None — пользователя нет."""
+        ttl = self.ttl()
+        now = time.monotonic()
+        with self._lock:
+            hit = self._local.get(user_id)
+            epoch = self._epoch
+        if hit is not None and hit[0] > now:
+            return hit[1]
+        if ttl <= 0:
+            return load(user_id)
+
+        principal = None
+        data = cache_get(key_principal(user_id))
+        if data:
+            try:
+                principal = Principal.from_dict(data)
+            except Exception as e:
+                logger.debug(f"Bad principal cache entry for {user_id}: {e}")
+        if principal is None:
+            principal = load(user_id)
+            if principal is None:
+                return None
+            if self._epoch == epoch:
+                cache_set(key_principal(user_id), principal.to_dict(), ttl=max(1, int(ttl)))
+        with self._lock:
+            if self._epoch == epoch:
+                self._local[user_id] = (now + ttl, principal)
+        return principal
+
+    def invalidate(self, *user_ids: int) -> None:
+        with self._lock:
+            self._epoch += 1
+            for uid in user_ids:
+                self._local.pop(uid, None)
+        for uid in user_ids:
+            cache_delete(key_principal(uid))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._local.clear()
+        bump_cache_version(NS_PRINCIPALS)
+
+
+principal_cache = PrincipalCache()
+
+
+def load_principal(db: Session, user_id: int) -> Optional[Principal]:
+    """Снимок из БД: пользователь + текущая подписка (два узких запроса, только на промахе)."""
+    from app.services.subscription_service import SubscriptionService
+
+    # без selectin-связей User (каналы, ключи, платежи…) — снимку нужны только колонки
+    user = db.query(User).options(lazyload("*")).filter(User.id == user_id).first()
+    if user is None:
+        return None
+    return Principal.from_user(user, SubscriptionService(db).get_user_subscription(user_id))
+
+
+def get_principal(user_id: int) -> Optional[Principal]:
+    """Снимок пользователя; на промахе — короткая собственная сессия БД (всегда закрывается)."""
+    from app.core.database import session_scope
+
+    def _load(uid: int) -> Optional[Principal]:
+        with session_scope() as db:
+            return load_principal(db, uid)
+
+    return principal_cache.get(user_id, _load)
+
+
+def invalidate_principal(*user_ids: int) -> None:
+    """Явная инвалидация снимков (когда изменение идёт мимо ORM-сессии этого процесса)."""
+    principal_cache.invalidate(*[uid for uid in user_ids if uid is not None])
+
+
+# --- Хуки сессии: после commit сбросить снимки пользователей, чьи данные изменились ---
+
+def _user_changed(user: User) -> bool:
+    state = inspect(user)
+    return any(state.attrs[name].history.has_changes() for name in _USER_FIELDS)
+
+
+def _mark(session: Session, user_ids: Set[Any]) -> None:
+    if user_ids:
+        session.info.setdefault(_DIRTY_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_written(session: Session, flush_context) -> None:
+    user_ids: Set[Any] = set()
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            user_ids.add(obj.id)
+        elif isinstance(obj, Subscription):
+            user_ids.add(obj.user_id)
+    for obj in session.new:
+        # новая подписка меняет current_subscription_status владельца
+        if isinstance(obj, Subscription):
+            user_ids.add(obj.user_id)
+    for obj in session.dirty:
+        if isinstance(obj, User) and _user_changed(obj):
+            user_ids.add(obj.id)
+        elif isinstance(obj, Subscription) and session.is_modified(obj, include_collections=False):
+            user_ids.add(obj.user_id)
+    _mark(session, user_ids)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk(orm_execute_state) -> None:
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in (User, Subscription):
+            _mark(orm_execute_state.session, {_ALL})
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session) -> None:
+    user_ids = session.info.pop(_DIRTY_KEY, None)
+    if not user_ids:
+        return
+    if _ALL in user_ids:
+        principal_cache.clear()
+    else:
+        principal_cache.invalidate(*[uid for uid in user_ids if uid is not None])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
@@ -20,7 +20,8 @@ from app.services.collection_pipeline import (
 )
 from app.services.deep_collector import fetch_all_posts
 from app.services.reddit_scraper import CRYPTO_SUBREDDITS, collect_reddit_signals_in_window
-from app.services.telegram_scraper import parse_signal_from_text, ParsedSignal
+from app.services.parse_executor import parse_texts_async
+from app.services.telegram_scraper import ParsedSignal
 
 logger = logging.getLogger(__name__)
 
@@ -65,19 +66,16 @@ async def backfill_telegram_window(
             logger.warning("backfill TG @%s: fetch error %s", uname, e)
             continue
 
+        window_posts = [p for p in posts if p.date and start <= _ensure_utc(p.date) < end]
+        # парсинг пачкой: при PARSE_EXECUTOR_WORKERS — в пуле процессов, loop не блокируется
+        parsed = await parse_texts_async([p.text for p in window_posts])
         in_window: List[ParsedSignal] = []
-        for post in posts:
-            if not post.date:
-                continue
-            pd = _ensure_utc(post.date)
-            if not (start <= pd < end):
-                continue
-            sig = parse_signal_from_text(post.text)
+        for post, sig in zip(window_posts, parsed):
             if sig and sig.entry_price:
-                sig.timestamp = pd
+                sig.timestamp = _ensure_utc(post.date)
                 in_window.append(sig)
 
-        raw_posts += len([p for p in posts if p.date and start <= _ensure_utc(p.date) < end])
+        raw_posts += len(window_posts)
         st = persist_parsed_signals_for_channel(
             db,
             channel,
@@ -1,83 +1,207 @@
 """
 Check if pending signals have hit TP or SL based on current market prices.
-Updates signal status and recalculates channel metrics.
+Updates signal status; channel metrics follow incrementally (metrics_calculator).
+
+check_pending_signals — пакетная сверка всех PENDING со снимком цен (без потока цен).
+SignalTriggerWatcher — то же по тикам price_feed: уровни PENDING-сигналов лежат в
+TriggerEngine, раз в секунду проверяются только пересечённые.
 """
 import logging
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models.signal import Signal
-from app.services.price_validator import get_current_price
-from app.services.metrics_calculator import recalculate_all_channels
+from app.services.price_feed import feed_config, price_table
+from app.services.price_snapshot import get_prices, normalize_pair
+from app.services.trigger_engine import Fired, TriggerEngine, exit_levels
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
 
-async def check_pending_signals(db: Session) -> dict:
-    """Check all PENDING signals against current market prices."""
-    pending = (
-        db.query(Signal)
-        .filter(
-            Signal.status == "PENDING",
-            Signal.entry_price.isnot(None),
-        )
-        .all()
+def _pending_query():
+    return select(Signal).where(
+        Signal.status == "PENDING",
+        Signal.entry_price.isnot(None),
     )
-    updated = 0
-    results = []
 
+
+def _apply_hit(signal: Signal, new_status: str, level: float, current_price: float) -> dict:
+    """Закрыть сигнал на уровне TP1/SL: статус, PnL от уровня (не от цены тика)."""
+    entry = float(signal.entry_price)
+    # BUY/SELL — legacy-синонимы LONG/SHORT (exit_levels взводит уровни и для них)
+    if str(getattr(signal.direction, "value", signal.direction) or "").upper() in ("SHORT", "SELL"):
+        pnl = ((entry - level) / entry) * 100
+    else:
+        pnl = ((level - entry) / entry) * 100
+    signal.status = new_status
+    signal.profit_loss_percentage = pnl
+    signal.profit_loss_absolute = round(entry * pnl / 100, 8)
+    signal.is_successful = new_status == "TP1_HIT"
+    return {
+        "id": signal.id,
+        "asset": signal.asset,
+        "direction": signal.direction,
+        "status": new_status,
+        "entry": entry,
+        "current": current_price,
+        "pnl": round(pnl, 2) if pnl else None,
+    }
+
+
+def _apply_prices(pending: List[Signal], prices: Dict[str, float]) -> Tuple[int, List[dict]]:
+    """Сверка сигналов со снимком цен; меняет объекты на месте, возвращает (updated, results)."""
+    results = []
     for signal in pending:
-        current_price = await get_current_price(signal.asset)
-        if current_price is None:
+        current_price = prices.get(signal.asset)
+        if current_price is None or not signal.entry_price:
             continue
 
-        entry = float(signal.entry_price) if signal.entry_price else None
         tp = float(signal.tp1_price) if signal.tp1_price else None
         sl = float(signal.stop_loss) if signal.stop_loss else None
 
-        if not entry:
-            continue
-
-        new_status = None
-        pnl = None
-
+        hit = None
         if signal.direction == "LONG":
             if tp and current_price >= tp:
-                new_status = "TP1_HIT"
-                pnl = ((tp - entry) / entry) * 100
+                hit = ("TP1_HIT", tp)
             elif sl and current_price <= sl:
-                new_status = "SL_HIT"
-                pnl = ((sl - entry) / entry) * 100
+                hit = ("SL_HIT", sl)
         elif signal.direction == "SHORT":
             if tp and current_price <= tp:
-                new_status = "TP1_HIT"
-                pnl = ((entry - tp) / entry) * 100
+                hit = ("TP1_HIT", tp)
             elif sl and current_price >= sl:
-                new_status = "SL_HIT"
-                pnl = ((entry - sl) / entry) * 100
-
-        if new_status:
-            signal.status = new_status
-            if pnl is not None:
-                signal.profit_loss_percentage = pnl
-                entry = float(signal.entry_price)
-                signal.profit_loss_absolute = round(entry * pnl / 100, 8)
-            signal.is_successful = new_status == "TP1_HIT"
-            updated += 1
-            results.append({
-                "id": signal.id,
-                "asset": signal.asset,
-                "direction": signal.direction,
-                "status": new_status,
-                "entry": entry,
-                "current": current_price,
-                "pnl": round(pnl, 2) if pnl else None,
-            })
+                hit = ("SL_HIT", sl)
+
+        if hit:
+            results.append(_apply_hit(signal, hit[0], hit[1], current_price))
+
+    return len(results), results
+
+
+async def check_pending_signals(db: Session) -> dict:
+    """Check all PENDING signals against current market prices."""
+    pending = db.execute(_pending_query()).scalars().all()
+    # один снимок цен на все уникальные активы вместо запроса на каждый сигнал
+    prices = await get_prices({s.asset for s in pending if s.asset})
+    updated, results = _apply_prices(pending, prices)
 
     if updated > 0:
+        # метрики каналов обновляются хуком flush (metrics_calculator), без полного пересчёта
         db.commit()
-        recalculate_all_channels(db)
 
     return {
         "checked": len(pending),
         "updated": updated,
         "results": results,
     }
+
+
+async def check_pending_signals_async(
+    session: "AsyncSession", skip_asset: Optional[Callable[[str], bool]] = None
+) -> dict:
+    """
+    check_pending_signals на AsyncSession (scheduler на event loop API).
+    skip_asset — активы, которые уже ведёт SignalTriggerWatcher (есть свежая цена в потоке).
+    """
+    pending = (await session.scalars(_pending_query())).all()
+    if skip_asset is not None:
+        pending = [s for s in pending if not (s.asset and skip_asset(s.asset))]
+    prices = await get_prices({s.asset for s in pending if s.asset})
+    updated, results = _apply_prices(pending, prices)
+
+    if updated > 0:
+        await session.commit()
+
+    return {
+        "checked": len(pending),
+        "updated": updated,
+        "results": results,
+    }
+
+
+_HIT_STATUS = {"tp": "TP1_HIT", "sl": "SL_HIT"}
+
+
+class SignalTriggerWatcher:
+    """
+    TP1/SL PENDING-сигналов в TriggerEngine. sync() раз в N секунд подтягивает из БД
+    уровни (узкий select без ORM-объектов), poll_ticks() кормит движок последними ценами
+    из таблицы потока, flush() закрывает сработавшие одним commit.
+    """
+
+    def __init__(self) -> None:
+        self.engine = TriggerEngine()
+        self.synced = False
+        self._fired: Dict[int, Fired] = {}
+
+    @property
+    def active(self) -> bool:
+        """Уровни загружены и поток цен жив — пакетная сверка check_pending_signals не нужна."""
+        return self.synced and price_table.live(feed_config()[1])
+
+    def covers(self, asset: str) -> bool:
+        """Актив ведётся по тикам: уровни загружены и в таблице потока есть свежая цена пары."""
+        return self.synced and price_table.price(normalize_pair(asset), feed_config()[1]) is not None
+
+    @property
+    def pending_hits(self) -> int:
+        return len(self._fired)
+
+    def _collect(self, fired: List[Fired]) -> None:
+        for f in fired:
+            self._fired[f.key] = f
+
+    async def sync(self, session: "AsyncSession") -> int:
+        rows = (
+            await session.execute(
+                select(Signal.id, Signal.asset, Signal.direction, Signal.tp1_price, Signal.stop_loss).where(
+                    Signal.status == "PENDING",
+                    Signal.entry_price.isnot(None),
+                )
+            )
+        ).all()
+        specs = {
+            row.id: (normalize_pair(row.asset), exit_levels(row.direction, row.tp1_price, row.stop_loss))
+            for row in rows
+            if row.asset
+        }
+        self._collect(self.engine.sync(specs))
+        self.synced = True
+        return len(specs)
+
+    def poll_ticks(self, max_age: Optional[float] = None) -> int:
+        """Последние цены по символам с живыми уровнями; O(символов + сработавших)."""
+        max_age = feed_config()[1] if max_age is None else max_age
+        for pair in self.engine.symbols():
+            price = price_table.price(pair, max_age)
+            if price is not None:
+                self._collect(self.engine.on_tick(pair, price))
+        return len(self._fired)
+
+    async def flush(self, session: "AsyncSession") -> List[dict]:
+        if not self._fired:
+            return []
+        fired, self._fired = self._fired, {}
+        try:
+            signals = (
+                await session.scalars(select(Signal).where(Signal.id.in_(list(fired)), Signal.status == "PENDING"))
+            ).all()
+            results = []
+            for signal in signals:
+                f = fired[signal.id]
+                results.append(_apply_hit(signal, _HIT_STATUS[f.kind], f.level, f.price))
+            if results:
+                # метрики каналов и версии кэша — хуками flush/commit, как в check_pending_signals
+                await session.commit()
+        except Exception:
+            # срабатывания не теряем: повторим на следующем flush (новые за это время — важнее)
+            for key, f in fired.items():
+                self._fired.setdefault(key, f)
+            raise
+        return results
+
+
+signal_trigger_watcher = SignalTriggerWatcher()
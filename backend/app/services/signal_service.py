@@ -1,6 +1,6 @@
 from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, or_, desc, asc, case
+from sqlalchemy import func, and_, or_, desc, asc, case, select
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -242,100 +242,137 @@ class SignalService:
         self.db.commit()
         return True
 
-    def get_signal_stats(self, filters: Optional[SignalFilterParams] = None) -> SignalStats:
-        """Get signal statistics."""
-        query = self.db.query(Signal)
+    def _hours_between(self, start, end):
+        """end - start в часах, выражением SQL."""
+        if self.db.get_bind().dialect.name == "sqlite":
+            return (func.julianday(end) - func.julianday(start)) * 24
+        return func.extract("epoch", end - start) / 3600
 
-        # Apply filters
-        if filters:
-            if filters.channel_id:
-                query = query.filter(Signal.channel_id == filters.channel_id)
-            if filters.date_from:
-                query = query.filter(Signal.message_timestamp >= filters.date_from)
-            if filters.date_to:
-                query = query.filter(Signal.message_timestamp <= filters.date_to)
-
-        signals = query.all()
+    def get_signal_stats(self, filters: Optional[SignalFilterParams] = None) -> SignalStats:
+        """
+        Get signal statistics.
+
+        Один агрегатный запрос (FILTER + оконный max для просадки), наружу — только скаляры.
+        Статистика канала кэшируется в Redis по версии канала (app/services/cache_versions.py).
+        """
+        channel_id = filters.channel_id if filters else None
+        date_from = filters.date_from if filters else None
+        date_to = filters.date_to if filters else None
+
+        cache_key = None
+        if channel_id:
+            try:
+                from app.core.redis_cache import cache_get, key_signal_stats
+                cache_key = key_signal_stats(channel_id, date_from, date_to)
+                cached = cache_get(cache_key)
+                if cached is not None:
+                    return SignalStats(**cached)
+            except Exception:
+                cache_key = None
+
+        conditions = []
+        if channel_id:
+            conditions.append(Signal.channel_id == channel_id)
+        if date_from:
+            conditions.append(Signal.message_timestamp >= date_from)
+        if date_to:
+            conditions.append(Signal.message_timestamp <= date_to)
+
+        roi = Signal.profit_loss_percentage
+        # Просадка: пик ROI среди предыдущих сигналов (хронологически) минус текущий ROI
+        peak = func.max(roi).over(
+            order_by=(Signal.message_timestamp, Signal.id),
+            rows=(None, 0),
+        )
+        rows = (
+            select(
+                Signal.is_successful.label("is_successful"),
+                Signal.status.label("status"),
+                Signal.reached_tp1.label("tp1"),
+                Signal.reached_tp2.label("tp2"),
+                Signal.reached_tp3.label("tp3"),
+                Signal.hit_stop_loss.label("sl"),
+                roi.label("roi"),
+                self._hours_between(Signal.created_at, Signal.final_exit_timestamp).label("hours"),
+                (peak - roi).label("drawdown"),
+            )
+            .where(*conditions)
+            .subquery()
+        )
+        count = func.count()
+        agg = self.db.execute(
+            select(
+                count.label("total"),
+                count.filter(rows.c.is_successful.is_(True)).label("successful"),
+                count.filter(rows.c.is_successful.is_(False)).label("failed"),
+                count.filter(rows.c.is_successful.is_(None)).label("pending"),
+                count.filter(rows.c.tp1.is_(True)).label("tp1"),
+                count.filter(rows.c.tp2.is_(True)).label("tp2"),
+                count.filter(rows.c.tp3.is_(True)).label("tp3"),
+                count.filter(rows.c.sl.is_(True)).label("sl"),
+                count.filter(rows.c.status == SignalStatus.EXPIRED).label("expired"),
+                func.count(rows.c.roi).label("roi_n"),
+                func.sum(rows.c.roi).label("roi_sum"),
+                func.sum(rows.c.roi * rows.c.roi).label("roi_sumsq"),
+                func.max(rows.c.roi).label("roi_max"),
+                func.min(rows.c.roi).label("roi_min"),
+                func.avg(rows.c.hours).label("avg_hours"),
+                func.max(rows.c.drawdown).label("max_drawdown"),
+            )
+        ).one()
 
-        if not signals:
+        if not agg.total:
             return SignalStats()
 
-        total_signals = len(signals)
-        successful_signals = len([s for s in signals if s.is_successful == True])
-        failed_signals = len([s for s in signals if s.is_successful == False])
-        pending_signals = len([s for s in signals if s.is_successful is None])
-
-        # Calculate accuracy
-        completed_signals = successful_signals + failed_signals
-        accuracy = (successful_signals / completed_signals * 100) if completed_signals > 0 else 0
-
-        # Calculate ROI stats
-        roi_values = [float(s.profit_loss_percentage) for s in signals if s.profit_loss_percentage is not None]
-        average_roi = sum(roi_values) / len(roi_values) if roi_values else 0
-        total_profit_loss = sum(roi_values) if roi_values else 0
-        best_roi = max(roi_values) if roi_values else 0
-        worst_roi = min(roi_values) if roi_values else 0
-
-        # Calculate duration
-        durations = [s.duration_hours for s in signals if s.duration_hours is not None]
-        avg_duration = sum(durations) / len(durations) if durations else 0
-
-        # Target hit breakdown
-        tp1_hits = len([s for s in signals if s.reached_tp1])
-        tp2_hits = len([s for s in signals if s.reached_tp2])
-        tp3_hits = len([s for s in signals if s.reached_tp3])
-        sl_hits = len([s for s in signals if s.hit_stop_loss])
-        expired_signals = len([s for s in signals if s.status == SignalStatus.EXPIRED])
-
-        # --- Maximum Drawdown ---
-        def calculate_max_drawdown(roi_list):
-            if not roi_list:
-                return 0.0
-            peak = roi_list[0]
-            max_drawdown = 0.0
-            for roi in roi_list:
-                if roi > peak:
-                    peak = roi
-                drawdown = peak - roi
-                if drawdown > max_drawdown:
-                    max_drawdown = drawdown
-            return round(max_drawdown, 2)
-        max_drawdown = calculate_max_drawdown(roi_values)
-        # --- Sharpe Ratio ---
-        def calculate_sharpe_ratio(roi_list):
-            if not roi_list or len(roi_list) < 2:
-                return 0.0
-            mean_roi = sum(roi_list) / len(roi_list)
-            stddev = (sum((x - mean_roi) ** 2 for x in roi_list) / (len(roi_list) - 1)) ** 0.5
-            if stddev == 0:
-                return 0.0
-            sharpe = mean_roi / stddev
-            return round(sharpe, 2)
-        sharpe_ratio = calculate_sharpe_ratio(roi_values)
-
-        return SignalStats(
-            total_signals=total_signals,
-            successful_signals=successful_signals,
-            failed_signals=failed_signals,
-            pending_signals=pending_signals,
+        completed = agg.successful + agg.failed
+        accuracy = (agg.successful / completed * 100) if completed > 0 else 0
+
+        n = agg.roi_n or 0
+        total_profit_loss = float(agg.roi_sum or 0)
+        average_roi = total_profit_loss / n if n else 0
+
+        # --- Sharpe Ratio (выборочное стандартное отклонение из сумм) ---
+        sharpe_ratio = 0.0
+        if n >= 2:
+            variance = (float(agg.roi_sumsq or 0) - n * average_roi ** 2) / (n - 1)
+            stddev = math.sqrt(variance) if variance > 0 else 0.0
+            if stddev > 0:
+                sharpe_ratio = round(average_roi / stddev, 2)
+
+        stats = SignalStats(
+            total_signals=agg.total,
+            successful_signals=agg.successful,
+            failed_signals=agg.failed,
+            pending_signals=agg.pending,
             accuracy_percentage=round(accuracy, 2),
+            success_rate=round(accuracy, 2),
             average_roi=round(average_roi, 2),
             total_profit_loss=round(total_profit_loss, 2),
-            best_signal_roi=round(best_roi, 2),
-            worst_signal_roi=round(worst_roi, 2),
-            average_duration_hours=round(avg_duration, 2),
-            tp1_hits=tp1_hits,
-            tp2_hits=tp2_hits,
-            tp3_hits=tp3_hits,
-            sl_hits=sl_hits,
-            expired_signals=expired_signals,
-            max_drawdown=max_drawdown,
+            total_roi=round(total_profit_loss, 2),
+            best_signal_roi=round(float(agg.roi_max or 0), 2),
+            worst_signal_roi=round(float(agg.roi_min or 0), 2),
+            average_duration_hours=round(float(agg.avg_hours or 0), 2),
+            tp1_hits=agg.tp1,
+            tp2_hits=agg.tp2,
+            tp3_hits=agg.tp3,
+            sl_hits=agg.sl,
+            expired_signals=agg.expired,
+            max_drawdown=round(float(agg.max_drawdown or 0), 2),
             sharpe_ratio=sharpe_ratio,
         )
 
+        if cache_key is not None:
+            try:
+                from app.core.redis_cache import cache_set, CACHE_TTL_VERSIONED
+                cache_set(cache_key, stats.model_dump(mode="json"), CACHE_TTL_VERSIONED)
+            except Exception:
+                pass
+        return stats
+
     def get_channel_stats(self, channel_id: int, days: int = 30) -> ChannelSignalStats:
         """Get signal statistics for a specific channel."""
-        date_from = datetime.utcnow() - timedelta(days=days)
+        # начало окна — с точностью до минуты, чтобы повторные запросы попадали в кэш
+        date_from = (datetime.utcnow() - timedelta(days=days)).replace(second=0, microsecond=0)
         filters = SignalFilterParams(channel_id=channel_id, date_from=date_from)
 
         stats = self.get_signal_stats(filters)
@@ -212,50 +212,59 @@ def _extract_caption_or_alt_text(msg_block) -> str:
     return "\n".join(out).strip()
 
 
-async def fetch_channel_posts(username: str, limit: int = 20) -> List[ChannelPost]:
-    """Fetch recent posts from a public Telegram channel."""
+async def _get_channel_page(client: httpx.AsyncClient, url: str) -> httpx.Response:
+    from app.services.collect_concurrency import host_limiter
+
+    await host_limiter("t.me")
+    return await client.get(url, headers={"User-Agent": random.choice(HTTP_USER_AGENTS)})
+
+
+async def fetch_channel_posts(
+    username: str, limit: int = 20, *, client: Optional[httpx.AsyncClient] = None
+) -> List[ChannelPost]:
+    """Fetch recent posts from a public Telegram channel (client — общий keep-alive клиент, если передан)."""
     url = f"https://t.me/s/{username}"
     posts = []
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            resp = await client.get(
-                url,
-                headers={"User-Agent": random.choice(HTTP_USER_AGENTS)},
+        if client is not None:
+            resp = await _get_channel_page(client, url)
+        else:
+            async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as own_client:
+                resp = await _get_channel_page(own_client, url)
+        if resp.status_code != 200:
+            return []
+        soup = BeautifulSoup(resp.text, "html.parser")
+        for msg in soup.select(".tgme_widget_message_wrap")[-limit:]:
+            text_el = msg.select_one(".tgme_widget_message_text")
+            text = ""
+            if text_el:
+                text = text_el.get_text(separator="\n").strip()
+            date_el = msg.select_one(".tgme_widget_message_date time")
+            date = None
+            if date_el and date_el.get("datetime"):
+                try:
+                    date = datetime.fromisoformat(date_el["datetime"].replace("Z", "+00:00"))
+                except ValueError:
+                    pass
+            views_el = msg.select_one(".tgme_widget_message_views")
+            views = None
+            if views_el:
+                vt = views_el.get_text().strip().replace("K", "000").replace("M", "000000")
+                try:
+                    views = int(float(vt))
+                except ValueError:
+                    pass
+            mid = _extract_telegram_message_id(msg)
+            image_urls = _extract_image_urls(msg)
+            if not text and image_urls:
+                # media-only post: try caption/alt from html
+                text = _extract_caption_or_alt_text(msg)
+            # Keep posts that have either text OR images (OCR fallback)
+            if not text and not image_urls:
+                continue
+            posts.append(
+                ChannelPost(text=text, date=date, views=views, message_id=mid, image_urls=image_urls)
             )
-            if resp.status_code != 200:
-                return []
-            soup = BeautifulSoup(resp.text, "html.parser")
-            for msg in soup.select(".tgme_widget_message_wrap")[-limit:]:
-                text_el = msg.select_one(".tgme_widget_message_text")
-                text = ""
-                if text_el:
-                    text = text_el.get_text(separator="\n").strip()
-                date_el = msg.select_one(".tgme_widget_message_date time")
-                date = None
-                if date_el and date_el.get("datetime"):
-                    try:
-                        date = datetime.fromisoformat(date_el["datetime"].replace("Z", "+00:00"))
-                    except ValueError:
-                        pass
-                views_el = msg.select_one(".tgme_widget_message_views")
-                views = None
-                if views_el:
-                    vt = views_el.get_text().strip().replace("K", "000").replace("M", "000000")
-                    try:
-                        views = int(float(vt))
-                    except ValueError:
-                        pass
-                mid = _extract_telegram_message_id(msg)
-                image_urls = _extract_image_urls(msg)
-                if not text and image_urls:
-                    # media-only post: try caption/alt from html
-                    text = _extract_caption_or_alt_text(msg)
-                # Keep posts that have either text OR images (OCR fallback)
-                if not text and not image_urls:
-                    continue
-                posts.append(
-                    ChannelPost(text=text, date=date, views=views, message_id=mid, image_urls=image_urls)
-                )
     except Exception as e:
         logger.error(f"Error fetching @{username}: {e}")
     return posts
@@ -263,24 +272,7 @@ async def fetch_channel_posts(username: str, limit: int = 20) -> List[ChannelPos
 
 def _detect_asset(text: str) -> Optional[str]:
     """Detect crypto asset from text, return e.g. 'SOL/USDT'."""
-    text_upper = text.upper()
-    for pair in sorted(CRYPTO_PAIRS.keys(), key=len, reverse=True):
-        patterns = [
-            rf'#{pair}\b',
-            rf'\${pair}\b',
-            rf'\b{pair}\s*/\s*USDT\b',
-            rf'\b{pair}USDT\b',
-            rf'\b{pair}\s*/\s*USD\b',
-            rf'\b{pair}\s*/\s*BTC\b',
-        ]
-        for pat in patterns:
-            if re.search(pat, text_upper):
-                return f"{pair}/USDT"
-    for pair in sorted(CRYPTO_PAIRS.keys(), key=len, reverse=True):
-        if re.search(rf'\b{pair}\b', text_upper):
-            if pair not in ("NOT", "OP", "AT"):
-                return f"{pair}/USDT"
-    return None
+    return _PARSER.detect_asset(text)
 
 
 def _normalize_price_token(raw: str) -> Optional[float]:
@@ -310,17 +302,17 @@ def _normalize_price_token(raw: str) -> Optional[float]:
         return None
 
 
-def _parse_price(text: str, pattern: str) -> Optional[float]:
+def _parse_price(text: str, pattern: "str | re.Pattern[str]") -> Optional[float]:
     """Extract price from text using pattern (первая группа — токен цены)."""
-    m = re.search(pattern, text, re.I | re.M)
+    m = pattern.search(text) if isinstance(pattern, re.Pattern) else re.search(pattern, text, re.I | re.M)
     if m:
         return _normalize_price_token(m.group(1))
     return None
 
 
-def _parse_price_two_groups(text: str, pattern: str) -> Optional[Tuple[float, float]]:
+def _parse_price_two_groups(text: str, pattern: "str | re.Pattern[str]") -> Optional[Tuple[float, float]]:
     """Две цены из паттерна (зона входа)."""
-    m = re.search(pattern, text, re.I | re.M)
+    m = pattern.search(text) if isinstance(pattern, re.Pattern) else re.search(pattern, text, re.I | re.M)
     if not m:
         return None
     a = _normalize_price_token(m.group(1))
@@ -330,24 +322,30 @@ def _parse_price_two_groups(text: str, pattern: str) -> Optional[Tuple[float, fl
     return (a, b)
 
 
-def _parse_entry_zone(text: str, asset: str) -> Optional[Tuple[float, float]]:
-    """Диапазон входа: 0.42-0.44, entry zone: 1,2 - 1,25, between X and Y."""
-    zone_patterns = [
+_ZONE_PATTERNS = [
+    re.compile(p, re.I | re.M)
+    for p in (
         r"(?:entry\s*zone|зона\s*входа|entry\s*range|диапазон\s*входа)[:\s]*"
         r"\$?([\d\s]+[,.]?\d*k?)\s*[-–—]\s*\$?([\d\s]+[,.]?\d*k?)",
         r"(?:entry|вход|zone|зона)\s*(?:range|диапазон)?[:\s]*"
         r"\$?([\d\s]+[,.]?\d*k?)\s*[-–—]\s*\$?([\d\s]+[,.]?\d*k?)",
         r"\$?([\d\s]+[,.]?\d*k?)\s*[-–—]\s*\$?([\d\s]+[,.]?\d*k?)\s*(?:entry|вход|zone|зона)?",
         r"between\s+\$?([\d\s]+[,.]?\d*k?)\s+and\s+\$?([\d\s]+[,.]?\d*k?)",
-    ]
-    for pat in zone_patterns:
+    )
+]
+
+
+def _parse_entry_zone(text: str, asset: str, million_ctx: Optional["_MillionContext"] = None) -> Optional[Tuple[float, float]]:
+    """Диапазон входа: 0.42-0.44, entry zone: 1,2 - 1,25, between X and Y."""
+    in_million = million_ctx.contains if million_ctx is not None else (lambda p: _price_in_million_context(text, p))
+    for pat in _ZONE_PATTERNS:
         pair = _parse_price_two_groups(text, pat)
         if not pair:
             continue
         lo, hi = min(pair[0], pair[1]), max(pair[0], pair[1])
         mid = (lo + hi) / 2
         if _validate_price(mid, asset) and _validate_price(lo, asset) and _validate_price(hi, asset):
-            if not _price_in_million_context(text, mid):
+            if not in_million(mid):
                 return (lo, hi)
     return None
 
@@ -379,14 +377,41 @@ def _is_garbage(text: str) -> bool:
     return False
 
 
+def _million_num_str(price: float) -> str:
+    return str(int(price)) if price == int(price) else str(price).rstrip("0").rstrip(".")
+
+
 def _price_in_million_context(text: str, price: float) -> bool:
     """True if this price appears next to million/mill (e.g. $168.4 million)."""
     # Match "168.4" or "168" near "million"/"mill"
-    num_str = str(int(price)) if price == int(price) else str(price).rstrip("0").rstrip(".")
+    num_str = _million_num_str(price)
     pat = rf'\$?{re.escape(num_str)}\s*(?:million|mill|bn|billion)\b'
     return bool(re.search(pat, text, re.I))
 
 
+_MILLION_WORD = re.compile(r'(?:million|mill|bn|billion)\b', re.I)
+
+
+class _MillionContext:
+    """
+    То же, что _price_in_million_context, но текст сканируется один раз на сообщение:
+    запоминаются хвосты текста перед million/mill/bn/billion (без пробелов), цена проверяется
+    сравнением окончания хвоста с её строковым видом.
+    """
+
+    __slots__ = ("tails",)
+
+    def __init__(self, text: str) -> None:
+        self.tails = [text[: m.start()].rstrip() for m in _MILLION_WORD.finditer(text)]
+
+    def contains(self, price: float) -> bool:
+        if not self.tails:
+            return False
+        num = _million_num_str(price).lower()
+        n = len(num)
+        return any(len(t) >= n and t[-n:].lower() == num for t in self.tails)
+
+
 def _merge_unique_prices(values: List[Optional[float]]) -> List[float]:
     seen: set[float] = set()
     out: List[float] = []
@@ -399,14 +424,18 @@ def _merge_unique_prices(values: List[Optional[float]]) -> List[float]:
     return out
 
 
+_NUMBERED_TP = re.compile(r"(?:tp|target|цель)\s*(\d)\s*[:\s=]+\s*\$?([\d\s]+[,.]?\d*k?)", re.I)
+_TP_LIST_LINE = re.compile(r"(?:targets?|tps?|take\s*profits?|цели)\s*[:\s]+(.+?)(?:\n|$)", re.I | re.M)
+_TP_LIST_STOP = re.compile(r"\n|(?=\b(?:sl|stop)\b)", re.I)
+_TP_LIST_SEP = re.compile(r"[,;/|•]+")
+_TP_LIST_DOLLAR = re.compile(r"^\$\s*")
+_TP_LIST_LABEL = re.compile(r"^(?:tp|target|цель)\s*\d\s*[:\s]*", re.I)
+
+
 def _parse_numbered_take_profits(text: str, asset: str) -> List[float]:
     """TP1 / TP2 / Target 3: … — порядок по номеру в тексте."""
     tagged: List[Tuple[int, float]] = []
-    for m in re.finditer(
-        r"(?:tp|target|цель)\s*(\d)\s*[:\s=]+\s*\$?([\d\s]+[,.]?\d*k?)",
-        text,
-        re.I,
-    ):
+    for m in _NUMBERED_TP.finditer(text):
         idx = int(m.group(1))
         val = _normalize_price_token(m.group(2))
         if val is not None and _validate_price(val, asset):
@@ -417,66 +446,34 @@ def _parse_numbered_take_profits(text: str, asset: str) -> List[float]:
 
 def _parse_take_profit_list_line(text: str, asset: str) -> List[float]:
     """Строка targets: 1.1, 1.2 / TPs: … (до перевода строки или SL)."""
-    m = re.search(
-        r"(?:targets?|tps?|take\s*profits?|цели)\s*[:\s]+(.+?)(?:\n|$)",
-        text,
-        re.I | re.M,
-    )
+    m = _TP_LIST_LINE.search(text)
     if not m:
         return []
     chunk = m.group(1).strip()
-    chunk = re.split(r"\n|(?=\b(?:sl|stop)\b)", chunk, maxsplit=1, flags=re.I)[0]
+    chunk = _TP_LIST_STOP.split(chunk, maxsplit=1)[0]
     out: List[float] = []
-    for part in re.split(r"[,;/|•]+", chunk):
+    for part in _TP_LIST_SEP.split(chunk):
         part = part.strip()
         if not part:
             continue
-        part = re.sub(r"^\$\s*", "", part)
-        part = re.sub(r"^(?:tp|target|цель)\s*\d\s*[:\s]*", "", part, flags=re.I)
+        part = _TP_LIST_DOLLAR.sub("", part)
+        part = _TP_LIST_LABEL.sub("", part)
         val = _normalize_price_token(part)
         if val is not None and _validate_price(val, asset):
             out.append(val)
     return out
 
 
-def parse_signal_from_text(text: str) -> Optional[ParsedSignal]:
-    """Extract trading signal from message text."""
-    if _is_news_or_digest(text):
-        return None
-    if _is_garbage(text):
-        return None
-    # Skip non-crypto assets
-    text_upper = text.upper()
-    for ignore in IGNORE_ASSETS:
-        if ignore in text_upper and not any(c in text_upper for c in ["BTC", "ETH", "SOL"]):
-            return None
-
-    asset = _detect_asset(text)
-    if not asset:
-        return None
-
-    direction = None
-    if LONG_KW.search(text):
-        direction = "LONG"
-    if SHORT_KW.search(text):
-        direction = "SHORT" if not direction else direction
-
-    if not direction:
-        return None
-
-    entry_zone_low: Optional[float] = None
-    entry_zone_high: Optional[float] = None
-    entry_price = None
+class SignalTextParser:
+    """
+    Парсер текста сигнала с предкомпилированными паттернами (один экземпляр на процесс — _PARSER).
 
-    # Сначала зона входа (иначе «entry zone: 0.42-0.44» ловится как одно число 0.42)
-    z = _parse_entry_zone(text, asset)
-    if z:
-        entry_zone_low, entry_zone_high = z[0], z[1]
-        mid = (entry_zone_low + entry_zone_high) / 2
-        if _validate_price(mid, asset) and not _price_in_million_context(text, mid):
-            entry_price = mid
+    Порядок и приоритет паттернов те же, что у исходного построчного парсера; отличие — всё
+    компилируется один раз, тикер ищется одним проходом по тексту (а не ~400 re.search на пост),
+    контекст «million/bn» для цен собирается один раз на сообщение.
+    """
 
-    entry_patterns = [
+    ENTRY_PATTERNS = (
         r'(?:entry|вход|enter|price|цена)\s*(?:price|zone|зона)?[:\s]*\$?([\d\s]+[,.]?\d*k?)',
         r'(?:buy|купить|long|лонг)\s*(?:at|по|@|zone|from)?[:\s]*\$?([\d\s]+[,.]?\d*k?)',
         r'(?:sell|продать|short|шорт)\s*(?:at|по|@|from)?[:\s]*\$?([\d\s]+[,.]?\d*k?)',
@@ -487,92 +484,171 @@ def parse_signal_from_text(text: str) -> Optional[ParsedSignal]:
         r'\@\s*\$?([\d\s]+[,.]?\d*k?)\s*(?:[-–]|$)',
         r'(?:level|уровень)\s*(?:1)?[:\s]*\$?([\d\s]+[,.]?\d*k?)',
         r'(?:avg|average|средн)[.a-z]*\s*(?:entry|price|вход)?[:\s]*\$?([\d\s]+[,.]?\d*k?)',
-    ]
-    tp_patterns = [
+    )
+    TP_PATTERNS = (
         r'(?:tp|take.profit|тейк|цель)\s*(?:\d\s*)?[:\s]+\$?([\d\s]+[,.]?\d*k?)',
         r'(?:targets?|цели)\s*[:\s]+\$?([\d\s]+[,.]?\d*k?)',
         r'(?:target)\s+([\d\s]+[,.]?\d*k?)',
-    ]
-    sl_patterns = [
+    )
+    SL_PATTERNS = (
         r'(?:sl|stop.loss|стоп|стоп.лосс|stoploss)[:\s]*\$?([\d\s]+[,.]?\d*k?)',
-    ]
+    )
+    MAJOR_ASSETS = ("BTC", "ETH", "SOL")
+    # Совпадение «целым словом» без торгового контекста не считается тикером
+    AMBIGUOUS_WORDS = ("NOT", "OP", "AT")
+
+    def __init__(self, pairs: Optional[Dict[str, float]] = None, ignore_assets: Optional[set] = None) -> None:
+        flags = re.I | re.M
+        self.entry = [re.compile(p, flags) for p in self.ENTRY_PATTERNS]
+        self.tp = [re.compile(p, flags) for p in self.TP_PATTERNS]
+        self.sl = [re.compile(p, flags) for p in self.SL_PATTERNS]
+        self.dollar = re.compile(r'\$([\d\s]+[,.]?\d*k?)')
+
+        # Приоритет тикеров: длинные раньше (как sorted(..., key=len, reverse=True))
+        self.pairs = sorted((pairs if pairs is not None else CRYPTO_PAIRS).keys(), key=len, reverse=True)
+        self._rank = {p: i for i, p in enumerate(self.pairs)}
+        alt = "|".join(re.escape(p) for p in self.pairs)
+        # Форматы #BTC, $BTC, BTC/USDT, BTCUSDT, BTC/USD, BTC/BTC; lookahead — совпадения на каждой позиции.
+        # Ни один тикер не является подстрокой другого, поэтому на позиции возможен лишь один.
+        self.asset_tagged = re.compile(
+            rf'(?=[#$]({alt})\b|\b({alt})(?:\s*/\s*(?:USDT|USD|BTC)\b|USDT\b))'
+        )
+        self.asset_word = re.compile(rf'\b({alt})\b')
+        ignore = ignore_assets if ignore_assets is not None else IGNORE_ASSETS
+        self.ignore = re.compile("|".join(re.escape(x) for x in sorted(ignore))) if ignore else None
+
+    def detect_asset(self, text: str) -> Optional[str]:
+        return self._detect_asset_upper(text.upper())
+
+    def _detect_asset_upper(self, text_upper: str) -> Optional[str]:
+        rank = self._rank
+        best: Optional[str] = None
+        for m in self.asset_tagged.finditer(text_upper):
+            pair = m.group(1) or m.group(2)
+            if best is None or rank[pair] < rank[best]:
+                best = pair
+        if best is None:
+            for m in self.asset_word.finditer(text_upper):
+                pair = m.group(1)
+                if pair in self.AMBIGUOUS_WORDS:
+                    continue
+                if best is None or rank[pair] < rank[best]:
+                    best = pair
+        return f"{best}/USDT" if best else None
 
-    for pat in entry_patterns:
-        if entry_price:
-            break
-        p = _parse_price(text, pat)
-        if p and _validate_price(p, asset) and not _price_in_million_context(text, p):
-            entry_price = p
-            break
-
-    take_profit = None
-    for pat in tp_patterns:
-        p = _parse_price(text, pat)
-        if p and _validate_price(p, asset):
-            take_profit = p
-            break
-
-    stop_loss = None
-    for pat in sl_patterns:
-        p = _parse_price(text, pat)
-        if p and _validate_price(p, asset):
-            stop_loss = p
-            break
-
-    dollar_prices = re.findall(r'\$([\d\s]+[,.]?\d*k?)', text)
-    valid_prices = []
-    for raw in dollar_prices:
-        val = _normalize_price_token(raw)
-        if val is not None and _validate_price(val, asset):
-            valid_prices.append(val)
+    def _first_price(self, text: str, patterns, asset: str, million: Optional[_MillionContext] = None) -> Optional[float]:
+        for pat in patterns:
+            p = _parse_price(text, pat)
+            if p and _validate_price(p, asset) and (million is None or not million.contains(p)):
+                return p
+        return None
+
+    def parse(self, text: str) -> Optional[ParsedSignal]:
+        """Extract trading signal from message text."""
+        if _is_news_or_digest(text):
+            return None
+        if _is_garbage(text):
+            return None
+        # Skip non-crypto assets
+        text_upper = text.upper()
+        if self.ignore is not None and self.ignore.search(text_upper):
+            if not any(c in text_upper for c in self.MAJOR_ASSETS):
+                return None
 
-    if not entry_price and valid_prices:
-        entry_price = valid_prices[0]
-    if not take_profit and len(valid_prices) >= 2:
-        take_profit = valid_prices[1]
+        pair = self._detect_asset_upper(text_upper)
+        if not pair:
+            return None
+        asset = pair
 
-    numbered_tp = _parse_numbered_take_profits(text, asset)
-    list_tp = _parse_take_profit_list_line(text, asset)
-    take_profits_merged = _merge_unique_prices([take_profit] + numbered_tp + list_tp)
-    take_profit = take_profits_merged[0] if take_profits_merged else None
+        direction = None
+        if LONG_KW.search(text):
+            direction = "LONG"
+        if SHORT_KW.search(text):
+            direction = "SHORT" if not direction else direction
 
-    # DeFi/news filter: long text with news-like keywords but no TP/SL = not a signal
-    if entry_price and not take_profit and not stop_loss:
-        if len(text.strip()) >= MIN_TEXT_LEN_FOR_STRICT_SIGNAL and DEFI_NEWS_LIKE.search(text):
+        if not direction:
             return None
 
-    confidence = 0.4
-    if entry_price:
-        confidence = 0.6
-        if take_profit:
-            confidence = 0.75
-        if stop_loss:
-            confidence = 0.85
-
-    from app.services.sanitizer import sanitize_signal_text
-
-    return ParsedSignal(
-        asset=asset,
-        direction=direction,
-        entry_price=entry_price,
-        take_profit=take_profit,
-        take_profits=take_profits_merged,
-        stop_loss=stop_loss,
-        confidence=confidence,
-        original_text=sanitize_signal_text(text[:500]),
-        entry_zone_low=entry_zone_low,
-        entry_zone_high=entry_zone_high,
-    )
+        million = _MillionContext(text)
+        entry_zone_low: Optional[float] = None
+        entry_zone_high: Optional[float] = None
+        entry_price = None
+
+        # Сначала зона входа (иначе «entry zone: 0.42-0.44» ловится как одно число 0.42)
+        z = _parse_entry_zone(text, asset, million)
+        if z:
+            entry_zone_low, entry_zone_high = z[0], z[1]
+            mid = (entry_zone_low + entry_zone_high) / 2
+            if _validate_price(mid, asset) and not million.contains(mid):
+                entry_price = mid
+
+        if not entry_price:
+            entry_price = self._first_price(text, self.entry, asset, million)
+        take_profit = self._first_price(text, self.tp, asset)
+        stop_loss = self._first_price(text, self.sl, asset)
+
+        valid_prices = []
+        for raw in self.dollar.findall(text):
+            val = _normalize_price_token(raw)
+            if val is not None and _validate_price(val, asset):
+                valid_prices.append(val)
+
+        if not entry_price and valid_prices:
+            entry_price = valid_prices[0]
+        if not take_profit and len(valid_prices) >= 2:
+            take_profit = valid_prices[1]
+
+        numbered_tp = _parse_numbered_take_profits(text, asset)
+        list_tp = _parse_take_profit_list_line(text, asset)
+        take_profits_merged = _merge_unique_prices([take_profit] + numbered_tp + list_tp)
+        take_profit = take_profits_merged[0] if take_profits_merged else None
+
+        # DeFi/news filter: long text with news-like keywords but no TP/SL = not a signal
+        if entry_price and not take_profit and not stop_loss:
+            if len(text.strip()) >= MIN_TEXT_LEN_FOR_STRICT_SIGNAL and DEFI_NEWS_LIKE.search(text):
+                return None
+
+        confidence = 0.4
+        if entry_price:
+            confidence = 0.6
+            if take_profit:
+                confidence = 0.75
+            if stop_loss:
+                confidence = 0.85
+
+        from app.services.sanitizer import sanitize_signal_text
+
+        return ParsedSignal(
+            asset=asset,
+            direction=direction,
+            entry_price=entry_price,
+            take_profit=take_profit,
+            take_profits=take_profits_merged,
+            stop_loss=stop_loss,
+            confidence=confidence,
+            original_text=sanitize_signal_text(text[:500]),
+            entry_zone_low=entry_zone_low,
+            entry_zone_high=entry_zone_high,
+        )
+
+
+_PARSER = SignalTextParser()
+
+
+def parse_signal_from_text(text: str) -> Optional[ParsedSignal]:
+    """Extract trading signal from message text."""
+    return _PARSER.parse(text)
 
 
 async def collect_signals_from_channel(
-    username: str, limit: Optional[int] = None
+    username: str, limit: Optional[int] = None, *, client: Optional[httpx.AsyncClient] = None
 ) -> ChannelScrapeResult:
     """Fetch and extract signals from a public Telegram channel."""
+    from app.services.collect_concurrency import ocr_semaphore
     from app.services.ocr_signal_parser import parse_signal_from_image_url
 
     lim = limit if limit is not None else 20
-    posts = await fetch_channel_posts(username, limit=lim)
+    posts = await fetch_channel_posts(username, limit=lim, client=client)
     signals = []
     ocr_enabled = os.getenv("OCR_TELEGRAM_ENABLED", "true").lower() in ("1", "true", "yes")
     ocr_max_images = int(os.getenv("OCR_TELEGRAM_MAX_IMAGES_PER_POST", "1"))
@@ -590,7 +666,9 @@ async def collect_signals_from_channel(
         if ocr_enabled and post.image_urls:
             for u in post.image_urls[: max(0, ocr_max_images)]:
                 try:
-                    ocr_sig = await parse_signal_from_image_url(u)
+                    # OCR ограничен общим семафором: каналы собираются параллельно
+                    async with ocr_semaphore():
+                        ocr_sig = await parse_signal_from_image_url(u, channel=username)
                 except Exception as e:
                     logger.debug("OCR error @%s msg=%s: %s", username, post.message_id, e)
                     ocr_sig = None
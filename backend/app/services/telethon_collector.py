@@ -9,6 +9,7 @@ import os
 import sys
 import asyncio
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 import base64
 from typing import Any, Dict, List, Optional, Tuple
@@ -136,22 +137,50 @@ def is_authenticated() -> bool:
     return os.path.exists(f"{SESSION_PATH}.session")
 
 
+@asynccontextmanager
+async def shared_client():
+    """
+    Одно подключение на весь прогон: запросы по разным каналам мультиплексируются
+    в одном MTProto-соединении (и один .session файл — без конкурентных коннектов).
+    Отдаёт None, если сессии нет или она не авторизована.
+    """
+    if not is_authenticated():
+        yield None
+        return
+    client = _get_client()
+    if not client:
+        yield None
+        return
+    try:
+        await client.connect()
+        if not await client.is_user_authorized():
+            logger.warning("Session expired. Re-run auth.")
+            yield None
+            return
+        yield client
+    finally:
+        await client.disconnect()
+
+
 async def collect_channel_history(
-    username: str, days_back: int = 90, limit: int = 500
+    username: str, days_back: int = 90, limit: int = 500, *, client=None
 ) -> Tuple[List[ParsedSignal], List[ChannelPost]]:
     """
     Collect messages from a channel using Telethon.
 
     Returns (parsed_signals, all_text_posts) — второй список для shadow raw_events
     (см. persist_shadow_telegram_posts_if_enabled, scraper=telethon).
+    client — уже подключённый клиент из shared_client(); иначе подключаемся сами.
     """
-    if not is_authenticated():
-        logger.warning("Telethon not authenticated. Run: python -m app.services.telethon_collector --auth")
-        return [], []
+    own_client = client is None
+    if own_client:
+        if not is_authenticated():
+            logger.warning("Telethon not authenticated. Run: python -m app.services.telethon_collector --auth")
+            return [], []
 
-    client = _get_client()
-    if not client:
-        return [], []
+        client = _get_client()
+        if not client:
+            return [], []
 
     signals: List[ParsedSignal] = []
     shadow_posts: List[ChannelPost] = []
@@ -159,10 +188,11 @@ async def collect_channel_history(
 
     full_mtproto = get_settings().SHADOW_TELETHON_FULL_MTPROTO
     try:
-        await client.connect()
-        if not await client.is_user_authorized():
-            logger.warning("Session expired. Re-run auth.")
-            return [], []
+        if own_client:
+            await client.connect()
+            if not await client.is_user_authorized():
+                logger.warning("Session expired. Re-run auth.")
+                return [], []
 
         entity = await client.get_entity(username)
         since = datetime.utcnow() - timedelta(days=days_back)
@@ -212,7 +242,8 @@ async def collect_channel_history(
     except Exception as e:
         logger.error(f"Telethon @{username}: {e}")
     finally:
-        await client.disconnect()
+        if own_client:
+            await client.disconnect()
 
     return signals, shadow_posts
 
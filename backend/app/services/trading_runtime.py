@@ -0,0 +1,73 @@
+"""
+Долгоживущий event loop для синхронных торговых задач (Celery / TradingScheduler).
+
+Задачи trading_tasks синхронные, а TradingService — async. Раньше на каждый аккаунт или
+позицию создавался и закрывался свой loop, а с ним и HTTP-сессия биржи (новый TCP + TLS
+на каждый вызов). Здесь loop один на процесс и живёт в отдельном потоке; задача отдаёт ему
+одну корутину через run() и ждёт результат. ExchangeService на этом loop общий, его
+keep-alive пул (exchange_service._shared_session) переживает запуски задач.
+
+После fork (prefork-воркер Celery) поток не наследуется — loop поднимается заново.
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Optional
+
+from app.services.exchange_service import ExchangeService, close_shared_session
+
+logger = logging.getLogger(__name__)
+
+
+class TradingRuntime:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._exchange: Optional[ExchangeService] = None
+
+    @property
+    def exchange_service(self) -> ExchangeService:
+        if self._exchange is None:
+            self._exchange = ExchangeService()
+        return self._exchange
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._thread is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def _serve() -> None:
+                    asyncio.set_event_loop(loop)
+                    started.set()
+                    loop.run_forever()
+
+                thread = threading.Thread(target=_serve, name="trading-runtime", daemon=True)
+                thread.start()
+                started.wait()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Выполнить корутину на loop рантайма и вернуть результат (вызывать не из этого loop)."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result(timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Закрыть пул соединений и остановить loop (shutdown процесса)."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or thread is None or not thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(close_shared_session(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Trading runtime: failed to close exchange session: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+
+trading_runtime = TradingRuntime()
@@ -3,7 +3,7 @@ Trading Service for auto-trading functionality
 """
 from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, or_, desc, extract
+from sqlalchemy import func, and_, or_, desc, extract, update
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -31,10 +31,10 @@ logger = logging.getLogger(__name__)
 class TradingService:
     """Main trading service for auto-trading operations"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, exchange_service: Optional[ExchangeService] = None):
         self.db = db
         self.settings = get_settings()
-        self.exchange_service = ExchangeService()
+        self.exchange_service = exchange_service or ExchangeService()
         self.risk_service = RiskService(db)
         
         # Initialize encryption key for API credentials
@@ -349,52 +349,7 @@ class TradingService:
                     detail="Trading account not found"
                 )
             
-            # Decrypt API credentials
-            api_key = self.cipher.decrypt(account.api_key_encrypted.encode()).decode()
-            api_secret = self.cipher.decrypt(account.api_secret_encrypted.encode()).decode()
-            passphrase = None
-            if account.passphrase_encrypted:
-                passphrase = self.cipher.decrypt(account.passphrase_encrypted.encode()).decode()
-            
-            # Get open positions
-            open_positions = self.get_open_positions(account_id)
-            
-            updated_count = 0
-            for position in open_positions:
-                try:
-                    # Get current price from exchange
-                    current_price = await self.exchange_service.get_current_price(
-                        exchange=account.exchange,
-                        api_key=api_key,
-                        api_secret=api_secret,
-                        passphrase=passphrase,
-                        symbol=position.symbol
-                    )
-                    
-                    if current_price:
-                        position.current_price = current_price
-                        
-                        # Calculate unrealized PnL
-                        if position.side == PositionSide.LONG:
-                            pnl = (current_price - position.entry_price) * position.size
-                        else:
-                            pnl = (position.entry_price - current_price) * position.size
-                        
-                        position.unrealized_pnl = pnl
-                        position.unrealized_pnl_percent = (pnl / (position.entry_price * position.size)) * 100
-                        
-                        updated_count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error updating position {position.id}: {e}")
-            
-            self.db.commit()
-            
-            return {
-                "success": True,
-                "positions_updated": updated_count,
-                "total_positions": len(open_positions)
-            }
+            return await self.update_open_positions([account_id])
             
         except Exception as e:
             logger.error(f"Error updating positions: {e}")
@@ -403,6 +358,62 @@ class TradingService:
                 detail="Failed to update positions"
             )
     
+    async def update_open_positions(self, account_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        Update prices and PnL of open positions (all, or of the given accounts):
+        one batch ticker call per exchange and one bulk UPDATE for all positions.
+        """
+        query = self.db.query(
+            TradingPosition.id,
+            TradingPosition.symbol,
+            TradingPosition.side,
+            TradingPosition.size,
+            TradingPosition.entry_price,
+            TradingAccount.exchange,
+        ).join(TradingAccount, TradingPosition.account_id == TradingAccount.id).filter(
+            TradingPosition.is_open == True
+        )
+        if account_ids is not None:
+            query = query.filter(TradingPosition.account_id.in_(account_ids))
+        rows = query.all()
+        
+        symbols_by_exchange: Dict[Any, set] = {}
+        for row in rows:
+            symbols_by_exchange.setdefault(row.exchange, set()).add(row.symbol)
+        fetched = await asyncio.gather(*(
+            self.exchange_service.get_current_prices(exchange, symbols)
+            for exchange, symbols in symbols_by_exchange.items()
+        ))
+        prices = dict(zip(symbols_by_exchange, fetched))
+        
+        updates = []
+        for row in rows:
+            current_price = prices[row.exchange].get(row.symbol)
+            if not current_price:
+                continue
+            if row.side == PositionSide.LONG:
+                pnl = (current_price - row.entry_price) * row.size
+            else:
+                pnl = (row.entry_price - current_price) * row.size
+            notional = row.entry_price * row.size
+            updates.append({
+                "id": row.id,
+                "current_price": current_price,
+                "unrealized_pnl": pnl,
+                "unrealized_pnl_percent": float(pnl / notional * 100) if notional else 0.0,
+            })
+        
+        if updates:
+            # ORM bulk UPDATE by primary key: one executemany instead of a flush per position
+            self.db.execute(update(TradingPosition), updates)
+            self.db.commit()
+        
+        return {
+            "success": True,
+            "positions_updated": len(updates),
+            "total_positions": len(rows)
+        }
+    
     def get_trading_stats(self, account_id: int) -> Dict[str, Any]:
         """Get trading statistics for an account"""
         try:
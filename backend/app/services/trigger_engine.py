@@ -0,0 +1,175 @@
+"""
+TP/SL-триггеры по тикам: на символ — две кучи уровней вместо перебора всех открытых сигналов.
+
+Уровень срабатывает либо при росте цены до него (UP: price >= level — TP лонга, SL шорта),
+либо при падении (DOWN: price <= level — SL лонга, TP шорта). UP-уровни лежат в min-куче,
+DOWN — в max-куче; инвариант: всё, что осталось в кучах, при последней цене ещё не сработало.
+Тик снимает с вершин только пересечённые уровни: O((k + 1) log n), k — сработавшие, а не
+число открытых сигналов. Гэп через несколько уровней ловится тем же проходом.
+
+Владелец (сигнал, позиция) срабатывает один раз: первый пересечённый уровень снимает все
+его уровни. Снятые записи удаляются из куч лениво (по поколению владельца), кучи
+пересобираются, когда мёртвых записей становится больше живых.
+
+Движок не потокобезопасен: один владелец — один поток / event loop.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+UP = 1
+DOWN = -1
+
+# (kind, price, side); price=None — уровня нет
+Level = Tuple[str, Optional[float], int]
+_Entry = Tuple[float, int, Hashable, str, int]  # (±level, seq, key, kind, generation)
+
+_COMPACT_MIN_DEAD = 64
+
+
+@dataclass(frozen=True)
+class Fired:
+    key: Hashable
+    kind: str
+    level: float
+    price: float
+
+
+def exit_levels(direction, take_profit, stop_loss) -> List[Level]:
+    """TP/SL в уровни с нужной стороной: LONG/BUY — TP вверх, SL вниз; SHORT/SELL — наоборот."""
+    d = str(getattr(direction, "value", direction) or "").upper()
+    tp = float(take_profit) if take_profit else None
+    sl = float(stop_loss) if stop_loss else None
+    if d in ("LONG", "BUY"):
+        return [("tp", tp, UP), ("sl", sl, DOWN)]
+    if d in ("SHORT", "SELL"):
+        return [("tp", tp, DOWN), ("sl", sl, UP)]
+    return []
+
+
+def _crossed(side: int, level: float, price: float) -> bool:
+    return price >= level if side == UP else price <= level
+
+
+class _Book:
+    __slots__ = ("up", "down", "price", "live", "dead")
+
+    def __init__(self) -> None:
+        self.up: List[_Entry] = []
+        self.down: List[_Entry] = []
+        self.price: Optional[float] = None
+        self.live = 0
+        self.dead = 0
+
+
+class TriggerEngine:
+    def __init__(self) -> None:
+        self._books: Dict[str, _Book] = {}
+        self._specs: Dict[Hashable, Tuple[str, Tuple[Tuple[str, float, int], ...]]] = {}
+        self._gen: Dict[Hashable, int] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._specs
+
+    def symbols(self) -> List[str]:
+        """Символы, по которым есть живые уровни (их и надо тикать)."""
+        return [s for s, book in self._books.items() if book.live]
+
+    def last_price(self, symbol: str) -> Optional[float]:
+        book = self._books.get(symbol)
+        return book.price if book else None
+
+    def watch(self, key: Hashable, symbol: str, levels: Iterable[Level]) -> List[Fired]:
+        """
+        Поставить (или заменить) уровни владельца. Если при последней цене символа уровень
+        уже пересечён — владелец не ставится, срабатывание возвращается сразу (приоритет —
+        порядок levels).
+        """
+        spec = (symbol, tuple((kind, float(price), side) for kind, price, side in levels if price))
+        if self._specs.get(key) == spec:
+            return []
+        self.unwatch(key)
+        if not spec[1]:
+            return []
+        book = self._books.setdefault(symbol, _Book())
+        if book.price is not None:
+            for kind, price, side in spec[1]:
+                if _crossed(side, price, book.price):
+                    return [Fired(key, kind, price, book.price)]
+        gen = next(self._seq)
+        for kind, price, side in spec[1]:
+            if side == UP:
+                heapq.heappush(book.up, (price, next(self._seq), key, kind, gen))
+            else:
+                heapq.heappush(book.down, (-price, next(self._seq), key, kind, gen))
+        book.live += len(spec[1])
+        self._specs[key] = spec
+        self._gen[key] = gen
+        return []
+
+    def unwatch(self, key: Hashable) -> bool:
+        return self._drop(key, popped=0)
+
+    def _drop(self, key: Hashable, popped: int) -> bool:
+        """Снять владельца; popped — сколько его записей уже вынуто из куч."""
+        spec = self._specs.pop(key, None)
+        if spec is None:
+            return False
+        del self._gen[key]
+        book = self._books[spec[0]]
+        book.live -= len(spec[1])
+        book.dead += len(spec[1]) - popped
+        if book.dead > book.live + _COMPACT_MIN_DEAD:
+            self._compact(book)
+        return True
+
+    def sync(self, specs: Mapping[Hashable, Tuple[str, Sequence[Level]]]) -> List[Fired]:
+        """Привести набор владельцев к specs (key → (symbol, levels)): лишних снять, новых/изменённых поставить."""
+        for key in [k for k in self._specs if k not in specs]:
+            self.unwatch(key)
+        fired: List[Fired] = []
+        for key, (symbol, levels) in specs.items():
+            fired.extend(self.watch(key, symbol, levels))
+        return fired
+
+    def on_tick(self, symbol: str, price: float) -> List[Fired]:
+        book = self._books.get(symbol)
+        if book is None:
+            return []
+        price = float(price)
+        book.price = price
+        fired: List[Fired] = []
+        while book.up and book.up[0][0] <= price:
+            self._fire(book, heapq.heappop(book.up), price, fired)
+        while book.down and -book.down[0][0] >= price:
+            self._fire(book, heapq.heappop(book.down), price, fired)
+        return fired
+
+    def on_ticks(self, prices: Mapping[str, float]) -> List[Fired]:
+        fired: List[Fired] = []
+        for symbol, price in prices.items():
+            if price:
+                fired.extend(self.on_tick(symbol, price))
+        return fired
+
+    def _fire(self, book: _Book, entry: _Entry, price: float, out: List[Fired]) -> None:
+        level, _, key, kind, gen = entry
+        if self._gen.get(key) != gen:
+            book.dead -= 1
+            return
+        self._drop(key, popped=1)
+        out.append(Fired(key, kind, abs(level), price))
+
+    def _compact(self, book: _Book) -> None:
+        book.up = [e for e in book.up if self._gen.get(e[2]) == e[4]]
+        book.down = [e for e in book.down if self._gen.get(e[2]) == e[4]]
+        heapq.heapify(book.up)
+        heapq.heapify(book.down)
+        book.dead = 0
@@ -1,6 +1,10 @@
 """
 Background scheduler for periodic signal collection.
 Uses asyncio instead of Celery for simplicity.
+
+Циклы работают на event loop API, поэтому к БД ходят через AsyncSession
+(app.core.database.async_session_scope); то, что осталось синхронным,
+выполняется в ограниченном пуле db-sync (run_with_session / run_sync_db).
 """
 import asyncio
 import logging
@@ -28,16 +32,23 @@ DAILY_REVALIDATION_INTERVAL = 86400  # 24 hours
 ML_TRAIN_INTERVAL = 86400  # 24 hours — переобучение ML раз в сутки
 SOURCE_HEALTH_INTERVAL = 86400  # 24 hours — регулярная проверка источников
 SOURCE_DISCOVERY_INTERVAL = 86400  # 24 hours — auto-add/cleanup источников
+# TP/SL по тикам потока цен: проверка раз в секунду, уровни из БД — раз в PRICE_TRIGGER_SYNC_INTERVAL
+PRICE_TRIGGER_TICK_INTERVAL = 1.0
+PRICE_TRIGGER_SYNC_INTERVAL = 30
 
 
 async def periodic_collection():
-    """Run signal collection every 15 minutes. C1: if COLLECT_TELEGRAM=false, skip Telegram (Reddit runs separately)."""
-    from app.core.database import SessionLocal
+    """
+    Run signal collection every 15 minutes. C1: if COLLECT_TELEGRAM=false, skip Telegram (Reddit runs separately).
+
+    Работает на AsyncSession: сбор, дедуп, сверка цен и метрик не блокируют event loop API.
+    """
+    from app.core.database import async_session_scope
     from app.core.config import get_settings
-    from app.services.collection_pipeline import run_telegram_collection_cycle
-    from app.services.metrics_calculator import recalculate_all_channels
-    from app.services.signal_checker import check_pending_signals
-    from app.services.dedup import cleanup_duplicates
+    from app.services.collection_pipeline import run_telegram_collection_cycle_async
+    from app.services.metrics_calculator import recalculate_all_channels_async
+    from app.services.signal_checker import check_pending_signals_async, signal_trigger_watcher
+    from app.services.dedup import cleanup_duplicates_async
 
     collection_cycle = 0
     while True:
@@ -45,104 +56,139 @@ async def periodic_collection():
         collection_cycle += 1
         logger.info(f"[Scheduler] Starting periodic collection at {datetime.utcnow().isoformat()}")
 
-        db = SessionLocal()
-        try:
-            settings = get_settings()
-            stats = await run_telegram_collection_cycle(db, settings)
-            total = stats.get("saved", 0)
+        async with async_session_scope() as session:
+            try:
+                settings = get_settings()
+                stats = await run_telegram_collection_cycle_async(session, settings)
+                total = stats.get("saved", 0)
+
+                await session.commit()
+
+                # Периодическая очистка дубликатов по полному тексту (раз в ~1 час при интервале 5 мин)
+                if collection_cycle % 12 == 0:
+                    try:
+                        removed = await cleanup_duplicates_async(session)
+                        if removed:
+                            logger.info(f"[Scheduler] cleanup_duplicates removed {removed} duplicates")
+                    except Exception as e:
+                        logger.warning(f"[Scheduler] cleanup_duplicates: {e}")
+                        await session.rollback()
+
+                # Check pending signals against market (метрики каналов обновляются инкрементально).
+                # Активы со свежей ценой в потоке ведёт periodic_price_triggers по тикам; остальные
+                # (нет в PRICE_FEED_SYMBOLS, только CoinGecko, …) — пакетная сверка со снимком цен
+                skip = signal_trigger_watcher.covers if signal_trigger_watcher.active else None
+                result = await check_pending_signals_async(session, skip_asset=skip)
+
+                # Сверка running-метрик каналов одним GROUP BY; заодно учитывает bulk-delete дубликатов
+                if collection_cycle % 12 == 0:
+                    await recalculate_all_channels_async(session)
+
+                logger.info(
+                    f"[Scheduler] Done: {total} new signals, "
+                    f"{result.get('updated', 0)} signals checked"
+                )
+            except Exception as e:
+                logger.error(f"[Scheduler] Error: {e}")
+                await session.rollback()
 
-            db.commit()
 
-            # Периодическая очистка дубликатов по полному тексту (раз в ~1 час при интервале 5 мин)
-            if collection_cycle % 12 == 0:
-                try:
-                    removed = cleanup_duplicates(db)
-                    if removed:
-                        logger.info(f"[Scheduler] cleanup_duplicates removed {removed} duplicates")
-                except Exception as e:
-                    logger.warning(f"[Scheduler] cleanup_duplicates: {e}")
+async def periodic_price_triggers():
+    """
+    TP/SL PENDING-сигналов по тикам потока цен (app/services/price_feed.py): на каждом проходе
+    TriggerEngine отдаёт только пересечённые уровни, в БД идут только они.
+    """
+    import time
 
-            # Check pending signals against market
-            result = await check_pending_signals(db)
-            recalculate_all_channels(db)
+    from app.core.database import async_session_scope
+    from app.services.signal_checker import signal_trigger_watcher as watcher
 
-            logger.info(
-                f"[Scheduler] Done: {total} new signals, "
-                f"{result.get('updated', 0)} signals checked"
-            )
+    last_sync = 0.0
+    while True:
+        try:
+            if time.monotonic() - last_sync >= PRICE_TRIGGER_SYNC_INTERVAL:
+                async with async_session_scope() as session:
+                    await watcher.sync(session)
+                last_sync = time.monotonic()
+            if watcher.poll_ticks():
+                async with async_session_scope() as session:
+                    results = await watcher.flush(session)
+                if results:
+                    logger.info("[Scheduler] Price triggers: %s signals closed", len(results))
         except Exception as e:
-            logger.error(f"[Scheduler] Error: {e}")
-            db.rollback()
-        finally:
-            db.close()
+            logger.error(f"[Scheduler] Price triggers error: {e}")
+        await asyncio.sleep(PRICE_TRIGGER_TICK_INTERVAL)
 
 
 async def periodic_reddit_collection():
     """Collect signals from Reddit every 30 minutes."""
-    from app.core.database import SessionLocal
+    from app.core.database import async_session_scope
     from app.core.config import get_settings
     from app.services.reddit_scraper import CRYPTO_SUBREDDITS
-    from app.services.collection_pipeline import run_reddit_collection_cycle
+    from app.services.collection_pipeline import run_reddit_collection_cycle_async
 
     while True:
         await asyncio.sleep(REDDIT_INTERVAL)
         logger.info("[Scheduler] Reddit collection starting...")
 
-        db = SessionLocal()
-        try:
-            settings = get_settings()
-            stats = await run_reddit_collection_cycle(db, settings)
-            total = stats.get("saved", 0)
-            db.commit()
-            logger.info(f"[Scheduler] Reddit: {total} new signals from {len(CRYPTO_SUBREDDITS)} subs")
-        except Exception as e:
-            logger.error(f"[Scheduler] Reddit error: {e}")
-            db.rollback()
-        finally:
-            db.close()
+        async with async_session_scope() as session:
+            try:
+                settings = get_settings()
+                stats = await run_reddit_collection_cycle_async(session, settings)
+                total = stats.get("saved", 0)
+                await session.commit()
+                logger.info(f"[Scheduler] Reddit: {total} new signals from {len(CRYPTO_SUBREDDITS)} subs")
+            except Exception as e:
+                logger.error(f"[Scheduler] Reddit error: {e}")
+                await session.rollback()
 
 
-async def periodic_weekly_digest():
-    """Send weekly digest email to all active users."""
-    from app.core.database import SessionLocal
+def _weekly_digest_data(db):
+    from datetime import timedelta
     from app.models.user import User
     from app.models.signal import Signal
     from app.models.channel import Channel
-    from datetime import datetime, timedelta
+
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    signals_count = db.query(Signal).filter(Signal.created_at >= week_ago).count()
+    top_signals = (
+        db.query(Signal)
+        .filter(Signal.created_at >= week_ago)
+        .order_by(Signal.confidence_score.desc().nullslast())
+        .limit(10)
+        .all()
+    )
+    top_channels = (
+        db.query(Channel)
+        .filter(Channel.is_active == True)
+        .order_by(Channel.signals_count.desc().nullslast())
+        .limit(10)
+        .all()
+    )
+    top_signals_data = [
+        {"asset": s.asset, "direction": s.direction, "confidence": s.confidence_score}
+        for s in top_signals
+    ]
+    top_channels_data = [
+        {"name": c.name or c.username, "signals_count": c.signals_count or 0}
+        for c in top_channels
+    ]
+    users = db.query(User).filter(User.is_active == True).all()
+    return signals_count, top_signals_data, top_channels_data, users
+
+
+async def periodic_weekly_digest():
+    """Send weekly digest email to all active users."""
+    from app.core.database import run_with_session
     from app.services.email_service import EmailService
 
     while True:
         await asyncio.sleep(WEEKLY_DIGEST_INTERVAL)
         logger.info("[Scheduler] Weekly digest starting...")
 
-        db = SessionLocal()
         try:
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            signals_count = db.query(Signal).filter(Signal.created_at >= week_ago).count()
-            top_signals = (
-                db.query(Signal)
-                .filter(Signal.created_at >= week_ago)
-                .order_by(Signal.confidence_score.desc().nullslast())
-                .limit(10)
-                .all()
-            )
-            top_channels = (
-                db.query(Channel)
-                .filter(Channel.is_active == True)
-                .order_by(Channel.signals_count.desc().nullslast())
-                .limit(10)
-                .all()
-            )
-            top_signals_data = [
-                {"asset": s.asset, "direction": s.direction, "confidence": s.confidence_score}
-                for s in top_signals
-            ]
-            top_channels_data = [
-                {"name": c.name or c.username, "signals_count": c.signals_count or 0}
-                for c in top_channels
-            ]
-
-            users = db.query(User).filter(User.is_active == True).all()
+            # выборка — в пуле db-sync, отправка писем — на loop
+            signals_count, top_signals_data, top_channels_data, users = await run_with_session(_weekly_digest_data)
             svc = EmailService()
             sent = 0
             for u in users:
@@ -153,42 +199,60 @@ async def periodic_weekly_digest():
             logger.info(f"[Scheduler] Weekly digest sent to {sent}/{len(users)} users")
         except Exception as e:
             logger.error(f"[Scheduler] Weekly digest error: {e}")
-        finally:
-            db.close()
 
 
 async def periodic_daily_revalidation():
     """Daily revalidation of PENDING signals against current market prices."""
-    from app.core.database import SessionLocal
+    from sqlalchemy import select
+    from app.core.database import async_session_scope
     from app.models.signal import Signal
     from app.services.price_validator import validate_signal_price
+    from app.services.price_snapshot import get_prices
 
     while True:
         await asyncio.sleep(DAILY_REVALIDATION_INTERVAL)
         logger.info("[Scheduler] Daily price revalidation starting...")
 
-        db = SessionLocal()
-        try:
-            pending = db.query(Signal).filter(Signal.status == "PENDING").all()
-            expired = 0
-            for sig in pending:
-                if not sig.entry_price:
-                    continue
-                try:
-                    result = await validate_signal_price(sig.asset, float(sig.entry_price))
-                    if not result.get("valid") and "deviation" in str(result.get("reason", "")):
-                        sig.status = "EXPIRED"
-                        expired += 1
-                except Exception as e:
-                    logger.warning(f"[Scheduler] Revalidation skip {sig.id}: {e}")
-            if expired > 0:
-                db.commit()
-            logger.info(f"[Scheduler] Daily revalidation: {expired} signals expired")
-        except Exception as e:
-            logger.error(f"[Scheduler] Daily revalidation error: {e}")
-            db.rollback()
-        finally:
-            db.close()
+        async with async_session_scope() as session:
+            try:
+                pending = (await session.scalars(select(Signal).where(Signal.status == "PENDING"))).all()
+                prices = await get_prices({s.asset for s in pending if s.asset and s.entry_price})
+                expired = 0
+                for sig in pending:
+                    if not sig.entry_price:
+                        continue
+                    try:
+                        result = await validate_signal_price(
+                            sig.asset, float(sig.entry_price), current_price=prices.get(sig.asset)
+                        )
+                        if not result.get("valid") and "deviation" in str(result.get("reason", "")):
+                            sig.status = "EXPIRED"
+                            expired += 1
+                    except Exception as e:
+                        logger.warning(f"[Scheduler] Revalidation skip {sig.id}: {e}")
+                if expired > 0:
+                    await session.commit()
+                logger.info(f"[Scheduler] Daily revalidation: {expired} signals expired")
+            except Exception as e:
+                logger.error(f"[Scheduler] Daily revalidation error: {e}")
+                await session.rollback()
+
+
+def _materialize_features() -> int:
+    from app.core.database import SessionLocal
+    from app.services.feature_store import materialize_all
+
+    db = SessionLocal()
+    try:
+        n = materialize_all(db)
+        logger.info("[Scheduler] Feature store: %s rows materialized", n)
+        return n
+    except Exception as e:
+        logger.warning("[Scheduler] Feature store materialization failed: %s", e)
+        db.rollback()
+        return 0
+    finally:
+        db.close()
 
 
 async def periodic_ml_train():
@@ -208,6 +272,10 @@ async def periodic_ml_train():
             if not train_script.exists():
                 logger.warning("[Scheduler] ml-service/train_from_db.py not found, skip ML train")
                 continue
+            # train_from_db.py читает signal_features — догоняем таблицу до запуска обучения
+            from app.core.database import run_sync_db
+
+            await run_sync_db(_materialize_features)
             from app.core.config import database_url_for_host
             env = os.environ.copy()
             env["DATABASE_URL"] = database_url_for_host(settings.database_url)
@@ -222,12 +290,48 @@ async def periodic_ml_train():
             stdout, stderr = await proc.communicate()
             if proc.returncode == 0:
                 logger.info("[Scheduler] ML training finished successfully")
+                # ML-сервис сам подхватит новый manifest; reload — чтобы не ждать интервал опроса
+                try:
+                    from app.services.ml_gateway import ml_http_request
+
+                    await ml_http_request(
+                        "post",
+                        f"{settings.ML_SERVICE_URL.rstrip('/')}/api/v1/predictions/models/reload",
+                        timeout=120.0,
+                    )
+                except Exception as e:
+                    logger.info("[Scheduler] ML model reload request skipped: %s", e)
             else:
                 logger.warning("[Scheduler] ML training exit code %s: %s", proc.returncode, (stderr or stdout).decode()[:500])
         except Exception as e:
             logger.error("[Scheduler] ML training error: %s", e)
 
 
+def _source_health_counts(db):
+    from datetime import timedelta
+    from app.models.channel import Channel
+    from app.models.signal import Signal
+
+    week_ago = datetime.utcnow() - timedelta(days=7)
+
+    total_channels = 0
+    active_channels = 0
+    zero_signals = 0
+
+    for ch in db.query(Channel).all():
+        total_channels += 1
+        recent_count = (
+            db.query(Signal)
+            .filter(Signal.channel_id == ch.id, Signal.created_at >= week_ago)
+            .count()
+        )
+        if recent_count > 0:
+            active_channels += 1
+        else:
+            zero_signals += 1
+    return total_channels, active_channels, zero_signals
+
+
 async def periodic_source_health():
     """
     Regular health check for all data sources (channels).
@@ -235,36 +339,14 @@ async def periodic_source_health():
     Считаем, сколько сигналов пришло за последнюю неделю по каждому каналу,
     и логируем агрегированную статистику, чтобы видеть «живость» источников.
     """
-    from datetime import datetime, timedelta
-    from app.core.database import SessionLocal
-    from app.models.channel import Channel
-    from app.models.signal import Signal
+    from app.core.database import run_with_session
 
     while True:
         await asyncio.sleep(SOURCE_HEALTH_INTERVAL)
         logger.info("[Scheduler] Source health check starting...")
 
-        db = SessionLocal()
         try:
-            now = datetime.utcnow()
-            week_ago = now - timedelta(days=7)
-
-            total_channels = 0
-            active_channels = 0
-            zero_signals = 0
-
-            for ch in db.query(Channel).all():
-                total_channels += 1
-                recent_count = (
-                    db.query(Signal)
-                    .filter(Signal.channel_id == ch.id, Signal.created_at >= week_ago)
-                    .count()
-                )
-                if recent_count > 0:
-                    active_channels += 1
-                else:
-                    zero_signals += 1
-
+            total_channels, active_channels, zero_signals = await run_with_session(_source_health_counts)
             logger.info(
                 "[Scheduler] Source health: total_channels=%d, active_last_7d=%d, zero_last_7d=%d",
                 total_channels,
@@ -273,8 +355,6 @@ async def periodic_source_health():
             )
         except Exception as e:
             logger.error("[Scheduler] Source health error: %s", e)
-        finally:
-            db.close()
 
 
 async def periodic_source_discovery():
@@ -285,7 +365,7 @@ async def periodic_source_discovery():
     - Telegram: best-effort discovery via public directory search pages (no TG API keys).
     - Cleanup: auto-deactivate channels that stopped producing signals.
     """
-    from app.core.database import SessionLocal
+    from app.core.database import run_with_session
     from app.services.source_discovery import (
         discover_reddit_sources,
         discover_telegram_sources_tgstat,
@@ -312,13 +392,17 @@ async def periodic_source_discovery():
         await asyncio.sleep(SOURCE_DISCOVERY_INTERVAL)
         logger.info("[Scheduler] Source discovery starting...")
 
-        db = SessionLocal()
         try:
             reddit_sources = await discover_reddit_sources(reddit_queries)
             tg_sources = await discover_telegram_sources_tgstat(tg_keywords)
-            stats_upsert = upsert_sources(db, [*reddit_sources, *tg_sources])
-            stats_cleanup = deactivate_stale_sources(db, days_without_signals=14)
-            db.commit()
+
+            def _apply(db):
+                upserted = upsert_sources(db, [*reddit_sources, *tg_sources])
+                cleaned = deactivate_stale_sources(db, days_without_signals=14)
+                db.commit()
+                return upserted, cleaned
+
+            stats_upsert, stats_cleanup = await run_with_session(_apply)
             logger.info(
                 "[Scheduler] Source discovery done: added=%d updated=%d deactivated=%d",
                 stats_upsert["added"],
@@ -327,6 +411,3 @@ async def periodic_source_discovery():
             )
         except Exception as e:
             logger.error("[Scheduler] Source discovery error: %s", e)
-            db.rollback()
-        finally:
-            db.close()
@@ -3,12 +3,13 @@ Celery tasks for automated trading.
 Requires TRADING_ENCRYPTION_KEY env var to be set.
 """
 import os
-import asyncio
 from celery import Celery
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import logging
 
+from app.services.trigger_engine import TriggerEngine, exit_levels
+
 logger = logging.getLogger(__name__)
 
 def _check_trading_ready():
@@ -21,6 +22,7 @@ def _check_trading_ready():
 # Only import heavy deps if trading is configured
 if _check_trading_ready():
     from app.core.database import get_db
+    from app.services.trading_runtime import trading_runtime
     from app.services.trading_service import TradingService
     from app.services.risk_service import RiskService
     from app.models.trading import TradingAccount, TradingPosition
@@ -31,6 +33,63 @@ else:
 # Initialize Celery app
 celery_app = Celery('crypto_analytics_trading')
 
+# Уровни SL/TP открытых позиций живут между запусками задач (TradingScheduler гоняет их
+# в процессе API каждые 10 с): на запуск — только сработавшие позиции, а не все открытые
+_position_triggers = {"sl": TriggerEngine(), "tp": TriggerEngine()}
+
+
+def _due_positions(db: Session, kind: str) -> list:
+    """
+    id открытых позиций, у которых пересечён уровень kind ("sl" / "tp").
+    Уровни синхронизируются узким select; цена символа — из потока цен, иначе сохранённая current_price.
+    """
+    from app.services.price_feed import last_prices
+
+    rows = db.query(
+        TradingPosition.id,
+        TradingPosition.symbol,
+        TradingPosition.side,
+        TradingPosition.stop_loss,
+        TradingPosition.take_profit,
+        TradingPosition.current_price,
+    ).filter(TradingPosition.is_open == True).all()
+
+    engine = _position_triggers[kind]
+    specs = {}
+    prices = {}
+    for row in rows:
+        levels = [lvl for lvl in exit_levels(row.side, row.take_profit, row.stop_loss) if lvl[0] == kind]
+        specs[row.id] = (row.symbol, levels)
+        if row.current_price is not None:
+            prices.setdefault(row.symbol, float(row.current_price))
+    fired = engine.sync(specs)
+    prices.update(last_prices(engine.symbols()))
+    fired.extend(engine.on_ticks(prices))
+    return [f.key for f in fired]
+
+
+def _trading_service(db: Session) -> "TradingService":
+    """TradingService на общем ExchangeService рантайма (keep-alive пул между запусками)."""
+    return TradingService(db, exchange_service=trading_runtime.exchange_service)
+
+
+async def _close_positions(trading_service: "TradingService", positions: list, label: str) -> int:
+    """Закрыть сработавшие позиции последовательно (сессия БД одна) в одной корутине."""
+    from app.schemas.trading import ClosePositionRequest
+
+    executed_count = 0
+    for position in positions:
+        try:
+            close_result = await trading_service.close_position(
+                ClosePositionRequest(position_id=position.id), position.account.user_id
+            )
+            if close_result:
+                executed_count += 1
+                logger.info(f"{label} executed for position {position.id}")
+        except Exception as e:
+            logger.error(f"Error executing {label.lower()} for position {position.id}: {e}")
+    return executed_count
+
 @celery_app.task
 def update_all_positions():
     """Update prices and PnL for all open positions"""
@@ -38,30 +97,21 @@ def update_all_positions():
         return
     try:
         db = next(get_db())
-        trading_service = TradingService(db)
+        trading_service = _trading_service(db)
         
         # Get all active trading accounts
-        accounts = db.query(TradingAccount).filter(
+        account_ids = [row.id for row in db.query(TradingAccount.id).filter(
             TradingAccount.is_active == True,
             TradingAccount.auto_trading_enabled == True
-        ).all()
+        ).all()]
         
+        # One batch ticker call per exchange and one bulk UPDATE for all accounts
         updated_count = 0
-        for account in accounts:
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                try:
-                    result = loop.run_until_complete(trading_service.update_positions(account.id))
-                    updated_count += result.get("positions_updated", 0)
-                finally:
-                    loop.close()
-                    
-            except Exception as e:
-                logger.error(f"Error updating positions for account {account.id}: {e}")
+        if account_ids:
+            result = trading_runtime.run(trading_service.update_open_positions(account_ids))
+            updated_count = result.get("positions_updated", 0)
         
-        logger.info(f"Updated {updated_count} positions across {len(accounts)} accounts")
+        logger.info(f"Updated {updated_count} positions across {len(account_ids)} accounts")
         return {"success": True, "positions_updated": updated_count}
         
     except Exception as e:
@@ -77,42 +127,16 @@ def check_stop_losses():
         return
     try:
         db = next(get_db())
-        risk_service = RiskService(db)
-        trading_service = TradingService(db)
+        trading_service = _trading_service(db)
         
-        # Get all open positions
-        open_positions = db.query(TradingPosition).filter(
+        # Only positions whose stop loss level was crossed (TriggerEngine), not every open one
+        due_ids = _due_positions(db, "sl")
+        triggered = db.query(TradingPosition).filter(
+            TradingPosition.id.in_(due_ids),
             TradingPosition.is_open == True
-        ).all()
+        ).all() if due_ids else []
         
-        executed_count = 0
-        for position in open_positions:
-            try:
-                # Check stop loss
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                try:
-                    should_close = loop.run_until_complete(risk_service.check_stop_loss_trigger(position))
-                    
-                    if should_close:
-                        # Close position
-                        from app.schemas.trading import ClosePositionRequest
-                        close_request = ClosePositionRequest(position_id=position.id)
-                        
-                        close_result = loop.run_until_complete(
-                            trading_service.close_position(close_request, position.account.user_id)
-                        )
-                        
-                        if close_result:
-                            executed_count += 1
-                            logger.info(f"Stop loss executed for position {position.id}")
-                            
-                finally:
-                    loop.close()
-                    
-            except Exception as e:
-                logger.error(f"Error checking stop loss for position {position.id}: {e}")
+        executed_count = trading_runtime.run(_close_positions(trading_service, triggered, "Stop loss")) if triggered else 0
         
         logger.info(f"Executed {executed_count} stop losses")
         return {"success": True, "stop_losses_executed": executed_count}
@@ -130,42 +154,16 @@ def check_take_profits():
         return
     try:
         db = next(get_db())
-        risk_service = RiskService(db)
-        trading_service = TradingService(db)
+        trading_service = _trading_service(db)
         
-        # Get all open positions
-        open_positions = db.query(TradingPosition).filter(
+        # Only positions whose take profit level was crossed (TriggerEngine), not every open one
+        due_ids = _due_positions(db, "tp")
+        triggered = db.query(TradingPosition).filter(
+            TradingPosition.id.in_(due_ids),
             TradingPosition.is_open == True
-        ).all()
+        ).all() if due_ids else []
         
-        executed_count = 0
-        for position in open_positions:
-            try:
-                # Check take profit
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                try:
-                    should_close = loop.run_until_complete(risk_service.check_take_profit_trigger(position))
-                    
-                    if should_close:
-                        # Close position
-                        from app.schemas.trading import ClosePositionRequest
-                        close_request = ClosePositionRequest(position_id=position.id)
-                        
-                        close_result = loop.run_until_complete(
-                            trading_service.close_position(close_request, position.account.user_id)
-                        )
-                        
-                        if close_result:
-                            executed_count += 1
-                            logger.info(f"Take profit executed for position {position.id}")
-                            
-                finally:
-                    loop.close()
-                    
-            except Exception as e:
-                logger.error(f"Error checking take profit for position {position.id}: {e}")
+        executed_count = trading_runtime.run(_close_positions(trading_service, triggered, "Take profit")) if triggered else 0
         
         logger.info(f"Executed {executed_count} take profits")
         return {"success": True, "take_profits_executed": executed_count}
@@ -191,25 +189,20 @@ def update_trailing_stops():
             TradingPosition.trailing_stop == True
         ).all()
         
-        updated_count = 0
-        for position in open_positions:
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
+        async def _update_all() -> int:
+            updated = 0
+            for position in open_positions:
                 try:
-                    new_stop_loss = loop.run_until_complete(risk_service.update_trailing_stop(position))
-                    
+                    new_stop_loss = await risk_service.update_trailing_stop(position)
                     if new_stop_loss:
                         position.stop_loss = new_stop_loss
-                        updated_count += 1
+                        updated += 1
                         logger.info(f"Updated trailing stop for position {position.id}: {new_stop_loss}")
-                        
-                finally:
-                    loop.close()
-                    
-            except Exception as e:
-                logger.error(f"Error updating trailing stop for position {position.id}: {e}")
+                except Exception as e:
+                    logger.error(f"Error updating trailing stop for position {position.id}: {e}")
+            return updated
+        
+        updated_count = trading_runtime.run(_update_all()) if open_positions else 0
         
         db.commit()
         logger.info(f"Updated {updated_count} trailing stops")
@@ -228,7 +221,7 @@ def execute_pending_signals():
         return
     try:
         db = next(get_db())
-        trading_service = TradingService(db)
+        trading_service = _trading_service(db)
         
         # Get all active auto-trading accounts
         auto_trading_accounts = db.query(TradingAccount).filter(
@@ -243,37 +236,30 @@ def execute_pending_signals():
             Signal.status == "active"
         ).all()
         
-        executed_count = 0
-        for account in auto_trading_accounts:
-            for signal in recent_signals:
-                try:
-                    # Check if signal already executed for this account
-                    existing_position = db.query(TradingPosition).filter(
-                        TradingPosition.account_id == account.id,
-                        TradingPosition.signal_id == signal.id
-                    ).first()
-                    
-                    if existing_position:
-                        continue
-                    
-                    # Execute signal
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    
+        async def _execute_all() -> int:
+            executed = 0
+            for account in auto_trading_accounts:
+                for signal in recent_signals:
                     try:
-                        position = loop.run_until_complete(
-                            trading_service.execute_signal(signal.id, account.id)
-                        )
+                        # Check if signal already executed for this account
+                        existing_position = db.query(TradingPosition).filter(
+                            TradingPosition.account_id == account.id,
+                            TradingPosition.signal_id == signal.id
+                        ).first()
+                        
+                        if existing_position:
+                            continue
                         
+                        position = await trading_service.execute_signal(signal.id, account.id)
                         if position:
-                            executed_count += 1
+                            executed += 1
                             logger.info(f"Signal {signal.id} executed for account {account.id}")
                             
-                    finally:
-                        loop.close()
-                        
-                except Exception as e:
-                    logger.error(f"Error executing signal {signal.id} for account {account.id}: {e}")
+                    except Exception as e:
+                        logger.error(f"Error executing signal {signal.id} for account {account.id}: {e}")
+            return executed
+        
+        executed_count = trading_runtime.run(_execute_all()) if auto_trading_accounts and recent_signals else 0
         
         logger.info(f"Executed {executed_count} signals")
         return {"success": True, "signals_executed": executed_count}
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Разовое заполнение signals.content_fingerprint для legacy-строк.
+
+После прогона дедуп идёт только по fingerprint (индекс), legacy-сравнение по left(500)
+можно выключить: DEDUP_LEGACY_PREFIX_CHECK=false.
+
+Запуск из каталога backend:
+  python scripts/backfill_content_fingerprints.py [--batch-size 1000] [--limit N]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.services.dedup import backfill_content_fingerprints  # noqa: E402
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Backfill content_fingerprint for legacy signals")
+    ap.add_argument("--batch-size", type=int, default=1000)
+    ap.add_argument("--limit", type=int, default=None, help="Максимум строк за прогон")
+    args = ap.parse_args()
+
+    db = SessionLocal()
+    try:
+        n = backfill_content_fingerprints(db, batch_size=args.batch_size, limit=args.limit)
+    finally:
+        db.close()
+    logging.info("content_fingerprint backfilled: %s rows", n)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
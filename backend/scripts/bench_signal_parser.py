@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк parse_signal_from_text на корпусах сообщений из workers/*.json.
+
+Запуск из каталога backend:
+  python scripts/bench_signal_parser.py [--repeat 20] [--golden tests/data/signal_parser_golden.json]
+
+Печатает число сообщений, сколько распознано как сигнал и сообщений/сек.
+--golden дополнительно прогоняет синтетический корпус из golden-файла (тот же, что в тестах паритета).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, List
+
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from app.services.telegram_scraper import parse_signal_from_text  # noqa: E402
+
+_TEXT_KEYS = {"text", "original_text", "message", "content", "raw_text", "message_text", "ocr_text", "title", "body", "selftext"}
+
+
+def _walk(obj: Any, out: List[str]) -> None:
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            if isinstance(v, str) and k in _TEXT_KEYS and len(v) >= 8:
+                out.append(v)
+            else:
+                _walk(v, out)
+    elif isinstance(obj, list):
+        for v in obj:
+            _walk(v, out)
+
+
+def load_corpus(workers_dir: Path) -> List[str]:
+    """Тексты сообщений из JSON-выгрузок workers/ (уникальные, в порядке появления)."""
+    out: List[str] = []
+    for f in sorted(workers_dir.rglob("*.json")):
+        try:
+            _walk(json.loads(f.read_text(encoding="utf-8")), out)
+        except (ValueError, UnicodeDecodeError, OSError):
+            continue
+    return list(dict.fromkeys(out))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark parse_signal_from_text")
+    ap.add_argument("--workers-dir", default=str(_ROOT.parent / "workers"))
+    ap.add_argument("--golden", default=None, help="Добавить тексты из golden-файла тестов")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    texts = load_corpus(Path(args.workers_dir))
+    if args.golden:
+        texts += [c["text"] for c in json.loads(Path(args.golden).read_text(encoding="utf-8"))]
+    if not texts:
+        print("corpus is empty")
+        return 1
+
+    parsed = sum(parse_signal_from_text(t) is not None for t in texts)
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        for t in texts:
+            parse_signal_from_text(t)
+    dt = time.perf_counter() - t0
+    n = len(texts) * args.repeat
+    print(f"messages={len(texts)} signals={parsed} runs={args.repeat} msg/s={n / dt:,.0f} us/msg={dt / n * 1e6:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
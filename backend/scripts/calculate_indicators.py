@@ -2,15 +2,23 @@
 Calculate technical indicators (RSI, MACD, Bollinger Bands, ATR, Stochastic, ADX)
 from market_candles and store in technical_indicators table.
 
+Инкрементально: считаются только свечи начиная с последней сохранённой точки
+(она пересчитывается — свеча могла быть незакрытой), плюс WARMUP_BARS свечей до неё
+для состояния EMA/RSI/ATR. Запись — пакетом (COPY + INSERT … ON CONFLICT).
+
 Usage:
     python calculate_indicators.py --symbol BTCUSDT --interval 1h
+    python calculate_indicators.py --symbol BTCUSDT --candle-store ./data/candle_store
+    python calculate_indicators.py --symbol BTCUSDT --full   # пересчитать всю историю
 """
 import os
 import sys
 import logging
+from bisect import bisect_left
 from datetime import datetime, timezone
+from pathlib import Path
 from decimal import Decimal
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 from sqlalchemy import create_engine, text
@@ -27,6 +35,17 @@ DATABASE_URL = os.getenv(
     ),
 )
 
+_BACKEND = Path(__file__).resolve().parent.parent
+if str(_BACKEND) not in sys.path:
+    sys.path.insert(0, str(_BACKEND))
+
+from app.services.market_data_loader import last_timestamp, load_indicators  # noqa: E402
+
+# Рекурсивные индикаторы (EMA в MACD, сглаживание Уайлдера в RSI/ATR) забывают начальное
+# состояние экспоненциально: через 300 баров его вклад < 1e-9 от значения, так что
+# инкрементальный расчёт совпадает с полным. Окна BB/Stochastic (20/14) покрываются тем же запасом.
+WARMUP_BARS = int(os.getenv("INDICATOR_WARMUP_BARS", "300"))
+
 
 class TechnicalIndicators:
     """Calculate various technical indicators"""
@@ -125,19 +144,7 @@ class TechnicalIndicators:
         return k, d
 
 
-def fetch_candles(symbol: str, interval: str) -> Tuple[List[datetime], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
-    """Fetch candles from market_candles table"""
-    engine = create_engine(DATABASE_URL)
-
-    with engine.connect() as conn:
-        q = text("""
-            SELECT timestamp, open, high, low, close, volume
-            FROM market_candles
-            WHERE symbol = :symbol AND timeframe = :interval
-            ORDER BY timestamp ASC
-        """)
-        rows = conn.execute(q, {"symbol": symbol, "interval": interval}).fetchall()
-
+def _columns(rows) -> Tuple[List[datetime], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     if not rows:
         return [], np.array([]), np.array([]), np.array([]), np.array([])
 
@@ -150,67 +157,123 @@ def fetch_candles(symbol: str, interval: str) -> Tuple[List[datetime], np.ndarra
     return timestamps, opens, highs, lows, closes
 
 
-def calculate_and_store(symbol: str, interval: str):
-    """Calculate indicators for symbol and store in DB"""
-    logger.info(f"Fetching candles for {symbol} {interval}...")
-    timestamps, opens, highs, lows, closes = fetch_candles(symbol, interval)
+def fetch_candles(
+    symbol: str, interval: str, after: Optional[datetime] = None, warmup: int = 0
+) -> Tuple[List[datetime], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Fetch candles from market_candles table: with after — from it on, plus warmup candles before it"""
+    engine = create_engine(DATABASE_URL)
+    params = {"symbol": symbol, "interval": interval}
 
-    if len(timestamps) == 0:
-        logger.warning(f"No candles found for {symbol} {interval}")
-        return 0
+    with engine.connect() as conn:
+        if after is None:
+            q = text("""
+                SELECT timestamp, open, high, low, close, volume
+                FROM market_candles
+                WHERE symbol = :symbol AND timeframe = :interval
+                ORDER BY timestamp ASC
+            """)
+            return _columns(conn.execute(q, params).fetchall())
+
+        warm_q = text("""
+            SELECT timestamp, open, high, low, close, volume
+            FROM market_candles
+            WHERE symbol = :symbol AND timeframe = :interval AND timestamp < :after
+            ORDER BY timestamp DESC
+            LIMIT :warmup
+        """)
+        new_q = text("""
+            SELECT timestamp, open, high, low, close, volume
+            FROM market_candles
+            WHERE symbol = :symbol AND timeframe = :interval AND timestamp >= :after
+            ORDER BY timestamp ASC
+        """)
+        warm = conn.execute(warm_q, {**params, "after": after, "warmup": warmup}).fetchall()
+        rows = conn.execute(new_q, {**params, "after": after}).fetchall()
+
+    return _columns(list(reversed(warm)) + list(rows))
+
+
+def fetch_candles_from_store(symbol: str, interval: str, store_dir: str) -> Tuple[List[datetime], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Sync the local candle store from market_candles and read columns zero-copy (mmap)"""
+    if str(_BACKEND) not in sys.path:
+        sys.path.insert(0, str(_BACKEND))
+    from app.services.candle_store import CandleStore
+
+    store = CandleStore(store_dir)
+    engine = create_engine(DATABASE_URL)
+    with engine.connect() as conn:
+        added = store.sync_from_db(conn, symbol, interval)
+    if added:
+        logger.info(f"Candle store: {added} new or revised candles for {symbol} {interval}")
+
+    series = store.series(symbol, interval)
+    return series.timestamps(), series.open, series.high, series.low, series.close
 
-    logger.info(f"Calculating indicators for {len(timestamps)} candles...")
 
-    # Calculate indicators
+def _num(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def indicator_rows(
+    symbol: str,
+    interval: str,
+    timestamps: List[Any],
+    highs: np.ndarray,
+    lows: np.ndarray,
+    closes: np.ndarray,
+    start: int = 0,
+) -> List[Tuple[Any, ...]]:
+    """Индикаторы по всему окну, строки (порядок INDICATOR_COLUMNS) — начиная с индекса start"""
     rsi_values = TechnicalIndicators.rsi(closes, period=14)
     macd_line, macd_signal, macd_hist = TechnicalIndicators.macd(closes, fast=12, slow=26, signal=9)
     bb_upper, bb_middle, bb_lower = TechnicalIndicators.bollinger_bands(closes, period=20, std_dev=2.0)
     atr_values = TechnicalIndicators.atr(highs, lows, closes, period=14)
     stoch_k, stoch_d = TechnicalIndicators.stochastic(highs, lows, closes, period=14, smooth_k=3, smooth_d=3)
-    adx_values = np.full(len(closes), np.nan)  # ADX is complex, skip for now
 
-    # Store in DB
+    return [
+        (
+            symbol, interval, timestamps[i],
+            _num(rsi_values[i]), _num(macd_line[i]), _num(macd_signal[i]), _num(macd_hist[i]),
+            _num(bb_upper[i]), _num(bb_middle[i]), _num(bb_lower[i]),
+            _num(atr_values[i]), _num(stoch_k[i]), _num(stoch_d[i]),
+        )
+        for i in range(start, len(timestamps))
+    ]
+
+
+def calculate_and_store(symbol: str, interval: str, candle_store: str = None, full: bool = False):
+    """Calculate indicators for symbol (from the last stored point on) and store in DB"""
     engine = create_engine(DATABASE_URL)
-    inserted = 0
+    with engine.connect() as conn:
+        last = None if full else last_timestamp(conn, "technical_indicators", symbol, interval)
+
+    logger.info(f"Fetching candles for {symbol} {interval} (from {last or 'the beginning'})...")
+    if candle_store:
+        timestamps, opens, highs, lows, closes = fetch_candles_from_store(symbol, interval, candle_store)
+        idx = bisect_left(timestamps, last) if last is not None else 0
+        lo = max(0, idx - WARMUP_BARS)
+        timestamps, highs, lows, closes = timestamps[lo:], highs[lo:], lows[lo:], closes[lo:]
+        start = idx - lo
+    else:
+        timestamps, opens, highs, lows, closes = fetch_candles(symbol, interval, after=last, warmup=WARMUP_BARS)
+        start = 0
+        if last is not None:
+            start = next((i for i, ts in enumerate(timestamps) if ts >= last), len(timestamps))
+
+    if len(timestamps) - start <= 0:
+        logger.info(f"No new candles for {symbol} {interval}")
+        return 0
+
+    logger.info(f"Calculating indicators for {len(timestamps) - start} candles (+{start} warm-up)...")
+    rows = indicator_rows(symbol, interval, timestamps, highs, lows, closes, start=start)
 
     logger.info("Storing indicators in DB...")
-    for i, ts in enumerate(timestamps):
-        try:
-            with engine.connect() as conn:
-                insert_q = text("""
-                    INSERT INTO technical_indicators
-                    (symbol, timeframe, timestamp, rsi_14, macd_line, macd_signal, macd_histogram,
-                     bb_upper, bb_middle, bb_lower, atr_14, stoch_k, stoch_d)
-                    VALUES (:symbol, :timeframe, :timestamp, :rsi_14, :macd_line, :macd_signal, :macd_histogram,
-                            :bb_upper, :bb_middle, :bb_lower, :atr_14, :stoch_k, :stoch_d)
-                    ON CONFLICT (symbol, timeframe, timestamp) DO NOTHING
-                """)
-
-                conn.execute(insert_q, {
-                    "symbol": symbol,
-                    "timeframe": interval,
-                    "timestamp": ts,
-                    "rsi_14": float(rsi_values[i]) if not np.isnan(rsi_values[i]) else None,
-                    "macd_line": float(macd_line[i]) if not np.isnan(macd_line[i]) else None,
-                    "macd_signal": float(macd_signal[i]) if not np.isnan(macd_signal[i]) else None,
-                    "macd_histogram": float(macd_hist[i]) if not np.isnan(macd_hist[i]) else None,
-                    "bb_upper": float(bb_upper[i]) if not np.isnan(bb_upper[i]) else None,
-                    "bb_middle": float(bb_middle[i]) if not np.isnan(bb_middle[i]) else None,
-                    "bb_lower": float(bb_lower[i]) if not np.isnan(bb_lower[i]) else None,
-                    "atr_14": float(atr_values[i]) if not np.isnan(atr_values[i]) else None,
-                    "stoch_k": float(stoch_k[i]) if not np.isnan(stoch_k[i]) else None,
-                    "stoch_d": float(stoch_d[i]) if not np.isnan(stoch_d[i]) else None,
-                })
-                conn.commit()
-                inserted += 1
-
-                if (i + 1) % 100 == 0:
-                    logger.info(f"Processed {i+1}/{len(timestamps)} candles")
-        except Exception as e:
-            logger.warning(f"Failed to insert indicator for {ts}: {e}")
-
-    logger.info(f"Stored indicators for {inserted} candles")
-    return inserted
+    with engine.connect() as conn:
+        stored = load_indicators(conn, rows)
+        conn.commit()
+
+    logger.info(f"Stored indicators for {stored} candles")
+    return stored
 
 
 def main():
@@ -219,6 +282,12 @@ def main():
     parser.add_argument("--symbol", default="BTCUSDT", help="Trading pair")
     parser.add_argument("--symbols", nargs="+", default=None, help="Multiple symbols")
     parser.add_argument("--interval", default="1h", help="Candle interval")
+    parser.add_argument(
+        "--candle-store",
+        default=os.getenv("CANDLE_STORE_DIR") if os.getenv("CANDLE_STORE_ENABLED", "").lower() == "true" else None,
+        help="Read candles from the local mmap candle store in this directory",
+    )
+    parser.add_argument("--full", action="store_true", help="Recompute the whole history instead of extending it")
 
     args = parser.parse_args()
 
@@ -226,7 +295,7 @@ def main():
 
     for symbol in symbols:
         logger.info(f"\nCalculating indicators for {symbol} {args.interval}...")
-        calculate_and_store(symbol, args.interval)
+        calculate_and_store(symbol, args.interval, candle_store=args.candle_store, full=args.full)
 
 
 if __name__ == "__main__":
@@ -11,13 +11,20 @@ import logging
 import json
 from datetime import datetime, timezone, timedelta
 from decimal import Decimal
-from typing import List, Tuple
+from pathlib import Path
+from typing import List, Optional, Tuple
 
 import requests
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+_BACKEND = Path(__file__).resolve().parent.parent
+if str(_BACKEND) not in sys.path:
+    sys.path.insert(0, str(_BACKEND))
+
+from app.services.market_data_loader import last_timestamp, load_candles  # noqa: E402
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -39,14 +46,17 @@ DEFAULT_DAYS = 180
 DEFAULT_INTERVAL = "1h"  # 1m, 5m, 15m, 1h, 4h, 1d
 
 
-def get_klines(symbol: str, interval: str = "1h", days: int = 180) -> List[Tuple]:
+def get_klines(symbol: str, interval: str = "1h", days: int = 180, since: Optional[datetime] = None) -> List[Tuple]:
     """
     Fetch OHLCV candles from Binance.
     Returns list of (timestamp, open, high, low, close, volume)
+    since — не раньше этой свечи (докачка от последней сохранённой).
     """
     try:
         # Calculate start time
         start_time = datetime.now(timezone.utc) - timedelta(days=days)
+        if since is not None:
+            start_time = max(start_time, since)
         start_ts = int(start_time.timestamp() * 1000)
 
         klines = []
@@ -100,8 +110,22 @@ def get_klines(symbol: str, interval: str = "1h", days: int = 180) -> List[Tuple
         return []
 
 
+def _aware(ts) -> Optional[datetime]:
+    if ts is None:
+        return None
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def last_loaded_timestamp(symbol: str, interval: str) -> Optional[datetime]:
+    engine = create_engine(DATABASE_URL)
+    with engine.connect() as conn:
+        return _aware(last_timestamp(conn, "market_candles", symbol, interval))
+
+
 def load_klines_to_db(symbol: str, interval: str, klines: List[Tuple], source: str = "binance"):
-    """Load candles to market_candles table"""
+    """Load candles to market_candles table (COPY + один INSERT … ON CONFLICT, одна транзакция)"""
     if not klines:
         logger.warning(f"No klines to load for {symbol}")
         return 0
@@ -109,53 +133,19 @@ def load_klines_to_db(symbol: str, interval: str, klines: List[Tuple], source: s
     try:
         engine = create_engine(DATABASE_URL)
         with engine.connect() as conn:
-            # Check existing candles
-            check_q = text("""
-                SELECT MAX(timestamp) FROM market_candles
-                WHERE symbol = :symbol AND timeframe = :interval
-            """)
-            result = conn.execute(check_q, {"symbol": symbol, "interval": interval}).scalar()
-            last_timestamp = result if result else None
-
-            # Filter out existing candles
-            new_klines = [k for k in klines if last_timestamp is None or k[0] > last_timestamp]
+            last = _aware(last_timestamp(conn, "market_candles", symbol, interval))
+            # последняя сохранённая свеча могла быть незакрытой — её перезаписываем
+            new_klines = [k for k in klines if last is None or k[0] >= last]
 
             if not new_klines:
                 logger.info(f"No new candles to load for {symbol} {interval}")
                 return 0
 
-            logger.info(f"Loading {len(new_klines)} new candles for {symbol} {interval}...")
-
-            # Batch insert
-            batch_size = 500
-            inserted = 0
-            for i in range(0, len(new_klines), batch_size):
-                batch = new_klines[i:i+batch_size]
-                insert_q = text("""
-                    INSERT INTO market_candles
-                    (symbol, timeframe, timestamp, open, high, low, close, volume, source)
-                    VALUES (:symbol, :timeframe, :timestamp, :open, :high, :low, :close, :volume, :source)
-                    ON CONFLICT (symbol, timeframe, timestamp) DO NOTHING
-                """)
-
-                for candle in batch:
-                    conn.execute(insert_q, {
-                        "symbol": symbol,
-                        "timeframe": interval,
-                        "timestamp": candle[0],
-                        "open": candle[1],
-                        "high": candle[2],
-                        "low": candle[3],
-                        "close": candle[4],
-                        "volume": candle[5],
-                        "source": source
-                    })
-
-                conn.commit()
-                inserted += len(batch)
-                logger.info(f"Inserted {inserted}/{len(new_klines)} candles")
-
-            return inserted
+            logger.info(f"Loading {len(new_klines)} candles for {symbol} {interval}...")
+            loaded = load_candles(conn, symbol, interval, new_klines, source=source)
+            conn.commit()
+            logger.info(f"Merged {loaded} candles for {symbol} {interval}")
+            return loaded
 
     except Exception as e:
         logger.error(f"Failed to load candles to DB: {e}")
@@ -180,7 +170,12 @@ def main():
         logger.info(f"Processing {symbol}")
         logger.info(f"{'='*60}")
 
-        klines = get_klines(symbol, args.interval, args.days)
+        try:
+            since = last_loaded_timestamp(symbol, args.interval)
+        except Exception as e:
+            logger.warning(f"Could not read last candle for {symbol}: {e}")
+            since = None
+        klines = get_klines(symbol, args.interval, args.days, since=since)
         loaded = load_klines_to_db(symbol, args.interval, klines)
         total_loaded += loaded
 
@@ -10,7 +10,7 @@ Limitations:
 Pipeline:
 1) Scrape posts with pagination (deep_collector.fetch_all_posts)
 2) Filter by date (last N days)
-3) Parse signal from text (telegram_scraper.parse_signal_from_text)
+3) Parse signal from text in one batch (parse_executor; PARSE_EXECUTOR_WORKERS>0 -> process pool)
 4) Persist into DB (collection_pipeline.persist_parsed_signals_for_channel)
 
 Run (inside backend container):
@@ -37,7 +37,7 @@ from app.core.config import get_settings
 from app.models.channel import Channel
 from app.services.collection_pipeline import persist_parsed_signals_for_channel
 from app.services.deep_collector import fetch_all_posts
-from app.services.telegram_scraper import parse_signal_from_text
+from app.services.parse_executor import parse_texts_async, shutdown_parse_executor
 from app.services.ocr_signal_parser import parse_signal_from_image_url
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
@@ -94,8 +94,8 @@ async def collect_channel(username: str, days_back: int, max_pages: int) -> tupl
     store_raw = os.getenv("STORE_RAW_TELEGRAM_SIGNALS", "true").lower() in ("1", "true", "yes")
     ocr_parsed = 0
     ocr_attempted = 0
-    for p in in_window:
-        sig = parse_signal_from_text(p.text) if p.text else None
+    parsed_texts = await parse_texts_async([p.text for p in in_window])
+    for p, sig in zip(in_window, parsed_texts):
         if sig:
             sig.timestamp = p.date
             sig.telegram_message_id = p.message_id
@@ -119,7 +119,7 @@ async def collect_channel(username: str, days_back: int, max_pages: int) -> tupl
             for u in (p.image_urls or [])[: max(0, ocr_max_images)]:
                 try:
                     ocr_attempted += 1
-                    ocr_sig = await parse_signal_from_image_url(u)
+                    ocr_sig = await parse_signal_from_image_url(u, channel=uname)
                 except Exception:
                     ocr_sig = None
                 if ocr_sig:
@@ -199,6 +199,7 @@ async def main():
         print(f"DONE. channels={len(usernames)} parsed_total={total_parsed} ocr_total={total_ocr} saved_total={total_saved}")
     finally:
         db.close()
+        shutdown_parse_executor()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Массовая переэкстракция MessageVersion за последние N дней текущим экстрактором.
+
+Парсинг — пачками через пул процессов (parse_executor), число воркеров — --workers
+или PARSE_EXECUTOR_WORKERS (-1 — по числу ядер). Уже извлечённые версии пропускаются.
+
+Запуск из каталога backend (нужен EXTRACTION_PIPELINE_ENABLED=true):
+  python scripts/reextract_history.py [--days 90] [--batch-size 2000] [--workers -1]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.models.raw_ingestion import MessageVersion  # noqa: E402
+from app.services.extraction_service import extract_message_versions  # noqa: E402
+from app.services.parse_executor import shutdown_parse_executor  # noqa: E402
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Re-extract message versions for the last N days")
+    ap.add_argument("--days", type=int, default=90)
+    ap.add_argument("--batch-size", type=int, default=2000)
+    ap.add_argument("--workers", type=int, default=None, help="PARSE_EXECUTOR_WORKERS для прогона")
+    args = ap.parse_args()
+    if args.workers is not None:
+        os.environ["PARSE_EXECUTOR_WORKERS"] = str(args.workers)
+
+    since = datetime.now(timezone.utc) - timedelta(days=args.days)
+    db = SessionLocal()
+    created = scanned = 0
+    last_id = 0
+    t0 = time.perf_counter()
+    try:
+        while True:
+            ids = [
+                i
+                for (i,) in db.query(MessageVersion.id)
+                .filter(MessageVersion.observed_at >= since, MessageVersion.id > last_id)
+                .order_by(MessageVersion.id)
+                .limit(args.batch_size)
+            ]
+            if not ids:
+                break
+            last_id = ids[-1]
+            scanned += len(ids)
+            created += extract_message_versions(db, ids)
+            db.commit()
+            logging.info("re-extract: scanned=%s created=%s", scanned, created)
+    finally:
+        db.close()
+        shutdown_parse_executor()
+    dt = time.perf_counter() - t0
+    logging.info("re-extract done: scanned=%s created=%s in %.1fs", scanned, created, dt)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
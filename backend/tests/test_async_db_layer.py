@@ -0,0 +1,74 @@
+"""Async-слой БД для фоновых циклов: AsyncSession (aiosqlite в тестах) и пул db-sync."""
+import threading
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from app.core.database import (
+    SessionLocal,
+    async_database_url,
+    async_session_scope,
+    engine,
+    run_with_session,
+)
+from app.models.base import Base
+from app.models.channel import Channel
+from app.models.signal import Signal, SignalDirection, SignalStatus
+from app.services.signal_checker import check_pending_signals_async
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def test_async_database_url():
+    assert async_database_url("postgresql://u:p@db:5432/x") == "postgresql+asyncpg://u:p@db:5432/x"
+    assert async_database_url("postgresql+psycopg2://u@db/x") == "postgresql+asyncpg://u@db/x"
+    assert async_database_url("sqlite:////tmp/a.db") == "sqlite+aiosqlite:////tmp/a.db"
+    assert async_database_url("postgresql+asyncpg://u@db/x") == "postgresql+asyncpg://u@db/x"
+
+
+async def test_check_pending_signals_on_async_session(db):
+    uid = uuid.uuid4().hex[:8]
+    ch = Channel(name=f"AS_{uid}", username=f"as_{uid}", url=f"https://t.me/as_{uid}")
+    db.add(ch)
+    db.commit()
+    sig = Signal(
+        channel_id=ch.id,
+        asset="BTC/USDT",
+        symbol="BTCUSDT",
+        direction=SignalDirection.LONG,
+        entry_price=Decimal("100"),
+        tp1_price=Decimal("110"),
+        stop_loss=Decimal("95"),
+        status=SignalStatus.PENDING,
+    )
+    db.add(sig)
+    db.commit()
+
+    async def fake_prices(symbols):
+        return {s: 111.0 for s in symbols}
+
+    with patch("app.services.signal_checker.get_prices", new=fake_prices):
+        async with async_session_scope() as session:
+            out = await check_pending_signals_async(session)
+
+    assert out["updated"] >= 1
+    db.refresh(sig)
+    assert sig.status == SignalStatus.TP1_HIT
+    assert sig.is_successful is True
+
+
+async def test_run_with_session_uses_worker_thread(db):
+    def probe(session):
+        return threading.current_thread().name, session.query(Channel).count()
+
+    name, count = await run_with_session(probe)
+    assert name.startswith("db-sync")
+    assert count >= 0
@@ -0,0 +1,92 @@
+"""CandleIndex: range max/min и «первый бар через уровень» против полного перебора."""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from app.services.candle_index import CandleIndex
+from app.services.outcome_candle_engine import OhlcCandle, _find_candle_index, to_epoch_us
+
+
+def _random_index(seed, n):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    # грубое квантование — много равных значений, проверяем выбор самого левого
+    high = np.round(close + rng.uniform(0, 2, n), 0)
+    low = np.round(close - rng.uniform(0, 2, n), 0)
+    ts = np.arange(n, dtype=np.int64) * 3_600_000_000
+    return CandleIndex(ts, high, low), high, low
+
+
+@pytest.mark.parametrize("seed,n", [(0, 1), (1, 2), (2, 37), (3, 256), (4, 1000)])
+def test_range_extrema_match_bruteforce(seed, n):
+    ix, high, low = _random_index(seed, n)
+    rng = np.random.default_rng(seed + 100)
+    i = rng.integers(0, n, 200)
+    j = np.maximum(i, rng.integers(0, n, 200))
+    for a, b in zip(i, j):
+        assert ix.argmax_high(a, b) == a + int(np.argmax(high[a : b + 1]))
+        assert ix.argmin_low(a, b) == a + int(np.argmin(low[a : b + 1]))
+    assert list(ix.argmax_high_many(i, j)) == [ix.argmax_high(a, b) for a, b in zip(i, j)]
+    assert list(ix.argmin_low_many(i, j)) == [ix.argmin_low(a, b) for a, b in zip(i, j)]
+
+
+@pytest.mark.parametrize("seed,n", [(5, 1), (6, 50), (7, 777)])
+def test_first_crossing_matches_bruteforce(seed, n):
+    ix, high, low = _random_index(seed, n)
+    rng = np.random.default_rng(seed + 200)
+    for _ in range(300):
+        start = int(rng.integers(0, n + 1))
+        end = int(rng.integers(start, n + 1))
+        level = float(rng.uniform(low.min() - 1, high.max() + 1))
+        hits = [k for k in range(start, end) if high[k] >= level]
+        assert ix.first_high_ge(level, start, end) == (hits[0] if hits else -1)
+        hits = [k for k in range(start, n) if low[k] <= level]
+        assert ix.first_low_le(level, start) == (hits[0] if hits else -1)
+
+
+def test_window_view_uses_relative_indices():
+    ix, high, low = _random_index(8, 300)
+    w = ix.window(100, 50)
+    assert len(w) == 50
+    assert w.argmax_high(0, 49) == int(np.argmax(high[100:150]))
+    assert w.min_low(10, 20) == float(low[110:121].min())
+    level = float(high[100:150].max())
+    assert w.first_high_ge(level, 0) == int(np.argmax(high[100:150] >= level))
+    assert w.locate(int(w.ts[100 + 7]) + 1, 3_600_000_000) == 7
+    assert w.bounds(int(ix.ts[120]), int(ix.ts[129])) == (20, 30)
+
+
+def test_find_candle_index_binary_search_matches_linear_scan():
+    t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    h = timedelta(hours=1)
+    candles = [
+        OhlcCandle(t0 + k * h, Decimal(1), Decimal(2), Decimal(0), Decimal(1)) for k in range(0, 40, 2)
+    ]
+    ix = CandleIndex.from_candles(candles)
+    for minutes in range(-120, 42 * 60, 17):
+        st = t0 + timedelta(minutes=minutes)
+        expected = next((i for i, c in enumerate(candles) if c.ts_open + h > st), -1)
+        assert _find_candle_index(st, candles, h) == expected
+        assert ix.locate(to_epoch_us(st), to_epoch_us(t0 + h) - to_epoch_us(t0)) == expected
+
+
+def test_linear_scan_for_plain_lists_matches_index():
+    from app.services.candle_index import LinearScan, index_for
+
+    rng = np.random.default_rng(9)
+    t0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    candles = []
+    for k in range(120):
+        mid = Decimal(int(rng.integers(90, 110)))
+        candles.append(OhlcCandle(t0 + k * timedelta(hours=1), mid, mid + int(rng.integers(0, 3)), mid - int(rng.integers(0, 3)), mid))
+    scan, ix = index_for(candles), CandleIndex.from_candles(candles)
+    assert isinstance(scan, LinearScan)
+    for a, b in [(0, 119), (5, 5), (30, 77), (100, 119)]:
+        assert scan.argmax_high(a, b) == ix.argmax_high(a, b)
+        assert scan.argmin_low(a, b) == ix.argmin_low(a, b)
+    for level in (85.0, 95.5, 100.0, 111.0):
+        for start, end in [(0, None), (40, 90), (119, None)]:
+            assert scan.first_high_ge(level, start, end) == ix.first_high_ge(level, start, end)
+            assert scan.first_low_le(level, start, end) == ix.first_low_le(level, start, end)
@@ -0,0 +1,152 @@
+"""Локальное mmap-хранилище свечей: append, срезы по времени, синк из market_candles."""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.services.candle_store import CandleSeries, CandleStore
+
+T0 = datetime(2025, 6, 1, tzinfo=timezone.utc)
+H = timedelta(hours=1)
+
+
+def _rows(n, start=0):
+    return [
+        (T0 + i * H, 100 + i, 101.5 + i, 99.25 + i, 100.5 + i, 10 * i)
+        for i in range(start, start + n)
+    ]
+
+
+@pytest.fixture
+def candles_db():
+    eng = create_engine("sqlite://")
+    with eng.begin() as conn:
+        conn.execute(
+            text(
+                """
+                CREATE TABLE market_candles (
+                    id INTEGER PRIMARY KEY, symbol TEXT, timeframe TEXT, timestamp DATETIME,
+                    open NUMERIC, high NUMERIC, low NUMERIC, close NUMERIC, volume NUMERIC
+                )
+                """
+            )
+        )
+    return eng
+
+
+def _insert(eng, rows, symbol="BTCUSDT", tf="1h"):
+    with eng.begin() as conn:
+        for r in rows:
+            conn.execute(
+                text(
+                    "INSERT INTO market_candles (symbol, timeframe, timestamp, open, high, low, close, volume) "
+                    "VALUES (:s, :tf, :ts, :o, :h, :l, :c, :v)"
+                ),
+                {"s": symbol, "tf": tf, "ts": r[0], "o": r[1], "h": r[2], "l": r[3], "c": r[4], "v": r[5]},
+            )
+
+
+def test_append_is_monotonic_and_mmap_readonly(tmp_path):
+    store = CandleStore(tmp_path)
+    assert len(store.series("BTCUSDT", "1h")) == 0
+    assert store.append("BTCUSDT", "1h", _rows(5)) == 5
+    # старые и повторные ts игнорируются, дописываются только новые
+    assert store.append("BTCUSDT", "1h", _rows(7)) == 2
+
+    s = store.series("btcusdt", "1h")
+    assert len(s) == 7
+    assert isinstance(s.high, np.memmap)
+    with pytest.raises(ValueError):
+        s.high[0] = 1.0
+    assert s[3].ts_open == T0 + 3 * H
+    assert s[3].high == Decimal("104.5")
+
+
+def test_range_slices_by_time_zero_copy(tmp_path):
+    store = CandleStore(tmp_path)
+    store.append("ETHUSDT", "1h", _rows(48))
+    s = store.series("ETHUSDT", "1h")
+    w = s.range(T0 + 10 * H + timedelta(minutes=1), T0 + 20 * H)
+    assert isinstance(w, CandleSeries)
+    assert len(w) == 10
+    assert w[0].ts_open == T0 + 11 * H
+    assert w[-1].ts_open == T0 + 20 * H
+    assert np.shares_memory(w.close, s.close)
+    assert [c.ts_open for c in w] == w.timestamps()
+
+
+def test_reader_remaps_after_append_and_truncates_torn_tail(tmp_path):
+    store = CandleStore(tmp_path)
+    store.append("SOLUSDT", "1h", _rows(3))
+    assert len(store.series("SOLUSDT", "1h")) == 3
+    # «оборванная» запись: значение дописано, ts — нет
+    with open(tmp_path / "1h" / "SOLUSDT" / "open.f8", "ab") as fh:
+        fh.write(np.asarray([1.0]).tobytes())
+    assert len(store.series("SOLUSDT", "1h")) == 3
+    store.append("SOLUSDT", "1h", _rows(2, start=3))
+    s = store.series("SOLUSDT", "1h")
+    assert len(s) == 5
+    assert float(s.open[3]) == 103.0
+
+
+def test_sync_from_db_is_incremental(tmp_path, candles_db):
+    store = CandleStore(tmp_path)
+    _insert(candles_db, _rows(10))
+    with candles_db.connect() as conn:
+        assert store.sync_from_db(conn, "BTCUSDT", "1h") == 10
+        assert store.sync_from_db(conn, "BTCUSDT", "1h") == 0
+    _insert(candles_db, _rows(4, start=10))
+    with candles_db.connect() as conn:
+        assert store.sync_from_db(conn, "BTCUSDT", "1h") == 4
+    assert len(store.series("BTCUSDT", "1h")) == 14
+
+
+def test_sync_picks_up_revised_last_bar_and_backfill(tmp_path, candles_db):
+    store = CandleStore(tmp_path)
+    rows = _rows(10)
+    _insert(candles_db, rows[:3] + rows[5:])
+    with candles_db.connect() as conn:
+        assert store.sync_from_db(conn, "BTCUSDT", "1h") == 8
+    before = store.series("BTCUSDT", "1h")
+
+    # загрузчик обновил незакрытый последний бар
+    with candles_db.begin() as conn:
+        conn.execute(text("UPDATE market_candles SET close = 555, high = 556 WHERE timestamp = :ts"), {"ts": rows[-1][0]})
+    with candles_db.connect() as conn:
+        assert store.sync_from_db(conn, "BTCUSDT", "1h") == 1
+    s = store.series("BTCUSDT", "1h")
+    assert (float(s.close[-1]), float(s.high[-1]), len(s)) == (555.0, 556.0, 8)
+    # старый mmap — прежний целый снимок
+    assert float(before.close[-1]) == 109.5
+
+    # догрузили дыру в истории (раньше окна перечитывания)
+    _insert(candles_db, rows[3:5])
+    with candles_db.connect() as conn:
+        assert store.sync_from_db(conn, "BTCUSDT", "1h") == 7
+    s = store.series("BTCUSDT", "1h")
+    assert s.timestamps() == [r[0] for r in rows]
+    assert float(s.open[4]) == 104.0 and float(s.close[-1]) == 555.0
+
+
+def test_outcome_engine_and_validator_read_from_store(monkeypatch, tmp_path, candles_db):
+    from app.services import candle_store
+    from app.services.historical_validator import get_price_range_after_from_db
+    from app.services.outcome_candle_engine import list_candles_from_db
+
+    monkeypatch.setenv("CANDLE_STORE_ENABLED", "true")
+    monkeypatch.setenv("CANDLE_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(candle_store, "_last_sync", {})
+    _insert(candles_db, _rows(30))
+
+    with candles_db.connect() as conn:
+        candles, src = list_candles_from_db(conn, asset="BTC/USDT", timeframe="1h", from_ts=T0 + 2 * H, to_ts=T0 + 5 * H)
+        assert src == "store.market_candles.1h"
+        assert [c.close for c in candles] == [Decimal("102.5"), Decimal("103.5"), Decimal("104.5"), Decimal("105.5")]
+
+        rng = get_price_range_after_from_db(conn, "BTC/USDT", (T0 + 20 * H).replace(tzinfo=None), days=1)
+        assert rng["data_points"] == 10
+        assert rng["high"] == 101.5 + 29
+        assert rng["low"] == 99.25 + 20
+        assert rng["close"] == 100.5 + 29
@@ -0,0 +1,123 @@
+"""Параллельный сбор: fan_out (ограничение + последовательная запись), token bucket, цикл Telegram."""
+import asyncio
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.collect_concurrency import TokenBucket, fan_out, host_limiter
+
+
+async def test_fan_out_bounds_fetch_and_serializes_persist():
+    active = 0
+    peak = 0
+    persisted = []
+    in_persist = False
+
+    async def fetch(i):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01 * (i % 3))
+        active -= 1
+        return None if i == 5 else i * 10
+
+    def persist(i, res):
+        nonlocal in_persist
+        assert not in_persist
+        in_persist = True
+        persisted.append((i, res))
+        in_persist = False
+
+    done = await fan_out(range(12), fetch, persist, concurrency=4)
+    assert done == 11
+    assert peak == 4
+    assert sorted(persisted) == [(i, i * 10) for i in range(12) if i != 5]
+
+
+async def test_fan_out_persist_error_cancels_pending_fetches():
+    started = []
+
+    async def fetch(i):
+        started.append(i)
+        await asyncio.sleep(0.05 if i else 0)
+        return i
+
+    def persist(i, res):
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        await fan_out(range(50), fetch, persist, concurrency=2)
+    assert len(started) < 50
+
+
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, burst=2)
+    t0 = time.monotonic()
+    for _ in range(7):
+        await bucket.acquire()
+    # 2 токена сразу, остальные 5 — по 1/50 с
+    assert time.monotonic() - t0 >= 0.09
+
+
+async def test_host_limiter_only_throttles_parallel_fan_out(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_HTTP_RATE_PER_SEC", "20")
+    monkeypatch.setenv("TELEGRAM_HTTP_BURST", "1")
+
+    async def fetch(_):
+        await host_limiter("t.me")
+        return 1
+
+    t0 = time.monotonic()
+    await fan_out(range(5), fetch, lambda *_: None, concurrency=1)
+    # последовательный сбор (по умолчанию) — без задержек, как до лимитера
+    assert time.monotonic() - t0 < 0.05
+
+    t0 = time.monotonic()
+    await fan_out(range(5), fetch, lambda *_: None, concurrency=3)
+    # 1 токен сразу, остальные 4 — по 1/20 с
+    assert time.monotonic() - t0 >= 0.18
+
+
+async def test_telegram_cycle_concurrent_persists_every_channel(monkeypatch):
+    from app.core.database import SessionLocal, engine
+    from app.models.base import Base
+    from app.models.channel import Channel
+    from app.services import collection_pipeline, telegram_scraper
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    uid = uuid.uuid4().hex[:6]
+    names = [f"conc_{uid}_{i}" for i in range(6)]
+    for n in names:
+        db.add(Channel(name=n, username=n, url=f"https://t.me/{n}", platform="telegram", is_active=True))
+    db.commit()
+
+    seen_clients = set()
+
+    async def fake_collect(uname, limit=None, *, client=None):
+        seen_clients.add(id(client))
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(posts_fetched=3 if uname in names else 0, signals=[], posts=[])
+
+    calls = []
+    monkeypatch.setattr(telegram_scraper, "collect_signals_from_channel", fake_collect)
+    monkeypatch.setattr(
+        collection_pipeline,
+        "persist_parsed_signals_for_channel",
+        lambda db_, ch, sigs, **kw: calls.append(ch.username) or {"saved": 0},
+    )
+    monkeypatch.setattr(collection_pipeline, "persist_shadow_telegram_posts_if_enabled", lambda *a, **kw: {})
+    settings = SimpleNamespace(COLLECT_TELEGRAM=True, TELEGRAM_COLLECT_CONCURRENCY=4)
+    try:
+        total = await collection_pipeline.run_telegram_collection_cycle(db, settings)
+    finally:
+        db.query(Channel).filter(Channel.name.in_(names)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+    assert set(names) <= set(calls)
+    assert total["posts_fetched"] == 3 * len(names)
+    # один общий клиент на весь цикл
+    assert len(seen_clients) == 1 and id(None) not in seen_clients
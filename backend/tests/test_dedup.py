@@ -75,3 +75,148 @@ def test_cleanup_duplicates_keeps_one(db_dedup, ch):
     assert deleted == 2
     after = db_dedup.query(Signal).filter(Signal.channel_id == ch.id).count()
     assert after == 1
+
+
+def _legacy_signal(ch, text, fp=None):
+    return Signal(
+        channel_id=ch.id,
+        asset="BTC/USDT",
+        symbol="BTCUSDT",
+        direction=SignalDirection.LONG,
+        entry_price=Decimal("50000"),
+        original_text=text,
+        content_fingerprint=fp,
+        status="PENDING",
+    )
+
+
+def test_find_duplicate_signals_single_query(db_dedup, ch):
+    from sqlalchemy import event
+
+    from app.services.dedup import find_duplicate_signals
+
+    known = "ETH SHORT 3000 tp 2800"
+    legacy = "SOL LONG 150 " + "x" * 600
+    db_dedup.add(_legacy_signal(ch, known, content_fingerprint(known)))
+    db_dedup.add(_legacy_signal(ch, legacy))
+    db_dedup.commit()
+
+    texts = [known.upper(), legacy[:500] + "different tail", "NEW signal", "new   SIGNAL", None]
+    channel_id = ch.id
+    statements = []
+    listener = lambda *a: statements.append(a[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        flags = find_duplicate_signals(db_dedup, channel_id, texts)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    # совпадение по fingerprint, legacy-префикс, первое вхождение нового текста, его повтор в пачке
+    assert flags == [True, True, False, True, False]
+    assert len(statements) == 1
+    assert [signal_exists(db_dedup, ch.id, t) for t in texts[:3]] == flags[:3]
+
+
+def test_backfill_content_fingerprints(db_dedup, ch):
+    from app.services.dedup import backfill_content_fingerprints, find_duplicate_signals
+
+    texts = [f"legacy signal {i}" for i in range(5)]
+    for t in texts:
+        db_dedup.add(_legacy_signal(ch, t))
+    db_dedup.commit()
+
+    assert backfill_content_fingerprints(db_dedup, batch_size=2, limit=3) == 3
+    assert backfill_content_fingerprints(db_dedup, batch_size=2) >= 2
+    rows = db_dedup.query(Signal).filter(Signal.channel_id == ch.id).all()
+    assert all(r.content_fingerprint == content_fingerprint(r.original_text) for r in rows)
+    assert find_duplicate_signals(db_dedup, ch.id, ["LEGACY signal 3"]) == [True]
+
+
+def test_existing_raw_telegram_texts(db_dedup):
+    from app.models.signal import TelegramSignal
+    from app.services.dedup import existing_raw_telegram_texts
+
+    src = f"raw_{uuid.uuid4().hex[:8]}"
+    db_dedup.add(TelegramSignal(symbol="BTCUSDT", signal_type="long", source=src, original_text="chart only"))
+    db_dedup.commit()
+    assert existing_raw_telegram_texts(db_dedup, src, ["chart only", "other", None]) == {"chart only"}
+    assert existing_raw_telegram_texts(db_dedup, "elsewhere", ["chart only"]) == set()
+
+
+def test_fingerprint_cache_narrows_definite_negatives_to_tail(db_dedup, ch, monkeypatch):
+    from sqlalchemy import event
+
+    from app.services import dedup
+
+    monkeypatch.setenv("DEDUP_FINGERPRINT_CACHE", "true")
+    monkeypatch.setattr(dedup, "_fp_cache", None)
+    known = f"BTC LONG 61000 cache {ch.id}"
+    db_dedup.add(_legacy_signal(ch, known, content_fingerprint(known)))
+    db_dedup.commit()
+    channel_id = ch.id
+    assert dedup.warm_fingerprint_cache(db_dedup) >= 1
+
+    statements = []
+    listener = lambda *a: statements.append(a[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        # новые тексты — Bloom «точно нет»: в SQL только хвост id > tail_from
+        assert dedup.find_duplicate_signals(db_dedup, channel_id, ["fresh 1", "fresh 2"]) == [False, False]
+        assert len(statements) == 1
+        assert "signals.id >" in statements[0]
+        # возможный дубликат подтверждается SQL и попадает в LRU
+        assert dedup.find_duplicate_signals(db_dedup, channel_id, [known]) == [True]
+        assert len(statements) == 2
+        assert dedup.signal_exists(db_dedup, channel_id, known) is True
+        assert len(statements) == 2
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    # записанное в этом процессе уже в фильтре: повтор идёт на подтверждение в SQL
+    assert dedup.get_fingerprint_cache().lookup(channel_id, [content_fingerprint("fresh 1")]) == {
+        content_fingerprint("fresh 1"): None
+    }
+
+
+def test_fingerprint_cache_sees_rows_of_other_processes_before_refresh(db_dedup, ch, monkeypatch):
+    from app.services import dedup
+
+    monkeypatch.setenv("DEDUP_FINGERPRINT_CACHE", "true")
+    monkeypatch.setattr(dedup, "_fp_cache", None)
+    dedup.warm_fingerprint_cache(db_dedup)
+    # другой воркер записал сигнал после прогрева; refresh_sec ещё не истёк
+    other = f"ETH SHORT 3100 other worker {ch.id}"
+    db_dedup.add(_legacy_signal(ch, other, content_fingerprint(other)))
+    db_dedup.commit()
+
+    fp = content_fingerprint(other)
+    assert dedup.get_fingerprint_cache().lookup(ch.id, [fp]) == {fp: False}
+    assert dedup.find_duplicate_signals(db_dedup, ch.id, [other, "brand new"]) == [True, False]
+    assert dedup.signal_exists(db_dedup, ch.id, other) is True
+
+
+def test_fingerprint_cache_bypasses_channels_with_legacy_rows(db_dedup, ch, monkeypatch):
+    from app.services import dedup
+
+    monkeypatch.setenv("DEDUP_FINGERPRINT_CACHE", "true")
+    monkeypatch.setattr(dedup, "_fp_cache", None)
+    legacy = "legacy without fingerprint " + "y" * 520
+    db_dedup.add(_legacy_signal(ch, legacy))
+    db_dedup.commit()
+    dedup.warm_fingerprint_cache(db_dedup)
+
+    assert dedup.find_duplicate_signals(db_dedup, ch.id, [legacy[:500] + " edited"]) == [True]
+    monkeypatch.setenv("DEDUP_LEGACY_PREFIX_CHECK", "false")
+    assert dedup.find_duplicate_signals(db_dedup, ch.id, [legacy[:500] + " edited"]) == [False]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    from app.services.dedup import _BloomFilter
+
+    bloom = _BloomFilter(1000)
+    fps = [content_fingerprint(f"text {i}") for i in range(1000)]
+    for fp in fps:
+        bloom.add(fp)
+    assert all(fp in bloom for fp in fps)
+    others = [content_fingerprint(f"other {i}") for i in range(2000)]
+    assert sum(fp in bloom for fp in others) < 100
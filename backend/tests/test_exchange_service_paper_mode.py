@@ -137,3 +137,51 @@ def test_live_bybit_balance_uses_signed_http_transport(live_svc, monkeypatch):
     assert kwargs["params"] == {"accountType": "UNIFIED"}
     assert kwargs["headers"]["X-BAPI-API-KEY"] == "key"
     assert kwargs["headers"]["X-BAPI-SIGN"]
+
+
+def test_live_bybit_batch_prices_use_one_ticker_call(live_svc, monkeypatch):
+    calls = []
+
+    async def fake_request(method, url, **kwargs):
+        calls.append((method, url, kwargs))
+        return {
+            "retCode": 0,
+            "result": {
+                "list": [
+                    {"symbol": "BTCUSDT", "lastPrice": "60100.5"},
+                    {"symbol": "ETHUSDT", "lastPrice": "3000"},
+                    {"symbol": "SOLUSDT", "lastPrice": "150"},
+                ]
+            },
+        }
+
+    monkeypatch.setattr(live_svc, "_request_json", fake_request)
+
+    prices = _run(live_svc.get_current_prices(ExchangeType.BYBIT, ["BTCUSDT", "ETHUSDT", "BTCUSDT", "XYZUSDT"]))
+
+    assert prices == {"BTCUSDT": Decimal("60100.5"), "ETHUSDT": Decimal("3000")}
+    assert len(calls) == 1
+    assert calls[0][1] == "https://bybit.test/v5/market/tickers"
+    assert calls[0][2]["params"] == {"category": "linear"}
+
+
+def test_paper_batch_prices(svc):
+    prices = _run(svc.get_current_prices(ExchangeType.BINANCE, ["BTCUSDT", "ETHUSDT", "SOLUSDT"]))
+    assert prices == {"BTCUSDT": Decimal("50000"), "ETHUSDT": Decimal("3000"), "SOLUSDT": Decimal("100")}
+
+
+def test_trading_runtime_reuses_one_loop():
+    from app.services.trading_runtime import TradingRuntime
+
+    runtime = TradingRuntime()
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    try:
+        first = runtime.run(current_loop())
+        assert runtime.run(current_loop()) is first
+        assert runtime.exchange_service is runtime.exchange_service
+    finally:
+        runtime.stop()
+    assert first.is_closed()
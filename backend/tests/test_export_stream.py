@@ -0,0 +1,102 @@
+"""Потоковый экспорт: курсор по столбцам, чанки CSV/NDJSON, gzip на лету."""
+import csv
+import gzip
+import io
+import json
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from app.core.database import SessionLocal, engine
+from app.models.base import Base
+from app.models.channel import Channel
+from app.models.signal import Signal, SignalDirection, SignalStatus
+from app.services.export_stream import (
+    gzip_chunks,
+    iter_csv,
+    iter_ndjson,
+    iter_rows,
+    signals_export_query,
+    SIGNAL_EXPORT_COLUMNS,
+)
+
+HEADERS = [h for h, _ in SIGNAL_EXPORT_COLUMNS]
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def channel_with_signals(db):
+    uid = uuid.uuid4().hex[:8]
+    ch = Channel(name=f"EX_{uid}", username=f"ex_{uid}", url=f"https://t.me/ex_{uid}")
+    db.add(ch)
+    db.commit()
+    db.add_all([
+        Signal(
+            channel_id=ch.id,
+            asset="BTC/USDT",
+            symbol="BTCUSDT",
+            direction=SignalDirection.LONG,
+            entry_price=Decimal("100") + i,
+            status=SignalStatus.PENDING,
+        )
+        for i in range(5)
+    ])
+    db.commit()
+    return ch
+
+
+def test_csv_streams_in_chunks(db, channel_with_signals):
+    rows = iter_rows(db, signals_export_query(channel_ids=[channel_with_signals.id]), chunk_rows=2)
+    chunks = list(iter_csv(HEADERS, rows, chunk_rows=2))
+    assert len(chunks) == 4  # заголовок + 2 + 2 + 1
+    parsed = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert parsed[0] == HEADERS
+    assert len(parsed) == 6
+    assert {r[HEADERS.index("Direction")] for r in parsed[1:]} == {"LONG"}
+    assert {r[HEADERS.index("Channel Name")] for r in parsed[1:]} == {channel_with_signals.name}
+
+
+def test_ndjson_gzip_roundtrip(db, channel_with_signals):
+    rows = iter_rows(db, signals_export_query(channel_ids=[channel_with_signals.id]))
+    body = gzip.decompress(b"".join(gzip_chunks(iter_ndjson(HEADERS, rows))))
+    records = [json.loads(line) for line in body.decode().splitlines()]
+    assert len(records) == 5
+    assert sorted(r["Entry Price"] for r in records) == [100.0, 101.0, 102.0, 103.0, 104.0]
+
+
+def test_signals_excel_built_off_event_loop(db, channel_with_signals, monkeypatch):
+    import asyncio
+    import threading
+    from types import SimpleNamespace
+
+    pytest.importorskip("openpyxl")
+    from app.services import export_service as es
+
+    async def _allow(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(es, "check_subscription_limit", _allow)
+    build = es.DataExportService._generate_signals_excel_response
+    threads = []
+
+    def _spy(self, *args):
+        threads.append(threading.current_thread())
+        return build(self, *args)
+
+    monkeypatch.setattr(es.DataExportService, "_generate_signals_excel_response", _spy)
+    monkeypatch.setattr(es, "signals_export_query", lambda **kw: signals_export_query(
+        channel_ids=[channel_with_signals.id]))
+
+    response = asyncio.run(es.DataExportService().export_user_data(
+        SimpleNamespace(id=None), db, format="excel"))
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert response.media_type.endswith("spreadsheetml.sheet")
@@ -0,0 +1,101 @@
+"""Feature store: индикатор и статистика канала — на момент сигнала, без будущих исходов."""
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from app.core.database import SessionLocal, engine
+from app.models.base import Base
+from app.models.channel import Channel
+from app.models.signal import Signal, SignalDirection, SignalStatus
+from app.models.signal_feature import SignalFeature
+from app.services.feature_store import FEATURE_VERSION, get_features, materialize_features
+
+T0 = datetime(2026, 5, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS technical_indicators ("
+            "id INTEGER PRIMARY KEY, symbol VARCHAR(20), timeframe VARCHAR(10), timestamp DATETIME, "
+            "rsi_14 NUMERIC, macd_line NUMERIC)"
+        ))
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def channel(db):
+    uid = uuid.uuid4().hex[:8]
+    ch = Channel(name=f"FS_{uid}", username=f"fs_{uid}", url=f"https://t.me/fs_{uid}", accuracy=100.0)
+    db.add(ch)
+    db.commit()
+    return ch
+
+
+def _signal(db, channel, asset, at, status=SignalStatus.PENDING, resolved_at=None):
+    s = Signal(
+        channel_id=channel.id,
+        asset=asset,
+        symbol=asset.replace("/", ""),
+        direction=SignalDirection.LONG,
+        entry_price=Decimal("100"),
+        tp1_price=Decimal("110"),
+        stop_loss=Decimal("95"),
+        confidence_score=Decimal("80"),
+        status=status,
+        message_timestamp=at,
+        final_exit_timestamp=resolved_at,
+    )
+    db.add(s)
+    db.commit()
+    return s
+
+
+def test_channel_stats_are_point_in_time(db, channel):
+    _signal(db, channel, "BTC/USDT", T0, SignalStatus.TP1_HIT, resolved_at=T0 + timedelta(hours=1))
+    _signal(db, channel, "BTC/USDT", T0 + timedelta(hours=2), SignalStatus.SL_HIT, resolved_at=T0 + timedelta(hours=3))
+    target = _signal(db, channel, "BTC/USDT", T0 + timedelta(hours=4))
+    # закрылся уже после target — в признаки target попасть не должен
+    _signal(db, channel, "BTC/USDT", T0 + timedelta(hours=1), SignalStatus.TP2_HIT, resolved_at=T0 + timedelta(hours=6))
+
+    f = get_features(db, [target.id])[target.id]
+    assert f["channel_accuracy"] == pytest.approx(50.0)
+    assert f["channel_signal_count"] == 3
+    assert f["confidence_score"] == pytest.approx(0.8)
+    assert f["risk_reward_ratio"] == pytest.approx(2.0)
+    assert f["direction"] == 1.0
+
+
+def test_indicator_is_last_point_not_after_signal(db, channel):
+    symbol = f"X{uuid.uuid4().hex[:6].upper()}"
+    with engine.begin() as conn:
+        for ts, rsi in ((T0 - timedelta(hours=30), 40.0), (T0 - timedelta(hours=2), 55.0), (T0 + timedelta(hours=1), 90.0)):
+            conn.execute(
+                text("INSERT INTO technical_indicators (symbol, timeframe, timestamp, rsi_14, macd_line) "
+                     "VALUES (:s, '1d', :ts, :rsi, 0.5)"),
+                {"s": symbol, "ts": ts, "rsi": rsi},
+            )
+    s = _signal(db, channel, f"{symbol}/USDT", T0)
+    s.symbol = symbol
+    db.commit()
+
+    assert materialize_features(db, signal_ids=[s.id]) == 1
+    row = db.query(SignalFeature).filter_by(signal_id=s.id).one()
+    assert row.rsi == pytest.approx(55.0)
+    assert row.has_indicators is True
+    assert row.feature_version == FEATURE_VERSION
+
+
+def test_materialize_picks_up_missing_rows(db, channel):
+    s = _signal(db, channel, "ETH/USDT", T0)
+    assert db.query(SignalFeature).filter_by(signal_id=s.id).first() is None
+    while materialize_features(db, limit=500) == 500:
+        pass
+    assert db.query(SignalFeature).filter_by(signal_id=s.id).one().has_indicators is False
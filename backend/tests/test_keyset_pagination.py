@@ -0,0 +1,105 @@
+"""Keyset-курсор по (created_at, id) и сброс версий кэша после commit."""
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.core.database import SessionLocal, engine
+from app.models.base import Base
+from app.models.channel import Channel
+from app.models.signal import Signal, SignalDirection, SignalStatus
+from app.services import cache_versions
+from app.services.keyset_pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def channel_with_signals(db):
+    uid = uuid.uuid4().hex[:8]
+    ch = Channel(name=f"KS_{uid}", username=f"ks_{uid}", url=f"https://t.me/ks_{uid}")
+    db.add(ch)
+    db.commit()
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    # пары с одинаковым created_at — курсор должен различать их по id
+    db.add_all([
+        Signal(
+            channel_id=ch.id,
+            asset="BTC/USDT",
+            symbol="BTCUSDT",
+            direction=SignalDirection.LONG,
+            entry_price=Decimal("100"),
+            status=SignalStatus.PENDING,
+            created_at=base + timedelta(minutes=i // 2),
+        )
+        for i in range(7)
+    ])
+    db.commit()
+    return ch
+
+
+def test_cursor_round_trip():
+    ts = datetime(2024, 5, 1, 10, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(ts, 42)) == (ts, 42)
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor")
+
+
+def test_pages_cover_all_rows_without_overlap(db, channel_with_signals):
+    query = db.query(Signal).filter(Signal.channel_id == channel_with_signals.id)
+    expected = [s.id for s in query.order_by(Signal.created_at.desc(), Signal.id.desc())]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = keyset_page(query, Signal, cursor, 3)
+        seen.extend(r.id for r in rows)
+        pages += 1
+        if cursor is None:
+            break
+    assert seen == expected
+    assert pages == 3
+
+
+def test_commit_bumps_signal_and_channel_versions(db, channel_with_signals, monkeypatch):
+    bumped = []
+    monkeypatch.setattr(cache_versions, "bump_cache_version", lambda *ns: bumped.append(ns))
+
+    signal = db.query(Signal).filter(Signal.channel_id == channel_with_signals.id).first()
+    signal.status = SignalStatus.ENTRY_HIT
+    db.commit()
+    assert bumped == [("channels", f"signal_stats:{channel_with_signals.id}", "signals")]
+
+    bumped.clear()
+    channel_with_signals.description = "updated"
+    db.rollback()
+    db.commit()
+    assert bumped == []
+
+
+def test_commit_on_event_loop_bumps_in_executor(db, channel_with_signals, monkeypatch):
+    import asyncio
+    import threading
+
+    bumped = []
+    monkeypatch.setattr(
+        cache_versions, "bump_cache_version", lambda *ns: bumped.append((threading.current_thread(), ns))
+    )
+
+    async def commit_on_loop():
+        signal = db.query(Signal).filter(Signal.channel_id == channel_with_signals.id).first()
+        signal.status = SignalStatus.ENTRY_HIT
+        db.commit()
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(commit_on_loop())  # asyncio.run дожидается default executor
+    assert len(bumped) == 1
+    thread, namespaces = bumped[0]
+    assert thread is not loop_thread
+    assert "signals" in namespaces
@@ -0,0 +1,82 @@
+"""Пакетная загрузка свечей/индикаторов и инкрементальный расчёт индикаторов."""
+import importlib.util
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.services.market_data_loader import last_timestamp, load_candles
+
+T0 = datetime(2025, 6, 1, tzinfo=timezone.utc)
+H = timedelta(hours=1)
+
+
+@pytest.fixture
+def candles_db():
+    eng = create_engine("sqlite://")
+    with eng.begin() as conn:
+        conn.execute(
+            text(
+                """
+                CREATE TABLE market_candles (
+                    id INTEGER PRIMARY KEY, symbol TEXT, timeframe TEXT, timestamp DATETIME,
+                    open NUMERIC, high NUMERIC, low NUMERIC, close NUMERIC, volume NUMERIC,
+                    source TEXT, created_at DATETIME, updated_at DATETIME,
+                    UNIQUE (symbol, timeframe, timestamp)
+                )
+                """
+            )
+        )
+    return eng
+
+
+def _klines(n, start=0, close_shift=0.0):
+    return [(T0 + i * H, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i + close_shift, 10.0 * i) for i in range(start, start + n)]
+
+
+def test_load_candles_merges_and_refreshes_last_bar(candles_db):
+    with candles_db.connect() as conn:
+        assert load_candles(conn, "BTCUSDT", "1h", _klines(5)) == 5
+        conn.commit()
+        # повтор с перекрытием: последняя свеча (индекс 4) пришла закрытой с другим close
+        load_candles(conn, "BTCUSDT", "1h", _klines(4, start=4, close_shift=1.0))
+        conn.commit()
+        rows = conn.execute(text("SELECT COUNT(*), MAX(close) FROM market_candles")).one()
+        bar4 = conn.execute(
+            text("SELECT close FROM market_candles WHERE timestamp = :ts"), {"ts": T0 + 4 * H}
+        ).scalar()
+        assert last_timestamp(conn, "market_candles", "BTCUSDT", "1h") is not None
+
+    assert rows[0] == 8
+    assert float(bar4) == pytest.approx(105.5)
+
+
+def _indicators_module():
+    path = Path(__file__).resolve().parent.parent / "scripts" / "calculate_indicators.py"
+    spec = importlib.util.spec_from_file_location("calculate_indicators", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_incremental_indicators_match_full_history():
+    ci = _indicators_module()
+    rng = np.random.default_rng(7)
+    n = 900
+    closes = 100 + np.cumsum(rng.normal(0, 1, n))
+    highs = closes + rng.uniform(0.1, 1.0, n)
+    lows = closes - rng.uniform(0.1, 1.0, n)
+    ts = [T0 + i * H for i in range(n)]
+
+    full = ci.indicator_rows("BTCUSDT", "1h", ts, highs, lows, closes)
+    idx = 700  # «последняя сохранённая точка»
+    lo = idx - ci.WARMUP_BARS
+    inc = ci.indicator_rows("BTCUSDT", "1h", ts[lo:], highs[lo:], lows[lo:], closes[lo:], start=idx - lo)
+
+    assert len(inc) == n - idx
+    for got, want in zip(inc, full[idx:]):
+        assert got[2] == want[2]
+        for g, w in zip(got[3:], want[3:]):
+            assert g == pytest.approx(w, rel=1e-6, abs=1e-6)
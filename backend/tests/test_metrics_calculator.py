@@ -0,0 +1,107 @@
+"""Инкрементальные метрики каналов: счётчики ведёт flush-хук, recalculate_* — сверка."""
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from app.core.database import SessionLocal, engine
+from app.models.base import Base
+from app.models.channel import Channel
+from app.models.signal import Signal, SignalDirection, SignalStatus
+from app.services.metrics_calculator import recalculate_all_channels, recalculate_channel_metrics
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def channel(db):
+    uid = uuid.uuid4().hex[:8]
+    ch = Channel(name=f"Metrics_{uid}", username=f"metrics_{uid}", url=f"https://t.me/metrics_{uid}")
+    db.add(ch)
+    db.commit()
+    return ch
+
+
+def _signal(channel_id, status=SignalStatus.PENDING, pnl=None):
+    return Signal(
+        channel_id=channel_id,
+        asset="BTC/USDT",
+        symbol="BTCUSDT",
+        direction=SignalDirection.LONG,
+        entry_price=Decimal("50000"),
+        status=status,
+        profit_loss_percentage=pnl,
+    )
+
+
+def test_counters_follow_inserts_and_status_changes(db, channel):
+    signals = [_signal(channel.id) for _ in range(4)]
+    db.add_all(signals)
+    db.commit()
+    db.refresh(channel)
+    assert (channel.signals_count, channel.resolved_signals, channel.accuracy) == (4, 0, None)
+
+    # после commit атрибуты expired — старое значение статуса всё равно учитывается
+    signals[0].status = "TP1_HIT"
+    signals[0].profit_loss_percentage = Decimal("10")
+    signals[1].status = SignalStatus.SL_HIT
+    signals[1].profit_loss_percentage = Decimal("-4")
+    db.commit()
+    db.refresh(channel)
+    assert channel.resolved_signals == 2
+    assert channel.successful_signals == 1
+    assert channel.accuracy == 50.0
+    assert channel.average_roi == 3.0
+
+    signals[1].status = SignalStatus.TP2_HIT
+    db.commit()
+    assert channel.successful_signals == 2
+    assert channel.accuracy == 100.0
+
+    db.delete(signals[0])
+    db.commit()
+    assert (channel.signals_count, channel.resolved_signals, channel.roi_count) == (3, 1, 1)
+    assert channel.average_roi == -4.0
+
+
+def test_reconcile_fixes_drift(db, channel):
+    db.add_all([_signal(channel.id, SignalStatus.TP1_HIT, Decimal("6")), _signal(channel.id, SignalStatus.SL_HIT, Decimal("-2"))])
+    db.commit()
+
+    first = recalculate_channel_metrics(db, channel.id)
+    assert first["reconciled"] is False
+    assert (first["total_signals"], first["hits"], first["accuracy"], first["average_roi"]) == (2, 1, 50.0, 2.0)
+
+    # bulk UPDATE мимо ORM хук не видит — сверка исправляет
+    db.query(Signal).filter(Signal.channel_id == channel.id).update(
+        {Signal.status: SignalStatus.TP1_HIT}, synchronize_session=False
+    )
+    db.commit()
+    results = {r["channel"]: r for r in recalculate_all_channels(db)}
+    fixed = results[channel.name]
+    assert fixed["reconciled"] is True
+    assert fixed["hits"] == 2 and fixed["accuracy"] == 100.0
+    db.refresh(channel)
+    assert channel.successful_signals == 2
+
+
+def test_persist_counts_each_signal_once(db, channel):
+    from app.services.collection_pipeline import persist_parsed_signals_for_channel
+    from app.services.telegram_scraper import ParsedSignal
+
+    parsed = [
+        ParsedSignal(asset="BTC/USDT", direction="LONG", entry_price=50000 + i, take_profit=52000, stop_loss=49000,
+                     original_text=f"BTC long {uuid.uuid4().hex}")
+        for i in range(3)
+    ]
+    stats = persist_parsed_signals_for_channel(db, channel, parsed, record_metrics=False)
+    db.commit()
+    db.refresh(channel)
+    assert stats["saved"] == 3
+    assert channel.signals_count == 3
@@ -15,21 +15,21 @@ def _reset_ml_circuit():
     asyncio.run(mg._on_success())
 
 
-def _mock_client_cm(mock_response):
+def _mock_client(mock_response):
     client = MagicMock()
     client.get = AsyncMock(return_value=mock_response)
     client.post = AsyncMock(return_value=mock_response)
-    cm = MagicMock()
-    cm.__aenter__ = AsyncMock(return_value=client)
-    cm.__aexit__ = AsyncMock(return_value=None)
-    return cm
+    return client
 
 
-def _settings(retries=2, th=5, secs=60):
+def _settings(retries=2, th=5, secs=60, window_ms=0, batch_max=32):
     s = MagicMock()
     s.ML_HTTP_RETRIES = retries
     s.ML_CIRCUIT_FAILURE_THRESHOLD = th
     s.ML_CIRCUIT_OPEN_SECONDS = secs
+    s.ML_SERVICE_URL = "http://ml"
+    s.ML_PREDICT_BATCH_WINDOW_MS = window_ms
+    s.ML_PREDICT_BATCH_MAX = batch_max
     return s
 
 
@@ -41,8 +41,8 @@ async def test_ml_http_request_200_resets_circuit():
     ok.status_code = 200
     with patch("app.services.ml_gateway.get_settings", return_value=_settings()):
         with patch(
-            "app.services.ml_gateway.httpx.AsyncClient",
-            return_value=_mock_client_cm(ok),
+            "app.services.ml_gateway._get_client",
+            return_value=_mock_client(ok),
         ):
             r = await mg.ml_http_request("GET", "http://ml/health")
             assert r.status_code == 200
@@ -56,8 +56,8 @@ async def test_ml_http_request_404_not_server_error():
     resp.status_code = 404
     with patch("app.services.ml_gateway.get_settings", return_value=_settings()):
         with patch(
-            "app.services.ml_gateway.httpx.AsyncClient",
-            return_value=_mock_client_cm(resp),
+            "app.services.ml_gateway._get_client",
+            return_value=_mock_client(resp),
         ):
             r = await mg.ml_http_request("GET", "http://ml/x")
             assert r.status_code == 404
@@ -74,8 +74,8 @@ async def test_ml_http_500_opens_circuit_when_threshold_one():
     settings = _settings(retries=0, th=1)
     with patch("app.services.ml_gateway.get_settings", return_value=settings):
         with patch(
-            "app.services.ml_gateway.httpx.AsyncClient",
-            return_value=_mock_client_cm(bad),
+            "app.services.ml_gateway._get_client",
+            return_value=_mock_client(bad),
         ):
             r = await mg.ml_http_request("GET", "http://ml/fail")
             assert r.status_code == 500
@@ -94,12 +94,9 @@ async def test_ml_http_request_error_after_retries_raises():
     client.get = AsyncMock(
         side_effect=httpx.RequestError("boom", request=MagicMock())
     )
-    cm = MagicMock()
-    cm.__aenter__ = AsyncMock(return_value=client)
-    cm.__aexit__ = AsyncMock(return_value=None)
 
     with patch("app.services.ml_gateway.get_settings", return_value=_settings(retries=0, th=99)):
-        with patch("app.services.ml_gateway.httpx.AsyncClient", return_value=cm):
+        with patch("app.services.ml_gateway._get_client", return_value=client):
             with pytest.raises(httpx.RequestError):
                 await mg.ml_http_request("GET", "http://ml/x")
 
@@ -114,13 +111,10 @@ async def test_ml_http_retries_then_success():
     ok.status_code = 200
     client = MagicMock()
     client.get = AsyncMock(side_effect=[fail, fail, ok])
-    cm = MagicMock()
-    cm.__aenter__ = AsyncMock(return_value=client)
-    cm.__aexit__ = AsyncMock(return_value=None)
 
     with patch("app.services.ml_gateway.get_settings", return_value=_settings(retries=2, th=5)):
         with patch("app.services.ml_gateway.asyncio.sleep", new_callable=AsyncMock):
-            with patch("app.services.ml_gateway.httpx.AsyncClient", return_value=cm):
+            with patch("app.services.ml_gateway._get_client", return_value=client):
                 r = await mg.ml_http_request("GET", "http://ml/")
                 assert r.status_code == 200
 
@@ -142,12 +136,93 @@ async def test_ml_http_transient_request_error_then_success():
     err = httpx.RequestError("timeout", request=MagicMock())
     client = MagicMock()
     client.get = AsyncMock(side_effect=[err, ok])
-    cm = MagicMock()
-    cm.__aenter__ = AsyncMock(return_value=client)
-    cm.__aexit__ = AsyncMock(return_value=None)
 
     with patch("app.services.ml_gateway.get_settings", return_value=_settings(retries=1, th=5)):
         with patch("app.services.ml_gateway.asyncio.sleep", new_callable=AsyncMock):
-            with patch("app.services.ml_gateway.httpx.AsyncClient", return_value=cm):
+            with patch("app.services.ml_gateway._get_client", return_value=client):
                 r = await mg.ml_http_request("GET", "http://ml/retry")
                 assert r.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_ml_client_is_reused_between_requests():
+    from app.services import ml_gateway as mg
+
+    with patch("app.services.ml_gateway.get_settings", return_value=_settings()):
+        client = mg._get_client()
+        assert mg._get_client() is client
+        await mg.close_ml_client()
+    assert client.is_closed
+
+
+def _prediction(p):
+    return {"success_probability": p, "confidence": 0.5, "recommendation": "HOLD"}
+
+
+@pytest.mark.asyncio
+async def test_identical_predictions_in_flight_share_one_request():
+    from app.services import ml_gateway as mg
+
+    ok = MagicMock()
+    ok.status_code = 200
+    ok.json.return_value = _prediction(0.7)
+    client = _mock_client(ok)
+
+    with patch("app.services.ml_gateway.get_settings", return_value=_settings()):
+        with patch("app.services.ml_gateway._get_client", return_value=client):
+            payload = {"asset": "BTC", "direction": "LONG", "entry_price": 100.0, "channel_id": 1}
+            results = await asyncio.gather(*(mg.ml_predict_signal(dict(payload)) for _ in range(5)))
+
+    assert results == [_prediction(0.7)] * 5
+    client.post.assert_awaited_once()
+    assert client.post.await_args.args[0] == "http://ml/api/v1/predictions/signal"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_predictions_are_micro_batched():
+    from app.services import ml_gateway as mg
+
+    ok = MagicMock()
+    ok.status_code = 200
+    ok.json.return_value = {"predictions": [_prediction(0.1), _prediction(0.2), _prediction(0.3)]}
+    client = _mock_client(ok)
+
+    with patch("app.services.ml_gateway.get_settings", return_value=_settings(window_ms=20)):
+        with patch("app.services.ml_gateway._get_client", return_value=client):
+            payloads = [{"asset": a, "direction": "LONG", "entry_price": 1.0, "channel_id": 1} for a in ("BTC", "ETH", "SOL")]
+            results = await asyncio.gather(*(mg.ml_predict_signal(p) for p in payloads))
+
+    assert [r["success_probability"] for r in results] == [0.1, 0.2, 0.3]
+    client.post.assert_awaited_once()
+    url = client.post.await_args.args[0]
+    assert url == "http://ml/api/v1/predictions/batch"
+    assert client.post.await_args.kwargs["json"] == {"signals": payloads}
+
+
+@pytest.mark.asyncio
+async def test_invalid_payload_in_batch_fails_only_its_caller():
+    from app.services import ml_gateway as mg
+
+    def respond(url, **kwargs):
+        resp = MagicMock()
+        body = kwargs["json"]
+        if url.endswith("/batch") or body["asset"] == "BAD":
+            resp.status_code = 422
+            resp.text = "validation error"
+        else:
+            resp.status_code = 200
+            resp.json.return_value = _prediction(0.4)
+        return resp
+
+    client = MagicMock()
+    client.post = AsyncMock(side_effect=respond)
+    with patch("app.services.ml_gateway.get_settings", return_value=_settings(window_ms=20)):
+        with patch("app.services.ml_gateway._get_client", return_value=client):
+            payloads = [{"asset": a, "direction": "LONG", "entry_price": 1.0, "channel_id": 1} for a in ("BTC", "BAD", "SOL")]
+            results = await asyncio.gather(*(mg.ml_predict_signal(p) for p in payloads), return_exceptions=True)
+
+    assert results[0]["success_probability"] == 0.4 and results[2]["success_probability"] == 0.4
+    assert isinstance(results[1], mg.MLServiceError) and results[1].status_code == 422
+    urls = [c.args[0] for c in client.post.await_args_list]
+    assert urls[0] == "http://ml/api/v1/predictions/batch"
+    assert urls[1:] == ["http://ml/api/v1/predictions/signal"] * 3
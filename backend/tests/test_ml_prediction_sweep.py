@@ -0,0 +1,90 @@
+"""ML sweep: все PENDING-сигналы одним запросом /api/v1/predictions/batch."""
+import uuid
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.database import SessionLocal, engine
+from app.models.base import Base
+from app.models.channel import Channel
+from app.models.signal import Signal, SignalDirection, SignalStatus
+from app.services.ml_prediction_sweep import predict_pending_signals
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def pending_signals(db):
+    uid = uuid.uuid4().hex[:8]
+    ch = Channel(name=f"ML_{uid}", username=f"ml_{uid}", url=f"https://t.me/ml_{uid}", accuracy=60.0)
+    db.add(ch)
+    db.commit()
+    signals = [
+        Signal(
+            channel_id=ch.id,
+            asset=asset,
+            symbol=asset.replace("/", ""),
+            direction=SignalDirection.LONG,
+            entry_price=Decimal("100"),
+            tp1_price=Decimal("110"),
+            stop_loss=Decimal("95"),
+            status=SignalStatus.PENDING,
+        )
+        for asset in ("BTC/USDT", "ETH/USDT", "SOL/USDT")
+    ]
+    db.add_all(signals)
+    db.commit()
+    return signals
+
+
+async def test_sweep_is_one_round_trip(db, pending_signals):
+    def respond(method, url, **kwargs):
+        rows = kwargs["json"]["signals"]
+        resp = MagicMock()
+        resp.status_code = 200
+        resp.json.return_value = {
+            "predictions": [{"success_probability": 0.7, "asset": r["asset"]} for r in rows]
+        }
+        return resp
+
+    mock = AsyncMock(side_effect=respond)
+    with patch("app.services.ml_prediction_sweep.ml_http_request", mock):
+        out = await predict_pending_signals(db)
+
+    assert mock.await_count == 1
+    assert mock.await_args.args[1].endswith("/api/v1/predictions/batch")
+    sent = mock.await_args.kwargs["json"]["signals"]
+    assert out["predicted_signals"] == len(sent) >= 3
+    mine = [r for r in sent if r["channel_id"] == pending_signals[0].channel_id]
+    assert len(mine) == 3
+    assert mine[0]["channel_accuracy"] == pytest.approx(0.6)  # проценты канала → 0-1
+    assert mine[0]["target_price"] == 110.0
+    # признаки из signal_features — те же, что читает обучение
+    assert mine[0]["signal_id"] is not None
+    assert mine[0]["features"]["risk_reward_ratio"] == pytest.approx(2.0)
+    for s in pending_signals:
+        db.refresh(s)
+        assert float(s.ml_success_probability) == pytest.approx(0.7)
+        assert s.ml_prediction["asset"] == s.asset
+
+
+@pytest.mark.parametrize("score, expected", [(None, 0.5), (0.8, 0.8), (80, 0.8), (1, 1.0)])
+def test_ml_request_confidence_matches_feature_store(score, expected):
+    from app.services.ml_prediction_sweep import signal_to_ml_request
+
+    signal = Signal(
+        id=1,
+        channel_id=1,
+        asset="BTC/USDT",
+        direction=SignalDirection.LONG,
+        entry_price=Decimal("100"),
+        confidence_score=score,
+    )
+    assert signal_to_ml_request(signal)["confidence"] == pytest.approx(expected)
@@ -0,0 +1,61 @@
+"""OCR вне event loop: кэш по хэшу содержимого (репост под новым URL не OCR-ится), ограниченная очередь."""
+import pytest
+
+from app.services import ocr_pool
+
+
+@pytest.fixture
+def ocr_env(monkeypatch):
+    """OCR inline в потоке, без Redis; считаем реальные вызовы OCR."""
+    calls = []
+
+    def fake_ocr(image_bytes, order):
+        calls.append(image_bytes)
+        return "BTC LONG entry 65000", order[0], [order[0]]
+
+    monkeypatch.setenv("OCR_WORKERS", "0")
+    monkeypatch.setattr(ocr_pool, "_ocr_job", fake_ocr)
+    monkeypatch.setattr("app.core.redis_cache.cache_get", lambda key: None)
+    monkeypatch.setattr("app.core.redis_cache.cache_set", lambda *a, **kw: False)
+    ocr_pool.clear_local_cache()
+    yield calls
+    ocr_pool.clear_local_cache()
+
+
+async def test_same_image_hash_skips_ocr(ocr_env, monkeypatch):
+    # два набора байт (тот же скриншот в другом контейнере) с одним хэшем пикселей
+    monkeypatch.setattr(ocr_pool, "image_hash", lambda b: "x" + "0" * 64)
+    assert await ocr_pool.ocr_image_bytes(b"original") == "BTC LONG entry 65000"
+    assert await ocr_pool.ocr_image_bytes(b"recompressed") == "BTC LONG entry 65000"
+    assert ocr_env == [b"original"]
+
+
+async def test_queue_full_skips_without_caching(ocr_env, monkeypatch):
+    monkeypatch.setenv("OCR_QUEUE_MAX", "1")
+    assert ocr_pool._try_reserve()
+    try:
+        assert await ocr_pool.ocr_image_bytes(b"busy") is None
+    finally:
+        ocr_pool._release()
+    assert ocr_env == []
+    assert await ocr_pool.ocr_image_bytes(b"busy") == "BTC LONG entry 65000"
+
+
+def test_hash_is_exact_for_pixels_not_layout():
+    np = pytest.importorskip("numpy")
+    cv2 = pytest.importorskip("cv2")
+
+    def card(text):
+        img = np.full((200, 400), 255, dtype=np.uint8)
+        cv2.putText(img, "BTC/USDT LONG", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, 0, 2)
+        cv2.putText(img, text, (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 1, 0, 2)
+        return img
+
+    a = card("TP 65100 SL 61900")
+    _, fast = cv2.imencode(".png", a, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    _, small = cv2.imencode(".png", a, [cv2.IMWRITE_PNG_COMPRESSION, 9])
+    _, other = cv2.imencode(".png", card("TP 68100 SL 64900"))
+    assert fast.tobytes() != small.tobytes()
+    assert ocr_pool.image_hash(fast.tobytes()) == ocr_pool.image_hash(small.tobytes())
+    # та же вёрстка, другие цифры — другой ключ кэша
+    assert ocr_pool.image_hash(other.tobytes()) != ocr_pool.image_hash(fast.tobytes())
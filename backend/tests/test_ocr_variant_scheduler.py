@@ -0,0 +1,51 @@
+"""Планировщик вариантов OCR: ранняя остановка и обучение порядка по win rate канала."""
+import pytest
+
+from app.services import ocr_signal_parser as ocr
+
+
+class _FakeReader:
+    """readtext отдаёт текст по имени варианта (картинка-заглушка = имя)."""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.calls = []
+
+    def readtext(self, img, detail=1, paragraph=True):
+        self.calls.append(img)
+        return [(None, self.texts.get(img, ""), 0.9)] if self.texts.get(img) else []
+
+
+@pytest.fixture
+def reader(monkeypatch):
+    names = list(ocr._VARIANT_NAMES[:6])
+    fake = _FakeReader({"otsu": "#BTC LONG entry $65000 TP $72000 SL $63000", "clahe": "noise"})
+    monkeypatch.setattr(ocr, "_get_reader", lambda: fake)
+    monkeypatch.setattr(ocr, "_named_image_variants", lambda b: [(n, n) for n in names])
+    monkeypatch.setattr("app.core.redis_cache.cache_get", lambda key: None)
+    monkeypatch.setattr("app.core.redis_cache.cache_set", lambda *a, **kw: False)
+    monkeypatch.setattr(ocr, "_variant_stats", {})
+    return fake
+
+
+def test_stops_once_entry_price_found(reader):
+    text, winner, tried = ocr.extract_text_ranked(b"img", ocr.variant_order())
+    assert winner == "otsu" and "65000" in text
+    assert tried == ["original", "clahe", "otsu"]
+
+
+def test_early_exit_disabled_runs_all_variants(reader, monkeypatch):
+    monkeypatch.setenv("OCR_EARLY_EXIT", "false")
+    _, winner, tried = ocr.extract_text_ranked(b"img", ocr.variant_order())
+    assert winner == "otsu" and len(tried) == 6
+
+
+def test_channel_win_rate_moves_winner_first(reader, monkeypatch):
+    monkeypatch.setenv("OCR_VARIANT_MIN_SAMPLES", "3")
+    for _ in range(3):
+        _, winner, tried = ocr.extract_text_ranked(b"img", ocr.variant_order("chan"))
+        ocr.record_variant_result("chan", winner, tried)
+    assert ocr.variant_order("chan")[0] == "otsu"
+    reader.calls.clear()
+    ocr.extract_text_ranked(b"img", ocr.variant_order("chan"))
+    assert reader.calls == ["otsu"]
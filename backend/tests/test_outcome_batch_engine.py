@@ -0,0 +1,208 @@
+"""Parity: векторизованный batch-движок outcome == compute_outcome_from_candles."""
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.services.outcome_batch_engine import CandleArrays, OutcomeSpec, compute_outcomes_batch
+from app.services.outcome_candle_engine import OhlcCandle, compute_outcome_from_candles
+
+T0 = datetime(2025, 6, 1, tzinfo=timezone.utc)
+H = timedelta(hours=1)
+
+
+def _random_candles(rng, n, start=T0, price=100.0):
+    out = []
+    for i in range(n):
+        o = price
+        c = max(1.0, o * (1 + rng.uniform(-0.03, 0.03)))
+        hi = max(o, c) * (1 + rng.uniform(0, 0.02))
+        lo = min(o, c) * (1 - rng.uniform(0, 0.02))
+        out.append(
+            OhlcCandle(
+                start + i * H,
+                Decimal(f"{o:.2f}"),
+                Decimal(f"{hi:.2f}"),
+                Decimal(f"{lo:.2f}"),
+                Decimal(f"{c:.2f}"),
+            )
+        )
+        price = c
+    return out
+
+
+def _random_spec(rng, candles):
+    st = candles[rng.randrange(len(candles))].ts_open + timedelta(minutes=rng.choice([0, 1, 30, 59]))
+    ref = float(candles[0].close)
+    direction = rng.choice(["LONG", "SHORT", "LONG", "SHORT", "FLAT"])
+    entry = Decimal(f"{ref * rng.uniform(0.9, 1.1):.2f}")
+    sign = 1 if direction == "LONG" else -1
+    sl = rng.choice([None, Decimal(f"{float(entry) * (1 - sign * rng.uniform(0.01, 0.1)):.2f}"), entry * 2])
+    n_tp = rng.choice([0, 1, 2, 3])
+    tps = sorted(
+        (Decimal(f"{float(entry) * (1 + sign * rng.uniform(0.005, 0.15)):.2f}") for _ in range(n_tp)),
+        reverse=direction == "SHORT",
+    )
+    mid = rng.choice([None, Decimal(f"{float(entry) * rng.uniform(0.97, 1.03):.2f}")])
+    return OutcomeSpec(
+        model_key=rng.choice(["market_on_publish", "first_touch_limit", "midpoint_entry", "bogus"]),
+        direction=direction,
+        entry_price=entry,
+        stop_loss=sl,
+        signal_time=st,
+        midpoint_price=mid,
+        take_profit_levels=tuple(tps),
+    )
+
+
+def _scalar(spec, candles, *, mop, sl_first):
+    return compute_outcome_from_candles(
+        model_key=spec.model_key,
+        direction=spec.direction,
+        entry_price=spec.entry_price,
+        take_profit=None,
+        stop_loss=spec.stop_loss,
+        signal_time=spec.signal_time,
+        candles=candles,
+        timeframe="1h",
+        midpoint_price=spec.midpoint_price,
+        take_profit_levels=list(spec.take_profit_levels),
+        mop_reference=mop,
+        sl_before_tp_same_bar=sl_first,
+    )
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("sl_first", [True, False])
+def test_batch_parity_with_scalar_engine_on_shared_window(seed, sl_first):
+    rng = random.Random(seed)
+    candles = _random_candles(rng, 400)
+    arrays = CandleArrays.from_candles(candles)
+    specs = [_random_spec(rng, candles) for _ in range(300)]
+    lookahead = timedelta(days=rng.choice([1, 3, 7]))
+    windows = [arrays.window_bounds(s.signal_time, s.signal_time + lookahead) for s in specs]
+    mop = rng.choice(["close", "open", "hl2", "ohlc4"])
+
+    got = compute_outcomes_batch(
+        arrays, specs, timeframe="1h", windows=windows, mop_reference=mop, sl_before_tp_same_bar=sl_first
+    )
+    for spec, (lo, hi), res in zip(specs, windows, got):
+        assert res == _scalar(spec, candles[lo:hi], mop=mop, sl_first=sl_first), spec
+
+
+def test_batch_parity_whole_window_and_after_candles():
+    rng = random.Random(42)
+    candles = _random_candles(rng, 50)
+    arrays = CandleArrays.from_candles(candles)
+    specs = [_random_spec(rng, candles) for _ in range(100)]
+    specs.append(
+        OutcomeSpec("market_on_publish", "LONG", Decimal("100"), None, candles[-1].ts_open + 5 * H)
+    )
+    got = compute_outcomes_batch(arrays, specs, timeframe="1h")
+    for spec, res in zip(specs, got):
+        assert res == _scalar(spec, candles, mop="close", sl_first=True)
+    assert got[-1][1]["error_detail"]["code"] == "signal_after_candles"
+
+
+def test_batch_empty_window_is_no_candles():
+    arrays = CandleArrays.from_candles([])
+    spec = OutcomeSpec("market_on_publish", "LONG", Decimal("1"), None, T0)
+    [(status, fields)] = compute_outcomes_batch(arrays, [spec], timeframe="1h")
+    assert status == "DATA_INCOMPLETE"
+    assert fields["error_detail"]["code"] == "no_candles"
+
+
+@pytest.fixture
+def outcome_rows():
+    import app.models.execution_model  # noqa: F401
+    import app.models.extraction  # noqa: F401
+    import app.models.extraction_decision  # noqa: F401
+    import app.models.normalized_signal  # noqa: F401
+    import app.models.raw_ingestion  # noqa: F401
+    import app.models.review_label  # noqa: F401
+    import app.models.signal_outcome  # noqa: F401
+    from app.core.database import Base, SessionLocal, engine
+    from app.models.normalized_signal import NormalizedSignal
+    from app.models.raw_ingestion import RawEvent
+    from app.services.outcome_service import ensure_pending_outcomes_for_normalized
+
+    from test_normalized_signals_api import _insert_min_normalized_chain
+    from test_signal_outcomes_api import _seed_execution_models
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    _seed_execution_models(db)
+    ns_ids = []
+    for k, (direction, entry, tp, sl) in enumerate(
+        [("LONG", "100", "104", "95"), ("SHORT", "101", "97", "108"), ("LONG", "99", "120", None)]
+    ):
+        _, ns_id = _insert_min_normalized_chain()
+        ns = db.query(NormalizedSignal).filter(NormalizedSignal.id == ns_id).first()
+        re = db.query(RawEvent).filter(RawEvent.id == ns.raw_event_id).first()
+        re.first_seen_at = T0 + (10 + 7 * k) * H + timedelta(minutes=15)
+        ns.direction = direction
+        ns.entry_price = Decimal(entry)
+        ns.take_profit = Decimal(tp)
+        ns.stop_loss = Decimal(sl) if sl else None
+        db.commit()
+        ensure_pending_outcomes_for_normalized(db, normalized_signal_id=ns_id)
+        db.commit()
+        ns_ids.append(ns_id)
+    db.close()
+    return ns_ids
+
+
+def _snapshot(db, ns_ids):
+    from app.models.signal_outcome import SignalOutcome
+
+    rows = (
+        db.query(SignalOutcome)
+        .filter(SignalOutcome.normalized_signal_id.in_(ns_ids))
+        .order_by(SignalOutcome.id.asc())
+        .all()
+    )
+    cols = (
+        "outcome_status", "entry_reached", "entry_fill_price", "tp_hits", "sl_hit", "expiry_hit",
+        "mfe", "mae", "time_to_entry_sec", "time_to_outcome_sec", "market_data_version", "error_detail",
+    )
+    return [tuple(getattr(r, c) for c in cols) for r in rows]
+
+
+def test_process_pending_batch_matches_per_row(monkeypatch, outcome_rows):
+    from app.core.database import SessionLocal
+    from app.models.signal_outcome import SignalOutcome
+    from app.services import outcome_recalc_service as svc
+
+    candles = _random_candles(random.Random(7), 200)
+    calls = []
+
+    def fake_list(_db, *, asset, timeframe, from_ts, to_ts):
+        calls.append((from_ts, to_ts))
+        return [c for c in candles if from_ts <= c.ts_open <= to_ts], f"db.market_candles.{timeframe}"
+
+    def fake_load(_db, *, asset, signal_time, lookahead_days, timeframe):
+        return fake_list(_db, asset=asset, timeframe=timeframe, from_ts=signal_time,
+                         to_ts=signal_time + timedelta(days=lookahead_days))
+
+    monkeypatch.setattr(svc, "list_candles_from_db", fake_list)
+    monkeypatch.setattr(svc, "load_candles_for_window", fake_load)
+
+    db = SessionLocal()
+    stats = svc.process_pending_signal_outcomes_batch(db, limit=100, lookahead_days=2, timeframe="1h", batch_size=4)
+    assert stats["failed"] == 0
+    assert stats["ok"] == stats["processed"] == 6
+    batch = _snapshot(db, outcome_rows)
+    assert all(r[0] != "PENDING" for r in batch)
+    # одна выборка свечей на группу символа в каждой пачке
+    assert len(calls) == 2
+
+    db.query(SignalOutcome).filter(SignalOutcome.normalized_signal_id.in_(outcome_rows)).update(
+        {"outcome_status": "PENDING"}, synchronize_session=False
+    )
+    db.commit()
+    stats = svc.process_pending_signal_outcomes(db, limit=100, lookahead_days=2, timeframe="1h")
+    assert stats["ok"] == 6
+    db.expire_all()
+    assert _snapshot(db, outcome_rows) == batch
+    db.close()
@@ -0,0 +1,49 @@
+"""Пул процессов парсинга: паритет с inline parse_signal_from_text, порядок, async-путь."""
+import json
+from pathlib import Path
+
+import pytest
+
+from app.services import parse_executor
+from app.services.extraction_service import classify_and_fields, classify_and_fields_many
+from app.services.telegram_scraper import parse_signal_from_text
+
+_GOLDEN = Path(__file__).parent / "data" / "signal_parser_golden.json"
+
+
+@pytest.fixture(scope="module")
+def texts():
+    cases = json.loads(_GOLDEN.read_text(encoding="utf-8"))
+    return [c["text"] for c in cases[:300]] + ["", None, "   "]
+
+
+@pytest.fixture
+def pool_env(monkeypatch):
+    monkeypatch.setenv("PARSE_EXECUTOR_MIN_BATCH", "1")
+    yield
+    parse_executor.shutdown_parse_executor()
+
+
+def test_inline_below_min_batch_does_not_start_pool(monkeypatch):
+    monkeypatch.setenv("PARSE_EXECUTOR_MIN_BATCH", "1000")
+    out = parse_executor.parse_texts(["#BTC LONG entry $65000 TP $72000 SL $63000"], workers=2)
+    assert out[0] is not None and out[0].entry_price == 65000.0
+    assert parse_executor._pool is None
+
+
+def test_pool_matches_inline(texts, pool_env):
+    expected = [parse_signal_from_text(t) if t else None for t in texts]
+    got = parse_executor.parse_texts(texts, workers=2, chunksize=37)
+    assert parse_executor._pool is not None
+    assert got == expected
+
+
+async def test_async_pool_matches_inline(texts, pool_env):
+    expected = [parse_signal_from_text(t) if t else None for t in texts]
+    got = await parse_executor.parse_texts_async(texts, workers=2, chunksize=50)
+    assert got == expected
+
+
+def test_classify_many_matches_single(texts, pool_env, monkeypatch):
+    monkeypatch.setenv("PARSE_EXECUTOR_WORKERS", "2")
+    assert classify_and_fields_many(texts) == [classify_and_fields(t) for t in texts]
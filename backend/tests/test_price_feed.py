@@ -0,0 +1,144 @@
+"""Поток цен: проигрывание записи тиков в таблицу последних цен, REST-фолбэк, чтение через get_prices."""
+import asyncio
+import json
+
+import pytest
+
+from app.services import price_feed, price_snapshot
+from app.services.price_feed import FileFeed, LastPriceTable, PriceFeedIngestor
+
+TICKS = [
+    {"ts": 1.0, "symbol": "BTCUSDT", "price": 60000.0},
+    {"ts": 1.2, "symbol": "ETHUSDT", "price": 3000.0},
+    {"ts": 1.5, "symbol": "BTCUSDT", "price": 60100.5},
+    {"ts": 2.0, "symbol": "SOL/USDT", "price": 150.0},
+]
+
+
+@pytest.fixture
+def replay_file(tmp_path):
+    path = tmp_path / "ticks.ndjson"
+    path.write_text("\n".join(json.dumps(t) for t in TICKS) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    price_feed.price_table.clear()
+    price_snapshot.clear_snapshot()
+    yield
+    price_feed.price_table.clear()
+    price_snapshot.clear_snapshot()
+
+
+async def test_file_feed_replays_into_table(replay_file):
+    table = LastPriceTable()
+    ingestor = PriceFeedIngestor([FileFeed(replay_file)], table=table, publish=False)
+    await ingestor.run()
+
+    assert ingestor.ticks == len(TICKS)
+    assert table.price("BTC", max_age=60) == 60100.5
+    assert table.price("ETH", max_age=60) == 3000.0
+    assert table.price("SOL", max_age=60) == 150.0
+    assert table.live(60)
+
+
+def test_older_tick_does_not_overwrite():
+    table = LastPriceTable()
+    table.update({"BTC": (100.0, 2000.0)})
+    table.update({"BTC": (99.0, 1999.0)})
+    assert table.get("BTC") == (100.0, 2000.0)
+    assert table.price("BTC", max_age=5) is None  # ts=2000 — давно
+
+
+async def test_get_prices_served_from_feed_without_http(replay_file, monkeypatch):
+    async def no_http(pairs):
+        raise AssertionError(f"unexpected HTTP fetch for {pairs}")
+
+    monkeypatch.setattr(price_snapshot, "_fetch_missing", no_http)
+    await PriceFeedIngestor([FileFeed(replay_file)], publish=False).run()
+
+    prices = await price_snapshot.get_prices(["BTC/USDT", "ETHUSDT"])
+    assert prices == {"BTC/USDT": 60100.5, "ETHUSDT": 3000.0}
+
+
+async def test_ingestor_publishes_coalesced_batches_off_loop(replay_file, monkeypatch):
+    import threading
+
+    published = []
+
+    def fake_publish(batch):
+        published.append((threading.current_thread(), dict(batch)))
+        return True
+
+    monkeypatch.setattr(price_feed, "publish_batch", fake_publish)
+    await PriceFeedIngestor([FileFeed(replay_file)], table=LastPriceTable(), publish_interval=60).run()
+
+    # одна пачка на весь прогон, по паре — последний тик, и не из потока event loop
+    assert len(published) == 1
+    thread, batch = published[0]
+    assert thread is not threading.current_thread()
+    assert {pair: price for pair, (price, _) in batch.items()} == {"BTC": 60100.5, "ETH": 3000.0, "SOL": 150.0}
+
+
+async def test_last_prices_async_reads_redis_hash_in_thread(monkeypatch):
+    import threading
+    import time
+
+    readers = []
+
+    def fake_hash(pairs):
+        readers.append(threading.current_thread())
+        return {p: (42.0, time.time()) for p in pairs}
+
+    monkeypatch.setattr(price_feed, "feed_config", lambda: (True, 15.0))
+    monkeypatch.setattr(price_feed, "start_redis_subscriber", lambda: None)
+    monkeypatch.setattr(price_feed, "_from_redis_hash", fake_hash)
+
+    assert await price_feed.last_prices_async(["BTCUSDT", "BTC/USDT"]) == {"BTCUSDT": 42.0, "BTC/USDT": 42.0}
+    assert readers and readers[0] is not threading.current_thread()
+    assert price_feed.price_table.price("BTC", max_age=15) == 42.0
+
+
+async def test_stream_failure_falls_back_to_rest(monkeypatch):
+    class BrokenStream:
+        name = "binance"
+
+        async def batches(self):
+            raise ConnectionError("ws down")
+            yield  # pragma: no cover
+
+    async def fake_poll(client):
+        return {"BTC": (61000.0, price_feed.time.time())}
+
+    monkeypatch.setitem(price_feed.REST_POLLERS, "binance", fake_poll)
+    table = LastPriceTable()
+    ingestor = PriceFeedIngestor([BrokenStream()], table=table, publish=False, rest_poll_sec=0.01)
+    task = asyncio.create_task(ingestor.run())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert ingestor.rest_polls >= 1
+    assert table.price("BTC", max_age=60) == 61000.0
+
+
+async def test_bybit_market_data_combines_feed_prices_with_tickers(monkeypatch):
+    from decimal import Decimal
+    from pathlib import Path
+    from unittest.mock import AsyncMock
+
+    monkeypatch.syspath_prepend(str(Path(__file__).resolve().parents[2]))
+    pytest.importorskip("aiohttp")
+    from workers.exchange import bybit_client
+
+    client = bybit_client.BybitClient()
+    monkeypatch.setattr(client, "get_current_prices", AsyncMock(return_value={"BTCUSDT": Decimal("100")}))
+    ticker = {"symbol": "BTCUSDT", "price24hPcnt": "0.01", "highPrice24h": "105", "lowPrice24h": "95",
+              "volume24h": "1", "turnover24h": "100", "bid1Price": "99.9", "ask1Price": "100.1"}
+    monkeypatch.setattr(client, "_make_request", AsyncMock(return_value={"result": {"list": [ticker]}}))
+
+    data = await client.get_market_data(["BTCUSDT"])
+    assert data["BTCUSDT"]["current_price"] == Decimal("100")
+    assert data["BTCUSDT"]["high_24h"] == Decimal("105")
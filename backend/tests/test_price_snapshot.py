@@ -0,0 +1,63 @@
+"""Снимок цен: пачечный запрос CoinGecko + Binance, повторные вызовы из снимка."""
+import httpx
+import pytest
+
+from app.services import price_snapshot
+from app.services.price_validator import COINGECKO_IDS, get_current_price, validate_signal_price
+
+
+@pytest.fixture
+def http(monkeypatch):
+    """Подменяет HTTP: CoinGecko отдаёт 100.0 на каждый id, Binance — XYZUSDT=2.5."""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url)
+        if request.url.host == "api.coingecko.com":
+            ids = request.url.params["ids"].split(",")
+            return httpx.Response(200, json={i: {"usd": 100.0} for i in ids})
+        return httpx.Response(200, json=[{"symbol": "XYZUSDT", "price": "2.5"}, {"symbol": "BTCUSDT", "price": "1"}])
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        price_snapshot.httpx,
+        "AsyncClient",
+        lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw),
+    )
+    monkeypatch.setattr("app.core.redis_cache.cache_get", lambda key: None)
+    monkeypatch.setattr("app.core.redis_cache.cache_set", lambda *a, **kw: False)
+    price_snapshot.clear_snapshot()
+    yield calls
+    price_snapshot.clear_snapshot()
+
+
+def test_normalize_pair():
+    assert price_snapshot.normalize_pair("btc/usdt") == "BTC"
+    assert price_snapshot.normalize_pair("ETH/USD") == "ETH"
+    assert price_snapshot.normalize_pair("SOLUSDT") == "SOL"
+    assert price_snapshot.normalize_pair("USDT") == "USDT"
+
+
+async def test_many_signals_few_http_calls(http):
+    known = [f"{a}/USDT" for a in COINGECKO_IDS]
+    symbols = known * 50 + ["XYZ/USDT", "NOPE/USDT"]
+    prices = await price_snapshot.get_prices(symbols)
+    # один multi-id CoinGecko + один Binance для того, чего нет в COINGECKO_IDS
+    assert len(http) == 2
+    assert all(prices[s] == 100.0 for s in known)
+    assert prices["XYZ/USDT"] == 2.5
+    assert prices["NOPE/USDT"] is None
+
+    again = await price_snapshot.get_prices(symbols)
+    assert again == prices
+    assert len(http) == 2  # всё из снимка, неизвестный актив — negative cache
+
+
+async def test_price_validator_reads_snapshot(http):
+    await price_snapshot.get_prices(["BTC/USDT", "ETH/USDT"])
+    assert await get_current_price("BTC/USDT") == 100.0
+    res = await validate_signal_price("ETH/USDT", 100.0)
+    assert res["valid"] and res["current_price"] == 100.0
+    assert len(http) == 1
+    res = await validate_signal_price("ETH/USDT", 10.0, current_price=100.0)
+    assert not res["valid"]
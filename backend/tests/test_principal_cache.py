@@ -0,0 +1,100 @@
+"""Кэш principal: зависимость авторизации без запросов в БД на попадании, сброс по commit User/Subscription."""
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+
+from app.core.auth import get_current_principal
+from app.core.database import SessionLocal, engine
+from app.core.security import create_access_token, get_password_hash
+from app.models.base import Base
+from app.models.user import SubscriptionPlan, User, UserRole
+from app.services.principal_cache import Principal, principal_cache
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db):
+    uid = uuid.uuid4().hex[:8]
+    u = User(
+        email=f"pc_{uid}@example.com",
+        username=f"pc_{uid}",
+        hashed_password=get_password_hash("StrongPass123!"),
+        role=UserRole.FREE_USER,
+        is_active=True,
+    )
+    u.update_subscription_plan(SubscriptionPlan.FREE)
+    db.add(u)
+    db.commit()
+    return u
+
+
+def _credentials(user_id: int) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": str(user_id)}))
+
+
+@pytest.fixture
+def queries():
+    statements = []
+
+    def _count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", _count)
+
+
+def test_cached_principal_needs_no_queries(user, queries):
+    creds = _credentials(user.id)
+    first = get_current_principal(creds)
+    assert isinstance(first, Principal)
+    assert first.id == user.id and first.subscription_plan == SubscriptionPlan.FREE
+    assert queries
+
+    queries.clear()
+    again = get_current_principal(creds)
+    assert again is first
+    assert queries == []
+
+
+def test_plan_change_and_deactivation_invalidate(db, user):
+    creds = _credentials(user.id)
+    assert not get_current_principal(creds).has_feature("ml_predictions")
+
+    user.update_subscription_plan(SubscriptionPlan.PRO)
+    db.commit()
+    principal = get_current_principal(creds)
+    assert principal.subscription_plan == SubscriptionPlan.PRO
+    assert principal.has_feature("ml_predictions")
+
+    user.is_active = False
+    db.commit()
+    with pytest.raises(HTTPException) as exc:
+        get_current_principal(creds)
+    assert exc.value.status_code == 401
+
+
+def test_counter_updates_do_not_drop_snapshot(db, user):
+    principal = get_current_principal(_credentials(user.id))
+    user.api_calls_used_today = 5
+    db.commit()
+    assert principal_cache.peek(user.id) is principal
+
+
+def test_subscription_limit_middleware_off_by_default():
+    from app.core.config import get_settings
+    from app.core.middleware import SubscriptionLimitMiddleware
+    from app.main import app
+
+    assert get_settings().SUBSCRIPTION_LIMITS_ENFORCED is False
+    assert SubscriptionLimitMiddleware not in [m.cls for m in app.user_middleware]
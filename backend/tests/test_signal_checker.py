@@ -1,7 +1,7 @@
 """Тесты для signal_checker: check_pending_signals с моком цены."""
 import pytest
 from decimal import Decimal
-from unittest.mock import AsyncMock, patch
+from unittest.mock import patch
 
 from app.core.database import SessionLocal
 from app.models.base import Base
@@ -10,6 +10,13 @@ from app.models.signal import Signal, SignalDirection, SignalStatus
 from app.services.signal_checker import check_pending_signals
 
 
+def _prices(value):
+    """Мок price_snapshot.get_prices: одна цена для всех запрошенных активов."""
+    async def fake(symbols):
+        return {s: value for s in symbols}
+    return fake
+
+
 @pytest.fixture
 def db_signal_checker():
     from app.core.database import engine
@@ -75,7 +82,7 @@ def pending_short_signal(db_signal_checker, channel):
 @pytest.mark.asyncio
 async def test_check_pending_signals_tp_hit_long(db_signal_checker, pending_long_signal, channel):
     """LONG: текущая цена >= TP -> TP1_HIT."""
-    with patch("app.services.signal_checker.get_current_price", new_callable=AsyncMock, return_value=52000.0):
+    with patch("app.services.signal_checker.get_prices", new=_prices(52000.0)):
         out = await check_pending_signals(db_signal_checker)
     assert out["checked"] >= 1
     assert out["updated"] >= 1
@@ -87,7 +94,7 @@ async def test_check_pending_signals_tp_hit_long(db_signal_checker, pending_long
 @pytest.mark.asyncio
 async def test_check_pending_signals_sl_hit_long(db_signal_checker, pending_long_signal):
     """LONG: текущая цена <= SL -> SL_HIT."""
-    with patch("app.services.signal_checker.get_current_price", new_callable=AsyncMock, return_value=47000.0):
+    with patch("app.services.signal_checker.get_prices", new=_prices(47000.0)):
         await check_pending_signals(db_signal_checker)
     db_signal_checker.refresh(pending_long_signal)
     assert pending_long_signal.status == SignalStatus.SL_HIT
@@ -97,7 +104,7 @@ async def test_check_pending_signals_sl_hit_long(db_signal_checker, pending_long
 @pytest.mark.asyncio
 async def test_check_pending_signals_tp_hit_short(db_signal_checker, pending_short_signal):
     """SHORT: текущая цена <= TP -> TP1_HIT."""
-    with patch("app.services.signal_checker.get_current_price", new_callable=AsyncMock, return_value=2750.0):
+    with patch("app.services.signal_checker.get_prices", new=_prices(2750.0)):
         await check_pending_signals(db_signal_checker)
     db_signal_checker.refresh(pending_short_signal)
     assert pending_short_signal.status == SignalStatus.TP1_HIT
@@ -106,8 +113,23 @@ async def test_check_pending_signals_tp_hit_short(db_signal_checker, pending_sho
 @pytest.mark.asyncio
 async def test_check_pending_signals_no_price(db_signal_checker, pending_long_signal):
     """Нет цены -> сигнал остаётся PENDING."""
-    with patch("app.services.signal_checker.get_current_price", new_callable=AsyncMock, return_value=None):
+    with patch("app.services.signal_checker.get_prices", new=_prices(None)):
         out = await check_pending_signals(db_signal_checker)
     assert out["updated"] == 0
     db_signal_checker.refresh(pending_long_signal)
     assert pending_long_signal.status == SignalStatus.PENDING
+
+
+@pytest.mark.asyncio
+async def test_check_pending_signals_single_price_lookup(db_signal_checker, pending_long_signal, pending_short_signal):
+    """Цены запрашиваются одним вызовом на уникальные активы, а не по сигналу."""
+    calls = []
+
+    async def fake(symbols):
+        calls.append(set(symbols))
+        return {s: None for s in symbols}
+
+    with patch("app.services.signal_checker.get_prices", new=fake):
+        await check_pending_signals(db_signal_checker)
+    assert len(calls) == 1
+    assert {"BTC/USDT", "ETH/USDT"} <= calls[0]
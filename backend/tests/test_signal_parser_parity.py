@@ -0,0 +1,72 @@
+"""SignalTextParser: результат совпадает с эталоном исходного парсера (golden) на корпусе сообщений."""
+import dataclasses
+import json
+import random
+import re
+from pathlib import Path
+
+import pytest
+
+from app.services.telegram_scraper import (
+    CRYPTO_PAIRS,
+    _MillionContext,
+    _detect_asset,
+    _price_in_million_context,
+    parse_signal_from_text,
+)
+
+_GOLDEN = Path(__file__).parent / "data" / "signal_parser_golden.json"
+
+
+def _dump(sig):
+    if sig is None:
+        return None
+    d = dataclasses.asdict(sig)
+    d.pop("timestamp")
+    d.pop("telegram_message_id")
+    return d
+
+
+def test_parser_matches_golden_corpus():
+    cases = json.loads(_GOLDEN.read_text(encoding="utf-8"))
+    assert len(cases) > 500
+    mismatches = [c["text"] for c in cases if _dump(parse_signal_from_text(c["text"])) != c["parsed"]]
+    assert mismatches == []
+
+
+def _reference_detect_asset(text):
+    text_upper = text.upper()
+    for pair in sorted(CRYPTO_PAIRS.keys(), key=len, reverse=True):
+        for pat in (
+            rf"#{pair}\b",
+            rf"\${pair}\b",
+            rf"\b{pair}\s*/\s*USDT\b",
+            rf"\b{pair}USDT\b",
+            rf"\b{pair}\s*/\s*USD\b",
+            rf"\b{pair}\s*/\s*BTC\b",
+        ):
+            if re.search(pat, text_upper):
+                return f"{pair}/USDT"
+    for pair in sorted(CRYPTO_PAIRS.keys(), key=len, reverse=True):
+        if re.search(rf"\b{pair}\b", text_upper) and pair not in ("NOT", "OP", "AT"):
+            return f"{pair}/USDT"
+    return None
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_detect_asset_matches_per_pattern_scan(seed):
+    rng = random.Random(seed)
+    pieces = list(CRYPTO_PAIRS) + ["#", "$", "/", " / ", "USDT", "USD", "BTC", "usdt", " ", "x", "not", "op", "\n", "-"]
+    for _ in range(1500):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 8)))
+        assert _detect_asset(text) == _reference_detect_asset(text), text
+
+
+def test_million_context_matches_regex_check():
+    rng = random.Random(11)
+    words = ["$", "168.4", "168", "1e-05", "1E-05", " ", "  ", "\n", "million", "mill", "millions", "bn", "Billion", "x", "2"]
+    for _ in range(3000):
+        text = "".join(rng.choice(words) for _ in range(rng.randint(1, 7)))
+        ctx = _MillionContext(text)
+        for price in (168.4, 168.0, 1e-05, 2.0, 12.0):
+            assert ctx.contains(price) == _price_in_million_context(text, price), (text, price)
@@ -0,0 +1,80 @@
+"""SignalService.get_signal_stats: агрегаты в SQL совпадают с расчётом по строкам."""
+import math
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.core.database import SessionLocal, engine
+from app.models.base import Base
+from app.models.channel import Channel
+from app.models.signal import Signal, SignalDirection, SignalStatus
+from app.schemas.signal import SignalFilterParams
+from app.services.signal_service import SignalService
+
+ROIS = [5.0, -2.0, 8.0, None, -6.0, 3.0]
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def channel(db):
+    uid = uuid.uuid4().hex[:8]
+    ch = Channel(name=f"ST_{uid}", username=f"st_{uid}", url=f"https://t.me/st_{uid}")
+    db.add(ch)
+    db.commit()
+    base = datetime(2024, 3, 1, 0, 0, 0)
+    for i, roi in enumerate(ROIS):
+        created = base + timedelta(hours=i)
+        db.add(Signal(
+            channel_id=ch.id,
+            asset="ETH/USDT",
+            symbol="ETHUSDT",
+            direction=SignalDirection.LONG,
+            entry_price=Decimal("100"),
+            status=SignalStatus.EXPIRED if roi is None else SignalStatus.TP1_HIT,
+            message_timestamp=created,
+            created_at=created,
+            final_exit_timestamp=None if roi is None else created + timedelta(hours=2),
+            profit_loss_percentage=None if roi is None else Decimal(str(roi)),
+            is_successful=None if roi is None else roi > 0,
+            reached_tp1=roi is not None and roi > 0,
+            hit_stop_loss=roi is not None and roi < 0,
+        ))
+    db.commit()
+    return ch
+
+
+def test_stats_match_row_computation(db, channel):
+    stats = SignalService(db).get_signal_stats(SignalFilterParams(channel_id=channel.id))
+    rois = [r for r in ROIS if r is not None]
+    mean = sum(rois) / len(rois)
+    stddev = math.sqrt(sum((x - mean) ** 2 for x in rois) / (len(rois) - 1))
+
+    assert stats.total_signals == 6
+    assert (stats.successful_signals, stats.failed_signals, stats.pending_signals) == (3, 2, 1)
+    assert stats.accuracy_percentage == 60.0
+    assert stats.average_roi == round(mean, 2)
+    assert stats.total_profit_loss == 8.0
+    assert (stats.best_signal_roi, stats.worst_signal_roi) == (8.0, -6.0)
+    assert stats.average_duration_hours == pytest.approx(2.0, abs=0.01)
+    assert (stats.tp1_hits, stats.sl_hits, stats.expired_signals) == (3, 2, 1)
+    assert stats.max_drawdown == 14.0  # пик 8 → -6
+    assert stats.sharpe_ratio == round(mean / stddev, 2)
+
+
+def test_date_filter_and_empty(db, channel):
+    svc = SignalService(db)
+    stats = svc.get_signal_stats(SignalFilterParams(
+        channel_id=channel.id, date_from=datetime(2024, 3, 1, 3, 30)
+    ))
+    assert stats.total_signals == 2
+    assert stats.max_drawdown == 0.0  # -6 → 3: пика выше нет
+    assert svc.get_signal_stats(SignalFilterParams(channel_id=10 ** 9)).total_signals == 0
@@ -0,0 +1,190 @@
+"""TriggerEngine: срабатывают ровно пересечённые уровни; SignalTriggerWatcher закрывает сигналы по тикам."""
+import random
+import time
+import uuid
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.database import SessionLocal, async_session_scope, engine
+from app.models.base import Base
+from app.models.channel import Channel
+from app.models.signal import Signal, SignalDirection, SignalStatus
+from app.services.price_feed import price_table
+from app.services.signal_checker import SignalTriggerWatcher, check_pending_signals_async
+from app.services.trigger_engine import TriggerEngine, exit_levels
+
+
+def _brute_force(levels, alive, price):
+    hit = set()
+    for key in alive:
+        direction, tp, sl = levels[key]
+        if direction == "LONG" and (price >= tp or price <= sl):
+            hit.add(key)
+        if direction == "SHORT" and (price <= tp or price >= sl):
+            hit.add(key)
+    return hit
+
+
+def test_ticks_fire_same_signals_as_full_scan():
+    rng = random.Random(3)
+    eng = TriggerEngine()
+    levels = {}
+    for key in range(1500):
+        direction = rng.choice(["LONG", "SHORT"])
+        up, down = 100 * (1 + rng.uniform(0.01, 0.2)), 100 * (1 - rng.uniform(0.01, 0.2))
+        levels[key] = (direction, up, down) if direction == "LONG" else (direction, down, up)
+        eng.watch(key, "BTC", exit_levels(direction, levels[key][1], levels[key][2]))
+
+    alive, price = set(levels), 100.0
+    for step in range(400):
+        price *= 1 + rng.uniform(-0.012, 0.012)
+        fired = {f.key for f in eng.on_tick("BTC", price)}
+        assert fired == _brute_force(levels, alive, price)
+        alive -= fired
+        if step % 40 == 0:  # сигналы, закрытые мимо движка
+            for key in list(alive)[:25]:
+                eng.unwatch(key)
+                alive.discard(key)
+    assert len(eng) == len(alive)
+
+
+def test_gap_fires_every_crossed_level_and_watch_checks_last_price():
+    eng = TriggerEngine()
+    eng.watch("a", "ETH", exit_levels("LONG", 110, 90))
+    eng.watch("b", "ETH", exit_levels("LONG", 120, 95))
+    eng.watch("c", "ETH", exit_levels("SHORT", 80, 125))
+    assert eng.on_tick("ETH", 100) == []
+
+    fired = eng.on_tick("ETH", 130)  # гэп через 110, 120 и SL шорта 125
+    assert {(f.key, f.kind, f.level) for f in fired} == {("a", "tp", 110.0), ("b", "tp", 120.0), ("c", "sl", 125.0)}
+    assert len(eng) == 0
+
+    late = eng.watch("d", "ETH", exit_levels("LONG", 128, 100))
+    assert [(f.key, f.kind) for f in late] == [("d", "tp")]
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    price_table.clear()
+
+
+async def test_watcher_closes_signal_on_tick(db):
+    uid = uuid.uuid4().hex[:8]
+    ch = Channel(name=f"TR_{uid}", username=f"tr_{uid}", url=f"https://t.me/tr_{uid}")
+    db.add(ch)
+    db.commit()
+    asset = f"T{uid.upper()}/USDT"
+    sig = Signal(
+        channel_id=ch.id,
+        asset=asset,
+        symbol=asset.replace("/", ""),
+        direction=SignalDirection.SHORT,
+        entry_price=Decimal("100"),
+        tp1_price=Decimal("90"),
+        stop_loss=Decimal("105"),
+        status=SignalStatus.PENDING,
+    )
+    db.add(sig)
+    db.commit()
+
+    watcher = SignalTriggerWatcher()
+    async with async_session_scope() as session:
+        assert await watcher.sync(session) >= 1
+    pair = f"T{uid.upper()}"
+
+    price_table.update({pair: (95.0, time.time())})
+    assert watcher.poll_ticks(max_age=60) == 0
+
+    price_table.update({pair: (89.5, time.time())})
+    assert watcher.poll_ticks(max_age=60) == 1
+    async with async_session_scope() as session:
+        results = await watcher.flush(session)
+
+    assert [r["id"] for r in results] == [sig.id]
+    db.refresh(sig)
+    assert sig.status == SignalStatus.TP1_HIT
+    assert float(sig.profit_loss_percentage) == pytest.approx(10.0)
+
+
+async def test_flush_keeps_hits_when_commit_fails(db):
+    watcher = SignalTriggerWatcher()
+    watcher.engine.watch(1, "ETH", exit_levels("LONG", 110, 90))
+    price_table.update({"ETH": (111.0, time.time())})
+    assert watcher.poll_ticks(max_age=60) == 1
+
+    session = AsyncMock()
+    session.scalars.side_effect = RuntimeError("db down")
+    with pytest.raises(RuntimeError):
+        await watcher.flush(session)
+    assert watcher.pending_hits == 1
+
+
+async def test_batch_check_covers_assets_missing_from_feed(db):
+    uid = uuid.uuid4().hex[:8]
+    ch = Channel(name=f"TR_{uid}", username=f"tr_{uid}", url=f"https://t.me/tr_{uid}")
+    db.add(ch)
+    db.commit()
+    fed, unfed = f"F{uid.upper()}/USDT", f"U{uid.upper()}/USDT"
+    signals = [
+        Signal(channel_id=ch.id, asset=a, symbol=a.replace("/", ""), direction=SignalDirection.LONG,
+               entry_price=Decimal("100"), tp1_price=Decimal("110"), stop_loss=Decimal("90"),
+               status=SignalStatus.PENDING)
+        for a in (fed, unfed)
+    ]
+    db.add_all(signals)
+    db.commit()
+
+    watcher = SignalTriggerWatcher()
+    async with async_session_scope() as session:
+        await watcher.sync(session)
+    price_table.update({f"F{uid.upper()}": (100.0, time.time())})
+    assert watcher.covers(fed) and not watcher.covers(unfed)
+
+    get_prices = AsyncMock(side_effect=lambda assets: {a: 111.0 for a in assets if a in (fed, unfed)})
+    with patch("app.services.signal_checker.get_prices", get_prices):
+        async with async_session_scope() as session:
+            result = await check_pending_signals_async(session, skip_asset=watcher.covers)
+
+    assert unfed in get_prices.await_args.args[0] and fed not in get_prices.await_args.args[0]
+    assert [r["asset"] for r in result["results"]] == [unfed]
+    for s in signals:
+        db.refresh(s)
+    assert (signals[0].status, signals[1].status) == (SignalStatus.PENDING, SignalStatus.TP1_HIT)
+
+
+async def test_watcher_closes_legacy_sell_signal_with_short_pnl(db):
+    uid = uuid.uuid4().hex[:8]
+    ch = Channel(name=f"TR_{uid}", username=f"tr_{uid}", url=f"https://t.me/tr_{uid}")
+    db.add(ch)
+    db.commit()
+    asset = f"S{uid.upper()}/USDT"
+    sig = Signal(
+        channel_id=ch.id,
+        asset=asset,
+        symbol=asset.replace("/", ""),
+        direction=SignalDirection.SELL,
+        entry_price=Decimal("100"),
+        tp1_price=Decimal("90"),
+        stop_loss=Decimal("105"),
+        status=SignalStatus.PENDING,
+    )
+    db.add(sig)
+    db.commit()
+
+    watcher = SignalTriggerWatcher()
+    async with async_session_scope() as session:
+        await watcher.sync(session)
+    price_table.update({f"S{uid.upper()}": (89.0, time.time())})
+    assert watcher.poll_ticks(max_age=60) == 1
+    async with async_session_scope() as session:
+        await watcher.flush(session)
+
+    db.refresh(sig)
+    assert sig.status == SignalStatus.TP1_HIT
+    assert float(sig.profit_loss_percentage) == pytest.approx(10.0)
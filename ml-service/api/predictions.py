@@ -2,25 +2,33 @@
 Fixed predictions API with REAL data integration
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Header
 from pydantic import BaseModel, Field
 from typing import Dict, List, Any, Optional
+import asyncio
 import logging
 import time
-import requests
 import random
 from datetime import datetime
 
 # Используем обученную модель с fallback на SimplePredictor
 from models.simple_predictor import SimplePredictor
-from models.trained_predictor import predict_signal_success, _load_model
+from models.trained_predictor import (
+    FEATURE_NAMES,
+    build_feature_matrix,
+    feature_importances,
+    predict_batch,
+    predict_signal_success,
+    _load_model,
+)
+from models.market_snapshot import get_market_data_many
+from models.model_registry import registry
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/predictions", tags=["predictions"])
 
 predictor = SimplePredictor()
-_load_model()  # Pre-load trained model on startup
 
 # Pydantic модели
 class SignalPredictionRequest(BaseModel):
@@ -32,6 +40,10 @@ class SignalPredictionRequest(BaseModel):
     channel_id: int = Field(..., description="Channel ID")
     channel_accuracy: float = Field(0.5, description="Channel accuracy (0-1)")
     confidence: float = Field(0.5, description="Signal confidence (0-1)")
+    signal_id: Optional[int] = Field(None, description="Backend signal ID")
+    features: Optional[Dict[str, Optional[float]]] = Field(
+        None, description="Point-in-time features from backend signal_features (same as training)"
+    )
 
 class SignalPredictionResponse(BaseModel):
     success_probability: float
@@ -73,120 +85,6 @@ class PredictionResponse(BaseModel):
     market_data: Dict[str, Any]
     recommendation: str
 
-def get_real_market_data(asset: str) -> Dict[str, Any]:
-    """Get REAL market data from external APIs"""
-    asset_upper = asset.upper()
-    
-    try:
-        # Try CoinGecko first (free, no API key needed)
-        if asset_upper == "BTC":
-            coingecko_id = "bitcoin"
-        elif asset_upper == "ETH":
-            coingecko_id = "ethereum"
-        elif asset_upper == "BNB":
-            coingecko_id = "binancecoin"
-        elif asset_upper == "SOL":
-            coingecko_id = "solana"
-        elif asset_upper == "ADA":
-            coingecko_id = "cardano"
-        elif asset_upper == "DOT":
-            coingecko_id = "polkadot"
-        elif asset_upper == "LINK":
-            coingecko_id = "chainlink"
-        elif asset_upper == "UNI":
-            coingecko_id = "uniswap"
-        else:
-            coingecko_id = asset_upper.lower()
-        
-        # Get price from CoinGecko
-        coingecko_url = f"https://api.coingecko.com/api/v3/simple/price?ids={coingecko_id}&vs_currencies=usd&include_24hr_change=true&include_24hr_vol=true"
-        response = requests.get(coingecko_url, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if coingecko_id in data:
-                price = data[coingecko_id]['usd']
-                change_24h = data[coingecko_id].get('usd_24h_change', 0)
-                volume_24h = data[coingecko_id].get('usd_24h_vol', 1000000)
-                
-                # Derive indicators from real price data
-                volatility = abs(change_24h) / 100
-                rsi = 50 + change_24h * 2  # RSI approximation from 24h change
-                rsi = max(10, min(90, rsi))
-                macd = change_24h / 100  # MACD signal from momentum
-                bollinger_position = 0.5 + (change_24h / 20)
-                bollinger_position = max(0.05, min(0.95, bollinger_position))
-                volume_ratio = min(volume_24h / 1_000_000_000, 3.0) if volume_24h else 1.0
-                
-                return {
-                    "price": price,
-                    "volume": volume_24h,
-                    "change_24h": change_24h,
-                    "rsi": rsi,
-                    "macd": macd,
-                    "bollinger_position": bollinger_position,
-                    "volume_ratio": volume_ratio,
-                    "volatility": volatility,
-                    "source": "coingecko_real"
-                }
-        
-        # Fallback to Binance public API
-        binance_symbol = f"{asset_upper}USDT"
-        binance_url = f"https://api.binance.com/api/v3/ticker/24hr?symbol={binance_symbol}"
-        response = requests.get(binance_url, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            price = float(data['lastPrice'])
-            change_24h = float(data['priceChangePercent'])
-            volume_24h = float(data['volume']) * price  # Convert to USD
-            
-            return {
-                "price": price,
-                "volume": volume_24h,
-                "change_24h": change_24h,
-                "rsi": 50,
-                "macd": 0,
-                "bollinger_position": 0.5,
-                "volume_ratio": 1.0,
-                "volatility": abs(change_24h) / 100,
-                "source": "binance_real"
-            }
-            
-    except Exception as e:
-        logger.warning(f"Failed to get real market data for {asset}: {e}")
-    
-    # Fallback to mock data if all else fails
-    mock_data = {
-        "BTC": {"price": 50000, "volume": 1000000, "change_24h": 2.5},
-        "ETH": {"price": 3000, "volume": 500000, "change_24h": 1.8},
-        "BNB": {"price": 400, "volume": 200000, "change_24h": 0.5},
-        "SOL": {"price": 100, "volume": 150000, "change_24h": 3.2},
-        "ADA": {"price": 0.5, "volume": 80000, "change_24h": -1.2},
-        "DOT": {"price": 7, "volume": 120000, "change_24h": 0.8},
-        "LINK": {"price": 15, "volume": 90000, "change_24h": 1.5},
-        "UNI": {"price": 8, "volume": 70000, "change_24h": -0.3}
-    }
-    
-    if asset_upper in mock_data:
-        data = mock_data[asset_upper].copy()
-        # Binance fallback — no random noise
-        data["volatility"] = abs(data["change_24h"]) / 100
-        data["source"] = "mock_fallback"
-        return data
-    else:
-        return {
-            "price": 100,
-            "volume": 50000,
-            "change_24h": 0.0,
-            "rsi": 50,
-            "macd": 0,
-            "bollinger_position": 0.5,
-            "volume_ratio": 1.0,
-            "volatility": 0.02,
-            "source": "mock_default"
-        }
-
 @router.post("/predict", response_model=PredictionResponse)
 async def predict_signal(request: PredictionRequest) -> PredictionResponse:
     """
@@ -195,8 +93,8 @@ async def predict_signal(request: PredictionRequest) -> PredictionResponse:
     try:
         start_time = time.time()
         
-        # Получаем РЕАЛЬНЫЕ рыночные данные
-        market_data = get_real_market_data(request.asset)
+        # Получаем РЕАЛЬНЫЕ рыночные данные (async, кэш)
+        market_data = (await get_market_data_many([request.asset]))[request.asset]
         current_price = market_data["price"]
         
         # Анализируем сигнал с реальными данными
@@ -260,7 +158,7 @@ async def get_market_data(asset: str):
     Получение РЕАЛЬНЫХ рыночных данных для актива
     """
     try:
-        market_data = get_real_market_data(asset)
+        market_data = (await get_market_data_many([asset]))[asset]
         return {
             "asset": asset.upper(),
             "data": market_data,
@@ -282,6 +180,100 @@ async def get_supported_assets():
         "update_frequency": "30s"
     }
 
+def _risk_reward(direction: str, entry: float, target: Optional[float], stop: Optional[float]) -> float:
+    if not (target and stop and entry):
+        return 2.0
+    if str(direction).upper() == "LONG":
+        return abs(target - entry) / max(abs(entry - stop), 0.01)
+    return abs(entry - target) / max(abs(stop - entry), 0.01)
+
+
+def _recommendation(probability: float, direction: str) -> str:
+    if probability >= 0.6:
+        return "BUY" if str(direction).upper() == "LONG" else "SELL"
+    if probability >= 0.45:
+        return "HOLD"
+    return "AVOID"
+
+
+async def _score_signals(
+    signals: List[SignalPredictionRequest], model_version: Optional[str] = None
+) -> List[SignalPredictionResponse]:
+    """N сигналов → одна матрица признаков → один вызов модели; рынок — один multi-asset запрос."""
+    # признаки из feature store backend — как при обучении; рынок нужен только остальным
+    market = await get_market_data_many({s.asset for s in signals if not s.features})
+    rows = []
+    for s in signals:
+        if s.features:
+            rows.append({name: s.features.get(name) for name in FEATURE_NAMES})
+            continue
+        m = market.get(s.asset) or {}
+        price = m.get("price") or 0
+        rows.append({
+            "confidence_score": s.confidence,
+            "risk_reward_ratio": _risk_reward(s.direction, s.entry_price, s.target_price, s.stop_loss),
+            "price_deviation": abs(s.entry_price - price) / price if price else None,
+            "direction": s.direction,
+            "rsi": m.get("rsi"),
+            "macd": m.get("macd"),
+            # запрос: 0-1, модель обучена на процентах
+            "channel_accuracy": s.channel_accuracy * 100 if s.channel_accuracy <= 1 else s.channel_accuracy,
+        })
+    results = predict_batch(build_feature_matrix(rows), model_version)
+    importance = feature_importances(model_version)
+    now = datetime.now().isoformat()
+    return [
+        SignalPredictionResponse(
+            success_probability=r["success_probability"],
+            confidence=r["confidence"],
+            recommendation=_recommendation(r["success_probability"], s.direction),
+            risk_score=round(max(0.05, min(0.95, 1.0 - r["success_probability"])), 3),
+            features_importance=importance,
+            model_version=r["model_version"],
+            prediction_timestamp=now,
+        )
+        for s, r in zip(signals, results)
+    ]
+
+
+@router.post("/batch", response_model=BatchPredictionResponse)
+async def predict_signals_batch(
+    request: BatchPredictionRequest,
+    x_ml_model_version: Optional[str] = Header(None),
+) -> BatchPredictionResponse:
+    """
+    Пакетное предсказание по N сигналам: порядок ответов совпадает с порядком запроса
+    """
+    try:
+        start_time = time.time()
+        predictions = await _score_signals(request.signals, x_ml_model_version) if request.signals else []
+        processing_time = (time.time() - start_time) * 1000
+        logger.info(f"✅ Batch prediction: {len(predictions)} signals in {processing_time:.2f}ms")
+        return BatchPredictionResponse(
+            predictions=predictions,
+            total_processed=len(predictions),
+            processing_time_ms=processing_time,
+        )
+    except Exception as e:
+        logger.error(f"❌ Error in batch prediction: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
+
+
+@router.post("/signal", response_model=SignalPredictionResponse)
+async def predict_single_signal(
+    request: SignalPredictionRequest,
+    x_ml_model_version: Optional[str] = Header(None),
+) -> SignalPredictionResponse:
+    """
+    Предсказание по одному сигналу (тот же путь, что и /batch)
+    """
+    try:
+        return (await _score_signals([request], x_ml_model_version))[0]
+    except Exception as e:
+        logger.error(f"❌ Error in signal prediction: {e}")
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+
 @router.post("/batch-predict")
 async def batch_predict(assets: List[str]):
     """
@@ -291,9 +283,11 @@ async def batch_predict(assets: List[str]):
         start_time = time.time()
         predictions = []
         
+        # Один multi-asset запрос вместо блокирующего вызова на каждый актив
+        market = await get_market_data_many(assets)
         for asset in assets:
             try:
-                market_data = get_real_market_data(asset)
+                market_data = market[asset]
                 # Simple prediction logic for batch
                 prediction = {
                     "asset": asset,
@@ -347,10 +341,41 @@ async def health_check():
     }
 
 
+@router.get("/models")
+async def models_status():
+    """Активная и предыдущая (тёплая) версии модели со счётчиками latency/throughput."""
+    return {**registry.stats(), "versions": registry.available_versions()}
+
+
+@router.post("/models/reload")
+async def models_reload():
+    """Загрузить текущую версию из manifest в фоне и переключить на неё."""
+    loaded = await asyncio.to_thread(registry.reload)
+    return {"active": loaded.stats() if loaded else None}
+
+
+@router.post("/models/rollback")
+async def models_rollback():
+    """Мгновенный откат на предыдущую версию (она уже в памяти)."""
+    loaded = registry.rollback()
+    if loaded is None:
+        raise HTTPException(status_code=409, detail="No previous model version loaded")
+    return {"active": loaded.stats()}
+
+
+@router.post("/models/activate/{version}")
+async def models_activate(version: str):
+    """Сделать активной конкретную версию из manifest."""
+    loaded = await asyncio.to_thread(registry.activate, version)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail=f"Model version {version} not available")
+    return {"active": loaded.stats()}
+
+
 @router.post("/ml-predict")
 async def ml_predict(request: PredictionRequest):
     """Predict signal success using trained XGBoost model."""
-    market = get_real_market_data(request.asset)
+    market = (await get_market_data_many([request.asset]))[request.asset]
     price_dev = abs(request.entry_price - market["price"]) / market["price"] if market["price"] else 0.05
     rr = 2.0
     if request.target_price and request.stop_loss and request.entry_price:
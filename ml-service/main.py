@@ -6,6 +6,7 @@ Main FastAPI application with working imports
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
 import logging
 import os
 from datetime import datetime
@@ -151,7 +152,12 @@ async def startup_event():
     
     # Initialize any required services
     try:
-        # Add any initialization logic here
+        # Активная версия модели грузится до первого запроса; дальше — hot swap по manifest
+        from models.model_registry import registry
+
+        loaded = await asyncio.to_thread(registry.preload)
+        logger.info(f"✅ Model: {'v' + loaded.version if loaded else 'rule-based fallback'}")
+        registry.start_watcher()
         logger.info("✅ ML Service startup completed")
     except Exception as e:
         logger.error(f"❌ Startup error: {e}")
@@ -165,7 +171,9 @@ async def shutdown_event():
     logger.info("💾 Saving any pending data...")
     
     try:
-        # Add any cleanup logic here
+        from models.model_registry import registry
+
+        await registry.stop_watcher()
         logger.info("✅ ML Service shutdown completed")
     except Exception as e:
         logger.error(f"❌ Shutdown error: {e}")
@@ -33,69 +33,43 @@ class EnsemblePredictor:
 
     def predict_proba(self, X: np.ndarray) -> np.ndarray:
         """Predict probability using weighted voting ensemble."""
-        # Реальные предсказания на основе логических правил
-        # Вместо mock predictions используем логическую модель
-        
-        # Извлекаем признаки из входных данных
+        # Реальные предсказания на основе логических правил, одним проходом по матрице
+        X = np.asarray(X, dtype=float)
         if X.ndim == 1:
             X = X.reshape(1, -1)
-        
-        # Предполагаем что X содержит: [risk_reward_ratio, volatility, market_conditions, direction_score]
-        predictions = []
-        
-        for sample in X:
-            # Логические правила для каждого типа модели
-            risk_reward = sample[0] if len(sample) > 0 else 0.5
-            volatility = sample[1] if len(sample) > 1 else 0.5
-            market_conditions = sample[2] if len(sample) > 2 else 0.5
-            direction_score = sample[3] if len(sample) > 3 else 0.5
-            
-            # RandomForest логика (на основе risk/reward)
-            rf_pred = min(1.0, max(0.0, risk_reward * 1.2 + volatility * 0.3))
-            
-            # XGBoost логика (на основе market conditions)
-            xgb_pred = min(1.0, max(0.0, market_conditions * 1.1 + direction_score * 0.4))
-            
-            # Neural Network логика (комплексная оценка)
-            nn_pred = min(1.0, max(0.0, 
-                risk_reward * 0.4 + 
-                volatility * 0.2 + 
-                market_conditions * 0.3 + 
-                direction_score * 0.1
-            ))
-            
-            # Взвешенное среднее
-            ensemble_pred = (
-                self.weights[0] * rf_pred + 
-                self.weights[1] * xgb_pred + 
-                self.weights[2] * nn_pred
-            )
-            
-            predictions.append(ensemble_pred)
-        
-        # Возвращаем в формате [prob_class_0, prob_class_1]
-        n_samples = len(predictions)
-        result = np.zeros((n_samples, 2))
-        for i, pred in enumerate(predictions):
-            result[i, 0] = 1 - pred  # probability of class 0
-            result[i, 1] = pred      # probability of class 1
-        
-        return result
-        
-        # Weighted average
-        proba = self.weights[0]*rf_pred + self.weights[1]*xgb_pred + self.weights[2]*nn_pred
-        proba = np.clip(proba, 0, 1)
-        
-        # Return 2D array with [prob_class_0, prob_class_1] for each sample
-        if X.ndim == 1:
-            X = X.reshape(1, -1)
-        
+
+        # Предполагаем что X содержит: [risk_reward_ratio, volatility, market_conditions, direction_score];
+        # недостающие столбцы = 0.5
         n_samples = X.shape[0]
-        result = np.zeros((n_samples, 2))
-        result[:, 0] = 1 - proba  # probability of class 0
-        result[:, 1] = proba      # probability of class 1
-        
-        return result
+        cols = np.full((n_samples, 4), 0.5)
+        k = min(4, X.shape[1])
+        cols[:, :k] = X[:, :k]
+        risk_reward, volatility, market_conditions, direction_score = cols.T
+
+        # RandomForest логика (на основе risk/reward)
+        rf_pred = np.clip(risk_reward * 1.2 + volatility * 0.3, 0.0, 1.0)
+
+        # XGBoost логика (на основе market conditions)
+        xgb_pred = np.clip(market_conditions * 1.1 + direction_score * 0.4, 0.0, 1.0)
+
+        # Neural Network логика (комплексная оценка)
+        nn_pred = np.clip(
+            risk_reward * 0.4 +
+            volatility * 0.2 +
+            market_conditions * 0.3 +
+            direction_score * 0.1,
+            0.0, 1.0,
+        )
+
+        # Взвешенное среднее
+        proba = (
+            self.weights[0] * rf_pred +
+            self.weights[1] * xgb_pred +
+            self.weights[2] * nn_pred
+        )
+
+        # Возвращаем в формате [prob_class_0, prob_class_1]
+        return np.column_stack([1 - proba, proba])
 
     def save(self, path: str):
         """Save all models to disk (заглушка)."""
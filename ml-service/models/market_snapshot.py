@@ -0,0 +1,250 @@
+"""
+Async multi-asset market data with a short in-process cache.
+
+One CoinGecko /simple/price call covers every asset of a request (ids=a,b,c);
+assets CoinGecko does not know are looked up in one Binance /ticker/24hr call.
+Results are cached for MARKET_DATA_TTL seconds, so a batch of N signals costs
+at most two HTTP calls and repeated predictions on the same assets cost none.
+"""
+import asyncio
+import logging
+import os
+import time
+import weakref
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+COINGECKO_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+BINANCE_TICKER_24H_URL = "https://api.binance.com/api/v3/ticker/24hr"
+
+COINGECKO_IDS = {
+    "BTC": "bitcoin",
+    "ETH": "ethereum",
+    "BNB": "binancecoin",
+    "SOL": "solana",
+    "ADA": "cardano",
+    "DOT": "polkadot",
+    "LINK": "chainlink",
+    "UNI": "uniswap",
+}
+
+_MOCK_DATA = {
+    "BTC": {"price": 50000, "volume": 1000000, "change_24h": 2.5},
+    "ETH": {"price": 3000, "volume": 500000, "change_24h": 1.8},
+    "BNB": {"price": 400, "volume": 200000, "change_24h": 0.5},
+    "SOL": {"price": 100, "volume": 150000, "change_24h": 3.2},
+    "ADA": {"price": 0.5, "volume": 80000, "change_24h": -1.2},
+    "DOT": {"price": 7, "volume": 120000, "change_24h": 0.8},
+    "LINK": {"price": 15, "volume": 90000, "change_24h": 1.5},
+    "UNI": {"price": 8, "volume": 70000, "change_24h": -0.3},
+}
+
+_COINGECKO_BATCH = 100
+
+# asset → (monotonic fetched_at, data)
+_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+def _ttl() -> float:
+    try:
+        return float(os.getenv("MARKET_DATA_TTL", "30"))
+    except ValueError:
+        return 30.0
+
+
+def normalize_asset(asset: str) -> str:
+    """'btc', 'BTC/USDT', 'BTCUSDT' → 'BTC'."""
+    a = (asset or "").strip().upper()
+    for quote in ("/USDT", "/USD"):
+        a = a.replace(quote, "")
+    if a.endswith("USDT") and len(a) > 4:
+        a = a[:-4]
+    return a
+
+
+def _coingecko_id(asset: str) -> str:
+    return COINGECKO_IDS.get(asset, asset.lower())
+
+
+def _from_coingecko(row: Dict[str, Any]) -> Dict[str, Any]:
+    price = row["usd"]
+    change_24h = row.get("usd_24h_change") or 0
+    volume_24h = row.get("usd_24h_vol", 1000000)
+
+    # Derive indicators from real price data
+    rsi = max(10, min(90, 50 + change_24h * 2))  # RSI approximation from 24h change
+    bollinger_position = max(0.05, min(0.95, 0.5 + (change_24h / 20)))
+    volume_ratio = min(volume_24h / 1_000_000_000, 3.0) if volume_24h else 1.0
+    return {
+        "price": price,
+        "volume": volume_24h,
+        "change_24h": change_24h,
+        "rsi": rsi,
+        "macd": change_24h / 100,  # MACD signal from momentum
+        "bollinger_position": bollinger_position,
+        "volume_ratio": volume_ratio,
+        "volatility": abs(change_24h) / 100,
+        "source": "coingecko_real",
+    }
+
+
+def _from_binance(row: Dict[str, Any]) -> Dict[str, Any]:
+    price = float(row["lastPrice"])
+    change_24h = float(row["priceChangePercent"])
+    return {
+        "price": price,
+        "volume": float(row["volume"]) * price,  # Convert to USD
+        "change_24h": change_24h,
+        "rsi": 50,
+        "macd": 0,
+        "bollinger_position": 0.5,
+        "volume_ratio": 1.0,
+        "volatility": abs(change_24h) / 100,
+        "source": "binance_real",
+    }
+
+
+def mock_market_data(asset: str) -> Dict[str, Any]:
+    """Fallback when no exchange returned data."""
+    if asset in _MOCK_DATA:
+        data = dict(_MOCK_DATA[asset])
+        data["volatility"] = abs(data["change_24h"]) / 100
+        data["source"] = "mock_fallback"
+        return data
+    return {
+        "price": 100,
+        "volume": 50000,
+        "change_24h": 0.0,
+        "rsi": 50,
+        "macd": 0,
+        "bollinger_position": 0.5,
+        "volume_ratio": 1.0,
+        "volatility": 0.02,
+        "source": "mock_default",
+    }
+
+
+async def _fetch_coingecko(client: httpx.AsyncClient, assets: List[str]) -> Dict[str, Dict[str, Any]]:
+    ids = {_coingecko_id(a): a for a in assets}
+    id_list = list(ids)
+    out: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(id_list), _COINGECKO_BATCH):
+        chunk = id_list[i:i + _COINGECKO_BATCH]
+        try:
+            resp = await client.get(
+                COINGECKO_PRICE_URL,
+                params={
+                    "ids": ",".join(chunk),
+                    "vs_currencies": "usd",
+                    "include_24hr_change": "true",
+                    "include_24hr_vol": "true",
+                },
+            )
+            if resp.status_code != 200:
+                logger.warning(f"CoinGecko batch market data: HTTP {resp.status_code}")
+                continue
+            data = resp.json()
+        except Exception as e:
+            logger.warning(f"CoinGecko batch market data failed: {e}")
+            continue
+        for cg_id in chunk:
+            row = data.get(cg_id)
+            if row and row.get("usd"):
+                out[ids[cg_id]] = _from_coingecko(row)
+    return out
+
+
+async def _fetch_binance(client: httpx.AsyncClient, assets: List[str]) -> Dict[str, Dict[str, Any]]:
+    want = {f"{a}USDT": a for a in assets}
+    try:
+        resp = await client.get(BINANCE_TICKER_24H_URL)
+        if resp.status_code != 200:
+            logger.warning(f"Binance ticker/24hr: HTTP {resp.status_code}")
+            return {}
+        rows = resp.json()
+    except Exception as e:
+        logger.warning(f"Binance ticker/24hr failed: {e}")
+        return {}
+    out: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        asset = want.get(row.get("symbol"))
+        if asset:
+            try:
+                out[asset] = _from_binance(row)
+            except (KeyError, TypeError, ValueError):
+                continue
+    return out
+
+
+def _lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _locks.get(loop)
+    if lock is None:
+        lock = _locks[loop] = asyncio.Lock()
+    return lock
+
+
+def _cached(asset: str, now: float) -> Optional[Dict[str, Any]]:
+    hit = _cache.get(asset)
+    if hit is not None and now - hit[0] < _ttl():
+        return hit[1]
+    return None
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+async def get_market_data_many(assets: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Market data for every asset (keys as passed in), fetched in at most one
+    CoinGecko and one Binance call for whatever is not cached.
+    """
+    by_asset: Dict[str, List[str]] = {}
+    for a in assets:
+        if a:
+            by_asset.setdefault(normalize_asset(a), []).append(a)
+
+    result: Dict[str, Dict[str, Any]] = {}
+    now = time.monotonic()
+    missing = []
+    for asset in by_asset:
+        hit = _cached(asset, now)
+        if hit is not None:
+            result[asset] = hit
+        else:
+            missing.append(asset)
+
+    if missing:
+        async with _lock():
+            # another request may have fetched them while we waited
+            now = time.monotonic()
+            still_missing = []
+            for asset in missing:
+                hit = _cached(asset, now)
+                if hit is not None:
+                    result[asset] = hit
+                else:
+                    still_missing.append(asset)
+            if still_missing:
+                async with httpx.AsyncClient(timeout=10.0) as client:
+                    fetched = await _fetch_coingecko(client, still_missing)
+                    rest = [a for a in still_missing if a not in fetched]
+                    if rest:
+                        fetched.update(await _fetch_binance(client, rest))
+                now = time.monotonic()
+                for asset in still_missing:
+                    data = fetched.get(asset) or mock_market_data(asset)
+                    _cache[asset] = (now, data)
+                    result[asset] = data
+
+    return {a: result[asset] for asset, originals in by_asset.items() for a in originals}
+
+
+async def get_market_data(asset: str) -> Dict[str, Any]:
+    """Market data for one asset (same cache as get_market_data_many)."""
+    return (await get_market_data_many([asset]))[asset]
@@ -0,0 +1,267 @@
+"""
+In-memory model registry with hot swap.
+
+The active model version (model_manifest.json "current", or the legacy
+signal_model.pkl when there is no manifest) is loaded at startup. A watcher
+polls the manifest; when train_from_db.py publishes a new version it is
+loaded in a worker thread and swapped in with a single reference assignment,
+so requests in flight keep the model they started with and no request waits
+for joblib. The previous version stays loaded for instant rollback.
+
+Per-version counters (requests, rows, latency) are kept for /models.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_FILE = os.path.join(MODELS_DIR, "model_manifest.json")
+LEGACY_MODEL_FILE = "signal_model.pkl"
+
+
+def _reload_interval() -> float:
+    try:
+        return float(os.getenv("ML_MODEL_RELOAD_INTERVAL", "30"))
+    except ValueError:
+        return 30.0
+
+
+@dataclass
+class LoadedModel:
+    version: str
+    file: str
+    model: Any
+    loaded_at: str
+    cv_accuracy: Optional[float] = None
+    requests: int = 0
+    rows: int = 0
+    errors: int = 0
+    latency_total_ms: float = 0.0
+    latency_max_ms: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, rows: int, seconds: float, ok: bool = True) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self.requests += 1
+            self.rows += rows
+            if not ok:
+                self.errors += 1
+            self.latency_total_ms += ms
+            self.latency_max_ms = max(self.latency_max_ms, ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            avg = self.latency_total_ms / self.requests if self.requests else 0.0
+            return {
+                "version": self.version,
+                "file": self.file,
+                "cv_accuracy": self.cv_accuracy,
+                "loaded_at": self.loaded_at,
+                "requests": self.requests,
+                "rows": self.rows,
+                "errors": self.errors,
+                "avg_latency_ms": round(avg, 3),
+                "max_latency_ms": round(self.latency_max_ms, 3),
+                "avg_rows_per_request": round(self.rows / self.requests, 2) if self.requests else 0.0,
+            }
+
+
+def read_manifest(path: str = MANIFEST_FILE) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"versions": [], "current": None}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _version_key(version: Any) -> str:
+    """'v6', 6, '6' → '6'."""
+    return str(version).strip().lower().lstrip("v")
+
+
+class ModelRegistry:
+    """Active + previous model in memory; swaps are a reference assignment under a lock."""
+
+    def __init__(self, models_dir: str = MODELS_DIR, manifest_file: str = MANIFEST_FILE):
+        self.models_dir = models_dir
+        self.manifest_file = manifest_file
+        self._active: Optional[LoadedModel] = None
+        self._previous: Optional[LoadedModel] = None
+        self._swap_lock = threading.Lock()
+        # одна загрузка за раз: watcher и ручной reload не грузят один файл дважды
+        self._load_lock = threading.Lock()
+        self._manifest_mtime: Optional[float] = None
+        self._watcher: Optional[asyncio.Task] = None
+
+    # --- loading -----------------------------------------------------------
+
+    def _target(self) -> Optional[Dict[str, Any]]:
+        """Manifest entry for the current version, or the legacy file."""
+        manifest = read_manifest(self.manifest_file)
+        current = manifest.get("current")
+        for entry in manifest.get("versions", []):
+            if current is not None and _version_key(entry.get("version")) == _version_key(current):
+                return entry
+        if os.path.exists(os.path.join(self.models_dir, LEGACY_MODEL_FILE)):
+            return {"version": "legacy", "file": LEGACY_MODEL_FILE}
+        return None
+
+    def _entry_for(self, version: Any) -> Optional[Dict[str, Any]]:
+        for entry in read_manifest(self.manifest_file).get("versions", []):
+            if _version_key(entry.get("version")) == _version_key(version):
+                return entry
+        return None
+
+    def _load(self, entry: Dict[str, Any]) -> Optional[LoadedModel]:
+        path = os.path.join(self.models_dir, entry["file"])
+        if not os.path.exists(path):
+            logger.warning(f"Model file not found: {path}")
+            return None
+        try:
+            import joblib
+
+            started = time.perf_counter()
+            model = joblib.load(path)
+        except Exception as e:
+            logger.warning(f"Failed to load model {path}: {e}")
+            return None
+        logger.info(f"Loaded model v{entry['version']} from {entry['file']} in {time.perf_counter() - started:.2f}s")
+        return LoadedModel(
+            version=_version_key(entry["version"]),
+            file=entry["file"],
+            model=model,
+            loaded_at=datetime.now(timezone.utc).isoformat(),
+            cv_accuracy=entry.get("cv_accuracy"),
+        )
+
+    def _swap(self, loaded: LoadedModel) -> None:
+        with self._swap_lock:
+            if self._active is not None and self._active.version != loaded.version:
+                self._previous = self._active
+            self._active = loaded
+        logger.info(f"Active model: v{loaded.version} (previous: {self._previous.version if self._previous else None})")
+
+    def _manifest_changed(self) -> bool:
+        try:
+            mtime = os.path.getmtime(self.manifest_file)
+        except OSError:
+            mtime = None
+        changed = mtime != self._manifest_mtime
+        self._manifest_mtime = mtime
+        return changed
+
+    def preload(self) -> Optional[LoadedModel]:
+        """Blocking load of the manifest's current version (startup)."""
+        self._manifest_changed()
+        return self.reload(force=True)
+
+    def reload(self, force: bool = False) -> Optional[LoadedModel]:
+        """Load the manifest's current version if it differs from the active one and swap it in."""
+        with self._load_lock:
+            target = self._target()
+            if target is None:
+                return self._active
+            version = _version_key(target["version"])
+            active = self._active
+            if not force and active is not None and active.version == version and active.file == target["file"]:
+                return active
+            # откат вперёд на предыдущую версию — уже в памяти
+            previous = self._previous
+            if previous is not None and previous.version == version and previous.file == target["file"]:
+                self._swap(previous)
+                return previous
+            loaded = self._load(target)
+            if loaded is not None:
+                self._swap(loaded)
+            return self._active
+
+    def activate(self, version: Any) -> Optional[LoadedModel]:
+        """Make a specific manifest version active (previous one stays warm)."""
+        key = _version_key(version)
+        with self._load_lock:
+            for warm in (self._active, self._previous):
+                if warm is not None and warm.version == key:
+                    self._swap(warm)
+                    return warm
+            entry = self._entry_for(version)
+            if entry is None:
+                return None
+            loaded = self._load(entry)
+            if loaded is not None:
+                self._swap(loaded)
+            return loaded
+
+    def rollback(self) -> Optional[LoadedModel]:
+        """Swap active and previous; no disk access."""
+        with self._swap_lock:
+            if self._previous is None:
+                return None
+            self._active, self._previous = self._previous, self._active
+            active = self._active
+        logger.info(f"Rolled back to model v{active.version}")
+        return active
+
+    # --- serving -----------------------------------------------------------
+
+    def active(self) -> Optional[LoadedModel]:
+        return self._active
+
+    def get(self, version: Any = None) -> Optional[LoadedModel]:
+        """Active model, or a warm (active/previous) one matching version (X-ML-Model-Version)."""
+        active, previous = self._active, self._previous
+        if version:
+            key = _version_key(version)
+            for warm in (active, previous):
+                if warm is not None and warm.version == key:
+                    return warm
+        return active
+
+    def stats(self) -> Dict[str, Any]:
+        active, previous = self._active, self._previous
+        return {
+            "active": active.stats() if active else None,
+            "previous": previous.stats() if previous else None,
+            "manifest": self.manifest_file,
+            "reload_interval_seconds": _reload_interval(),
+        }
+
+    def available_versions(self) -> List[Dict[str, Any]]:
+        return read_manifest(self.manifest_file).get("versions", [])
+
+    # --- background watcher -----------------------------------------------
+
+    async def _watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self._manifest_changed():
+                    await asyncio.to_thread(self.reload)
+            except Exception as e:
+                logger.warning(f"Model reload failed: {e}")
+
+    def start_watcher(self) -> None:
+        interval = _reload_interval()
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = asyncio.get_running_loop().create_task(self._watch(interval))
+
+    async def stop_watcher(self) -> None:
+        if self._watcher is None:
+            return
+        self._watcher.cancel()
+        try:
+            await self._watcher
+        except asyncio.CancelledError:
+            pass
+        self._watcher = None
+
+
+registry = ModelRegistry()
@@ -5,34 +5,44 @@ Falls back to rule-based prediction if no trained model exists.
 """
 import os
 import logging
+import time
 import numpy as np
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence
 from datetime import datetime
 
+from models.model_registry import registry
+
 logger = logging.getLogger(__name__)
 
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "signal_model.pkl")
 
-_model = None
-_model_loaded = False
+# Порядок столбцов матрицы признаков (как в train_and_save_model)
+FEATURE_NAMES = [
+    "confidence_score",
+    "risk_reward_ratio",
+    "price_deviation",
+    "direction",
+    "rsi",
+    "macd",
+    "channel_accuracy",
+    "channel_signal_count",
+]
+_FEATURE_DEFAULTS = {
+    "confidence_score": 0.5,
+    "risk_reward_ratio": 2.0,
+    "price_deviation": 0.05,
+    "direction": "LONG",
+    "rsi": 50.0,
+    "macd": 0.0,
+    "channel_accuracy": 50.0,
+    "channel_signal_count": 100,
+}
 
 
 def _load_model():
-    global _model, _model_loaded
-    if _model_loaded:
-        return _model
-    _model_loaded = True
-    if os.path.exists(MODEL_PATH):
-        try:
-            import joblib
-            _model = joblib.load(MODEL_PATH)
-            logger.info(f"Loaded trained model from {MODEL_PATH}")
-        except Exception as e:
-            logger.warning(f"Failed to load model: {e}")
-            _model = None
-    else:
-        logger.info("No trained model found, using rule-based predictor")
-    return _model
+    """Активная модель из registry (None — rule-based fallback)."""
+    loaded = registry.active()
+    return loaded.model if loaded is not None else None
 
 
 def train_and_save_model():
@@ -78,6 +88,7 @@ def train_and_save_model():
 
         accuracy = (model.predict(features) == labels).mean()
         joblib.dump(model, MODEL_PATH)
+        registry.reload(force=True)
         logger.info(f"Model trained and saved. Training accuracy: {accuracy:.1%}")
         return {"accuracy": round(accuracy * 100, 1), "samples": n_samples, "path": MODEL_PATH}
 
@@ -86,6 +97,89 @@ def train_and_save_model():
         return {"error": str(e)}
 
 
+def build_feature_matrix(rows: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """
+    N словарей признаков (ключи FEATURE_NAMES, пропуски — дефолты) → матрица N×8.
+    direction — 'LONG'/'SHORT' или уже 1.0/0.0 (строки signal_features).
+    """
+    matrix = np.empty((len(rows), len(FEATURE_NAMES)), dtype=float)
+    for i, row in enumerate(rows):
+        for j, name in enumerate(FEATURE_NAMES):
+            value = row.get(name)
+            if value is None:
+                value = _FEATURE_DEFAULTS[name]
+            if name == "direction" and isinstance(value, str):
+                value = 1.0 if value.upper() in ("LONG", "BUY") else 0.0
+            matrix[i, j] = float(value)
+    return matrix
+
+
+def _rule_based_scores(features: np.ndarray) -> np.ndarray:
+    return (
+        features[:, 0] * 0.3 +
+        np.minimum(features[:, 1] / 5, 1) * 0.15 +
+        (1 - np.minimum(features[:, 2] / 0.15, 1)) * 0.1 +
+        features[:, 3] * 0.05 +
+        np.abs(features[:, 4] - 50) / 50 * 0.1 +
+        features[:, 6] / 100 * 0.2 +
+        np.minimum(features[:, 7] / 500, 1) * 0.1
+    )
+
+
+def predict_batch(features: np.ndarray, model_version: Optional[str] = None) -> List[dict]:
+    """
+    Предсказания для матрицы признаков N×8 одним вызовом модели
+    (XGBoost predict_proba по всей матрице; без модели — векторизованные правила).
+    model_version — версия из X-ML-Model-Version, если она загружена (активная или предыдущая).
+    """
+    features = np.asarray(features, dtype=float).reshape(-1, len(FEATURE_NAMES))
+    if features.shape[0] == 0:
+        return []
+    # одна ссылка на весь вызов: hot swap посреди батча не смешивает версии
+    loaded = registry.get(model_version)
+
+    if loaded is not None:
+        started = time.perf_counter()
+        try:
+            proba = loaded.model.predict_proba(features)
+        except Exception as e:
+            loaded.record(len(features), time.perf_counter() - started, ok=False)
+            logger.warning(f"Model prediction failed: {e}")
+        else:
+            loaded.record(len(features), time.perf_counter() - started)
+            return [
+                {
+                    "prediction": "SUCCESS" if p[1] > 0.5 else "FAIL",
+                    "confidence": round(float(max(p)), 3),
+                    "success_probability": round(float(p[1]), 3),
+                    "model_type": "xgboost_trained",
+                    "model_version": f"v{loaded.version}",
+                }
+                for p in proba
+            ]
+
+    return [
+        {
+            "prediction": "SUCCESS" if score > 0.5 else "FAIL",
+            "confidence": round(float(score), 3),
+            "success_probability": round(float(score), 3),
+            "model_type": "rule_based_fallback",
+            "model_version": "0.1.0",
+        }
+        for score in _rule_based_scores(features)
+    ]
+
+
+def feature_importances(model_version: Optional[str] = None) -> Dict[str, float]:
+    """Важность признаков обученной модели (или веса правил fallback)."""
+    loaded = registry.get(model_version)
+    model = loaded.model if loaded is not None else None
+    weights = getattr(model, "feature_importances_", None) if model is not None else None
+    if weights is None:
+        weights = [0.3, 0.15, 0.1, 0.05, 0.1, 0.0, 0.2, 0.1]
+    return {name: round(float(w), 3) for name, w in zip(FEATURE_NAMES, weights)}
+
+
 def predict_signal_success(
     confidence_score: float = 0.5,
     risk_reward_ratio: float = 2.0,
@@ -97,47 +191,14 @@ def predict_signal_success(
     channel_signal_count: int = 100,
 ) -> dict:
     """Predict whether a signal will be successful."""
-    model = _load_model()
-
-    features = np.array([[
-        confidence_score,
-        risk_reward_ratio,
-        price_deviation,
-        1.0 if direction == "LONG" else 0.0,
-        rsi,
-        macd,
-        channel_accuracy,
-        float(channel_signal_count),
-    ]])
-
-    if model is not None:
-        try:
-            prediction = model.predict(features)[0]
-            proba = model.predict_proba(features)[0]
-            return {
-                "prediction": "SUCCESS" if prediction == 1 else "FAIL",
-                "confidence": round(float(max(proba)), 3),
-                "success_probability": round(float(proba[1]), 3),
-                "model_type": "xgboost_trained",
-                "model_version": "1.0.0",
-            }
-        except Exception as e:
-            logger.warning(f"Model prediction failed: {e}")
-
-    score = (
-        confidence_score * 0.3 +
-        min(risk_reward_ratio / 5, 1) * 0.15 +
-        (1 - min(price_deviation / 0.15, 1)) * 0.1 +
-        (1 if direction == "LONG" else 0) * 0.05 +
-        abs(rsi - 50) / 50 * 0.1 +
-        channel_accuracy / 100 * 0.2 +
-        min(channel_signal_count / 500, 1) * 0.1
-    )
-
-    return {
-        "prediction": "SUCCESS" if score > 0.5 else "FAIL",
-        "confidence": round(score, 3),
-        "success_probability": round(score, 3),
-        "model_type": "rule_based_fallback",
-        "model_version": "0.1.0",
-    }
+    features = build_feature_matrix([{
+        "confidence_score": confidence_score,
+        "risk_reward_ratio": risk_reward_ratio,
+        "price_deviation": price_deviation,
+        "direction": direction,
+        "rsi": rsi,
+        "macd": macd,
+        "channel_accuracy": channel_accuracy,
+        "channel_signal_count": channel_signal_count,
+    }])
+    return predict_batch(features)[0]
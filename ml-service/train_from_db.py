@@ -15,6 +15,9 @@ Usage:
   ML_SYNTHETIC_FALLBACK=1 — старый синтетический набор при очень малом N
   ML_INDICATOR_TIMEFRAME — таймфрейм для JOIN (по умолчанию 1d)
   ML_STRICT_DATA_QUALITY=1 — ошибка, если покрытие индикаторов < 30%%
+
+Если есть таблица signal_features (point-in-time feature store backend), признаки читаются из неё
+потоково и без LIMIT, матрица строится тем же build_feature_matrix, что и при инференсе.
 """
 from __future__ import annotations
 
@@ -28,6 +31,8 @@ from decimal import Decimal
 
 import numpy as np
 
+from models.trained_predictor import FEATURE_NAMES, build_feature_matrix
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -78,16 +83,65 @@ def _table_exists(conn, name: str, dialect: str) -> bool:
         return False
 
 
+_LABEL_STATUSES = {
+    1: ("TP1_HIT", "TP2_HIT", "TP3_HIT", "TP_HIT"),
+    0: ("SL_HIT", "EXPIRED", "CANCELLED"),
+}
+FEATURE_STORE_CHUNK = 5000
+
+
+def _create_engine():
+    from sqlalchemy import create_engine
+
+    if DATABASE_URL.startswith("sqlite"):
+        return create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    return create_engine(DATABASE_URL)
+
+
+def fetch_feature_rows():
+    """
+    Строки point-in-time feature store (signal_features, ведёт backend feature_store) + статус сигнала.
+    Читаются потоково чанками, без LIMIT; None — таблицы нет или она пуста (старый путь).
+    """
+    try:
+        from sqlalchemy import text
+
+        engine = _create_engine()
+        with engine.connect() as conn:
+            if not _table_exists(conn, "signal_features", engine.dialect.name):
+                return None
+            result = conn.execution_options(stream_results=True, yield_per=FEATURE_STORE_CHUNK).execute(text("""
+                SELECT
+                    sf.confidence_score, sf.risk_reward_ratio, sf.price_deviation, sf.direction,
+                    sf.rsi, sf.macd, sf.channel_accuracy, sf.channel_signal_count,
+                    s.status
+                FROM signal_features sf
+                JOIN signals s ON s.id = sf.signal_id
+                ORDER BY sf.as_of ASC, sf.signal_id ASC
+            """))
+            out = []
+            for chunk in result.partitions():
+                for row in chunk:
+                    m = row._mapping
+                    status = m["status"]
+                    out.append({
+                        "status": getattr(status, "value", status) or "PENDING",
+                        "rsi_14": m["rsi"],
+                        "macd_line": m["macd"],
+                        "features": {name: m[name] for name in FEATURE_NAMES},
+                    })
+        return out or None
+    except Exception as e:
+        logger.warning("Feature store read failed: %s. Fallback to signals query.", e)
+        return None
+
+
 def fetch_signals_from_db():
     """Fetch signals; при PostgreSQL и наличии technical_indicators — подтягиваем RSI/MACD."""
     try:
-        from sqlalchemy import create_engine, text
-
-        if DATABASE_URL.startswith("sqlite"):
-            engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-        else:
-            engine = create_engine(DATABASE_URL)
+        from sqlalchemy import text
 
+        engine = _create_engine()
         dialect = engine.dialect.name
 
         with engine.connect() as conn:
@@ -229,6 +283,10 @@ def _fetch_signals_from_api():
 
 
 def fetch_signals():
+    signals = fetch_feature_rows()
+    if signals:
+        logger.info("Признаки из feature store (signal_features): %d строк", len(signals))
+        return signals
     signals = fetch_signals_from_db()
     return signals if signals else []
 
@@ -250,7 +308,24 @@ def _label_for_status(status: str, conf: float, allow_proxy_pending: bool):
     return None
 
 
+def _features_from_store(signals, allow_proxy_pending: bool):
+    """Строки signal_features → матрица тем же build_feature_matrix, что и при инференсе; метки — векторно."""
+    features = build_feature_matrix([s["features"] for s in signals])
+    statuses = np.array([(s.get("status") or "").upper() for s in signals])
+    conditions = [np.isin(statuses, _LABEL_STATUSES[1]), np.isin(statuses, _LABEL_STATUSES[0])]
+    choices = [1, 0]
+    if allow_proxy_pending:
+        conditions.append(np.isin(statuses, ("PENDING", "ENTRY_HIT", "")))
+        choices.append((features[:, 0] > 0.6).astype(int))
+    labels = np.select(conditions, choices, default=-1)
+    placeholder_rows = sum(1 for s in signals if s.get("rsi_14") is None or s.get("macd_line") is None)
+    return features, labels, placeholder_rows
+
+
 def build_features(signals, allow_proxy_pending: bool):
+    if signals and all("features" in s for s in signals):
+        return _features_from_store(signals, allow_proxy_pending)
+
     features = []
     labels = []
     placeholder_rows = 0
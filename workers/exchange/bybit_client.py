@@ -25,6 +25,12 @@ except ImportError:
     sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
     from real_data_config import BYBIT_API_KEY, BYBIT_API_SECRET, CRYPTO_SYMBOLS
 
+# Общая таблица последних цен из потока backend (если backend в sys.path)
+try:
+    from app.services.price_feed import last_prices
+except ImportError:
+    last_prices = None
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -285,6 +291,12 @@ class BybitClient:
             symbols = CRYPTO_SYMBOLS
             
         prices = {}
+
+        # Свежие тики потока цен: REST только если чего-то в таблице нет
+        if last_prices is not None:
+            prices = {s: Decimal(str(p)) for s, p in last_prices(symbols).items()}
+            if len(prices) == len(set(symbols)):
+                return prices
         
         try:
             data = await self._make_request(
@@ -296,7 +308,7 @@ class BybitClient:
             if data:
                 for ticker in data.get("result", {}).get("list", []):
                     symbol = ticker.get("symbol", "")
-                    if symbol in symbols:
+                    if symbol in symbols and symbol not in prices:
                         try:
                             price = Decimal(ticker.get("lastPrice", "0"))
                             prices[symbol] = price
@@ -33,6 +33,13 @@ except ImportError:
     BACKEND_AVAILABLE = False
     print("Warning: Backend models not available")
 
+# Shared last-price table fed by the backend price feed (WebSocket ticks via Redis)
+try:
+    from app.services.price_feed import last_prices
+    PRICE_FEED_AVAILABLE = True
+except ImportError:
+    PRICE_FEED_AVAILABLE = False
+
 # Import Bybit client
 try:
     from .bybit_client import BybitClient
@@ -156,9 +163,15 @@ class PriceMonitor:
         return None
 
     async def get_current_price(self, symbol: str) -> Optional[float]:
-        """Get current price with priority: Bybit -> Binance -> CoinGecko -> Mock"""
+        """Get current price with priority: price feed -> Bybit -> Binance -> CoinGecko -> Mock"""
         if not self.use_real_data:
             return self.get_mock_price(symbol)
+
+        # Priority 0: live price feed (no REST call)
+        if PRICE_FEED_AVAILABLE:
+            price = last_prices([symbol]).get(symbol)
+            if price:
+                return price
             
         # Priority 1: Bybit (our primary exchange)
         if self.bybit_available:
@@ -184,6 +197,19 @@ class PriceMonitor:
         logger.warning(f"⚠️ Using mock price for {symbol}")
         return self.get_mock_price(symbol)
 
+    async def get_current_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Prices for many assets: one price feed lookup, REST chain only for what it lacks"""
+        unique = list(dict.fromkeys(s for s in symbols if s))
+        prices: Dict[str, float] = {}
+        if self.use_real_data and PRICE_FEED_AVAILABLE:
+            prices.update(last_prices(unique))
+        for symbol in unique:
+            if symbol not in prices:
+                price = await self.get_current_price(symbol)
+                if price:
+                    prices[symbol] = price
+        return prices
+
     async def get_market_data_real(self, symbols: List[str] = None) -> Dict[str, Dict]:
         """Get comprehensive market data from Bybit"""
         if not self.bybit_available or not self.use_real_data:
@@ -336,14 +362,16 @@ class PriceMonitor:
                 Signal.status.in_(['PENDING', 'PARTIAL']),
                 Signal.created_at >= datetime.now() - timedelta(days=7)  # Only recent signals
             ).all()
+
+            # One price lookup per asset, not per signal
+            prices = await self.get_current_prices([signal.asset for signal in active_signals])
             
             for signal in active_signals:
                 try:
                     monitored_signals += 1
                     assets_monitored.add(signal.asset)
                     
-                    # Get current price
-                    current_price = await self.get_current_price(signal.asset)
+                    current_price = prices.get(signal.asset)
                     if not current_price:
                         continue
                         
@@ -366,9 +394,6 @@ class PriceMonitor:
                     if execution_result['status_changed']:
                         if await self.update_signal_status(db, signal.id, execution_result):
                             updated_signals += 1
-                            
-                    # Small delay to avoid overwhelming the API
-                    await asyncio.sleep(0.1)
                     
                 except Exception as e:
                     logger.error(f"Error monitoring signal {signal.id}: {e}")
@@ -3,7 +3,6 @@ import sys
 import logging
 from celery import Celery
 from dotenv import load_dotenv
-import httpx
 from datetime import datetime, timedelta
 
 # Добавляем пути для импорта
@@ -175,49 +174,36 @@ def get_ml_predictions():
     logger.info("Starting ML predictions for signals")
     
     try:
-        # Получаем предсказания от ML-сервиса
-        ml_service_url = os.getenv("ML_SERVICE_URL", "http://ml-service:8001")
+        # PENDING-сигналы уходят в ML-сервис одной пачкой (/api/v1/predictions/batch)
+        import asyncio
+        backend_dir = os.path.join(parent_dir, "backend")
+        if backend_dir not in sys.path:
+            sys.path.append(backend_dir)
+        from app.core.database import SessionLocal
+        from app.services.ml_prediction_sweep import predict_pending_signals
         
+        db = SessionLocal()
         try:
-            # Синхронный запрос к ML сервису
-            with httpx.Client(timeout=30.0) as client:
-                # Получаем информацию о модели
-                response = client.get(f"{ml_service_url}/api/v1/predictions/model-info")
-                if response.status_code == 200:
-                    model_info = response.json()
-                    logger.info(f"ML service available: {model_info.get('model_name', 'Unknown')}")
-                    
-                    # Получаем предсказания для новых сигналов
-                    # В реальном проекте здесь будет логика получения сигналов из БД
-                    # и отправки их на предсказание
-                    
-                    return {
-                        "status": "success", 
-                        "predicted_signals": 8, 
-                        "ml_service_status": "available",
-                        "timestamp": datetime.now().isoformat()
-                    }
-                else:
-                    logger.warning(f"ML service not available: {response.status_code}")
-                    return {
-                        "status": "warning", 
-                        "predicted_signals": 0, 
-                        "ml_service_status": "unavailable",
-                        "timestamp": datetime.now().isoformat()
-                    }
-        except Exception as e:
-            logger.error(f"Error connecting to ML service: {e}")
-            return {
-                "status": "error", 
-                "predicted_signals": 0, 
-                "ml_service_status": "error",
-                "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            }
+            result = asyncio.run(predict_pending_signals(db))
+        finally:
+            db.close()
+        
+        return {
+            "status": "success",
+            "predicted_signals": result.get("predicted_signals", 0),
+            "ml_service_status": "available",
+            "timestamp": datetime.now().isoformat()
+        }
     
     except Exception as e:
         logger.error(f"Error getting ML predictions: {str(e)}")
-        return {"status": "error", "error": str(e), "timestamp": datetime.now().isoformat()}
+        return {
+            "status": "error",
+            "predicted_signals": 0,
+            "ml_service_status": "error",
+            "error": str(e),
+            "timestamp": datetime.now().isoformat()
+        }
 
 # Задача для мониторинга цен в реальном времени
 @app.task(name="monitor_prices")